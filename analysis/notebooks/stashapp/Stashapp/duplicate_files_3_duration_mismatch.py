@@ -8,6 +8,7 @@ import polars as pl
 sys.path.append(str(Path.cwd().parent))
 
 from libraries.client_stashapp import StashAppClient, get_stashapp_client
+from libraries.duplicate_files import check_duplicate_files, load_duplicate_files
 
 
 stash = get_stashapp_client()
@@ -46,52 +47,8 @@ stash_client.update_tags_for_scenes(
 
 
 # %%
-scenes_with_dupes = stash.find_scenes({
-  "file_count": {
-    "modifier": "GREATER_THAN",
-    "value": 1
-  },
-  "tags": {
-    "value": [],
-    "modifier": "INCLUDES",
-    "excludes": [scenes_with_multiple_versions["id"]]
-  }
-}, fragment="id title date studio { name } files { id duration path width height size fingerprints { type value } }")
-
-
-
-
-
-# %%
-# Create a list to store all file records
-file_records = []
-
-for scene in scenes_with_dupes:
-    for i, file in enumerate(scene["files"]):
-        # Extract fingerprints
-        oshash = next((fp["value"] for fp in file["fingerprints"] if fp["type"] == "oshash"), None)
-        phash = next((fp["value"] for fp in file["fingerprints"] if fp["type"] == "phash"), None)
-
-        # Create a record for each file
-        record = {
-            "scene_id": scene["id"],
-            "title": scene["title"],
-            "date": scene["date"],
-            "studio_name": scene["studio"]["name"] if scene["studio"] else None,
-            "file_id": file["id"],
-            "file_path": file["path"],
-            "resolution_width": file["width"],
-            "resolution_height": file["height"],
-            "size": file["size"],
-            "duration": file["duration"],
-            "oshash": oshash,
-            "phash": phash,
-            "is_primary": i == 0  # True if this is the first file in the scene's files list
-        }
-        file_records.append(record)
-
-# Create Polars DataFrame
-scenes_with_multiple_files_df = pl.DataFrame(file_records)
+# All files of scenes with more than one file, except scenes tagged "Scene: Multiple Versions"
+scenes_with_multiple_files_df = load_duplicate_files(stash_client)
 scenes_with_multiple_files_df
 
 
@@ -104,64 +61,22 @@ scenes_with_multiple_files_df
 # # Finding scenes where durations do not match
 
 # %%
-# Create a list to store all file records
-file_records = []
-
-for scene in scenes_with_dupes:
-    for i, file in enumerate(scene["files"]):
-        # Extract fingerprints
-        oshash = next((fp["value"] for fp in file["fingerprints"] if fp["type"] == "oshash"), None)
-        phash = next((fp["value"] for fp in file["fingerprints"] if fp["type"] == "phash"), None)
-
-        # Create a record for each file
-        record = {
-            "scene_id": scene["id"],
-            "title": scene["title"],
-            "date": scene["date"],
-            "studio_name": scene["studio"]["name"] if scene["studio"] else None,
-            "file_id": file["id"],
-            "file_path": file["path"],
-            "resolution_width": file["width"],
-            "resolution_height": file["height"],
-            "size": file["size"],
-            "duration": round(file["duration"]),  # Round duration to nearest second
-            "oshash": oshash,
-            "phash": phash,
-            "is_primary": i == 0  # True if this is the first file in the scene's files list
-        }
-        file_records.append(record)
-
-# Create Polars DataFrame
-scenes_with_multiple_files_df = pl.DataFrame(file_records)
-
-# Group by scene_id and find scenes where durations don't match
-duration_mismatches = scenes_with_multiple_files_df.group_by("scene_id").agg([
-    pl.col("title").first().alias("title"),
-    pl.col("duration").n_unique().alias("unique_durations"),
-    pl.col("duration").alias("all_durations"),
-    pl.col("file_id").alias("all_file_ids"),
-    pl.col("file_path").alias("all_file_paths"),
-    pl.col("size").alias("all_file_sizes"),
-    pl.col("is_primary").alias("all_is_primary")
-]).filter(
-    pl.col("unique_durations") > 1  # Only keep scenes with different durations
-).sort("scene_id")
+# Scenes whose longest and shortest file differ by more than a second
+duration_mismatches = check_duplicate_files(scenes_with_multiple_files_df, duration_tolerance=1.0).filter(
+    pl.col("duration_mismatch")
+)
+mismatched_files = scenes_with_multiple_files_df.join(duration_mismatches.select("scene_id"), on="scene_id")
 
 # Print summary of mismatched files
 print("\nScenes with duration mismatches:")
-for row in duration_mismatches.iter_rows(named=True):
-    print(f"\nScene {row['scene_id']} - {row['title']}")
-
-    for i, (duration, file_id, file_path, size, is_primary) in enumerate(zip(
-        row["all_durations"],
-        row["all_file_ids"],
-        row["all_file_paths"],
-        row["all_file_sizes"],
-        row["all_is_primary"], strict=False
-    )):
-        primary_status = " (Primary)" if is_primary else ""
-        print(f"  File{primary_status}: {file_path}")
-        print(f"    Duration: {duration}s, ID: {file_id}, Size: {size:,} bytes")
+for (scene_id,), group in mismatched_files.group_by("scene_id", maintain_order=True):
+    scene_files = group.to_dicts()
+    print(f"\nScene {scene_id} - {scene_files[0]['title']}")
+
+    for file in scene_files:
+        primary_status = " (Primary)" if file["is_primary"] else ""
+        print(f"  File{primary_status}: {file['file_path']}")
+        print(f"    Duration: {file['duration']}s, ID: {file['file_id']}, Size: {file['size']:,} bytes")
 
 # Print summary statistics
 print(f"\nTotal scenes with duration mismatches: {len(duration_mismatches)}")
@@ -170,7 +85,7 @@ print(f"\nTotal scenes with duration mismatches: {len(duration_mismatches)}")
 
 
 # %%
-duration_mismatches_scene_ids = duration_mismatches.select("scene_id").to_series().to_list()
+duration_mismatches_scene_ids = duration_mismatches["scene_id"].to_list()
 stash_client.update_tags_for_scenes(
     duration_mismatches_scene_ids,
     [duration_mismatch_tag["name"]],
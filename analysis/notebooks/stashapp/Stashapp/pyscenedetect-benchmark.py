@@ -0,0 +1,142 @@
+"""Benchmark pyscenedetect-process.py on locally generated test videos.
+
+Compares the previous processing (a 960x540 intermediate file, then scenedetect on it,
+one video at a time) with scene detection on an ffmpeg pipe in a pool of workers, then
+renames the videos and runs again to show scene lists coming from the oshash cache. The
+previous processing encodes its intermediate file with libx264 instead of h264_nvenc, as
+it would have to on a worker without an NVIDIA GPU. Reports frames/second and how many of
+the generated cuts each finds.
+
+Usage:
+    python pyscenedetect-benchmark.py --videos 4 --segments 12 --segment-duration 10 --workers 2
+"""
+
+import argparse
+import importlib
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from scenedetect import ContentDetector, SceneManager, open_video
+
+
+pyscenedetect_process = importlib.import_module("pyscenedetect-process")
+
+SOURCES = ["testsrc2", "smptehdbars", "mandelbrot", "rgbtestsrc", "cellauto", "life", "yuvtestsrc", "pal100bars"]
+
+
+def generate_video(path: Path, segments: int, segment_duration: int, offset: int):
+    """A 720p H.264 video of segments test patterns, one cut between each."""
+    command = ["ffmpeg", "-v", "error"]
+    for segment in range(segments):
+        source = SOURCES[(segment + offset) % len(SOURCES)]
+        command += ["-f", "lavfi", "-t", str(segment_duration), "-i", f"{source}=size=1280x720:rate=24"]
+    scaled = "".join(f"[{segment}:v]scale=1280:720,setsar=1,format=yuv420p[v{segment}];" for segment in range(segments))
+    inputs = "".join(f"[v{segment}]" for segment in range(segments))
+    command += [
+        "-filter_complex", f"{scaled}{inputs}concat=n={segments}:v=1:a=0[out]",
+        "-map", "[out]",
+        "-c:v", "libx264",
+        "-preset", "ultrafast",
+        "-y", str(path),
+    ]  # fmt: skip
+    subprocess.run(command, check=True)
+
+
+def previous_processing(video_path: Path) -> tuple[list[int], int]:
+    """The previous pipeline on the CPU: downscale to an intermediate file, then detect on it."""
+    downscaled_path = video_path.with_name(f"{video_path.stem}.540p{video_path.suffix}")
+    subprocess.run(
+        [
+            "ffmpeg", "-v", "error",
+            "-i", str(video_path),
+            "-vf", "scale=960:540",
+            "-c:v", "libx264",
+            "-preset", "ultrafast",
+            "-b:v", "1M",
+            "-an",
+            "-y", str(downscaled_path),
+        ],
+        check=True,
+    )  # fmt: skip
+    try:
+        video = open_video(str(downscaled_path))
+        scene_manager = SceneManager()
+        scene_manager.add_detector(ContentDetector())
+        scene_manager.detect_scenes(video=video)
+        cuts = [start.frame_num for start, _ in scene_manager.get_scene_list(start_in_scene=True)[1:]]
+        return cuts, video.frame_number
+    finally:
+        downscaled_path.unlink(missing_ok=True)
+
+
+def sidecar_cuts(video_path: Path) -> list[int]:
+    """Start frames of all but the first scene in a video's sidecar, 0-based like FrameTimecode."""
+    lines = pyscenedetect_process.get_sidecar_path(video_path).read_text().splitlines()
+    return [int(line.split(",")[1]) - 1 for line in lines[3:] if line]
+
+
+def score_cuts(found: list[int], generated: list[int]) -> tuple[int, int]:
+    """Generated cuts found within one frame, and cuts found that are not generated ones."""
+    matched = sum(any(abs(cut - other) <= 1 for other in found) for cut in generated)
+    extra = sum(not any(abs(cut - other) <= 1 for other in generated) for cut in found)
+    return matched, extra
+
+
+def report(label: str, frames: int, elapsed: float, videos: int):
+    print(f"{label:<28} {frames:7} frames {elapsed:7.2f}s {frames / elapsed:8.1f} frames/s {videos / elapsed * 60:6.1f} videos/min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pyscenedetect-process.py")
+    parser.add_argument("--videos", type=int, default=4, help="Number of test videos")
+    parser.add_argument("--segments", type=int, default=12, help="Scenes per test video")
+    parser.add_argument("--segment-duration", type=int, default=10, help="Seconds per scene")
+    parser.add_argument("--workers", type=int, default=2, help="Videos processed in parallel")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        video_paths = [tmp_path / f"video-{index}.mp4" for index in range(args.videos)]
+        for index, video_path in enumerate(video_paths):
+            generate_video(video_path, args.segments, args.segment_duration, index)
+        print(
+            f"Test videos: {args.videos} x {args.segments * args.segment_duration}s 720p, "
+            f"{args.segments - 1} cuts each, {args.workers} workers"
+        )
+
+        start = time.perf_counter()
+        previous = [previous_processing(video_path) for video_path in video_paths]
+        report("previous (sequential)", sum(frames for _, frames in previous), time.perf_counter() - start, args.videos)
+
+        cache_dir = tmp_path / "cache"
+        start = time.perf_counter()
+        counts = pyscenedetect_process.process_videos([(path, None) for path in video_paths], workers=args.workers, cache_dir=cache_dir)
+        elapsed = time.perf_counter() - start
+        report("ffmpeg pipe (pool)", sum(frames for _, frames in previous), elapsed, counts["detected"])
+
+        generated = [segment * args.segment_duration * 24 for segment in range(1, args.segments)]
+        for label, found in [
+            ("previous", [cuts for cuts, _ in previous]),
+            ("ffmpeg pipe", [sidecar_cuts(video_path) for video_path in video_paths]),
+        ]:
+            scores = [score_cuts(cuts, generated) for cuts in found]
+            print(
+                f"{label:<28} found {sum(matched for matched, _ in scores)} of {len(generated) * args.videos} "
+                f"generated cuts, {sum(extra for _, extra in scores)} other cuts"
+            )
+
+        # Renamed files keep their oshash, so their scene lists come from the cache
+        renamed = []
+        for video_path in video_paths:
+            renamed_path = video_path.with_name(f"renamed-{video_path.name}")
+            video_path.rename(renamed_path)
+            renamed.append(renamed_path)
+        start = time.perf_counter()
+        counts = pyscenedetect_process.process_videos([(path, None) for path in renamed], workers=args.workers, cache_dir=cache_dir)
+        print(f"{'renamed (cache)':<28} {time.perf_counter() - start:7.2f}s, {counts['cached']} of {args.videos} from the cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,161 +1,304 @@
+import argparse
+import json
+import os
+import shutil
 import subprocess
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+import numpy as np
+from scenedetect import ContentDetector, SceneManager, VideoStream
+from scenedetect.scene_manager import write_scene_list
+from scenedetect.video_stream import SeekError
 
-sys.path.append(str(Path.cwd().parent))
 
-from libraries.client_stashapp import StashAppClient, get_stashapp_client
+sys.path.append(str(Path.cwd().parent))
 
+from libraries.client_stashapp import get_stashapp_client
 
-def get_sidecar_file(video_path):
-    """Check if a sidecar file exists for the given video file."""
-    video_path = Path(video_path)
-    # Look for a sidecar file with .Scenes.csv extension
-    sidecar_pattern = f"{video_path.name}.Scenes.csv"
-    sidecar_path = video_path.parent / sidecar_pattern
 
-    if sidecar_path.exists():
-        return str(sidecar_path)
-    return None
-
-
-def downscale_video(input_path):
-    """Downscale video using ffmpeg with NVENC."""
-    input_path = Path(input_path)
-    output_path = input_path.parent / f"{input_path.stem}.540p{input_path.suffix}"
-
-    ffmpeg_cmd = [
-        "ffmpeg",
-        "-hwaccel",
-        "cuda",
-        "-hwaccel_output_format",
-        "cuda",
-        "-i",
-        str(input_path),
-        "-vf",
-        "scale_cuda=960:540",
-        "-c:v",
-        "h264_nvenc",
-        "-preset",
-        "p1",  # Fastest preset
-        "-tune",
-        "ll",  # Low latency
-        "-rc",
-        "cbr",  # Constant bitrate
-        "-b:v",
-        "1M",  # Low bitrate since quality doesn't matter
-        "-an",
-        str(output_path),
-    ]
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "culture" / "pyscenedetect"
 
-    subprocess.run(ffmpeg_cmd, check=True)
-    return str(output_path)
+# Frames are analysed at the size scenedetect downscaled the previous 960x540 intermediate file to
+ANALYSIS_WIDTH = 320
+ANALYSIS_HEIGHT = 180
 
 
-def run_scene_detection(video_path):
-    """Run scene detection on the video file."""
+def get_sidecar_path(video_path):
+    """The .Scenes.csv sidecar file of a video file."""
     video_path = Path(video_path)
-    scenedetect_cmd = [
-        "scenedetect",
-        "--input",
-        str(video_path),
-        "--output",
-        str(video_path.parent),
-        "detect-content",
-        "list-scenes",
-    ]
+    return video_path.parent / f"{video_path.name}.Scenes.csv"
 
-    subprocess.run(scenedetect_cmd, check=True)
 
+def oshash(video_path):
+    """The OpenSubtitles hash Stashapp uses as a file fingerprint.
 
-def rename_scene_csv(video_path):
-    """Rename the scene CSV file to match the original filename pattern."""
+    File size plus the sums of the 64-bit little-endian words of the first and last 64 KiB,
+    so only 128 KiB of the file is read.
+    """
     video_path = Path(video_path)
+    size = video_path.stat().st_size
+    chunk_size = min(64 * 1024, size)
+    with video_path.open("rb") as f:
+        head = f.read(chunk_size)
+        f.seek(size - chunk_size)
+        tail = f.read(chunk_size)
+    checksum = size
+    for chunk in (head, tail):
+        words = np.frombuffer(chunk[: len(chunk) // 8 * 8], dtype="<u8")
+        checksum += int(words.sum(dtype=np.uint64))
+    return f"{checksum & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+class FFmpegPipeStream(VideoStream):
+    """A video decoded and downscaled by ffmpeg, read as raw BGR frames from its stdout.
+
+    scenedetect reads frames in order and never seeks, so the video is decoded once on
+    the CPU (or with hwaccel) and no intermediate file is written.
+    """
+
+    BACKEND_NAME = "ffmpeg_pipe"
+
+    def __init__(self, video_path, width=ANALYSIS_WIDTH, height=ANALYSIS_HEIGHT, threads=0, hwaccel=None):
+        super().__init__()
+        self._path = str(video_path)
+        self._width = width
+        self._height = height
+        self._frame_bytes = width * height * 3
+        self._frames = 0
+
+        probe = json.loads(
+            subprocess.run(
+                [
+                    "ffprobe",
+                    "-v", "error",
+                    "-select_streams", "v:0",
+                    "-show_entries", "stream=avg_frame_rate,r_frame_rate:format=duration",
+                    "-of", "json",
+                    self._path,
+                ],
+                capture_output=True,
+                check=True,
+            ).stdout
+        )  # fmt: skip
+        stream = probe["streams"][0]
+        frame_rate = stream["avg_frame_rate"] if stream["avg_frame_rate"] != "0/0" else stream["r_frame_rate"]
+        numerator, denominator = (int(part) for part in frame_rate.split("/"))
+        self._frame_rate = numerator / denominator
+        self._duration = float(probe["format"].get("duration") or 0)
+
+        command = ["ffmpeg", "-v", "error", "-nostdin", "-threads", str(threads)]
+        if hwaccel:
+            command += ["-hwaccel", hwaccel]
+        command += [
+            "-i", self._path,
+            "-map", "0:v:0",
+            "-vf", f"scale={width}:{height}:flags=fast_bilinear",
+            "-fps_mode", "passthrough",
+            "-pix_fmt", "bgr24",
+            "-f", "rawvideo",
+            "-",
+        ]  # fmt: skip
+        self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=self._frame_bytes * 4)
+
+    @property
+    def frame_rate(self):
+        return self._frame_rate
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def name(self):
+        return Path(self._path).stem
+
+    @property
+    def is_seekable(self):
+        return False
+
+    @property
+    def frame_size(self):
+        return (self._width, self._height)
+
+    @property
+    def duration(self):
+        return self.base_timecode + round(self._duration * self._frame_rate) if self._duration else None
+
+    @property
+    def aspect_ratio(self):
+        return 1.0
+
+    @property
+    def position(self):
+        return self.base_timecode + max(self._frames - 1, 0)
+
+    @property
+    def position_ms(self):
+        return max(self._frames - 1, 0) * 1000.0 / self._frame_rate
+
+    @property
+    def frame_number(self):
+        return self._frames
+
+    def seek(self, target):
+        raise SeekError(f"Cannot seek to {target}, ffmpeg pipe streams are read in order")
+
+    def reset(self):
+        raise SeekError("Cannot reset, ffmpeg pipe streams are read in order")
+
+    def read(self, decode=True):
+        frame = self._process.stdout.read(self._frame_bytes)
+        if len(frame) < self._frame_bytes:
+            return False
+        self._frames += 1
+        if not decode:
+            return True
+        return np.frombuffer(frame, dtype=np.uint8).reshape(self._height, self._width, 3)
+
+    def close(self, kill=False):
+        """Wait for ffmpeg, or stop it, and return its exit code and error output."""
+        if kill and self._process.poll() is None:
+            self._process.kill()
+        _, stderr = self._process.communicate()
+        return self._process.returncode, stderr.decode(errors="replace").strip()
+
+
+def detect_scenes(video_path, output_csv, threads=0, hwaccel=None):
+    """Detect scene cuts with ContentDetector and write the scene list CSV.
+
+    Returns:
+        Number of scenes and number of analysed frames
+    """
+    stream = FFmpegPipeStream(video_path, threads=threads, hwaccel=hwaccel)
+    scene_manager = SceneManager()
+    scene_manager.add_detector(ContentDetector())
+    scene_manager.auto_downscale = False  # ffmpeg already scaled the frames
+    try:
+        scene_manager.detect_scenes(video=stream)
+    except BaseException:
+        stream.close(kill=True)
+        raise
+    returncode, stderr = stream.close()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on {video_path}: {stderr}")
 
-    # Find all CSV files in the directory that might be our scene file
-    csv_files = list(video_path.parent.glob(f"{video_path.stem}*-Scenes.csv"))
-
-    if not csv_files:
-        # If no exact match, try to find the most recent CSV file
-        # that was created after the video file
-        video_mtime = video_path.stat().st_mtime
-        csv_files = [
-            f
-            for f in video_path.parent.glob("*-Scenes.csv")
-            if f.stat().st_mtime > video_mtime
-        ]
-
-    if csv_files:
-        # Get the most recently modified CSV file
-        latest_csv = max(csv_files, key=lambda x: x.stat().st_mtime)
-
-        # Create new filename by removing .540p from the name
-        # but preserve the original filename structure including extension
-        original_name = str(video_path.name).replace(".540p", "")
-        new_csv_path = video_path.parent / f"{original_name}.Scenes.csv"
-
-        print(f"Found CSV file: {latest_csv}")
-        print(f"Renaming to: {new_csv_path}")
+    scene_list = scene_manager.get_scene_list(start_in_scene=True)
+    with Path(output_csv).open("w", newline="") as f:
+        write_scene_list(f, scene_list, include_cut_list=True)
+    return len(scene_list), stream.frame_number
 
-        latest_csv.rename(new_csv_path)
-        return str(new_csv_path)
 
-    return None
+def process_video(video_path, file_oshash=None, cache_dir=DEFAULT_CACHE_DIR, threads=0, hwaccel=None):
+    """Write a video's .Scenes.csv sidecar, from the cache when its oshash was processed before.
 
+    Scene lists are cached as <cache_dir>/<oshash>.Scenes.csv, so a renamed or moved file
+    gets its sidecar back without decoding it again. Existing sidecars are added to the cache.
 
-def process_video(video_path):
-    """Main function to process a video file."""
+    Returns:
+        "sidecar", "cached" or "detected", and the number of analysed frames
+    """
     video_path = Path(video_path)
+    sidecar_path = get_sidecar_path(video_path)
+    cache_path = Path(cache_dir) / f"{file_oshash or oshash(video_path)}.Scenes.csv"
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Check if sidecar file exists
-    sidecar_file = get_sidecar_file(video_path)
-    if sidecar_file:
-        print(f"Sidecar file already exists: {sidecar_file}")
-        return
+    if sidecar_path.exists():
+        if not cache_path.exists():
+            shutil.copyfile(sidecar_path, cache_path)
+        return "sidecar", 0
 
-    # Downscale video
-    print(f"Downscaling video: {video_path}")
-    downscaled_path = downscale_video(video_path)
+    if cache_path.exists():
+        shutil.copyfile(cache_path, sidecar_path)
+        return "cached", 0
 
+    # Written under a temporary name, so an interrupted detection leaves no scene list behind
+    partial_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.partial")
     try:
-        # Run scene detection
-        print(f"Running scene detection on: {downscaled_path}")
-        run_scene_detection(downscaled_path)
-
-        # Rename CSV file
-        print("Renaming scene CSV file")
-        new_csv_path = rename_scene_csv(downscaled_path)
-        if new_csv_path:
-            print(f"Renamed CSV file to: {new_csv_path}")
+        _, frames = detect_scenes(video_path, partial_path, threads=threads, hwaccel=hwaccel)
+        partial_path.replace(cache_path)
     finally:
-        # Clean up downscaled video file
-        print(f"Deleting downscaled video: {downscaled_path}")
-        Path(downscaled_path).unlink(missing_ok=True)
+        partial_path.unlink(missing_ok=True)
+    shutil.copyfile(cache_path, sidecar_path)
+    return "detected", frames
+
+
+def process_videos(videos, workers=2, cache_dir=DEFAULT_CACHE_DIR, hwaccel=None):
+    """Process (video path, oshash or None) pairs on a pool of workers processes.
+
+    Each worker runs one ffmpeg decode and one detector, and ffmpeg's decoding threads are
+    divided between the workers.
+
+    Returns:
+        Number of videos per outcome: sidecar, cached, detected and failed
+    """
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    counts = dict.fromkeys(["sidecar", "cached", "detected", "failed"], 0)
+    frames = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_video, video_path, file_oshash, cache_dir, threads, hwaccel): video_path
+            for video_path, file_oshash in videos
+        }
+        for future in as_completed(futures):
+            video_path = futures[future]
+            try:
+                outcome, video_frames = future.result()
+            except Exception as e:
+                print(f"Failed: {video_path}: {e}")
+                counts["failed"] += 1
+                continue
+            counts[outcome] += 1
+            frames += video_frames
+            if outcome == "detected":
+                print(f"Detected scenes of {video_path} ({video_frames} frames)")
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Processed {len(futures)} videos in {elapsed:.1f}s: "
+        + ", ".join(f"{count} {outcome}" for outcome, count in counts.items())
+        + (f", {frames / elapsed:.0f} frames/s" if frames else "")
+    )
+    return counts
+
+
+def scenes_to_process():
+    """(path, oshash) of the primary files of AI tagged scenes without PySceneDetect processing."""
+    stash = get_stashapp_client()
+
+    ai_tagged_tag = stash.find_tag("AI_Tagged")
+    pyscenedetect_processed_tag = stash.find_tag("Scenes: PySceneDetect: Processed")
+    scenes_with_ai_wo_pyscenedetect = stash.find_scenes(
+        {
+            "tags": {
+                "value": [ai_tagged_tag["id"]],
+                "modifier": "INCLUDES_ALL",
+                "excludes": [pyscenedetect_processed_tag["id"]],
+            }
+        },
+        fragment="id title files { id path fingerprints { type value } }",
+    )
+
+    return [
+        (
+            scene["files"][0]["path"],
+            next((fp["value"] for fp in scene["files"][0]["fingerprints"] if fp["type"] == "oshash"), None),
+        )
+        for scene in scenes_with_ai_wo_pyscenedetect
+        if scene["files"]
+    ]
 
 
 if __name__ == "__main__":
-    import sys
-
-    if len(sys.argv) == 2:
-        video_file = sys.argv[1]
-        process_video(video_file)
-    else:
-        stash = get_stashapp_client()
-        stash_client = StashAppClient()
-
-        ai_tagged_tag = stash.find_tag("AI_Tagged")
-        pyscenedetect_processed_tag = stash.find_tag("Scenes: PySceneDetect: Processed")
-        scenes_with_ai_wo_pyscenedetect = stash.find_scenes(
-            {
-                "tags": {
-                    "value": [ai_tagged_tag["id"]],
-                    "modifier": "INCLUDES_ALL",
-                    "excludes": [pyscenedetect_processed_tag["id"]],
-                }
-            },
-            fragment="id title files { id path }",
-        )
-
-        for scene in scenes_with_ai_wo_pyscenedetect:
-            process_video(scene["files"][0]["path"])
+    parser = argparse.ArgumentParser(description="Write PySceneDetect .Scenes.csv sidecars for videos")
+    parser.add_argument("videos", nargs="*", help="Video files (default: AI tagged Stashapp scenes not processed yet)")
+    parser.add_argument("--workers", type=int, default=2, help="Videos processed in parallel")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="Scene lists keyed by file oshash")
+    parser.add_argument("--hwaccel", help="ffmpeg hardware decoder, e.g. cuda (default: CPU decoding)")
+    args = parser.parse_args()
+
+    videos = [(video, None) for video in args.videos] if args.videos else scenes_to_process()
+    process_videos(videos, workers=args.workers, cache_dir=args.cache_dir, hwaccel=args.hwaccel)
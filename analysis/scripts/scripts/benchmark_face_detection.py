@@ -0,0 +1,135 @@
+"""Benchmark a face detector backend against MTCNN on a fixture set of frames.
+
+The fixture set is a directory of frame JPEGs or a scene archive written by
+FrameExtractor. MTCNN's detections are the reference: they are computed one frame at a
+time, as FaceDetector did before it had backends, and cached in a JSON file so later
+runs with other backends or settings do not need TensorFlow. Reports frames/second for
+each and how well the backend's faces agree with MTCNN's, matching faces by IoU.
+
+Usage:
+    python benchmark_face_detection.py --frames fixtures/frames --reference fixtures/mtcnn.json \\
+        --model det_500m.onnx --batch-size 8 --threads 4
+"""
+
+import argparse
+import json
+import tarfile
+import tempfile
+from pathlib import Path
+
+from face_detection import DetectionStats, MTCNNBackend, create_backend, detect_frames
+from face_detector import FaceDetector
+
+
+def iou(box1: tuple[int, ...], box2: tuple[int, ...]) -> float:
+    x1, y1, w1, h1 = box1
+    x2, y2, w2, h2 = box2
+    width = max(0, min(x1 + w1, x2 + w2) - max(x1, x2))
+    height = max(0, min(y1 + h1, y2 + h2) - max(y1, y2))
+    intersection = width * height
+    union = w1 * h1 + w2 * h2 - intersection
+    return intersection / union if union else 0.0
+
+
+def match_faces(reference: list[tuple[int, ...]], candidate: list[tuple[int, ...]], threshold: float) -> list[float]:
+    """Greedily match boxes by highest IoU, returning the IoU of each match at or above threshold."""
+    pairs = sorted(
+        ((iou(ref, cand), i, j) for i, ref in enumerate(reference) for j, cand in enumerate(candidate)),
+        reverse=True,
+    )
+    matched_reference, matched_candidate, ious = set(), set(), []
+    for overlap, i, j in pairs:
+        if overlap < threshold:
+            break
+        if i in matched_reference or j in matched_candidate:
+            continue
+        matched_reference.add(i)
+        matched_candidate.add(j)
+        ious.append(overlap)
+    return ious
+
+
+def run_backend(backend, frame_paths: list[Path], decode_workers: int) -> tuple[dict[str, list[tuple[int, ...]]], DetectionStats]:
+    stats = DetectionStats()
+    detections = {}
+    for frame_path, _, faces in detect_frames(
+        backend, frame_paths, decode_workers=decode_workers, preprocess=FaceDetector.preprocess_frame, stats=stats
+    ):
+        detections[frame_path.name] = [face.box for face in faces]
+    return detections, stats
+
+
+def load_reference(reference_path: Path, frame_paths: list[Path], decode_workers: int) -> dict[str, list[tuple[int, ...]]]:
+    if reference_path.exists():
+        with reference_path.open() as f:
+            reference = json.load(f)
+        print(f"Loaded MTCNN reference for {len(reference['frames'])} frames: {reference['frames_per_second']:.1f} frames/s")
+        return {name: [tuple(box) for box in boxes] for name, boxes in reference["frames"].items()}
+
+    detections, stats = run_backend(MTCNNBackend(), frame_paths, decode_workers)
+    print(f"{'mtcnn':<8} {stats.summary()}")
+    with reference_path.open("w") as f:
+        json.dump({"frames_per_second": stats.frames_per_second, "frames": detections}, f)
+    return detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a face detector backend against MTCNN")
+    parser.add_argument("--frames", type=Path, required=True, help="Directory of frame JPEGs or a scene .tar archive")
+    parser.add_argument("--reference", type=Path, required=True, help="JSON cache of MTCNN's detections, computed if missing")
+    parser.add_argument("--backend", choices=["mtcnn", "scrfd"], default="scrfd")
+    parser.add_argument("--model", type=str, help="SCRFD ONNX model")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threads", type=int, help="Intra-op threads for inference")
+    parser.add_argument("--decode-workers", type=int, default=2)
+    parser.add_argument("--min-confidence", type=float, help="Backend confidence threshold")
+    parser.add_argument("--iou", type=float, default=0.5, help="Smallest IoU of faces counted as the same face")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        frames_dir = args.frames
+        if args.frames.suffix == ".tar":
+            frames_dir = Path(tmp)
+            with tarfile.open(args.frames) as archive:
+                archive.extractall(frames_dir, filter="data")
+        frame_paths = sorted(frames_dir.glob("*.jpg"))
+        print(f"Fixture set: {len(frame_paths)} frames from {args.frames}")
+
+        reference = load_reference(args.reference, frame_paths, args.decode_workers)
+
+        backend = create_backend(
+            args.backend,
+            model_path=args.model,
+            batch_size=args.batch_size,
+            intra_op_threads=args.threads,
+            min_confidence=args.min_confidence,
+        )
+        detections, stats = run_backend(backend, frame_paths, args.decode_workers)
+        print(f"{backend.name:<8} {stats.summary()}")
+
+    reference_faces = candidate_faces = same_count = 0
+    ious = []
+    for name, reference_boxes in reference.items():
+        candidate_boxes = detections.get(name, [])
+        reference_faces += len(reference_boxes)
+        candidate_faces += len(candidate_boxes)
+        same_count += len(reference_boxes) == len(candidate_boxes)
+        ious.extend(match_faces(reference_boxes, candidate_boxes, args.iou))
+
+    matched = len(ious)
+    rows = {
+        "MTCNN faces": reference_faces,
+        f"{backend.name} faces": candidate_faces,
+        "Matched": matched,
+        "Recall (of MTCNN)": f"{matched / reference_faces:.1%}" if reference_faces else "N/A",
+        "Precision": f"{matched / candidate_faces:.1%}" if candidate_faces else "N/A",
+        "Mean IoU of matches": f"{sum(ious) / matched:.3f}" if matched else "N/A",
+        "Frames with same count": f"{same_count / len(reference):.1%}" if reference else "N/A",
+    }
+    print(f"\nAgreement with MTCNN on {len(reference)} frames (IoU >= {args.iou}):")
+    for label, value in rows.items():
+        print(f"  {label + ':':<24}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark FrameExtractor on locally generated test videos.
+
+Compares the previous extraction (every 10th keyframe of a decode of the whole file,
+one scene at a time) with FrameExtractor's timestamp sampling, run for several scenes
+on the per-drive worker pool. Every scene reads its own copy of the video. With --cold
+the page cache is dropped before each run (Linux, as root), so videos are read from disk
+as they would be from the video drives. Reports frames/second and scenes/minute.
+
+Usage:
+    python benchmark_frame_extractor.py --duration 600 --scenes 4
+    sudo python benchmark_frame_extractor.py --duration 600 --scenes 4 --cold
+"""
+
+import argparse
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+import ffmpeg
+from frame_extractor import FrameExtractor
+
+from libraries.scene_states import SceneState
+
+
+def generate_video(path: Path, duration: int, keyframe_interval: int):
+    """A 720p H.264 test pattern with a keyframe every keyframe_interval seconds."""
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-v", "error",
+            "-f", "lavfi",
+            "-i", f"testsrc2=size=1280x720:rate=24:duration={duration}",
+            "-c:v", "libx264",
+            "-preset", "ultrafast",
+            "-g", str(24 * keyframe_interval),
+            "-y", str(path),
+        ],
+        check=True,
+    )  # fmt: skip
+
+
+def drop_page_cache():
+    subprocess.run(["sync"], check=True)
+    Path("/proc/sys/vm/drop_caches").write_text("1\n")
+
+
+def previous_extraction(video_path: Path, output_dir: Path) -> int:
+    """The previous FrameExtractor command: every 10th keyframe, decoding the whole file."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (
+        ffmpeg.input(str(video_path), skip_frame="nokey")
+        .filter("select", "not(mod(n,10))")
+        .output(str(output_dir / "frame_%04d.jpg"), qscale=3, vsync=0, threads=10)
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return len(list(output_dir.glob("*.jpg")))
+
+
+def report(label: str, frames: int, elapsed: float, scenes: int):
+    print(f"{label:<24} {frames:5} frames {elapsed:7.2f}s {frames / elapsed:8.1f} frames/s {scenes / elapsed * 60:6.1f} scenes/min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FrameExtractor")
+    parser.add_argument("--duration", type=int, default=600, help="Test video length in seconds")
+    parser.add_argument("--keyframe-interval", type=int, default=2, help="Seconds between keyframes of the test video")
+    parser.add_argument("--scenes", type=int, default=4, help="Scenes extracted concurrently")
+    parser.add_argument("--max-per-drive", type=int, default=2)
+    parser.add_argument("--frame-interval", type=float, default=20.0)
+    parser.add_argument("--cold", action="store_true", help="Drop the page cache before each run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        video_paths = [tmp_path / f"scene-{scene}.mp4" for scene in range(args.scenes)]
+        generate_video(video_paths[0], args.duration, args.keyframe_interval)
+        for video_path in video_paths[1:]:
+            shutil.copyfile(video_paths[0], video_path)
+        size_mib = video_paths[0].stat().st_size / 2**20
+        print(f"Test video: {args.duration}s, {size_mib:.0f} MiB, keyframe every {args.keyframe_interval}s, {args.scenes} scenes")
+
+        if args.cold:
+            drop_page_cache()
+        start = time.perf_counter()
+        frames = sum(previous_extraction(video_path, tmp_path / "previous" / video_path.stem) for video_path in video_paths)
+        elapsed = time.perf_counter() - start
+        report("previous (sequential)", frames, elapsed, args.scenes)
+
+        extractor = FrameExtractor(str(tmp_path / "dataset"), max_per_drive=args.max_per_drive, frame_interval=args.frame_interval)
+        if args.cold:
+            drop_page_cache()
+        start = time.perf_counter()
+        for video_path in video_paths:
+            extractor.submit(video_path.stem, {"video_path": str(video_path), "performers": []})
+        extractor.wait()
+        elapsed = time.perf_counter() - start
+        extractor.stop()
+
+        frames = 0
+        for archive_path in extractor.dataset.scenes[SceneState.FRAMES_EXTRACTED.value].glob("*.tar"):
+            with tarfile.open(archive_path) as archive:
+                frames += len(archive.getnames())
+        report("FrameExtractor (pool)", frames, elapsed, args.scenes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Face detector backends for FaceDetector.
+
+A backend takes a batch of decoded BGR frames and returns the faces found in each frame,
+already filtered by the backend's confidence threshold. detect_frames decodes JPEGs on
+worker threads while the backend runs inference on the previous batch.
+"""
+
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+KEYPOINT_NAMES = ["left_eye", "right_eye", "nose", "mouth_left", "mouth_right"]
+
+
+@dataclass
+class Face:
+    box: tuple[int, int, int, int]  # x, y, width, height
+    confidence: float
+    keypoints: np.ndarray | None = None  # 5 x 2, in KEYPOINT_NAMES order
+
+
+class FaceDetectorBackend(ABC):
+    name: str
+    batch_size: int
+    min_confidence: float
+
+    @abstractmethod
+    def detect(self, frames: list[np.ndarray]) -> list[list[Face]]:
+        """Detect faces in up to batch_size BGR frames."""
+
+
+def configure_tensorflow(intra_op_threads: int | None = None):
+    """Import TensorFlow, limit its CPU threads and enable memory growth on the GPUs."""
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")  # Suppress TF logging
+    import tensorflow as tf
+
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+
+    print("\nTensorFlow GPU configuration:")
+    print(f"TensorFlow version: {tf.__version__}")
+    print(f"Built with CUDA: {tf.test.is_built_with_cuda()}")
+
+    physical_devices = tf.config.list_physical_devices("GPU")
+    if not physical_devices:
+        print("No GPU found, using CPU for processing")
+        return
+
+    print(f"Found {len(physical_devices)} GPU(s):")
+    for device in physical_devices:
+        print(f"  {device.device_type}: {device.name}")
+    try:
+        for gpu in physical_devices:
+            tf.config.experimental.set_memory_growth(gpu, True)
+        tf.keras.mixed_precision.set_global_policy("mixed_float16")
+        print("GPU memory growth and mixed precision enabled")
+    except RuntimeError as e:
+        print(f"GPU configuration error: {e}")
+
+
+class MTCNNBackend(FaceDetectorBackend):
+    """MTCNN from the mtcnn package on TensorFlow, one frame at a time.
+
+    This is the detector FaceDetector has always used. Frames are passed as decoded, in
+    BGR order, so its output stays comparable with the faces extracted so far.
+    """
+
+    name = "mtcnn"
+
+    def __init__(self, *, intra_op_threads: int | None = None, min_confidence: float = 0.95):
+        configure_tensorflow(intra_op_threads)
+        from mtcnn import MTCNN
+
+        start = time.perf_counter()
+        self.detector = MTCNN()
+        print(f"MTCNN initialization took {time.perf_counter() - start:.2f}s")
+        self.batch_size = 1
+        self.min_confidence = min_confidence
+
+    def detect(self, frames: list[np.ndarray]) -> list[list[Face]]:
+        return [
+            [
+                Face(
+                    box=tuple(int(value) for value in face["box"]),
+                    confidence=float(face["confidence"]),
+                    keypoints=np.array([face["keypoints"][name] for name in KEYPOINT_NAMES], dtype=np.float32),
+                )
+                for face in self.detector.detect_faces(frame)
+                if face["confidence"] >= self.min_confidence
+            ]
+            for frame in frames
+        ]
+
+
+class SCRFDBackend(FaceDetectorBackend):
+    """SCRFD (insightface's det_500m, det_2.5g, det_10g ONNX models) on ONNX Runtime's CPU provider.
+
+    Frames are letterboxed into the model's input size. As in insightface, models with 3-D
+    outputs (batch, anchors, values) are batched, and a batch runs as one inference when
+    the input's batch dimension is dynamic too. Models with 2-D outputs (anchors, values)
+    run one frame at a time on the same session.
+    """
+
+    name = "scrfd"
+
+    def __init__(
+        self,
+        model_path: str | Path,
+        *,
+        batch_size: int = 8,
+        intra_op_threads: int | None = None,
+        input_size: tuple[int, int] = (640, 640),
+        min_confidence: float = 0.5,
+        nms_threshold: float = 0.4,
+    ):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_names = [output.name for output in self.session.get_outputs()]
+        # Models exported with a dynamic input batch can still flatten their outputs to 2-D,
+        # which would concatenate the anchors of all frames
+        self.batched = len(self.session.get_outputs()[0].shape) == 3 and not isinstance(model_input.shape[0], int)
+        # Models with a fixed input size only run at that size
+        if isinstance(model_input.shape[2], int) and isinstance(model_input.shape[3], int):
+            input_size = (model_input.shape[3], model_input.shape[2])
+        self.input_size = input_size  # width, height
+
+        # Scores, box distances and optionally keypoint distances for each stride
+        if len(self.output_names) in {6, 9}:
+            self.strides, self.anchors_per_location = [8, 16, 32], 2
+        elif len(self.output_names) in {10, 15}:
+            self.strides, self.anchors_per_location = [8, 16, 32, 64, 128], 1
+        else:
+            raise ValueError(f"{model_path} has {len(self.output_names)} outputs, not an SCRFD model")
+        self.has_keypoints = len(self.output_names) in {9, 15}
+        self.anchor_centers = {stride: self._anchor_centers(stride) for stride in self.strides}
+
+        self.batch_size = batch_size if self.batched else 1
+        self.min_confidence = min_confidence
+        self.nms_threshold = nms_threshold
+
+    def _anchor_centers(self, stride: int) -> np.ndarray:
+        width, height = self.input_size[0] // stride, self.input_size[1] // stride
+        centers = np.stack(np.mgrid[:height, :width][::-1], axis=-1).astype(np.float32).reshape(-1, 2) * stride
+        return np.repeat(centers, self.anchors_per_location, axis=0)
+
+    def letterbox(self, frame: np.ndarray) -> tuple[np.ndarray, float]:
+        """The frame scaled to fit the input size, padded at the bottom and right, and its scale."""
+        width, height = self.input_size
+        scale = min(width / frame.shape[1], height / frame.shape[0])
+        resized = cv2.resize(frame, (int(frame.shape[1] * scale), int(frame.shape[0] * scale)))
+        padded = np.zeros((height, width, 3), dtype=np.uint8)
+        padded[: resized.shape[0], : resized.shape[1]] = resized
+        return padded, scale
+
+    def decode(self, outputs: list[np.ndarray], index: int, scale: float, frame_shape: tuple[int, ...]) -> list[Face]:
+        """The faces of frame index of a batch, in frame coordinates after non-maximum suppression."""
+        count = len(self.strides)
+        scores, boxes, keypoints = [], [], []
+        for level, stride in enumerate(self.strides):
+            level_scores = outputs[level][index].reshape(-1)
+            if level_scores.size != len(self.anchor_centers[stride]):
+                raise ValueError(
+                    f"Stride {stride} has {level_scores.size} scores per frame, expected {len(self.anchor_centers[stride])} anchors"
+                )
+            keep = np.flatnonzero(level_scores >= self.min_confidence)
+            if not keep.size:
+                continue
+            centers = self.anchor_centers[stride][keep]
+            distances = outputs[level + count][index].reshape(-1, 4)[keep] * stride
+            scores.append(level_scores[keep])
+            boxes.append(np.hstack([centers - distances[:, :2], centers + distances[:, 2:]]))
+            if self.has_keypoints:
+                offsets = outputs[level + count * 2][index].reshape(-1, 5, 2)[keep] * stride
+                keypoints.append(centers[:, None, :] + offsets)
+        if not scores:
+            return []
+
+        scores = np.concatenate(scores)
+        boxes = np.concatenate(boxes) / scale
+        keypoints = np.concatenate(keypoints) / scale if keypoints else None
+        frame_height, frame_width = frame_shape[:2]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, frame_width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, frame_height)
+        xywh = np.hstack([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]])
+
+        kept = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), self.min_confidence, self.nms_threshold)
+        return [
+            Face(
+                box=tuple(int(value) for value in np.rint(xywh[i])),
+                confidence=float(scores[i]),
+                keypoints=keypoints[i] if keypoints is not None else None,
+            )
+            for i in np.asarray(kept, dtype=int).reshape(-1)
+        ]
+
+    def _run(self, padded: list[np.ndarray]) -> list[np.ndarray]:
+        blob = cv2.dnn.blobFromImages(padded, 1.0 / 128.0, self.input_size, (127.5, 127.5, 127.5), swapRB=True)
+        outputs = self.session.run(self.output_names, {self.input_name: blob})
+        # Models exported without a batch dimension return (anchors, values)
+        return [output if output.ndim == 3 else output[None] for output in outputs]
+
+    def detect(self, frames: list[np.ndarray]) -> list[list[Face]]:
+        letterboxed = [self.letterbox(frame) for frame in frames]
+        if self.batched:
+            outputs = self._run([image for image, _ in letterboxed])
+            return [
+                self.decode(outputs, index, scale, frame.shape)
+                for index, (frame, (_, scale)) in enumerate(zip(frames, letterboxed, strict=True))
+            ]
+        return [self.decode(self._run([image]), 0, scale, frame.shape) for frame, (image, scale) in zip(frames, letterboxed, strict=True)]
+
+
+BACKENDS = {MTCNNBackend.name: MTCNNBackend, SCRFDBackend.name: SCRFDBackend}
+
+
+def create_backend(
+    name: str,
+    *,
+    model_path: str | None = None,
+    batch_size: int = 8,
+    intra_op_threads: int | None = None,
+    min_confidence: float | None = None,
+) -> FaceDetectorBackend:
+    """Create a backend by name, with the backend's default confidence threshold unless given."""
+    kwargs = {"intra_op_threads": intra_op_threads}
+    if min_confidence is not None:
+        kwargs["min_confidence"] = min_confidence
+    if name == MTCNNBackend.name:
+        return MTCNNBackend(**kwargs)
+    if name == SCRFDBackend.name:
+        if not model_path:
+            raise ValueError("The scrfd backend needs the path of an SCRFD ONNX model")
+        return SCRFDBackend(model_path, batch_size=batch_size, **kwargs)
+    raise ValueError(f"Unknown face detector backend {name}, expected one of {', '.join(BACKENDS)}")
+
+
+@dataclass
+class DetectionStats:
+    frames: int = 0
+    unreadable: int = 0
+    batches: int = 0
+    faces: int = 0
+    decode_wait: float = 0.0  # Seconds spent waiting for decoded frames
+    detect_time: float = 0.0
+    start: float = field(default_factory=time.perf_counter)
+    end: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.frames} frames in {self.elapsed:.2f}s ({self.frames_per_second:.1f} frames/s), "
+            f"{self.batches} batches, {self.faces} faces, "
+            f"detection {self.detect_time:.2f}s, waiting for decoding {self.decode_wait:.2f}s"
+            + (f", {self.unreadable} unreadable" if self.unreadable else "")
+        )
+
+
+def detect_frames(
+    backend: FaceDetectorBackend,
+    frame_paths: list[Path],
+    *,
+    decode_workers: int = 2,
+    prefetch_batches: int = 2,
+    preprocess: Callable[[np.ndarray], np.ndarray] | None = None,
+    stats: DetectionStats | None = None,
+) -> Iterator[tuple[Path, np.ndarray, list[Face]]]:
+    """Detect faces in frame files in order, yielding (path, frame, faces) for each readable frame.
+
+    decode_workers threads read, decode and preprocess up to prefetch_batches batches
+    ahead of the batch being detected. cv2 releases the GIL while decoding, and ONNX
+    Runtime and TensorFlow while running inference, so decoding overlaps with detection.
+    """
+    stats = stats or DetectionStats()
+
+    def decode(frame_path: Path) -> np.ndarray | None:
+        frame = cv2.imread(str(frame_path))
+        if frame is not None and preprocess:
+            frame = preprocess(frame)
+        return frame
+
+    batch_size = max(1, backend.batch_size)
+    remaining = iter(frame_paths)
+    pending: deque[tuple[Path, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=decode_workers) as executor:
+
+        def fill():
+            while len(pending) < batch_size * (prefetch_batches + 1) and (frame_path := next(remaining, None)) is not None:
+                pending.append((frame_path, executor.submit(decode, frame_path)))
+
+        fill()
+        while pending:
+            paths, frames = [], []
+            wait_start = time.perf_counter()
+            while pending and len(frames) < batch_size:
+                frame_path, future = pending.popleft()
+                frame = future.result()
+                if frame is None:
+                    stats.unreadable += 1
+                    continue
+                paths.append(frame_path)
+                frames.append(frame)
+            stats.decode_wait += time.perf_counter() - wait_start
+            fill()  # Decode the next batches while this one is detected
+            if not frames:
+                continue
+
+            detect_start = time.perf_counter()
+            detections = backend.detect(frames)
+            stats.detect_time += time.perf_counter() - detect_start
+            stats.frames += len(frames)
+            stats.batches += 1
+            stats.faces += sum(len(faces) for faces in detections)
+            yield from zip(paths, frames, detections, strict=True)
+
+    stats.end = time.perf_counter()
@@ -1,31 +1,26 @@
-import os
-
-
-os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"  # Suppress TF logging
-
 import argparse
 import cProfile
 import json
+import os
 import pstats
 import shutil
+import socket
+import tarfile
 import time
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
 import cv2
-import tensorflow as tf
-import torch
-from facenet_pytorch import MTCNN
-from mtcnn import MTCNN
-from PIL import Image
+from face_detection import DetectionStats, Face, FaceDetectorBackend, MTCNNBackend, create_backend, detect_frames
 
 from libraries.scene_states import DatasetStructure, SceneState
 
 
 class FaceDetector:
-    def __init__(self, base_dir: str, max_concurrent: int = 4):
+    def __init__(
+        self, base_dir: str, backend: FaceDetectorBackend | None = None, decode_workers: int = 2, state_db: str | None = None
+    ):
         # Convert Windows path to WSL path if needed
         if base_dir.startswith(("C:", "D:", "E:", "F:", "G:", "H:")):
             drive_letter = base_dir[0].lower()
@@ -34,52 +29,16 @@ class FaceDetector:
         else:
             self.base_dir = Path(base_dir)
 
-        # GPU setup and verification
-        print("\nTensorFlow GPU configuration:")
-        print(f"TensorFlow version: {tf.__version__}")
-        print(f"GPU devices: {tf.config.list_physical_devices('GPU')}")
-        print(f"Built with CUDA: {tf.test.is_built_with_cuda()}")
-
-        physical_devices = tf.config.list_physical_devices("GPU")
-        if physical_devices:
-            print(f"\nFound {len(physical_devices)} GPU(s):")
-            for device in physical_devices:
-                print(f"  {device.device_type}: {device.name}")
+        print("\nInitializing face detector backend...")
+        self.backend = backend or MTCNNBackend()
+        print(f"Using {self.backend.name} backend (batch size {self.backend.batch_size}, confidence >= {self.backend.min_confidence})")
+        self.decode_workers = decode_workers  # Threads decoding frames ahead of detection
 
-            # Configure memory growth for all GPUs
-            try:
-                for gpu in physical_devices:
-                    tf.config.experimental.set_memory_growth(gpu, True)
-                print("GPU memory growth enabled for all GPUs")
-
-                # Enable mixed precision
-                tf.keras.mixed_precision.set_global_policy("mixed_float16")
-                print("Mixed precision enabled")
-
-                # Test GPU computation
-                print("\nTesting GPU computation...")
-                with tf.device("/GPU:0"):
-                    dummy = tf.random.normal([1000, 1000])
-                    tf.matmul(dummy, tf.transpose(dummy))
-                    print("GPU test successful")
-            except RuntimeError as e:
-                print(f"GPU configuration error: {e}")
-        else:
-            print("\nNo GPU found. Please check:")
-            print("1. NVIDIA GPU drivers are installed in WSL2")
-            print("2. CUDA toolkit is installed in WSL2")
-            print("3. cuDNN is installed in WSL2")
-            print("4. TensorFlow was installed with GPU support")
-            print("\nUsing CPU for processing (will be slower)")
-
-        print("\nInitializing MTCNN detector...")
-        start = time.time()
-        self.detector = MTCNN()
-        print(f"MTCNN initialization took {time.time() - start:.2f}s")
-
-        self.max_concurrent = max_concurrent
         print(f"\nInitializing with base directory: {self.base_dir}")
-        self.dataset = DatasetStructure(str(self.base_dir))  # Convert Path to string
+        # The scene state database cannot be shared with Windows processes over /mnt/<drive>,
+        # so with the detector in WSL2 every worker runs there with state_db on the WSL2 filesystem
+        self.dataset = DatasetStructure(str(self.base_dir), state_db)
+        self.worker = f"{socket.gethostname()}-{os.getpid()}"  # Owner of claimed scenes
 
         # Create all required directories
         for state in SceneState:
@@ -87,15 +46,8 @@ class FaceDetector:
             print(f"Creating directory: {dir_path}")
             dir_path.mkdir(parents=True, exist_ok=True)
 
-        self.mtcnn = MTCNN(
-            image_size=160,
-            margin=10,
-            post_process=False,
-            select_largest=True,
-            device=torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        )
-
-    def preprocess_frame(self, frame):
+    @staticmethod
+    def preprocess_frame(frame):
         """Preprocess frame for faster detection"""
         # Resize large images
         max_size = 1280
@@ -105,29 +57,10 @@ class FaceDetector:
             frame = cv2.resize(frame, None, fx=scale, fy=scale)
         return frame
 
-    def process_frame(self, frame_data):
-        """Process a single frame"""
-        frame_path, faces_dir, scene_id = frame_data
-        frame_start = time.time()
-
-        # Load and preprocess frame
-        frame = cv2.imread(str(frame_path))
-        if frame is None:
-            return 0, 0, 0
-
-        frame = self.preprocess_frame(frame)
-
-        # Detect faces
-        detect_start = time.time()
-        faces = self.detector.detect_faces(frame)
-        detection_time = time.time() - detect_start
-
-        faces_extracted = 0
+    def save_faces(self, frame, faces: list[Face], frame_path: Path, faces_dir: Path, scene_id: str) -> int:
+        """Crop the detected faces with a 20% margin and write them to faces_dir"""
         for face_idx, face in enumerate(faces):
-            if face["confidence"] < 0.95:
-                continue
-
-            x, y, width, height = face["box"]
+            x, y, width, height = face.box
             margin = int(max(width, height) * 0.2)
             face_img = frame[
                 max(0, y-margin):min(frame.shape[0], y+height+margin),
@@ -137,25 +70,19 @@ class FaceDetector:
             face_id = f"{scene_id}_{frame_path.stem}_face_{face_idx}"
             face_path = faces_dir / f"{face_id}.jpg"
             cv2.imwrite(str(face_path), face_img)
-            faces_extracted += 1
-
-        frame_time = time.time() - frame_start
-        return faces_extracted, frame_time, detection_time
+        return len(faces)
 
     def process_scene(self, scene_id: str):
         scene_start = time.time()
-        frame_times = []
-        detection_times = []
         working_dir = None
 
         try:
             # State and metadata checks
-            if self.dataset.is_scene_processed(scene_id) and \
-               self.dataset.info["processed_scenes"][scene_id] in [
-                   SceneState.FACES_EXTRACTED.value,
-                   SceneState.VERIFIED.value,
-                   SceneState.NO_FACES_FOUND.value
-               ]:
+            if self.dataset.get_scene_state(scene_id) in {
+                SceneState.FACES_EXTRACTED,
+                SceneState.VERIFIED,
+                SceneState.NO_FACES_FOUND,
+            }:
                 print(f"Skipping {scene_id} - already processed")
                 return
 
@@ -176,40 +103,45 @@ class FaceDetector:
             working_dir = Path(str(self.dataset.scenes[SceneState.EXTRACTING_FACES.value] / scene_id))
             faces_dir = working_dir / "faces"
 
-            if not source_dir.exists():
+            source_archive = source_dir.with_name(f"{scene_id}.tar")
+            if source_archive.exists():
+                # Frame extractor output: one archive of frames per scene
+                working_dir.mkdir(parents=True, exist_ok=True)
+                with tarfile.open(source_archive) as archive:
+                    archive.extractall(working_dir, filter="data")
+                source_archive.unlink()
+            elif source_dir.exists():
+                shutil.move(str(source_dir), str(working_dir))
+            elif working_dir.exists():
+                print(f"Resuming {scene_id} from {working_dir}")
+            else:
                 raise FileNotFoundError(f"Source directory not found: {source_dir}")
-
-            shutil.move(str(source_dir), str(working_dir))
             faces_dir.mkdir(parents=True, exist_ok=True)
             print(f"Directory setup took {time.time() - setup_start:.2f}s")
 
             print(f"Processing scene {scene_id}")
 
-            # Face detection with parallel frame processing
-            frame_files = list(working_dir.glob("*.jpg"))
+            # Face detection, decoding the next frames while a batch is detected
+            frame_files = sorted(working_dir.glob("*.jpg"))
             print(f"Found {len(frame_files)} frames to process")
 
             total_faces = 0
-            frame_data = [(f, faces_dir, scene_id) for f in frame_files]
-
-            # Process frames in parallel
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                results = list(executor.map(self.process_frame, frame_data))
-
-            # Collect results
-            for i, (faces, frame_time, detection_time) in enumerate(results):
-                total_faces += faces
-                frame_times.append(frame_time)
-                detection_times.append(detection_time)
-
-                if i % 10 == 0:
-                    avg_frame = sum(frame_times[-10:]) / min(10, len(frame_times))
-                    avg_detect = sum(detection_times[-10:]) / min(10, len(detection_times))
-                    print(f"Frame {i}/{len(frame_files)} - "
-                          f"Avg frame: {avg_frame:.2f}s, "
-                          f"Avg detection: {avg_detect:.2f}s, "
-                          f"Faces so far: {total_faces}")
-
+            stats = DetectionStats()
+            for i, (frame_path, frame, faces) in enumerate(
+                detect_frames(
+                    self.backend,
+                    frame_files,
+                    decode_workers=self.decode_workers,
+                    preprocess=self.preprocess_frame,
+                    stats=stats,
+                )
+            ):
+                total_faces += self.save_faces(frame, faces, frame_path, faces_dir, scene_id)
+
+                if i % 100 == 0:
+                    print(f"Frame {i}/{len(frame_files)} - {stats.frames_per_second:.1f} frames/s, Faces so far: {total_faces}")
+
+            print(f"Detection: {stats.summary()}")
             print(f"Final face count for scene {scene_id}: {total_faces}")
 
             # Handle case where no faces were found
@@ -277,8 +209,7 @@ class FaceDetector:
             total_time = time.time() - scene_start
             print(f"\nScene {scene_id} completed:")
             print(f"Total time: {total_time:.2f}s")
-            print(f"Average frame time: {sum(frame_times)/len(frame_times):.2f}s")
-            print(f"Average detection time: {sum(detection_times)/len(detection_times):.2f}s")
+            print(f"Detection: {stats.frames_per_second:.1f} frames/s")
             print(f"Faces extracted: {total_faces}")
 
         except Exception as e:
@@ -289,16 +220,17 @@ class FaceDetector:
                 f.write(str(e))
             if working_dir and working_dir.exists():
                 shutil.rmtree(working_dir)
+            self.dataset.update_scene_state(scene_id, SceneState.FAILED, self.worker)
 
     def run(self):
-        print(f"Starting face detector (monitoring {self.base_dir / 'scenes' / SceneState.FRAMES_EXTRACTED.value})")
+        print(f"Starting face detector {self.worker} (monitoring {self.base_dir / 'scenes' / SceneState.FRAMES_EXTRACTED.value})")
         while True:
             try:
-                # Check for scenes with extracted frames
-                frames_dir = self.base_dir / "scenes" / SceneState.FRAMES_EXTRACTED.value
-                for scene_dir in frames_dir.iterdir():
-                    if scene_dir.is_dir():
-                        self.process_scene(scene_dir.name)
+                # Claim scenes with extracted frames, shared with other face detectors
+                while scene_id := self.dataset.claim_next_scene(
+                    SceneState.FRAMES_EXTRACTED, SceneState.EXTRACTING_FACES, self.worker
+                ):
+                    self.process_scene(scene_id)
 
                 time.sleep(1)  # Wait before checking again
 
@@ -309,38 +241,48 @@ class FaceDetector:
                 print(f"Unexpected error: {e}")
                 time.sleep(1)
 
-    def detect_and_align(self, image):
-        """Detect faces and align them using eye landmarks"""
-        # Detect faces and landmarks
-        boxes, _probs, landmarks = self.mtcnn.detect(image, landmarks=True)
-
-        aligned_faces = []
-        if boxes is not None:
-            for _i, (box, landmark) in enumerate(zip(boxes, landmarks, strict=False)):
-                # Extract face using box
-                face = image.crop(box)
-
-                # Align face using landmarks
-                aligned_face = align_face(face, landmark)
-
-                # Resize to standard size
-                aligned_face = aligned_face.resize((160, 160), Image.Resampling.LANCZOS)
-
-                aligned_faces.append(aligned_face)
-
-        return aligned_faces
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Face Detector for WSL2")
     parser.add_argument("--base-dir", type=str, required=True,
                        help="Base directory for dataset (Windows or WSL2 path)")
+    parser.add_argument("--state-db", type=str,
+                       help="Scene state database (default: <base-dir>/metadata/scene_states.db). Every worker of the "
+                       "dataset runs on the OS that created it, so in WSL2 use one on the WSL2 filesystem for all workers")
+    parser.add_argument("--release-claims", action="store_true",
+                       help="Return the scenes claimed by all face detectors. Only use while no other face detector is running")
+    parser.add_argument("--release-worker", type=str,
+                       help="Return the scenes claimed by a stopped face detector (<hostname>-<pid>, as printed at its start)")
+    parser.add_argument("--backend", choices=["mtcnn", "scrfd"], default="mtcnn",
+                       help="Face detector: mtcnn (TensorFlow) or scrfd (ONNX Runtime, needs --model)")
+    parser.add_argument("--model", type=str,
+                       help="SCRFD ONNX model, e.g. det_500m.onnx or det_10g.onnx from insightface")
+    parser.add_argument("--batch-size", type=int, default=8,
+                       help="Frames per inference, for models with a dynamic batch dimension")
+    parser.add_argument("--threads", type=int,
+                       help="Intra-op threads for inference (default: all cores)")
+    parser.add_argument("--decode-workers", type=int, default=2,
+                       help="Threads decoding frames ahead of detection")
+    parser.add_argument("--min-confidence", type=float,
+                       help="Detection confidence threshold (default: 0.95 for mtcnn, 0.5 for scrfd)")
     args = parser.parse_args()
 
     # Setup profiler
     pr = cProfile.Profile()
     pr.enable()
 
-    detector = FaceDetector(args.base_dir)
+    backend = create_backend(
+        args.backend,
+        model_path=args.model,
+        batch_size=args.batch_size,
+        intra_op_threads=args.threads,
+        min_confidence=args.min_confidence,
+    )
+    detector = FaceDetector(args.base_dir, backend, decode_workers=args.decode_workers, state_db=args.state_db)
+    if args.release_claims or args.release_worker:
+        released = detector.dataset.states.release_claims(
+            SceneState.EXTRACTING_FACES, SceneState.FRAMES_EXTRACTED, worker=args.release_worker
+        )
+        print(f"Released {released} claimed scene(s)")
     try:
         detector.run()
     except KeyboardInterrupt:
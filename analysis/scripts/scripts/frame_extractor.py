@@ -1,9 +1,12 @@
+import argparse
 import json
 import os
+import queue
 import shutil
+import subprocess
+import tarfile
 import threading
-import time
-from pathlib import Path
+from pathlib import Path, PurePath
 
 import ffmpeg
 
@@ -11,101 +14,261 @@ from libraries.scene_states import DatasetStructure, SceneState
 
 
 class FrameExtractor:
-    def __init__(self, base_dir: str, max_per_drive: int = 2):
+    def __init__(
+        self,
+        base_dir: str,
+        max_per_drive: int = 2,
+        frame_interval: float = 20.0,
+        seeks_per_process: int = 16,
+        scan_interval: float = 5.0,
+        *,
+        state_db: str | None = None,
+    ):
         self.base_dir = Path(base_dir)
         self.max_per_drive = max_per_drive
-        self.drive_semaphores = {}
+        self.frame_interval = frame_interval  # Seconds between sampled frames
+        self.seeks_per_process = seeks_per_process  # Frames extracted per ffmpeg process
+        self.scan_interval = scan_interval  # Seconds between scans of the pending directory
 
-        # Initialize dataset structure
-        self.dataset = DatasetStructure(base_dir)
+        # One queue per drive, each served by max_per_drive worker threads
+        self.drive_queues: dict[str, queue.Queue] = {}
+        self.workers: list[threading.Thread] = []
+        self.queued_scenes: set[str] = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
 
-    def process_scene(self, scene_id: str, scene_data: dict):
+        # Initialize dataset structure, every worker of the dataset runs on the OS that created state_db
+        self.dataset = DatasetStructure(base_dir, state_db)
+
+    @staticmethod
+    def drive_of(video_path: str) -> str:
+        """The drive a video is read from: the drive letter, or the mount point under /Volumes, /mnt or /media."""
+        drive = os.path.splitdrive(video_path)[0].upper()
+        if drive:
+            return drive
+        parts = PurePath(video_path).parts
+        if len(parts) > 2 and parts[1] in {"Volumes", "mnt", "media"}:
+            return str(PurePath(*parts[:3]))
+        return parts[0] if parts else ""
+
+    def frame_timestamps(self, duration: float) -> list[float]:
+        """Timestamps to sample, in the middle of every frame_interval of the video."""
+        timestamps = [(index + 0.5) * self.frame_interval for index in range(int(duration // self.frame_interval))]
+        return timestamps or [duration / 2]
+
+    def extract_frames(self, video_path: str, output_dir: Path) -> list[Path]:
+        """Extract one keyframe per timestamp as JPEGs in output_dir.
+
+        Every timestamp is an input seek that lands on the preceding keyframe, so only
+        keyframes are decoded and the parts of the video between them are not read.
+        seeks_per_process seeks share one ffmpeg process. ffmpeg runs in its own process
+        group so Ctrl+C does not kill it, and stop() takes effect between processes.
+        """
+        duration = float(ffmpeg.probe(video_path)["format"]["duration"])
+        timestamps = self.frame_timestamps(duration)
+        frame_paths = [output_dir / f"frame_{index:04d}.jpg" for index in range(1, len(timestamps) + 1)]
+
+        for start in range(0, len(timestamps), self.seeks_per_process):
+            if self.stopping.is_set():
+                raise InterruptedError("Frame extractor stopped")
+            outputs = [
+                ffmpeg.input(video_path, ss=f"{timestamp:.3f}", skip_frame="nokey", noaccurate_seek=None).video.output(
+                    str(frame_path), vframes=1, qscale=3
+                )
+                for timestamp, frame_path in zip(
+                    timestamps[start : start + self.seeks_per_process],
+                    frame_paths[start : start + self.seeks_per_process],
+                    strict=True,
+                )
+            ]
+            subprocess.run(
+                ffmpeg.merge_outputs(*outputs).overwrite_output().compile(),
+                capture_output=True,
+                check=True,
+                start_new_session=True,
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0,
+            )
+
+        return [frame_path for frame_path in frame_paths if frame_path.exists()]
+
+    @staticmethod
+    def archive_frames(frame_paths: list[Path], archive_path: Path) -> int:
+        """Write frames to an uncompressed tar, skipping frames identical to the previous one.
+
+        Timestamps closer together than the video's keyframe interval land on the same
+        keyframe. The archive is written next to archive_path and renamed into place,
+        so a scene's archive is either complete or absent.
+
+        Returns:
+            Number of frames in the archive
+        """
+        partial_path = archive_path.with_name(f"{archive_path.name}.partial")
+        previous = None
+        count = 0
+        with tarfile.open(partial_path, "w") as archive:
+            for frame_path in frame_paths:
+                frame = frame_path.read_bytes()
+                if frame == previous:
+                    continue
+                previous = frame
+                count += 1
+                archive.add(frame_path, arcname=f"frame_{count:04d}.jpg")
+        partial_path.replace(archive_path)
+        return count
+
+    def process_scene(self, scene_id: str, scene_data: dict) -> bool:
+        """Extract a scene's frames into FRAMES_EXTRACTED/<scene_id>.tar.
+
+        Returns:
+            False if extraction was interrupted by stop() and the scene should stay pending
+        """
         # Check if already processed
         if self.dataset.is_scene_processed(scene_id):
             print(f"Skipping {scene_id} - already processed")
-            return
+            return True
 
         # Store scene metadata permanently
         with (self.dataset.scene_data / f"{scene_id}.json").open("w") as f:
             json.dump(scene_data, f, indent=2)
 
         video_path = scene_data["video_path"]
-        drive = os.path.splitdrive(video_path)[0].upper()
+        drive = self.drive_of(video_path)
 
         print(f"[{drive}] {scene_id}: Starting frame extraction...")
 
-        # Get/create semaphore for this drive
-        if drive not in self.drive_semaphores:
-            self.drive_semaphores[drive] = threading.Semaphore(self.max_per_drive)
+        scene_dir = self.dataset.scenes[SceneState.EXTRACTING_FRAMES.value] / scene_id
+        try:
+            scene_dir.mkdir(parents=True, exist_ok=True)
 
-        with self.drive_semaphores[drive]:
-            try:
-                # Move to extracting state
-                scene_dir = self.dataset.scenes[SceneState.EXTRACTING_FRAMES.value] / scene_id
-                scene_dir.mkdir(parents=True, exist_ok=True)
-
-                # Extract frames
-                (
-                    ffmpeg
-                    .input(video_path, skip_frame="nokey")
-                    .filter("select", "not(mod(n,10))")
-                    .output(
-                        str(scene_dir / "frame_%04d.jpg"),
-                        qscale=3,
-                        vsync=0,
-                        threads=10
-                    )
-                    .overwrite_output()
-                    .run(capture_stdout=True, capture_stderr=True)
-                )
+            # Extract frames
+            frame_paths = self.extract_frames(video_path, scene_dir)
+            if not frame_paths:
+                raise RuntimeError("No frames extracted")
 
-                # Move to frames extracted state
-                target_dir = self.dataset.scenes[SceneState.FRAMES_EXTRACTED.value] / scene_id
-                shutil.move(str(scene_dir), str(target_dir))
+            # Archive to frames extracted state
+            archive_path = self.dataset.scenes[SceneState.FRAMES_EXTRACTED.value] / f"{scene_id}.tar"
+            frame_count = self.archive_frames(frame_paths, archive_path)
+            shutil.rmtree(scene_dir)
 
-                print(f"[{drive}] {scene_id}: Completed frame extraction")
+            print(f"[{drive}] {scene_id}: Completed frame extraction ({frame_count} frames)")
 
-                # Update scene state after successful processing
-                self.dataset.update_scene_state(scene_id, SceneState.FRAMES_EXTRACTED)
+            # Update scene state after successful processing
+            self.dataset.update_scene_state(scene_id, SceneState.FRAMES_EXTRACTED)
 
-            except Exception as e:
-                print(f"[{drive}] {scene_id}: Failed - {e!s}")
-                # Move to failed state
-                failed_dir = self.dataset.scenes[SceneState.FAILED.value] / scene_id
-                failed_dir.mkdir(parents=True, exist_ok=True)
-                with (failed_dir / "error.txt").open("w") as f:
-                    f.write(str(e))
-                if scene_dir.exists():
-                    shutil.rmtree(scene_dir)
+        except Exception as e:
+            if scene_dir.exists():
+                shutil.rmtree(scene_dir)
+            if self.stopping.is_set():
+                print(f"[{drive}] {scene_id}: Interrupted, left pending")
+                return False
+            # ffmpeg.Error and CalledProcessError carry ffmpeg's output
+            stderr = e.stderr.decode(errors="replace") if isinstance(getattr(e, "stderr", None), bytes) else ""
+            print(f"[{drive}] {scene_id}: Failed - {e!s}")
+            # Move to failed state
+            failed_dir = self.dataset.scenes[SceneState.FAILED.value] / scene_id
+            failed_dir.mkdir(parents=True, exist_ok=True)
+            with (failed_dir / "error.txt").open("w") as f:
+                f.write(f"{e!s}\n{stderr}")
 
-    def run(self):
-        print(f"Starting frame extractor (monitoring {self.dataset.scenes[SceneState.PENDING.value]})")
-        while True:
-            try:
-                # Check for pending scenes with JSON data
-                pending_dir = self.dataset.scenes[SceneState.PENDING.value]
-                for json_file in pending_dir.glob("*.json"):
-                    scene_id = json_file.stem
+        return True
 
-                    # Load scene data
-                    with json_file.open("r") as f:
-                        scene_data = json.load(f)
+    def submit(self, scene_id: str, scene_data: dict, json_file: Path | None = None):
+        """Queue a scene for extraction on the workers of its drive.
 
-                    # Process the scene
-                    self.process_scene(scene_id, scene_data)
+        json_file is the pending file the scene came from, removed once the scene is done.
+        """
+        drive = self.drive_of(scene_data["video_path"])
+        with self.lock:
+            if scene_id in self.queued_scenes:
+                return
+            self.queued_scenes.add(scene_id)
+            if drive not in self.drive_queues:
+                self.drive_queues[drive] = queue.Queue()
+                for _ in range(self.max_per_drive):
+                    worker = threading.Thread(target=self._work, args=(self.drive_queues[drive],), daemon=True)
+                    worker.start()
+                    self.workers.append(worker)
+        self.drive_queues[drive].put((scene_id, scene_data, json_file))
 
+    def _work(self, drive_queue: queue.Queue):
+        while (item := drive_queue.get()) is not None:
+            scene_id, scene_data, json_file = item
+            try:
+                # After stop(), queued scenes stay pending instead of being started
+                if not self.stopping.is_set() and self.process_scene(scene_id, scene_data) and json_file:
                     # Remove JSON file after processing
-                    json_file.unlink()
+                    json_file.unlink(missing_ok=True)
+            finally:
+                with self.lock:
+                    self.queued_scenes.discard(scene_id)
+                drive_queue.task_done()
+        drive_queue.task_done()
+
+    def wait(self):
+        """Block until every queued scene has been processed."""
+        for drive_queue in list(self.drive_queues.values()):
+            drive_queue.join()
 
-                time.sleep(1)  # Wait before checking again
+    def stop(self):
+        """Stop the workers after their current ffmpeg process, leaving unfinished and queued scenes pending."""
+        self.stopping.set()
+        for drive_queue in self.drive_queues.values():
+            for _ in range(self.max_per_drive):
+                drive_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def queue_pending(self) -> int:
+        """Queue the pending scenes that are not queued yet.
+
+        Returns:
+            Number of newly queued scenes
+        """
+        queued = 0
+        pending_dir = self.dataset.scenes[SceneState.PENDING.value]
+        for json_file in sorted(pending_dir.glob("*.json")):
+            scene_id = json_file.stem
+            if scene_id in self.queued_scenes:
+                continue
+            with json_file.open("r") as f:
+                scene_data = json.load(f)
+            self.submit(scene_id, scene_data, json_file)
+            queued += 1
+        return queued
+
+    def recover(self):
+        """Remove frames and archives left behind by an interrupted run; their scenes are still pending."""
+        for scene_dir in self.dataset.scenes[SceneState.EXTRACTING_FRAMES.value].iterdir():
+            if scene_dir.is_dir():
+                shutil.rmtree(scene_dir)
+        for partial_archive in self.dataset.scenes[SceneState.FRAMES_EXTRACTED.value].glob("*.tar.partial"):
+            partial_archive.unlink()
+
+    def run(self):
+        print(f"Starting frame extractor (monitoring {self.dataset.scenes[SceneState.PENDING.value]})")
+        self.recover()
+        try:
+            while True:
+                try:
+                    queued = self.queue_pending()
+                    if queued:
+                        print(f"Queued {queued} scene(s) on {len(self.drive_queues)} drive(s)")
+                except Exception as e:
+                    print(f"Unexpected error: {e}")
+                # Workers keep extracting while waiting for new pending scenes
+                if self.stopping.wait(self.scan_interval):
+                    break
+        except KeyboardInterrupt:
+            print("Shutting down frame extractor")
+            self.stop()
 
-            except KeyboardInterrupt:
-                print("Shutting down frame extractor")
-                break
-            except Exception as e:
-                print(f"Unexpected error: {e}")
-                time.sleep(1)
 
 if __name__ == "__main__":
-    extractor = FrameExtractor("H:\\Faces\\dataset")
+    parser = argparse.ArgumentParser(description="Extract frames of pending scenes")
+    parser.add_argument("--base-dir", type=str, default="H:\\Faces\\dataset", help="Base directory of the dataset")
+    parser.add_argument("--state-db", type=str,
+                       help="Scene state database (default: <base-dir>/metadata/scene_states.db), on the OS every worker runs on")
+    args = parser.parse_args()
+
+    extractor = FrameExtractor(args.base_dir, state_db=args.state_db)
     extractor.run()
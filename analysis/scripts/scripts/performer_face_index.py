@@ -0,0 +1,159 @@
+"""Build and query a local index of performer face embeddings.
+
+Faces that scene_verifier moved to <base-dir>/performers/verified/<performer id> - <name>/
+are embedded with InceptionResnetV1 (vggface2) and added to a FaceIndex in
+<base-dir>/metadata/face_index. Only faces not in the index yet are embedded, so add can
+run after every verification round. identify embeds face images (crops as written by
+face_detector) and prints the most similar indexed performers, without any network service.
+
+Usage:
+    python performer_face_index.py add --base-dir /mnt/h/Faces/dataset
+    python performer_face_index.py identify --base-dir /mnt/h/Faces/dataset faces/ face.jpg --json
+    python performer_face_index.py stats --base-dir /mnt/h/Faces/dataset
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import torch
+from facenet_pytorch import InceptionResnetV1
+from PIL import Image
+
+from libraries.face_index import FaceIndex
+
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+class FaceEmbedder:
+    def __init__(self, device: torch.device | None = None, batch_size: int = 64, load_workers: int = 4):
+        self.device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = InceptionResnetV1(pretrained="vggface2").eval().to(self.device)
+        self.batch_size = batch_size
+        self.load_workers = load_workers  # Threads decoding the next batch while one is embedded
+
+    @staticmethod
+    def load(image_path: Path) -> np.ndarray | None:
+        """A face image as a 160x160 RGB array standardized as facenet_pytorch does, None if unreadable"""
+        try:
+            with Image.open(image_path) as image:
+                face = np.asarray(image.convert("RGB").resize((160, 160), Image.Resampling.BILINEAR), dtype=np.float32)
+        except OSError:
+            return None
+        return (face.transpose(2, 0, 1) - 127.5) / 128.0
+
+    def embed(self, image_paths: list[Path]) -> tuple[list[Path], np.ndarray]:
+        """Embeddings of the readable images, with the paths they belong to"""
+        embedded, embeddings = [], []
+        with ThreadPoolExecutor(max_workers=self.load_workers) as executor:
+            batches = [image_paths[start : start + self.batch_size] for start in range(0, len(image_paths), self.batch_size)]
+            next_faces = executor.map(self.load, batches[0]) if batches else None
+            for index, batch in enumerate(batches):
+                faces = list(next_faces)
+                if index + 1 < len(batches):
+                    next_faces = executor.map(self.load, batches[index + 1])
+                readable = [(path, face) for path, face in zip(batch, faces, strict=True) if face is not None]
+                if not readable:
+                    continue
+                with torch.inference_mode():
+                    tensor = torch.from_numpy(np.stack([face for _, face in readable])).to(self.device)
+                    embeddings.append(self.model(tensor).cpu().numpy())
+                embedded.extend(path for path, _ in readable)
+        return embedded, np.concatenate(embeddings) if embeddings else np.empty((0, 512), dtype=np.float32)
+
+
+def image_files(paths: list[Path]) -> list[Path]:
+    """Images given directly or found in the given directories"""
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(file for file in path.rglob("*") if file.suffix.lower() in IMAGE_SUFFIXES))
+        else:
+            files.append(path)
+    return files
+
+
+def add_verified_faces(index: FaceIndex, embedder: FaceEmbedder, verified_dir: Path) -> int:
+    """Embed and add the verified faces not in the index yet, one performer directory at a time"""
+    total = 0
+    start = time.perf_counter()
+    for performer_dir in sorted(path for path in verified_dir.iterdir() if path.is_dir()):
+        # Directory names are "<performer id> - <name>"
+        performer_id, _, performer_name = performer_dir.name.partition(" - ")
+        faces = image_files([performer_dir])
+        indexed = index.indexed_sources([str(face) for face in faces])
+        new_faces = [face for face in faces if str(face) not in indexed]
+        if not new_faces:
+            continue
+        embedded, embeddings = embedder.embed(new_faces)
+        added = index.add(embeddings, performer_id, performer_name or performer_id, [str(face) for face in embedded])
+        total += added
+        print(f"{performer_dir.name}: added {added} of {len(faces)} faces")
+    elapsed = time.perf_counter() - start
+    print(f"Added {total} faces in {elapsed:.1f}s, index has {len(index)} faces")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local index of performer face embeddings")
+    parser.add_argument("--base-dir", type=Path, required=True, help="Base directory of the face dataset")
+    parser.add_argument("--index-dir", type=Path, help="Index directory (default: <base-dir>/metadata/face_index)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Faces per embedding batch")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("add", help="Add verified faces that are not in the index yet")
+
+    identify_parser = subparsers.add_parser("identify", help="Identify the performers of face images")
+    identify_parser.add_argument("images", type=Path, nargs="+", help="Face images or directories of them")
+    identify_parser.add_argument("--top", type=int, default=3, help="Performers per face")
+    identify_parser.add_argument("--neighbours", type=int, default=20, help="Nearest indexed faces considered per face")
+    identify_parser.add_argument("--min-similarity", type=float, default=0.5, help="Smallest cosine similarity of a match")
+    identify_parser.add_argument("--json", action="store_true", help="Print one JSON object per face")
+
+    subparsers.add_parser("stats", help="Print the number of indexed faces per performer")
+    args = parser.parse_args()
+
+    index = FaceIndex(args.index_dir or args.base_dir / "metadata" / "face_index")
+
+    if args.command == "stats":
+        performers = index.performers()
+        for performer_id, (name, count) in sorted(performers.items(), key=lambda item: -item[1][1]):
+            print(f"{count:6} {name} ({performer_id})")
+        print(f"{len(index)} faces of {len(performers)} performers")
+        return
+
+    embedder = FaceEmbedder(batch_size=args.batch_size)
+    if args.command == "add":
+        add_verified_faces(index, embedder, args.base_dir / "performers" / "verified")
+        return
+
+    embedded, embeddings = embedder.embed(image_files(args.images))
+    start = time.perf_counter()
+    results = index.identify(embeddings, k=args.neighbours, top=args.top, min_similarity=args.min_similarity)
+    search_time = time.perf_counter() - start
+    for image_path, performers in zip(embedded, results, strict=True):
+        if args.json:
+            print(
+                json.dumps(
+                    {
+                        "image": str(image_path),
+                        "performers": [
+                            {"id": p.performer_id, "name": p.performer_name, "similarity": round(p.similarity, 4), "faces": p.faces}
+                            for p in performers
+                        ],
+                    }
+                )
+            )
+        else:
+            matches = ", ".join(f"{p.performer_name} ({p.similarity:.3f}, {p.faces} faces)" for p in performers) or "no match"
+            print(f"{image_path}: {matches}")
+    if not args.json:
+        print(f"Searched {len(embedded)} faces against {len(index)} in {search_time * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import os
 
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"  # Suppress TF logging
 
+import argparse
 import json
 import shutil
 import time
@@ -12,11 +13,11 @@ from libraries.scene_states import DatasetStructure, SceneState
 
 
 class SceneVerifier:
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, state_db: str | None = None):
         self.base_dir = Path(base_dir)
 
-        # Initialize dataset structure
-        self.dataset = DatasetStructure(base_dir)
+        # Initialize dataset structure, every worker of the dataset runs on the OS that created state_db
+        self.dataset = DatasetStructure(base_dir, state_db)
 
     def is_scene_ready_for_verification(self, scene_dir: Path) -> bool:
         """Check if all faces have been sorted into performer directories"""
@@ -39,8 +40,7 @@ class SceneVerifier:
     def verify_scene(self, scene_id: str, scene_dir: Path):
         """Process a verified scene and move it to final state"""
         # Check if already verified
-        if self.dataset.is_scene_processed(scene_id) and \
-           self.dataset.info["processed_scenes"][scene_id] == SceneState.VERIFIED.value:
+        if self.dataset.get_scene_state(scene_id) == SceneState.VERIFIED:
             print(f"Skipping {scene_id} - already verified")
             return
 
@@ -116,5 +116,11 @@ class SceneVerifier:
                 time.sleep(1)
 
 if __name__ == "__main__":
-    verifier = SceneVerifier("H:\\Faces\\dataset")
+    parser = argparse.ArgumentParser(description="Move verified scenes' faces to their performers")
+    parser.add_argument("--base-dir", type=str, default="H:\\Faces\\dataset", help="Base directory of the dataset")
+    parser.add_argument("--state-db", type=str,
+                       help="Scene state database (default: <base-dir>/metadata/scene_states.db), on the OS every worker runs on")
+    args = parser.parse_args()
+
+    verifier = SceneVerifier(args.base_dir, args.state_db)
     verifier.run()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+HotAudio Decryption Benchmark
+
+Generates a synthetic HAX file locally (random audio payload, encrypted with keys derived
+from a random root key exactly like HotAudio segments) and compares the previous in-memory,
+sequential decryption against the streaming, parallel decrypt_hax_to_file.
+
+Reports wall time, throughput and peak Python memory for each variant.
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+from hotaudio_extractor import DECRYPT_WORKERS, HaxFile, KeyTree, decrypt_hax_to_file
+
+
+def bencode(value) -> bytes:
+    """Minimal bencode encoder for building synthetic HAX metadata."""
+    if isinstance(value, dict):
+        items = sorted((k.encode() if isinstance(k, str) else k, v) for k, v in value.items())
+        return b"d" + b"".join(bencode(k) + bencode(v) for k, v in items) + b"e"
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, str):
+        value = value.encode()
+    return b"%d:%s" % (len(value), value)
+
+
+def write_synthetic_hax(
+    path: Path, segment_count: int, segment_size: int, root_key: bytes
+) -> bytes:
+    """
+    Write a HAX file with random segments encrypted under keys derived from root_key (node 1).
+
+    Returns:
+        The expected plaintext (concatenated segments)
+    """
+    key_tree = KeyTree({"1": root_key.hex()})
+    plaintexts = [os.urandom(segment_size) for _ in range(segment_count)]
+    ciphertexts = [
+        ChaCha20Poly1305(key_tree.get_segment_key(i, segment_count)).encrypt(bytes(12), pt, None)
+        for i, pt in enumerate(plaintexts)
+    ]
+
+    def build_header(first_offset: int) -> bytes:
+        table = bytearray()
+        offset = first_offset
+        for i, ct in enumerate(ciphertexts):
+            table += offset.to_bytes(4, "little") + (i * 1000).to_bytes(4, "little")
+            offset += len(ct)
+        metadata = bencode({
+            "codec": "aac",
+            "durationMs": segment_count * 1000,
+            "segmentCount": segment_count,
+            "segments": bytes(table),
+        })
+        return b"HAX0" + bytes(12) + metadata
+
+    # The segment table contains absolute offsets, so its own length must be known first
+    header = build_header(0)
+    header = build_header(len(header))
+
+    with path.open("wb") as f:
+        f.write(header)
+        for ct in ciphertexts:
+            f.write(ct)
+
+    return b"".join(plaintexts)
+
+
+def decrypt_in_memory(hax_path: Path, key_tree: KeyTree, output_path: Path) -> str:
+    """Previous approach: whole file in memory, sequential decryption, join, write."""
+    hax_buffer = hax_path.read_bytes()
+    with HaxFile(hax_path) as hax_file:
+        metadata, segments = hax_file.metadata, hax_file.segments
+    decrypted_segments = []
+    for i, seg in enumerate(segments):
+        seg_key = key_tree.get_segment_key(i, metadata["segmentCount"])
+        ciphertext = hax_buffer[seg["offset"] : seg["offset"] + seg["size"]]
+        decrypted_segments.append(ChaCha20Poly1305(seg_key).decrypt(bytes(12), ciphertext, None))
+    full_audio = b"".join(decrypted_segments)
+    output_path.write_bytes(full_audio)
+    return hashlib.sha256(full_audio).hexdigest()
+
+
+def decrypt_streaming(hax_path: Path, key_tree: KeyTree, output_path: Path, workers: int) -> str:
+    with HaxFile(hax_path) as hax_file:
+        return decrypt_hax_to_file(hax_file, key_tree, output_path, workers=workers).sha256
+
+
+def measure(label: str, func, total_bytes: int) -> str:
+    tracemalloc.start()
+    start = time.perf_counter()
+    checksum = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {label:<24} {elapsed:7.2f}s  {total_bytes / elapsed / 1024 / 1024:8.1f} MB/s  "
+        f"peak {peak / 1024 / 1024:8.1f} MB"
+    )
+    return checksum
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HotAudio segment decryption on synthetic HAX files")
+    parser.add_argument("--segments", type=int, default=3600, help="Number of segments (default: 1h of 1s segments)")
+    parser.add_argument("--segment-size", type=int, default=24 * 1024, help="Plaintext bytes per segment")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, DECRYPT_WORKERS], help="Worker counts to try")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        hax_path = tmp_dir / "synthetic.hax"
+        root_key = os.urandom(32)
+        expected = write_synthetic_hax(hax_path, args.segments, args.segment_size, root_key)
+        expected_sha256 = hashlib.sha256(expected).hexdigest()
+        total_bytes = len(expected)
+        del expected
+
+        print(f"Synthetic HAX: {args.segments} segments, {hax_path.stat().st_size / 1024 / 1024:.1f} MB")
+        key_tree = KeyTree({"1": root_key.hex()})
+
+        results = {
+            "in-memory sequential": measure(
+                "in-memory sequential",
+                lambda: decrypt_in_memory(hax_path, key_tree, tmp_dir / "memory.m4a"),
+                total_bytes,
+            )
+        }
+        for workers in args.workers:
+            label = f"streaming ({workers} workers)"
+            results[label] = measure(
+                label,
+                lambda workers=workers: decrypt_streaming(hax_path, key_tree, tmp_dir / f"stream{workers}.m4a", workers),
+                total_bytes,
+            )
+
+        for label, checksum in results.items():
+            if checksum != expected_sha256:
+                raise SystemExit(f"Checksum mismatch for {label}")
+        print("All outputs match the original plaintext")
+
+
+if __name__ == "__main__":
+    main()
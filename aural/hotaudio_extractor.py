@@ -16,13 +16,19 @@ Uses async Playwright API for reliable CDP console message capture.
 
 import argparse
 import asyncio
+import collections
 import concurrent.futures
 import contextlib
 import functools
 import hashlib
 import json
 import math
+import mmap
+import os
+import tempfile
 import time
+import weakref
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from pathlib import Path
 
@@ -66,47 +72,80 @@ def sha256_bytes(data: bytes) -> bytes:
 
 
 class KeyTree:
-    """Tree-based key derivation for HotAudio segments."""
+    """
+    Tree-based key derivation for HotAudio segments.
+
+    Every derived node is memoized, so neighbouring segments share their ancestor
+    chain and each node of the tree is hashed at most once. Like the JS player, a
+    node's key is derived from the root-most ancestor with a known key.
+    """
 
     def __init__(self, keys: dict[str, str]):
         self.keys: dict[int, bytes] = {}
         for node_str, hex_key in keys.items():
             self.keys[int(node_str)] = bytes.fromhex(hex_key)
+        # Node 0 is the (virtual) parent of the root; None marks nodes without a key
+        self._derived: dict[int, bytes | None] = {0: None}
+
+    def _derive_child(self, node: int) -> bytes | None:
+        parent_key = self._derived[node >> 1]
+        if parent_key is None:
+            return self.keys.get(node)
+        # Match JS Uint8Array behavior: wrap to single byte (modulo 256)
+        return sha256_bytes(parent_key + bytes([node & 0xFF]))
 
     def derive_key(self, node_index: int) -> bytes:
         """Derive key for a given node index using tree traversal."""
-        # Find the highest bit position (tree depth)
-        n = int(math.log2(node_index))
-        depth = -1
-        ancestor_key = None
-
-        # Search from root (depth 0) to leaf (depth n) for an ancestor we have
-        # At depth d, the ancestor node is node_index >> (n - d)
-        for d in range(n + 1):
-            ancestor_node = node_index >> (n - d)
-            if ancestor_node in self.keys:
-                depth = d
-                ancestor_key = self.keys[ancestor_node]
-                break
-
-        if ancestor_key is None:
+        # Walk up to the nearest node that was already resolved
+        chain = []
+        node = node_index
+        while node not in self._derived:
+            chain.append(node)
+            node >>= 1
+
+        # Resolve back down, memoizing every intermediate node
+        for node in reversed(chain):
+            self._derived[node] = self._derive_child(node)
+
+        key = self._derived[node_index]
+        if key is None:
             raise ValueError(f"No applicable key available for node {node_index}")
+        return key
 
-        # Derive from ancestor down to target
-        current_key = ancestor_key
-        for d in range(depth + 1, n + 1):
-            child_node = node_index >> (n - d)
-            # Match JS Uint8Array behavior: wrap to single byte (modulo 256)
-            current_key = sha256_bytes(current_key + bytes([child_node & 0xFF]))
+    def derive_keys(self, first_node: int, last_node: int) -> list[bytes | None]:
+        """
+        Derive keys for a contiguous range of nodes on one tree level in a single top-down pass.
 
-        return current_key
+        Returns:
+            Keys for first_node..last_node (inclusive), None where no key is available
+        """
+        depth = first_node.bit_length() - 1
+        if last_node < first_node or last_node.bit_length() - 1 != depth:
+            raise ValueError(f"Nodes {first_node}..{last_node} are not on one tree level")
+
+        for d in range(depth + 1):
+            shift = depth - d
+            for node in range(first_node >> shift, (last_node >> shift) + 1):
+                if node not in self._derived:
+                    self._derived[node] = self._derive_child(node)
+
+        return [self._derived[node] for node in range(first_node, last_node + 1)]
+
+    @staticmethod
+    def segment_node(segment_index: int, segment_count: int) -> int:
+        """Tree node holding the key of a segment."""
+        tree_depth = math.ceil(math.log2(segment_count))
+        return 1 + (1 << (tree_depth + 1)) + segment_index
 
     def get_segment_key(self, segment_index: int, segment_count: int) -> bytes:
         """Get decryption key for a specific segment."""
-        tree_depth = math.ceil(math.log2(segment_count))
-        segment_key_base = 1 + (1 << (tree_depth + 1))
-        node_index = segment_key_base + segment_index
-        return self.derive_key(node_index)
+        return self.derive_key(self.segment_node(segment_index, segment_count))
+
+    def get_segment_keys(self, start: int, stop: int, segment_count: int) -> list[bytes | None]:
+        """Get decryption keys for segments start..stop-1, None where no key is available."""
+        if start >= stop:
+            return []
+        return self.derive_keys(self.segment_node(start, segment_count), self.segment_node(stop - 1, segment_count))
 
 
 def parse_bencode(buffer: bytes, offset: int = 0) -> tuple:
@@ -154,6 +193,197 @@ def parse_bencode(buffer: bytes, offset: int = 0) -> tuple:
     raise ValueError(f"Unknown bencode type at offset {offset}: {char}")
 
 
+HAX_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DECRYPT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+class HaxFile:
+    """
+    HAX container stored on disk.
+
+    The header and segment table are parsed through an mmap and segments are read
+    on demand with os.pread, so the file is never held in memory as a whole.
+    Downloaded files are temporary and removed on close (or garbage collection).
+    """
+
+    def __init__(self, path: Path, delete: bool = False):
+        self.path = path
+        self.size = path.stat().st_size
+        self._fd = os.open(path, os.O_RDONLY)
+        self._finalizer = weakref.finalize(self, HaxFile._release, self._fd, path, delete)
+        try:
+            self.metadata, self.segments = self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    @staticmethod
+    def _release(fd: int, path: Path, delete: bool) -> None:
+        os.close(fd)
+        if delete:
+            path.unlink(missing_ok=True)
+
+    def _parse(self) -> tuple[dict, list[dict]]:
+        with mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ) as buffer:
+            magic = buffer[:4].decode("utf-8")
+            if magic != "HAX0":
+                raise ValueError(f"Invalid HAX magic: {magic}")
+
+            # Find metadata start (bencode dict starts with 'd')
+            meta_start = 16
+            while meta_start < 64 and buffer[meta_start] != 0x64:
+                meta_start += 1
+
+            metadata, _ = parse_bencode(buffer, meta_start)
+
+        # Parse segment table
+        segment_data = metadata["segments"]
+        segments = []
+        for i in range(metadata["segmentCount"]):
+            offset = int.from_bytes(segment_data[i * 8 : i * 8 + 4], byteorder="little")
+            pts = int.from_bytes(segment_data[i * 8 + 4 : i * 8 + 8], byteorder="little")
+            segments.append({"offset": offset, "pts": pts, "index": i})
+
+        # Calculate segment sizes
+        for i in range(len(segments) - 1):
+            segments[i]["size"] = segments[i + 1]["offset"] - segments[i]["offset"]
+        segments[-1]["size"] = self.size - segments[-1]["offset"]
+
+        return metadata, segments
+
+    def read(self, offset: int, size: int) -> bytes:
+        """Read a byte range; safe to call from several threads at once."""
+        return os.pread(self._fd, size, offset)
+
+    def header_hex(self) -> str:
+        return self.read(0, 16).hex()
+
+    def sha256(self) -> str:
+        digest = hashlib.sha256()
+        with self.path.open("rb") as f:
+            while chunk := f.read(HAX_DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def close(self) -> None:
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def download_hax(client: httpx.Client, hax_url: str) -> HaxFile:
+    """Stream a HAX file from the CDN into a temporary file."""
+    fd, tmp_name = tempfile.mkstemp(prefix="hotaudio-", suffix=".hax")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as f, client.stream("GET", hax_url) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes(HAX_DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+        return HaxFile(tmp_path, delete=True)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+@dataclass
+class DecryptResult:
+    """Outcome of decrypting a HAX file into an output file."""
+
+    decrypted_segments: int
+    size: int
+    sha256: str
+    failed_segment: int | None = None
+    error: str | None = None
+
+
+def _decrypt_segment(hax_file: HaxFile, segment: dict, seg_key: bytes | None) -> tuple[bytes, bytes]:
+    if seg_key is None:
+        raise ValueError(f"No applicable key available for segment {segment['index']}")
+    ciphertext = hax_file.read(segment["offset"], segment["size"])
+    nonce = bytes(12)
+    return ciphertext, ChaCha20Poly1305(seg_key).decrypt(nonce, ciphertext, None)
+
+
+def decrypt_hax_to_file(
+    hax_file: HaxFile,
+    key_tree: KeyTree,
+    output_path: Path,
+    workers: int = DECRYPT_WORKERS,
+    on_segment=None,
+) -> DecryptResult:
+    """
+    Decrypt all segments of a HAX file and write the plaintext to output_path in order.
+
+    Segments are decrypted in a thread pool (ChaCha20Poly1305 releases the GIL) with a
+    bounded number in flight, and written as soon as all earlier segments are done.
+    Decryption stops at the first failing segment. The output is written to a .part
+    file and only renamed into place when every segment was decrypted.
+
+    Args:
+        on_segment: Optional callback(segment, ciphertext, plaintext) called in order
+    """
+    segment_count = hax_file.metadata["segmentCount"]
+    segments = [seg for seg in hax_file.segments if seg["size"] > 0]
+    segment_keys = key_tree.get_segment_keys(0, segment_count, segment_count)
+    part_path = output_path.with_name(output_path.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
+    decrypted = 0
+    failed_segment = None
+    error = None
+
+    with (
+        concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor,
+        part_path.open("wb") as out,
+    ):
+        pending: collections.deque = collections.deque()
+        next_to_submit = 0
+        max_in_flight = workers * 4
+
+        while next_to_submit < len(segments) or pending:
+            while next_to_submit < len(segments) and len(pending) < max_in_flight:
+                seg = segments[next_to_submit]
+                pending.append(
+                    (seg, executor.submit(_decrypt_segment, hax_file, seg, segment_keys[seg["index"]]))
+                )
+                next_to_submit += 1
+
+            seg, future = pending.popleft()
+            try:
+                ciphertext, plaintext = future.result()
+            except Exception as e:
+                failed_segment = seg["index"]
+                error = str(e)
+                for _, remaining in pending:
+                    remaining.cancel()
+                break
+
+            out.write(plaintext)
+            digest.update(plaintext)
+            size += len(plaintext)
+            decrypted += 1
+            if on_segment:
+                on_segment(seg, ciphertext, plaintext)
+
+    if decrypted < len(hax_file.segments):
+        part_path.unlink(missing_ok=True)
+    else:
+        part_path.replace(output_path)
+
+    return DecryptResult(
+        decrypted_segments=decrypted,
+        size=size,
+        sha256=digest.hexdigest(),
+        failed_segment=failed_segment,
+        error=error,
+    )
+
+
 class HotAudioExtractor:
     """Extract and decrypt audio from HotAudio using async Playwright."""
 
@@ -164,6 +394,7 @@ class HotAudioExtractor:
         self.last_request_time = 0
         self.browser = None
         self.playwright = None
+        self.http_client: httpx.Client | None = None
         self.captured_data: dict = {}
 
     def setup_playwright(self):
@@ -177,6 +408,9 @@ class HotAudioExtractor:
     def close_browser(self):
         """Close browser if open (sync wrapper for compatibility)."""
         # Async cleanup is handled in extract method
+        if self.http_client is not None:
+            self.http_client.close()
+            self.http_client = None
 
     def ensure_rate_limit(self):
         """Ensure rate limiting between requests."""
@@ -190,60 +424,29 @@ class HotAudioExtractor:
 
         self.last_request_time = time.time()
 
-    def _download_and_parse_hax(self, hax_url: str) -> tuple[bytes, dict, list[dict]]:
+    def _get_http_client(self) -> httpx.Client:
+        """Return the HTTP client shared by all HAX downloads of this extractor."""
+        if self.http_client is None:
+            self.http_client = httpx.Client(timeout=httpx.Timeout(30.0, read=120.0))
+        return self.http_client
+
+    def _download_and_parse_hax(self, hax_url: str) -> HaxFile:
         """
-        Download HAX file and parse its metadata.
+        Download HAX file to a temporary file and parse its metadata.
 
         Returns:
-            Tuple of (hax_buffer, metadata_dict, segments_list)
+            HaxFile with parsed metadata and segment table; close it when done
         """
         print("Downloading HAX file from CDN...")
-        with httpx.Client() as client:
-            response = client.get(hax_url)
-            response.raise_for_status()
+        hax_file = download_hax(self._get_http_client(), hax_url)
+        print(f"Downloaded {hax_file.size / 1024:.1f} KB")
 
-        hax_buffer = response.content
-        print(f"Downloaded {len(hax_buffer) / 1024:.1f} KB")
-
-        # Parse HAX header
-        magic = hax_buffer[:4].decode("utf-8")
-        if magic != "HAX0":
-            raise ValueError(f"Invalid HAX magic: {magic}")
-
-        # Find metadata start (bencode dict starts with 'd')
-        meta_start = 16
-        while meta_start < 64 and hax_buffer[meta_start] != 0x64:
-            meta_start += 1
-
-        metadata, _ = parse_bencode(hax_buffer, meta_start)
-
-        codec = (
-            metadata["codec"].decode("utf-8")
-            if isinstance(metadata["codec"], bytes)
-            else metadata["codec"]
-        )
-        print(f"  Codec: {codec}")
+        metadata = hax_file.metadata
+        print(f"  Codec: {self._decode_codec(metadata)}")
         print(f"  Duration: {metadata['durationMs'] / 1000:.1f}s")
         print(f"  Segments: {metadata['segmentCount']}")
 
-        # Parse segment table
-        segment_data = metadata["segments"]
-        segments = []
-        for i in range(metadata["segmentCount"]):
-            offset = int.from_bytes(
-                segment_data[i * 8 : i * 8 + 4], byteorder="little"
-            )
-            pts = int.from_bytes(
-                segment_data[i * 8 + 4 : i * 8 + 8], byteorder="little"
-            )
-            segments.append({"offset": offset, "pts": pts, "index": i})
-
-        # Calculate segment sizes
-        for i in range(len(segments) - 1):
-            segments[i]["size"] = segments[i + 1]["offset"] - segments[i]["offset"]
-        segments[-1]["size"] = len(hax_buffer) - segments[-1]["offset"]
-
-        return hax_buffer, metadata, segments
+        return hax_file
 
     def discover_tracks(self, url: str) -> list[dict]:
         """
@@ -551,7 +754,7 @@ class HotAudioExtractor:
         hax_count_before = len(captured_hax_urls)
 
         await self._switch_to_track(page, tid)
-        track_hax_data, actual_segment_count = await self._get_early_hax_data(
+        track_hax_file, actual_segment_count = await self._get_early_hax_data(
             captured_hax_urls, hax_count_before
         )
 
@@ -575,7 +778,7 @@ class HotAudioExtractor:
 
         try:
             track_result = await self._download_and_decrypt_track(
-                output_dir, track_basename, url, track_info, track_hax_data
+                output_dir, track_basename, url, track_info, track_hax_file
             )
             track_result["trackIndex"] = track_index
             track_result["trackTitle"] = track_title
@@ -615,7 +818,7 @@ class HotAudioExtractor:
 
     async def _get_early_hax_data(
         self, captured_hax_urls: list[str], hax_count_before: int
-    ) -> tuple[tuple | None, int | None]:
+    ) -> tuple[HaxFile | None, int | None]:
         """Download HAX file early to get actual segment count."""
         if len(captured_hax_urls) <= hax_count_before:
             return None, None
@@ -623,10 +826,10 @@ class HotAudioExtractor:
         track_hax_url = captured_hax_urls[hax_count_before]
         self.captured_data["hax_url"] = track_hax_url
         try:
-            track_hax_data = self._download_and_parse_hax(track_hax_url)
-            actual_segment_count = track_hax_data[1]["segmentCount"]
+            track_hax_file = self._download_and_parse_hax(track_hax_url)
+            actual_segment_count = track_hax_file.metadata["segmentCount"]
             print(f"  Actual segment count: {actual_segment_count}")
-            return track_hax_data, actual_segment_count
+            return track_hax_file, actual_segment_count
         except Exception as e:
             print(f"  Warning: Early HAX download failed: {e}")
             return None, None
@@ -878,7 +1081,7 @@ class HotAudioExtractor:
         basename: str,
         source_url: str,
         track_info: dict,
-        hax_data: tuple[bytes, dict, list[dict]] | None = None,
+        hax_file: HaxFile | None = None,
     ) -> dict:
         """Download and decrypt a single track using captured data.
 
@@ -887,67 +1090,44 @@ class HotAudioExtractor:
             basename: Base filename for output
             source_url: Original source URL
             track_info: Track metadata
-            hax_data: Optional pre-downloaded (hax_buffer, metadata, segments) tuple
+            hax_file: Optional pre-downloaded HAX file
         """
         segment_keys = self.captured_data["segment_keys"]
 
         # Use pre-downloaded data or download now
-        if hax_data:
-            hax_buffer, metadata, segments = hax_data
-        else:
-            hax_buffer, metadata, segments = self._download_and_parse_hax(
-                self.captured_data["hax_url"]
-            )
-
-        codec = (
-            metadata["codec"].decode("utf-8")
-            if isinstance(metadata["codec"], bytes)
-            else metadata["codec"]
-        )
+        if hax_file is None:
+            hax_file = self._download_and_parse_hax(self.captured_data["hax_url"])
 
-        # Decrypt segments
-        print(f"  Decrypting {len(segments)} segments...")
-        key_tree = KeyTree(segment_keys)
-        decrypted_segments = []
+        with hax_file:
+            metadata = hax_file.metadata
+            codec = self._decode_codec(metadata)
+            total_segments = len(hax_file.segments)
+            output_path = output_dir / f"{basename}.m4a"
 
-        for i, seg in enumerate(segments):
-            if seg["size"] == 0:
-                continue
-            try:
-                seg_key = key_tree.get_segment_key(i, metadata["segmentCount"])
-                ciphertext = hax_buffer[seg["offset"] : seg["offset"] + seg["size"]]
-                nonce = bytes(12)
-                cipher = ChaCha20Poly1305(seg_key)
-                decrypted = cipher.decrypt(nonce, ciphertext, None)
-                decrypted_segments.append(decrypted)
-            except Exception as e:
-                print(f"  Warning: Segment {i} failed: {e}")
-                break
+            # Decrypt segments straight into the output file
+            print(f"  Decrypting {total_segments} segments...")
+            decrypt_result = decrypt_hax_to_file(hax_file, KeyTree(segment_keys), output_path)
 
-        total_segments = len(segments)
-        print(f"  Decrypted {len(decrypted_segments)}/{total_segments} segments")
+        if decrypt_result.error:
+            print(f"  Warning: Segment {decrypt_result.failed_segment} failed: {decrypt_result.error}")
+        print(f"  Decrypted {decrypt_result.decrypted_segments}/{total_segments} segments")
 
         # Require 100% segment decryption - partial extractions are failures
-        if len(decrypted_segments) < total_segments:
+        if decrypt_result.decrypted_segments < total_segments:
             print(
                 f"  ERROR: Track extraction incomplete "
-                f"({len(decrypted_segments)}/{total_segments} segments). "
-                f"Missing {total_segments - len(decrypted_segments)} segments."
+                f"({decrypt_result.decrypted_segments}/{total_segments} segments). "
+                f"Missing {total_segments - decrypt_result.decrypted_segments} segments."
             )
             return {
                 "success": False,
-                "error": f"Incomplete extraction: {len(decrypted_segments)}/{total_segments} segments",
+                "error": f"Incomplete extraction: {decrypt_result.decrypted_segments}/{total_segments} segments",
                 "platformData": {
                     "segmentCount": total_segments,
-                    "decryptedSegments": len(decrypted_segments),
+                    "decryptedSegments": decrypt_result.decrypted_segments,
                 },
             }
 
-        # Save audio file
-        output_path = output_dir / f"{basename}.m4a"
-        full_audio = b"".join(decrypted_segments)
-        output_path.write_bytes(full_audio)
-
         # Save track metadata
         json_path = output_dir / f"{basename}.json"
         track_result = {
@@ -956,8 +1136,8 @@ class HotAudioExtractor:
                 "downloadUrl": self.captured_data["hax_url"],
                 "filePath": str(output_path),
                 "format": "m4a",
-                "fileSize": len(full_audio),
-                "checksum": {"sha256": sha256_hex(full_audio)},
+                "fileSize": decrypt_result.size,
+                "checksum": {"sha256": decrypt_result.sha256},
             },
             "metadata": {
                 "title": track_info.get("title") or basename,
@@ -968,7 +1148,7 @@ class HotAudioExtractor:
             "platformData": {
                 "codec": codec,
                 "segmentCount": total_segments,
-                "decryptedSegments": len(decrypted_segments),
+                "decryptedSegments": decrypt_result.decrypted_segments,
                 "tid": track_info.get("tid"),
             },
             "backupFiles": {"metadata": str(json_path)},
@@ -1033,37 +1213,30 @@ class HotAudioExtractor:
             await self._validate_captured_data(page)
             await self._close_browser(browser, playwright)
 
-            hax_buffer, metadata, segments = self._download_and_parse_hax(
-                self.captured_data["hax_url"]
-            )
-            codec = self._decode_codec(metadata)
-
-            if verify_data:
-                self._collect_hax_verification(verify_data, hax_buffer, metadata, codec)
+            output_path = output_dir / f"{final_output_name}.m4a"
+            with self._download_and_parse_hax(self.captured_data["hax_url"]) as hax_file:
+                metadata = hax_file.metadata
+                codec = self._decode_codec(metadata)
 
-            decrypted_segments = self._decrypt_segments(
-                hax_buffer, metadata, segments, verify_data
-            )
+                if verify_data:
+                    self._collect_hax_verification(verify_data, hax_file, codec)
 
-            if len(decrypted_segments) < len(segments):
-                return self._build_failure_result(decrypted_segments, segments)
+                decrypt_result = self._decrypt_segments(hax_file, output_path, verify_data)
 
-            full_audio = b"".join(decrypted_segments)
-            output_path = output_dir / f"{final_output_name}.m4a"
-            output_path.write_bytes(full_audio)
+            if decrypt_result.decrypted_segments < metadata["segmentCount"]:
+                return self._build_failure_result(decrypt_result, metadata["segmentCount"])
 
             if verify_data:
-                self._collect_output_verification(verify_data, output_path, full_audio)
+                self._collect_output_verification(verify_data, output_path, decrypt_result)
 
             result = self._build_success_result(
-                url, output_path, json_path, full_audio, metadata, codec,
-                decrypted_segments, verify_data
+                url, output_path, json_path, decrypt_result, metadata, codec, verify_data
             )
             json_path.write_text(
                 json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8"
             )
 
-            self._print_summary(output_path, full_audio, metadata, verify_data)
+            self._print_summary(output_path, decrypt_result, metadata, verify_data)
             return result
 
         except Exception as error:
@@ -1194,10 +1367,8 @@ class HotAudioExtractor:
         actual_segment_count = None
         if self.captured_data["hax_url"]:
             try:
-                _, hax_metadata, _ = self._download_and_parse_hax(
-                    self.captured_data["hax_url"]
-                )
-                actual_segment_count = hax_metadata["segmentCount"]
+                with self._download_and_parse_hax(self.captured_data["hax_url"]) as hax_file:
+                    actual_segment_count = hax_file.metadata["segmentCount"]
             except Exception as e:
                 print(f"  Warning: Early HAX download failed: {e}")
 
@@ -1489,14 +1660,15 @@ class HotAudioExtractor:
         return codec
 
     def _collect_hax_verification(
-        self, verify_data: dict, hax_buffer: bytes, metadata: dict, codec: str
+        self, verify_data: dict, hax_file: HaxFile, codec: str
     ) -> None:
         """Collect HAX file verification data."""
+        metadata = hax_file.metadata
         verify_data["hax"] = {
             "url": self.captured_data["hax_url"],
-            "size_bytes": len(hax_buffer),
-            "sha256": sha256_hex(hax_buffer),
-            "header_hex": hax_buffer[:16].hex(),
+            "size_bytes": hax_file.size,
+            "sha256": hax_file.sha256(),
+            "header_hex": hax_file.header_hex(),
         }
         base_key = metadata.get("baseKey", b"")
         orig_hash = metadata.get("origHash")
@@ -1510,93 +1682,80 @@ class HotAudioExtractor:
         verify_data["tree_keys"] = dict(self.captured_data["segment_keys"])
 
     def _decrypt_segments(
-        self, hax_buffer: bytes, metadata: dict, segments: list[dict],
-        verify_data: dict | None
-    ) -> list[bytes]:
-        """Decrypt all segments using captured keys."""
+        self, hax_file: HaxFile, output_path: Path, verify_data: dict | None
+    ) -> DecryptResult:
+        """Decrypt all segments using captured keys and write them to output_path."""
         print("\nDecrypting segments...")
         key_preview = sorted([int(k) for k in self.captured_data["segment_keys"]])[:20]
         print(f"Key nodes available: {', '.join(str(k) for k in key_preview)}...")
 
+        segments = hax_file.segments
         key_tree = KeyTree(self.captured_data["segment_keys"])
-        decrypted_segments = []
-
-        for i, seg in enumerate(segments):
-            if seg["size"] == 0:
-                continue
-
-            try:
-                seg_key = key_tree.get_segment_key(i, metadata["segmentCount"])
-                ciphertext = hax_buffer[seg["offset"] : seg["offset"] + seg["size"]]
-
-                nonce = bytes(12)
-                cipher = ChaCha20Poly1305(seg_key)
-                decrypted = cipher.decrypt(nonce, ciphertext, None)
-                decrypted_segments.append(decrypted)
 
-                if verify_data:
-                    verify_data["segments"].append({
-                        "index": i,
-                        "offset": seg["offset"],
-                        "size": seg["size"],
-                        "encrypted_sha256": sha256_hex(ciphertext),
-                        "decrypted_sha256": sha256_hex(decrypted),
-                    })
-
-                if i == 0 or i == len(segments) - 1:
-                    print(f"  Segment {i}: {len(decrypted)} bytes")
-                elif i == 1:
-                    print(f"  ... decrypting {len(segments) - 2} more segments ...")
-
-            except Exception as e:
-                failed_node = 4097 + i
-                print(f"  Segment {i} failed (node {failed_node}): {e}")
-                ancestors = [n for n in [1, 2, 4, 8, 16, 32, 64, 128] if n < failed_node]
-                print(f"  Looking for ancestors: {', '.join(str(a) for a in ancestors)}")
-                key_sample = list(self.captured_data["segment_keys"].keys())[:20]
-                print(f"  We have: {', '.join(key_sample)}...")
-                break
-
-        total_segments = len(segments)
-        print(f"\nDecrypted {len(decrypted_segments)}/{total_segments} segments")
-        return decrypted_segments
+        def on_segment(seg: dict, ciphertext: bytes, plaintext: bytes) -> None:
+            i = seg["index"]
+            if verify_data:
+                verify_data["segments"].append({
+                    "index": i,
+                    "offset": seg["offset"],
+                    "size": seg["size"],
+                    "encrypted_sha256": sha256_hex(ciphertext),
+                    "decrypted_sha256": sha256_hex(plaintext),
+                })
+
+            if i == 0 or i == len(segments) - 1:
+                print(f"  Segment {i}: {len(plaintext)} bytes")
+            elif i == 1:
+                print(f"  ... decrypting {len(segments) - 2} more segments ...")
+
+        result = decrypt_hax_to_file(hax_file, key_tree, output_path, on_segment=on_segment)
+
+        if result.error:
+            i = result.failed_segment
+            failed_node = 4097 + i
+            print(f"  Segment {i} failed (node {failed_node}): {result.error}")
+            ancestors = [n for n in [1, 2, 4, 8, 16, 32, 64, 128] if n < failed_node]
+            print(f"  Looking for ancestors: {', '.join(str(a) for a in ancestors)}")
+            key_sample = list(self.captured_data["segment_keys"].keys())[:20]
+            print(f"  We have: {', '.join(key_sample)}...")
+
+        print(f"\nDecrypted {result.decrypted_segments}/{len(segments)} segments")
+        return result
 
     def _build_failure_result(
-        self, decrypted_segments: list[bytes], segments: list[dict]
+        self, decrypt_result: DecryptResult, total_segments: int
     ) -> dict:
         """Build result dict for incomplete extraction."""
-        total_segments = len(segments)
+        decrypted = decrypt_result.decrypted_segments
         print(
             f"ERROR: Extraction incomplete "
-            f"({len(decrypted_segments)}/{total_segments} segments). "
-            f"Missing {total_segments - len(decrypted_segments)} segments."
+            f"({decrypted}/{total_segments} segments). "
+            f"Missing {total_segments - decrypted} segments."
         )
         return {
             "success": False,
-            "error": f"Incomplete extraction: {len(decrypted_segments)}/{total_segments} segments",
+            "error": f"Incomplete extraction: {decrypted}/{total_segments} segments",
             "platformData": {
                 "segmentCount": total_segments,
-                "decryptedSegments": len(decrypted_segments),
+                "decryptedSegments": decrypted,
             },
         }
 
     def _collect_output_verification(
-        self, verify_data: dict, output_path: Path, full_audio: bytes
+        self, verify_data: dict, output_path: Path, decrypt_result: DecryptResult
     ) -> None:
         """Collect output file verification data."""
         verify_data["output"] = {
             "path": str(output_path),
-            "size_bytes": len(full_audio),
-            "sha256": sha256_hex(full_audio),
+            "size_bytes": decrypt_result.size,
+            "sha256": decrypt_result.sha256,
         }
 
     def _build_success_result(
-        self, url: str, output_path: Path, json_path: Path, full_audio: bytes,
-        metadata: dict, codec: str, decrypted_segments: list[bytes],
-        verify_data: dict | None
+        self, url: str, output_path: Path, json_path: Path, decrypt_result: DecryptResult,
+        metadata: dict, codec: str, verify_data: dict | None
     ) -> dict:
         """Build result dict for successful extraction."""
-        audio_checksum = sha256_hex(full_audio)
         final_output_name = output_path.stem
 
         return {
@@ -1605,8 +1764,8 @@ class HotAudioExtractor:
                 "downloadUrl": self.captured_data["hax_url"],
                 "filePath": str(output_path),
                 "format": "m4a",
-                "fileSize": len(full_audio),
-                "checksum": {"sha256": audio_checksum},
+                "fileSize": decrypt_result.size,
+                "checksum": {"sha256": decrypt_result.sha256},
             },
             "metadata": {
                 "title": (
@@ -1622,7 +1781,7 @@ class HotAudioExtractor:
             "platformData": {
                 "codec": codec,
                 "segmentCount": metadata["segmentCount"],
-                "decryptedSegments": len(decrypted_segments),
+                "decryptedSegments": decrypt_result.decrypted_segments,
                 "pid": (self.captured_data.get("metadata") or {}).get("pid"),
                 "extractedAt": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
             },
@@ -1630,18 +1789,18 @@ class HotAudioExtractor:
             "success": True,
             "outputPath": str(output_path),
             "duration": metadata["durationMs"] / 1000,
-            "size": len(full_audio),
-            "segments": len(decrypted_segments),
+            "size": decrypt_result.size,
+            "segments": decrypt_result.decrypted_segments,
             "verifyData": verify_data,
         }
 
     def _print_summary(
-        self, output_path: Path, full_audio: bytes, metadata: dict,
+        self, output_path: Path, decrypt_result: DecryptResult, metadata: dict,
         verify_data: dict | None
     ) -> None:
         """Print extraction summary."""
         print(f"\nSaved: {output_path}")
-        print(f"Size: {len(full_audio) / 1024:.1f} KB")
+        print(f"Size: {decrypt_result.size / 1024:.1f} KB")
         print(f"Duration: {metadata['durationMs'] / 1000:.1f}s")
 
         if verify_data:
@@ -0,0 +1,94 @@
+"""Property tests for the memoized HotAudio KeyTree against the original derivation."""
+
+import math
+import os
+import random
+
+import pytest
+from hotaudio_extractor import KeyTree, sha256_bytes
+
+
+def reference_derive_key(keys: dict[int, bytes], node_index: int) -> bytes:
+    """The original, uncached KeyTree.derive_key."""
+    n = int(math.log2(node_index))
+    depth = -1
+    ancestor_key = None
+    for d in range(n + 1):
+        ancestor_node = node_index >> (n - d)
+        if ancestor_node in keys:
+            depth = d
+            ancestor_key = keys[ancestor_node]
+            break
+
+    if ancestor_key is None:
+        raise ValueError(f"No applicable key available for node {node_index}")
+
+    current_key = ancestor_key
+    for d in range(depth + 1, n + 1):
+        child_node = node_index >> (n - d)
+        current_key = sha256_bytes(current_key + bytes([child_node & 0xFF]))
+    return current_key
+
+
+def reference_segment_key(keys: dict[int, bytes], segment_index: int, segment_count: int) -> bytes | None:
+    tree_depth = math.ceil(math.log2(segment_count))
+    try:
+        return reference_derive_key(keys, 1 + (1 << (tree_depth + 1)) + segment_index)
+    except ValueError:
+        return None
+
+
+def random_tree(rng: random.Random, segment_count: int) -> dict[str, str]:
+    """Random known keys scattered over the tree, possibly overlapping and possibly leaving gaps."""
+    max_node = 1 << (math.ceil(math.log2(segment_count)) + 3)
+    nodes = rng.sample(range(1, max_node), k=rng.randint(1, 12))
+    return {str(node): os.urandom(32).hex() for node in nodes}
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_segment_keys_match_reference(seed):
+    rng = random.Random(seed)
+    segment_count = rng.randint(1, 600)
+    keys = random_tree(rng, segment_count)
+    reference_keys = {int(node): bytes.fromhex(key) for node, key in keys.items()}
+    expected = [reference_segment_key(reference_keys, i, segment_count) for i in range(segment_count)]
+
+    # Single segment lookups in random order
+    tree = KeyTree(keys)
+    order = list(range(segment_count))
+    rng.shuffle(order)
+    for i in order:
+        if expected[i] is None:
+            with pytest.raises(ValueError, match="No applicable key"):
+                tree.get_segment_key(i, segment_count)
+        else:
+            assert tree.get_segment_key(i, segment_count) == expected[i]
+
+    # Range derivation on a fresh tree, then on the warm one
+    start = rng.randrange(segment_count)
+    stop = rng.randint(start + 1, segment_count)
+    assert KeyTree(keys).get_segment_keys(start, stop, segment_count) == expected[start:stop]
+    assert tree.get_segment_keys(0, segment_count, segment_count) == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_intermediate_nodes_match_reference(seed):
+    rng = random.Random(1000 + seed)
+    keys = random_tree(rng, 256)
+    reference_keys = {int(node): bytes.fromhex(key) for node, key in keys.items()}
+    tree = KeyTree(keys)
+
+    for node in rng.sample(range(1, 1 << 12), k=200):
+        try:
+            expected = reference_derive_key(reference_keys, node)
+        except ValueError:
+            with pytest.raises(ValueError, match="No applicable key"):
+                tree.derive_key(node)
+        else:
+            assert tree.derive_key(node) == expected
+
+
+def test_derive_keys_rejects_mixed_levels():
+    tree = KeyTree({"1": os.urandom(32).hex()})
+    with pytest.raises(ValueError, match="not on one tree level"):
+        tree.derive_keys(6, 9)
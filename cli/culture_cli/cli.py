@@ -15,8 +15,9 @@ app = typer.Typer(
     add_completion=True,
 )
 
-# Register sync command
+# Register sync commands
 app.command("sync")(sync.sync_scene)
+app.command("sync-site")(sync.sync_site)
 
 # Register module subcommands
 app.add_typer(ce_app, name="ce", help="Culture Extractor operations")
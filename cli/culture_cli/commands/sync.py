@@ -1,6 +1,7 @@
 """Sync command for synchronizing data between systems."""
 
 import os
+import time
 import traceback
 from pathlib import Path
 from typing import Annotated
@@ -8,7 +9,14 @@ from typing import Annotated
 import typer
 from dotenv import load_dotenv
 
-from culture_cli.utils.formatters import display_sync_plan, display_sync_result, print_error, print_info
+from culture_cli.utils.formatters import (
+    display_site_sync_plan,
+    display_site_sync_result,
+    display_sync_plan,
+    display_sync_result,
+    print_error,
+    print_info,
+)
 from culture_cli.utils.sync_engine import SyncEngine
 from libraries.client_culture_extractor import ClientCultureExtractor
 from libraries.client_stashapp import StashAppClient
@@ -104,6 +112,63 @@ def sync_scene(
         raise typer.Exit(code=1) from e
 
 
+def sync_site(
+    from_system: Annotated[str, typer.Option("--from", help="Source system (culture-extractor)")],
+    site: Annotated[str, typer.Option("--site", help="Source site (CE site UUID)")],
+    to_system: Annotated[str, typer.Option("--to", help="Target system (stashapp)")],
+    *,
+    apply: Annotated[bool, typer.Option("--apply", help="Apply changes (default is dry-run)")] = False,
+    overwrite: Annotated[
+        bool, typer.Option("--overwrite", help="Overwrite existing values instead of merging")
+    ] = False,
+    batch_size: Annotated[int, typer.Option("--batch-size", help="Scenes per scenesUpdate request")] = 25,
+) -> None:
+    """Synchronize metadata for every release of a site that is linked to a Stashapp scene.
+
+    CE data for the whole site and the linked Stashapp scenes are fetched in a few
+    requests, and shared changes (studio, performers, tags) are applied with
+    bulkSceneUpdate. Like `culture sync`, this runs in dry-run mode unless --apply is given.
+
+    Examples:
+        # Dry run (show a table of changes without applying)
+        culture sync-site --from culture-extractor --site <SITE_UUID> --to stashapp
+
+        # Apply changes (merge with existing data)
+        culture sync-site --from culture-extractor --site <SITE_UUID> --to stashapp --apply
+    """
+    try:
+        _validate_systems(from_system, to_system)
+        sync_engine = _initialize_sync_engine()
+
+        print_info(f"Fetching site data from Culture Extractor and Stashapp (Site UUID: {site})...")
+        start = time.perf_counter()
+        try:
+            site_plan = sync_engine.plan_site_sync(site, overwrite=overwrite)
+        except ValueError as e:
+            print_error(str(e))
+            raise typer.Exit(code=1) from e
+        plan_elapsed = time.perf_counter() - start
+
+        print()
+        display_site_sync_plan(site_plan, dry_run=not apply, elapsed=plan_elapsed)
+        print()
+
+        if apply and site_plan.changes:
+            start = time.perf_counter()
+            result = sync_engine.apply_site_sync(site_plan, batch_size=batch_size)
+            display_site_sync_result(result, elapsed=time.perf_counter() - start)
+
+            if not result.success:
+                raise typer.Exit(code=1)
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        print_error(f"Unexpected error: {e}")
+        print(traceback.format_exc())
+        raise typer.Exit(code=1) from e
+
+
 def _validate_systems(from_system: str, to_system: str) -> None:
     """Validate source and target systems."""
     if from_system.lower() != "culture-extractor":
@@ -155,7 +220,15 @@ def _initialize_sync_engine() -> SyncEngine:
     print_info("Connecting to Stashapp...")
     stash_client = StashAppClient()
 
-    # Get metadata base path from environment (optional)
+    # Get metadata base path, the URL it is served at and the cover size limit from environment (optional)
     metadata_base_path = os.environ.get("CE_METADATA_BASE_PATH")
-
-    return SyncEngine(ce_client, stash_client, metadata_base_path)
+    metadata_base_url = os.environ.get("CE_METADATA_BASE_URL")
+    cover_max_size = os.environ.get("SYNC_COVER_MAX_SIZE")
+
+    return SyncEngine(
+        ce_client,
+        stash_client,
+        metadata_base_path,
+        metadata_base_url=metadata_base_url,
+        cover_max_size=int(cover_max_size) if cover_max_size else None,
+    )
@@ -4,6 +4,9 @@ from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 import Levenshtein
+import numpy as np
+from rapidfuzz import process
+from rapidfuzz.distance import Indel
 
 
 if TYPE_CHECKING:
@@ -54,6 +57,157 @@ def calculate_similarity(name1: str, name2: str) -> tuple[int, float]:
     return distance, similarity
 
 
+class TagMatchIndex:
+    """Prebuilt index of Stashapp tags for repeated fuzzy matching.
+
+    Stashapp tag names are normalized once and grouped by normalized length. Since the similarity
+    ratio is 1 - indel_distance / (len1 + len2) and the indel distance is at least the length
+    difference, only tags with a close enough length can reach the threshold. Scores for each
+    length block are computed in bulk with rapidfuzz's cdist across multiple workers.
+    """
+
+    def __init__(self, stashapp_tags: pl.DataFrame, workers: int = -1):
+        """Build the index.
+
+        Args:
+            stashapp_tags: DataFrame with Stashapp tags (columns: id, name, stashdb_id)
+            workers: Number of threads for bulk scoring (-1 uses all cores)
+        """
+        self.workers = workers
+        self._tags = stashapp_tags.select(["id", "name", "stashdb_id"]).to_dicts()
+        self._normalized = [normalize_tag_name(tag["name"]) for tag in self._tags]
+
+        positions_by_length: dict[int, list[int]] = {}
+        for position, name in enumerate(self._normalized):
+            positions_by_length.setdefault(len(name), []).append(position)
+        self._positions_by_length = {
+            length: np.asarray(positions, dtype=np.intp) for length, positions in positions_by_length.items()
+        }
+        self._candidate_cache: dict[tuple[int, float, int | None], tuple[np.ndarray, list[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def _candidates(self, length: int, threshold: float, max_distance: int | None) -> tuple[np.ndarray, list[str]]:
+        """Positions and normalized names of tags whose length allows reaching the threshold, in original order."""
+        key = (length, threshold, max_distance)
+        if key not in self._candidate_cache:
+            positions = self._block_positions(length, threshold, max_distance)
+            self._candidate_cache[key] = (positions, [self._normalized[position] for position in positions])
+        return self._candidate_cache[key]
+
+    def _block_positions(self, length: int, threshold: float, max_distance: int | None) -> np.ndarray:
+        blocks = []
+        for other_length, positions in self._positions_by_length.items():
+            length_diff = abs(length - other_length)
+            # Small epsilon keeps the bound conservative against float rounding
+            if length_diff > (1 - threshold) * (length + other_length) + 1e-9:
+                continue
+            if max_distance is not None and length_diff > max_distance:
+                continue
+            blocks.append(positions)
+        if not blocks:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(blocks))
+
+    def _score(self, names: list[str], choices: list[str]) -> np.ndarray:
+        """Similarity ratios (same as Levenshtein.ratio) of normalized names against normalized choices."""
+        return process.cdist(
+            names,
+            choices,
+            scorer=Indel.normalized_similarity,
+            dtype=np.float64,
+            # Spinning up worker threads costs more than scoring a single name
+            workers=self.workers if len(names) > 1 else 1,
+        )
+
+    def _build_match(self, ce_uuid: str, ce_name: str, position: int, distance: int, similarity: float) -> TagMatch:
+        tag = self._tags[position]
+        return TagMatch(
+            ce_uuid=ce_uuid,
+            ce_name=ce_name,
+            stashapp_id=tag["id"],
+            stashapp_name=tag["name"],
+            stashdb_id=tag.get("stashdb_id"),
+            distance=distance,
+            similarity=similarity,
+        )
+
+    def find_matches(
+        self,
+        ce_tags: pl.DataFrame,
+        threshold: float = 0.85,
+        max_distance: int | None = None,
+    ) -> list[TagMatch]:
+        """Find all Stashapp tags matching each CE tag.
+
+        Args:
+            ce_tags: DataFrame with CE tags (columns: ce_tags_uuid, ce_tags_name)
+            threshold: Minimum similarity ratio (0-1) for a match
+            max_distance: Maximum Levenshtein distance for a match (optional)
+
+        Returns:
+            List of TagMatch objects sorted by similarity (highest first), then distance (lowest first)
+        """
+        ce_tags_list = ce_tags.select(["ce_tags_uuid", "ce_tags_name"]).to_dicts()
+        ce_normalized = [normalize_tag_name(tag["ce_tags_name"]) for tag in ce_tags_list]
+
+        ce_by_length: dict[int, list[int]] = {}
+        for index, name in enumerate(ce_normalized):
+            ce_by_length.setdefault(len(name), []).append(index)
+
+        # (ce index, tag position, distance, similarity)
+        found: list[tuple[int, int, int, float]] = []
+        for length, ce_indices in ce_by_length.items():
+            positions, choices = self._candidates(length, threshold, max_distance)
+            if len(positions) == 0:
+                continue
+
+            scores = self._score([ce_normalized[index] for index in ce_indices], choices)
+            for row, col in zip(*np.nonzero(scores >= threshold), strict=True):
+                ce_index = ce_indices[row]
+                position = int(positions[col])
+                distance = Levenshtein.distance(ce_normalized[ce_index], self._normalized[position])
+                if max_distance is None or distance <= max_distance:
+                    found.append((ce_index, position, distance, float(scores[row, col])))
+
+        # Same order as comparing every CE tag against every Stashapp tag, then a stable sort
+        found.sort(key=lambda item: (item[0], item[1]))
+        matches = [
+            self._build_match(
+                ce_tags_list[ce_index]["ce_tags_uuid"], ce_tags_list[ce_index]["ce_tags_name"], position, distance, similarity
+            )
+            for ce_index, position, distance, similarity in found
+        ]
+        matches.sort(key=lambda x: (-x.similarity, x.distance))
+        return matches
+
+    def find_best_match(self, ce_tag_name: str, threshold: float = 0.85) -> TagMatch | None:
+        """Find the best match for a single CE tag.
+
+        Args:
+            ce_tag_name: CE tag name to match
+            threshold: Minimum similarity ratio for a match
+
+        Returns:
+            Best TagMatch (the first one on ties) or None if no match found
+        """
+        normalized = normalize_tag_name(ce_tag_name)
+        positions, choices = self._candidates(len(normalized), threshold, None)
+        if len(positions) == 0:
+            return None
+
+        scores = self._score([normalized], choices)[0]
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        if similarity < threshold or similarity <= 0.0:
+            return None
+
+        position = int(positions[best])
+        distance = Levenshtein.distance(normalized, self._normalized[position])
+        return self._build_match("", ce_tag_name, position, distance, similarity)
+
+
 def find_tag_matches(
     ce_tags: pl.DataFrame,
     stashapp_tags: pl.DataFrame,
@@ -71,80 +225,23 @@ def find_tag_matches(
     Returns:
         List of TagMatch objects sorted by similarity (highest first)
     """
-    matches = []
-
-    # Convert to Python lists for iteration
-    ce_tags_list = ce_tags.select(["ce_tags_uuid", "ce_tags_name"]).to_dicts()
-    stashapp_tags_list = stashapp_tags.select(["id", "name", "stashdb_id"]).to_dicts()
-
-    for ce_tag in ce_tags_list:
-        ce_uuid = ce_tag["ce_tags_uuid"]
-        ce_name = ce_tag["ce_tags_name"]
-
-        for stash_tag in stashapp_tags_list:
-            stash_id = stash_tag["id"]
-            stash_name = stash_tag["name"]
-            stashdb_id = stash_tag.get("stashdb_id")
-
-            distance, similarity = calculate_similarity(ce_name, stash_name)
-
-            # Check if match meets criteria
-            if similarity >= threshold and (max_distance is None or distance <= max_distance):
-                matches.append(
-                    TagMatch(
-                        ce_uuid=ce_uuid,
-                        ce_name=ce_name,
-                        stashapp_id=stash_id,
-                        stashapp_name=stash_name,
-                        stashdb_id=stashdb_id,
-                        distance=distance,
-                        similarity=similarity,
-                    )
-                )
-
-    # Sort by similarity (highest first), then by distance (lowest first)
-    matches.sort(key=lambda x: (-x.similarity, x.distance))
-
-    return matches
+    return TagMatchIndex(stashapp_tags).find_matches(ce_tags, threshold=threshold, max_distance=max_distance)
 
 
 def find_best_match_for_tag(
     ce_tag_name: str,
-    stashapp_tags: pl.DataFrame,
+    stashapp_tags: pl.DataFrame | TagMatchIndex,
     threshold: float = 0.85,
 ) -> TagMatch | None:
     """Find the best match for a single CE tag.
 
     Args:
         ce_tag_name: CE tag name to match
-        stashapp_tags: DataFrame with Stashapp tags
+        stashapp_tags: DataFrame with Stashapp tags, or a prebuilt TagMatchIndex to reuse across calls
         threshold: Minimum similarity ratio for a match
 
     Returns:
         Best TagMatch or None if no match found
     """
-    stashapp_tags_list = stashapp_tags.select(["id", "name", "stashdb_id"]).to_dicts()
-
-    best_match = None
-    best_similarity = 0.0
-
-    for stash_tag in stashapp_tags_list:
-        stash_id = stash_tag["id"]
-        stash_name = stash_tag["name"]
-        stashdb_id = stash_tag.get("stashdb_id")
-
-        distance, similarity = calculate_similarity(ce_tag_name, stash_name)
-
-        if similarity >= threshold and similarity > best_similarity:
-            best_similarity = similarity
-            best_match = TagMatch(
-                ce_uuid="",  # Will be filled in by caller
-                ce_name=ce_tag_name,
-                stashapp_id=stash_id,
-                stashapp_name=stash_name,
-                stashdb_id=stashdb_id,
-                distance=distance,
-                similarity=similarity,
-            )
-
-    return best_match
+    index = stashapp_tags if isinstance(stashapp_tags, TagMatchIndex) else TagMatchIndex(stashapp_tags)
+    return index.find_best_match(ce_tag_name, threshold=threshold)
@@ -2,7 +2,7 @@
 
 import typer
 
-from culture_cli.modules.stash.commands import performers, scenes, tags
+from culture_cli.modules.stash.commands import duplicates, performers, scenes, tags
 
 
 stash_app = typer.Typer(
@@ -12,6 +12,7 @@ stash_app = typer.Typer(
 )
 
 # Register command groups
+stash_app.add_typer(duplicates.app, name="duplicates", help="Check scenes with more than one file")
 stash_app.add_typer(performers.app, name="performers", help="Manage and query performers")
 stash_app.add_typer(scenes.app, name="scenes", help="Manage and query scenes")
 stash_app.add_typer(tags.app, name="tags", help="Manage and query tags")
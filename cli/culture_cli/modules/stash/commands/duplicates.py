@@ -0,0 +1,95 @@
+"""Duplicate file commands for culture stash."""
+
+import sys
+import time
+import traceback
+from typing import Annotated
+
+import polars as pl
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from libraries.client_stashapp import StashAppClient
+from libraries.duplicate_files import CHECK_TAGS, apply_duplicate_tags, check_duplicate_files, load_duplicate_files
+
+
+app = typer.Typer()
+console = Console()
+
+
+def create_checks_table(checks: pl.DataFrame) -> Table:
+    """Create a rich table for the scenes failing at least one check."""
+    table = Table(title="Scenes Failing Duplicate Checks", show_header=True, header_style="bold magenta")
+    table.add_column("ID", style="cyan", no_wrap=True)
+    table.add_column("Title", style="green")
+    table.add_column("Files", justify="right")
+    table.add_column("Duration Δ", justify="right")
+    table.add_column("Max pHash Distance", justify="right")
+    table.add_column("Video Codecs", style="blue")
+    table.add_column("Audio Codecs", style="blue")
+    table.add_column("Failed", style="red")
+
+    for row in checks.iter_rows(named=True):
+        table.add_row(
+            str(row["scene_id"]),
+            row["title"] or "",
+            str(row["file_count"]),
+            f"{row['duration_delta']:.1f}s" if row["duration_delta"] is not None else "N/A",
+            str(row["max_phash_distance"]) if row["max_phash_distance"] is not None else "N/A",
+            ", ".join(codec or "?" for codec in row["video_codecs"]),
+            ", ".join(codec or "?" for codec in row["audio_codecs"]),
+            ", ".join(CHECK_TAGS[check] for check in CHECK_TAGS if row[check]),
+        )
+
+    return table
+
+
+@app.command("check")
+def check_duplicates(
+    *,
+    duration_tolerance: Annotated[
+        float, typer.Option("--duration-tolerance", help="Largest duration difference in seconds between files of a scene")
+    ] = 1.0,
+    phash_threshold: Annotated[
+        int, typer.Option("--phash-threshold", help="Largest phash distance between files of a scene with matching durations")
+    ] = 8,
+    dry_run: Annotated[bool, typer.Option("--dry-run", help="Print the tag changes without applying them")] = False,
+    show: Annotated[bool, typer.Option("--show", help="List the scenes failing a check")] = False,
+    prefix: Annotated[str, typer.Option("--prefix", "-p", help="Env var prefix for Stashapp connection")] = "MAIN_",
+) -> None:
+    """Check scenes with more than one file for duration, phash and codec differences and tag them.
+
+    The files of all multi-file scenes are loaded once and every check runs on them in a
+    single pass. Scenes failing a check get its tag, scenes passing it lose the tag.
+
+    Examples:
+        culture stash duplicates check
+        culture stash duplicates check --dry-run --show
+        culture stash duplicates check --phash-threshold 10 --duration-tolerance 2
+    """
+    try:
+        client = StashAppClient(prefix=prefix)
+
+        console.print("[blue]Loading files of scenes with more than one file...[/blue]")
+        start = time.perf_counter()
+        files = load_duplicate_files(client)
+        checks = check_duplicate_files(files, duration_tolerance=duration_tolerance, phash_threshold=phash_threshold)
+        console.print(f"[green]Checked {len(checks)} scenes with {len(files)} files in {time.perf_counter() - start:.1f}s[/green]")
+
+        for check, tag_name in CHECK_TAGS.items():
+            console.print(f"  {tag_name}: {checks[check].sum()} scene(s)")
+
+        failing = checks.filter(pl.any_horizontal(list(CHECK_TAGS)))
+        if show and not failing.is_empty():
+            console.print(create_checks_table(failing))
+
+        counts = apply_duplicate_tags(client, checks, dry_run=dry_run)
+        for tag_name, (tagged, untagged) in counts.items():
+            verb = "Would tag" if dry_run else "Tagged"
+            console.print(f"[green]{verb} {tagged} and untag {untagged} scene(s) with {tag_name}[/green]")
+
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        console.print(f"[red]{traceback.format_exc()}[/red]")
+        sys.exit(1)
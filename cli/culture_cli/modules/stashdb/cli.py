@@ -2,7 +2,7 @@
 
 import typer
 
-from culture_cli.modules.stashdb.commands import scenes, scrape
+from culture_cli.modules.stashdb.commands import lake, scenes, scrape
 
 
 stashdb_app = typer.Typer(
@@ -14,3 +14,4 @@ stashdb_app = typer.Typer(
 # Register command groups
 stashdb_app.add_typer(scrape.app, name="scrape", help="Scrape data from StashDB")
 stashdb_app.add_typer(scenes.app, name="scenes", help="Query scenes in data lake")
+stashdb_app.add_typer(lake.app, name="lake", help="Manage data lake tables")
@@ -0,0 +1,81 @@
+"""Table management commands for the StashDB data lake."""
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from libraries.stashdb_lake import DEFAULT_RETENTION_HOURS, StashDbLake
+
+
+app = typer.Typer()
+console = Console()
+
+
+@app.command("enable-cdf")
+def enable_change_data_feed(
+    data_path: str = typer.Option(
+        "data/stashdb", "--data-path", "-d", help="Base path for Delta Lake storage"
+    ),
+) -> None:
+    """Enable the change data feed on tables created before it was the default.
+
+    Scene history is read from the change data feed from this point on; older
+    versions are still read from table snapshots.
+
+    Examples:
+        culture stashdb lake enable-cdf
+        culture stashdb lake enable-cdf --data-path /data/stashdb
+    """
+    lake = StashDbLake(data_path)
+    migrated = lake.enable_change_data_feed()
+
+    if migrated:
+        console.print(f"[green]Enabled change data feed on: {', '.join(migrated)}[/green]")
+    else:
+        console.print("[yellow]All tables already have the change data feed enabled.[/yellow]")
+
+
+@app.command("maintain")
+def maintain(
+    data_path: str = typer.Option(
+        "data/stashdb", "--data-path", "-d", help="Base path for Delta Lake storage"
+    ),
+    retention_hours: int = typer.Option(
+        DEFAULT_RETENTION_HOURS, "--retention-hours", help="Delete files removed from tables longer ago than this"
+    ),
+    skip_vacuum: bool = typer.Option(False, "--skip-vacuum", help="Keep all removed files (full time travel)"),
+    z_order: bool = typer.Option(False, "--z-order", help="Z-order the scenes table on id instead of compacting it"),
+) -> None:
+    """Compact small files, vacuum removed files and checkpoint all tables.
+
+    Versions older than the retention can no longer be queried with --as-of
+    or shown in scene history after a vacuum.
+
+    Examples:
+        culture stashdb lake maintain
+        culture stashdb lake maintain --z-order
+        culture stashdb lake maintain --retention-hours 720
+        culture stashdb lake maintain --skip-vacuum
+    """
+    lake = StashDbLake(data_path)
+    results = lake.maintain(retention_hours=None if skip_vacuum else retention_hours, z_order=z_order)
+
+    if not results:
+        console.print("[yellow]No tables found in data lake.[/yellow]")
+        return
+
+    table = Table(title="Table maintenance", show_header=True)
+    table.add_column("Table", style="cyan")
+    table.add_column("Files before", justify="right")
+    table.add_column("Files after", justify="right")
+    table.add_column("Files vacuumed", justify="right")
+    table.add_column("Version", justify="right")
+    for result in results:
+        table.add_row(
+            result.table,
+            str(result.files_before),
+            str(result.files_after),
+            str(result.files_vacuumed),
+            str(result.version),
+        )
+    console.print(table)
@@ -62,7 +62,7 @@ def list_scenes(
             console.print(f"[red]Invalid date format: {as_of}. Use YYYY-MM-DD[/red]")
             sys.exit(1)
 
-    df = lake.get_scenes(as_of=as_of_dt)
+    df = lake.get_scenes(as_of=as_of_dt, studio_ids=[studio] if studio else None)
 
     if df.is_empty():
         console.print("[yellow]No scenes found in data lake.[/yellow]")
@@ -72,8 +72,6 @@ def list_scenes(
     # Apply filters
     if performer:
         df = df.filter(df["performer_ids"].list.contains(performer))
-    if studio:
-        df = df.filter(df["studio_id"] == studio)
 
     # Limit results
     df = df.head(limit)
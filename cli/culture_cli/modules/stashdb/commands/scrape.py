@@ -2,104 +2,148 @@
 
 import subprocess
 import sys
+import tempfile
+from pathlib import Path
+from typing import Annotated
 
 import typer
 from rich.console import Console
 
+from culture_cli.modules.ce.utils.config import config
+
 
 app = typer.Typer()
 console = Console()
 
 
+def _resolve_ids(mode: str, ids: list[str] | None, ids_file: Path | None, all_tracked: bool) -> list[str]:
+    """Combine ids from arguments, a file and Culture Extractor links, keeping the first occurrence."""
+    resolved = list(ids or [])
+    if ids_file:
+        if not ids_file.exists():
+            console.print(f"[red]File not found: {ids_file}[/red]")
+            sys.exit(1)
+        resolved.extend(line.strip() for line in ids_file.read_text().splitlines())
+    if all_tracked:
+        client = config.get_client()
+        try:
+            tracked = client.get_linked_external_ids("site" if mode == "studio" else "performer", "stashdb")
+        finally:
+            client.close()
+        console.print(f"[blue]{len(tracked)} {mode}s linked to StashDB in Culture Extractor[/blue]")
+        resolved.extend(tracked)
+    return list(dict.fromkeys(entity_id for entity_id in resolved if entity_id))
+
+
+def _run_crawl(
+    mode: str,
+    ids: list[str],
+    *,
+    data_path: str,
+    no_images: bool,
+    full: bool,
+    concurrency: int,
+) -> None:
+    """Crawl all ids in one `scrapy crawl stashdb` process."""
+    if not ids:
+        console.print(f"[red]No {mode} IDs given. Pass IDs, --file or --all-tracked.[/red]")
+        sys.exit(1)
+
+    console.print(f"[blue]Scraping scenes for {len(ids)} {mode}(s)[/blue]")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(ids) == 1:
+            id_args = ["-a", f"{mode}_id={ids[0]}"]
+        else:
+            ids_file = Path(tmp) / "ids.txt"
+            ids_file.write_text("\n".join(ids))
+            id_args = ["-a", f"ids_file={ids_file}"]
+
+        cmd = [
+            "scrapy",
+            "crawl",
+            "stashdb",
+            "-a",
+            f"mode={mode}",
+            *id_args,
+            "-a",
+            f"data_path={data_path}",
+            "-a",
+            f"download_images={not no_images}",
+            "-a",
+            f"full={full}",
+            "-a",
+            f"max_concurrency={concurrency}",
+        ]
+
+        console.print(f"[dim]Running: {' '.join(cmd)}[/dim]\n")
+
+        result = subprocess.run(
+            cmd,
+            cwd="extractors/scrapy",
+            check=False,
+        )
+
+    if result.returncode == 0:
+        console.print("\n[green]Scrape completed successfully![/green]")
+    else:
+        console.print(f"\n[red]Scrape failed with exit code {result.returncode}[/red]")
+        sys.exit(result.returncode)
+
+
 @app.command("performer")
 def scrape_performer(
-    performer_id: str = typer.Argument(..., help="StashDB performer UUID"),
-    data_path: str = typer.Option(
-        "data/stashdb", "--data-path", "-d", help="Base path for Delta Lake storage"
-    ),
-    no_images: bool = typer.Option(
-        False, "--no-images", help="Skip downloading images"
-    ),
+    performer_ids: Annotated[list[str] | None, typer.Argument(help="StashDB performer UUIDs")] = None,
+    *,
+    ids_file: Annotated[Path | None, typer.Option("--file", "-f", help="File with one StashDB performer UUID per line")] = None,
+    all_tracked: Annotated[bool, typer.Option("--all-tracked", help="All performers linked to StashDB in Culture Extractor")] = False,
+    data_path: Annotated[str, typer.Option("--data-path", "-d", help="Base path for Delta Lake storage")] = "data/stashdb",
+    no_images: Annotated[bool, typer.Option("--no-images", help="Skip downloading images")] = False,
+    full: Annotated[
+        bool, typer.Option("--full", help="Fetch all scenes, not only those updated since the last scrape")
+    ] = False,
+    concurrency: Annotated[int, typer.Option("--concurrency", "-c", help="Maximum concurrent StashDB requests")] = 4,
 ) -> None:
-    """Scrape all scenes for a StashDB performer.
+    """Scrape scenes for one or more StashDB performers in a single crawl.
+
+    Only scenes updated since the last completed scrape of a performer are fetched,
+    unless --full is given.
 
     Examples:
         culture stashdb scrape performer 12345678-1234-1234-1234-123456789abc
         culture stashdb scrape performer 12345678-1234-1234-1234-123456789abc --no-images
+        culture stashdb scrape performer 12345678-1234-1234-1234-123456789abc --full
+        culture stashdb scrape performer --file performers.txt
+        culture stashdb scrape performer --all-tracked
     """
-    console.print(f"[blue]Scraping scenes for performer: {performer_id}[/blue]")
-
-    cmd = [
-        "scrapy",
-        "crawl",
-        "stashdb",
-        "-a",
-        "mode=performer",
-        "-a",
-        f"performer_id={performer_id}",
-        "-a",
-        f"data_path={data_path}",
-        "-a",
-        f"download_images={not no_images}",
-    ]
-
-    console.print(f"[dim]Running: {' '.join(cmd)}[/dim]\n")
-
-    result = subprocess.run(
-        cmd,
-        cwd="extractors/scrapy",
-        check=False,
-    )
-
-    if result.returncode == 0:
-        console.print("\n[green]Scrape completed successfully![/green]")
-    else:
-        console.print(f"\n[red]Scrape failed with exit code {result.returncode}[/red]")
-        sys.exit(result.returncode)
+    ids = _resolve_ids("performer", performer_ids, ids_file, all_tracked)
+    _run_crawl("performer", ids, data_path=data_path, no_images=no_images, full=full, concurrency=concurrency)
 
 
 @app.command("studio")
 def scrape_studio(
-    studio_id: str = typer.Argument(..., help="StashDB studio UUID"),
-    data_path: str = typer.Option(
-        "data/stashdb", "--data-path", "-d", help="Base path for Delta Lake storage"
-    ),
-    no_images: bool = typer.Option(
-        False, "--no-images", help="Skip downloading images"
-    ),
+    studio_ids: Annotated[list[str] | None, typer.Argument(help="StashDB studio UUIDs")] = None,
+    *,
+    ids_file: Annotated[Path | None, typer.Option("--file", "-f", help="File with one StashDB studio UUID per line")] = None,
+    all_tracked: Annotated[bool, typer.Option("--all-tracked", help="All sites linked to a StashDB studio in Culture Extractor")] = False,
+    data_path: Annotated[str, typer.Option("--data-path", "-d", help="Base path for Delta Lake storage")] = "data/stashdb",
+    no_images: Annotated[bool, typer.Option("--no-images", help="Skip downloading images")] = False,
+    full: Annotated[
+        bool, typer.Option("--full", help="Fetch all scenes, not only those updated since the last scrape")
+    ] = False,
+    concurrency: Annotated[int, typer.Option("--concurrency", "-c", help="Maximum concurrent StashDB requests")] = 4,
 ) -> None:
-    """Scrape all scenes for a StashDB studio.
+    """Scrape scenes for one or more StashDB studios in a single crawl.
+
+    Only scenes updated since the last completed scrape of a studio are fetched,
+    unless --full is given.
 
     Examples:
         culture stashdb scrape studio 12345678-1234-1234-1234-123456789abc
         culture stashdb scrape studio 12345678-1234-1234-1234-123456789abc --no-images
+        culture stashdb scrape studio 12345678-1234-1234-1234-123456789abc --full
+        culture stashdb scrape studio --file studios.txt
+        culture stashdb scrape studio --all-tracked
     """
-    console.print(f"[blue]Scraping scenes for studio: {studio_id}[/blue]")
-
-    cmd = [
-        "scrapy",
-        "crawl",
-        "stashdb",
-        "-a",
-        "mode=studio",
-        "-a",
-        f"studio_id={studio_id}",
-        "-a",
-        f"data_path={data_path}",
-        "-a",
-        f"download_images={not no_images}",
-    ]
-
-    console.print(f"[dim]Running: {' '.join(cmd)}[/dim]\n")
-
-    result = subprocess.run(
-        cmd,
-        cwd="extractors/scrapy",
-        check=False,
-    )
-
-    if result.returncode == 0:
-        console.print("\n[green]Scrape completed successfully![/green]")
-    else:
-        console.print(f"\n[red]Scrape failed with exit code {result.returncode}[/red]")
-        sys.exit(result.returncode)
+    ids = _resolve_ids("studio", studio_ids, ids_file, all_tracked)
+    _run_crawl("studio", ids, data_path=data_path, no_images=no_images, full=full, concurrency=concurrency)
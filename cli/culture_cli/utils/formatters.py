@@ -4,7 +4,7 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
-from culture_cli.utils.sync_engine import SyncPlan, SyncResult
+from culture_cli.utils.sync_engine import SiteSyncPlan, SiteSyncResult, SyncPlan, SyncResult
 
 
 console = Console()
@@ -237,6 +237,86 @@ def display_sync_result(result: SyncResult) -> None:
                 console.print(f"  [red]✗[/red] {error}")
 
 
+def display_site_sync_plan(site_plan: SiteSyncPlan, dry_run: bool = True, elapsed: float | None = None) -> None:
+    """Display a site-wide sync plan as one table row per changed scene.
+
+    Args:
+        site_plan: SiteSyncPlan to display
+        dry_run: Whether this is a dry run (affects header message)
+        elapsed: Seconds it took to compute the plan, for the scenes/s rate
+    """
+    mode_text = "[yellow]DRY RUN[/yellow]" if dry_run else "[green]APPLYING CHANGES[/green]"
+    header = (
+        f"[bold cyan]Site Sync Plan: Culture Extractor → Stashapp ({mode_text})[/bold cyan]\n\n"
+        f"[green]CE Site:[/green]         {site_plan.site_name}\n"
+        f"[green]CE Site UUID:[/green]    {site_plan.site_uuid}\n"
+        f"[green]Linked scenes:[/green]   {site_plan.scene_count}\n"
+        f"[green]To update:[/green]       {len(site_plan.changes)}"
+    )
+    console.print(Panel(header, border_style="cyan"))
+    console.print()
+
+    if site_plan.changes:
+        table = Table(title="Scene Changes", show_header=True, header_style="bold magenta", expand=False)
+        table.add_column("Scene", style="cyan", justify="right")
+        table.add_column("Title", style="white", max_width=50)
+        table.add_column("Changes", style="yellow")
+        table.add_column("Not Linked", style="dim")
+
+        for scene_changes in site_plan.changes:
+            plan = scene_changes.plan
+            not_found = [diff.ce_name for diff in [*plan.performer_diffs, *plan.tag_diffs] if diff.status == "not_found"]
+            table.add_row(
+                f"#{plan.stashapp_id}",
+                plan.ce_release_name or plan.stashapp_title,
+                ", ".join(scene_changes.fields_updated),
+                ", ".join(not_found),
+            )
+
+        console.print(table)
+        console.print()
+
+    if site_plan.unlinked_releases:
+        console.print(f"[yellow]⚠  {site_plan.unlinked_releases} release(s) not linked to a Stashapp scene - skipped[/yellow]")
+    if site_plan.missing_scene_ids:
+        console.print(f"[yellow]⚠  {len(site_plan.missing_scene_ids)} linked scene(s) not found in Stashapp - skipped[/yellow]")
+    if elapsed:
+        rate = site_plan.scene_count / elapsed
+        console.print(f"[blue]ℹ[/blue] Planned {site_plan.scene_count} scene(s) in {elapsed:.2f}s ({rate:.1f} scenes/s)")
+
+    if not site_plan.changes:
+        console.print("[green]✓ No changes needed - site is already in sync[/green]")
+    elif dry_run:
+        console.print()
+        console.print("[cyan]Run with --apply to execute this sync.[/cyan]")
+
+
+def display_site_sync_result(result: SiteSyncResult, elapsed: float | None = None) -> None:
+    """Display the result of applying a site-wide sync.
+
+    Args:
+        result: SiteSyncResult to display
+        elapsed: Seconds it took to apply the sync, for the scenes/s rate
+    """
+    console.print()
+
+    if result.success:
+        console.print(f"[bold green]✓ Updated {result.scenes_updated} scene(s)[/bold green]")
+    else:
+        console.print(
+            f"[bold red]✗ Updated {result.scenes_updated} scene(s), {result.scenes_failed} failed "
+            f"with {len(result.errors)} error(s)[/bold red]"
+        )
+        for error in result.errors:
+            console.print(f"  [red]✗[/red] {error}")
+
+    console.print(
+        f"[green]{result.bulk_requests} bulkSceneUpdate and {result.scene_update_requests} scenesUpdate request(s)[/green]"
+    )
+    if elapsed:
+        console.print(f"[blue]ℹ[/blue] Applied in {elapsed:.2f}s ({result.scenes_updated / elapsed:.1f} scenes/s)")
+
+
 def print_error(message: str) -> None:
     """Print an error message.
 
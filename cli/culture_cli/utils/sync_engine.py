@@ -1,16 +1,54 @@
 """Core sync engine for synchronizing data between systems."""
 
 import base64
+import hashlib
+import io
 import mimetypes
+from collections import defaultdict
 from collections.abc import Callable
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
+from urllib.parse import quote
 
 from libraries.client_culture_extractor import ClientCultureExtractor
 from libraries.client_stashapp import StashAppClient
 
 
+CE_STASH_ID_ENDPOINT = "https://culture.extractor/graphql"
+
+STASHAPP_SCENE_FRAGMENT = """
+    id
+    title
+    date
+    details
+    urls
+    studio {
+        id
+        name
+    }
+    performers {
+        id
+        name
+        stash_ids {
+            endpoint
+            stash_id
+        }
+    }
+    tags {
+        id
+        name
+    }
+    stash_ids {
+        endpoint
+        stash_id
+    }
+    paths {
+        screenshot
+    }
+"""
+
+
 @dataclass
 class FieldDiff:
     """Represents a difference in a single field."""
@@ -89,6 +127,46 @@ class SyncResult:
     errors: list[str]
 
 
+@dataclass
+class SceneChanges:
+    """Changes to one Stashapp scene in a site-wide sync."""
+
+    plan: SyncPlan
+    fields_updated: list[str]
+    update: dict  # SceneUpdateInput fields only this scene gets
+    bulk: list[tuple[str, str | None, Any]]  # (BulkSceneUpdateInput field, mode, value) shared with other scenes
+    cover_path: Path | None
+
+
+@dataclass
+class SiteSyncPlan:
+    """Synchronization plan for all linked releases of a site."""
+
+    site_uuid: str
+    site_name: str
+    changes: list[SceneChanges]
+    unchanged: list[SyncPlan]
+    unlinked_releases: int
+    missing_scene_ids: list[int]
+
+    @property
+    def scene_count(self) -> int:
+        """Number of Stashapp scenes compared."""
+        return len(self.changes) + len(self.unchanged)
+
+
+@dataclass
+class SiteSyncResult:
+    """Result after applying a site-wide sync."""
+
+    success: bool
+    scenes_updated: int  # Scenes all of whose changes were applied
+    scenes_failed: int  # Scenes with a failed request or an unreadable cover image
+    bulk_requests: int
+    scene_update_requests: int
+    errors: list[str]
+
+
 class SyncEngine:
     """Engine for synchronizing data between Culture Extractor and Stashapp."""
 
@@ -97,6 +175,8 @@ class SyncEngine:
         ce_client: ClientCultureExtractor,
         stash_client: StashAppClient,
         metadata_base_path: str | Path | None = None,
+        metadata_base_url: str | None = None,
+        cover_max_size: int | None = None,
     ):
         """Initialize the sync engine.
 
@@ -104,10 +184,16 @@ class SyncEngine:
             ce_client: Culture Extractor client
             stash_client: Stashapp client
             metadata_base_path: Base path where downloaded files are stored (optional)
+            metadata_base_url: URL metadata_base_path is served at. If set, Stashapp is given cover
+                image URLs to fetch instead of base64-encoded images (optional)
+            cover_max_size: Downscale base64-uploaded cover images to fit this many pixels (optional)
         """
         self.ce_client = ce_client
         self.stash_client = stash_client
         self.metadata_base_path = Path(metadata_base_path) if metadata_base_path else None
+        self.metadata_base_url = metadata_base_url.rstrip("/") if metadata_base_url else None
+        self.cover_max_size = cover_max_size
+        self._site_stashapp_ids: dict[str, int | None] = {}
 
     def fetch_ce_data(self, ce_uuid: str) -> dict:
         """Fetch release and performer data from Culture Extractor.
@@ -152,18 +238,7 @@ class SyncEngine:
             )
             if covers.shape[0] > 0:
                 saved_filename = covers["ce_downloads_saved_filename"][0]
-
-                # Construct full path if metadata_base_path is provided
-                if self.metadata_base_path and saved_filename:
-                    # Path structure: {base_path}/{site_name}/Metadata/{release_uuid}/{filename}
-                    site_name = release.get("ce_site_name", "")
-                    full_path = (
-                        self.metadata_base_path / site_name / "Metadata" / ce_uuid / saved_filename
-                    )
-                    cover_image_path = str(full_path)
-                else:
-                    # Just use the filename if no base path configured
-                    cover_image_path = saved_filename
+                cover_image_path = self._cover_image_path(release.get("ce_site_name", ""), ce_uuid, saved_filename)
 
         return {
             "release": release,
@@ -172,6 +247,15 @@ class SyncEngine:
             "cover_image_path": cover_image_path,
         }
 
+    def _cover_image_path(self, site_name: str, release_uuid: str, saved_filename: str | None) -> str | None:
+        """Build the cover image path for a release's saved cover download."""
+        # Construct full path if metadata_base_path is provided
+        if self.metadata_base_path and saved_filename:
+            # Path structure: {base_path}/{site_name}/Metadata/{release_uuid}/{filename}
+            return str(self.metadata_base_path / site_name / "Metadata" / release_uuid / saved_filename)
+        # Just use the filename if no base path configured
+        return saved_filename
+
     def fetch_stashapp_data(self, stashapp_id: int) -> dict:
         """Fetch scene and performer data from Stashapp.
 
@@ -181,35 +265,7 @@ class SyncEngine:
         Returns:
             Dictionary containing scene and performer data
         """
-        fragment = """
-            id
-            title
-            date
-            details
-            urls
-            studio {
-                id
-                name
-            }
-            performers {
-                id
-                name
-                stash_ids {
-                    endpoint
-                    stash_id
-                }
-            }
-            tags {
-                id
-                name
-            }
-            stash_ids {
-                endpoint
-                stash_id
-            }
-        """
-
-        scene = self.stash_client.stash.find_scene(stashapp_id, fragment=fragment)
+        scene = self.stash_client.stash.find_scene(stashapp_id, fragment=STASHAPP_SCENE_FRAGMENT)
         if not scene:
             raise ValueError(f"Scene with ID '{stashapp_id}' not found in Stashapp")
 
@@ -293,7 +349,17 @@ class SyncEngine:
 
         # Compare cover image
         cover_image_path = ce_data.get("cover_image_path")
-        if cover_image_path:
+        if cover_image_path and self._cover_image_unchanged(Path(cover_image_path), stash_data):
+            field_diffs.append(
+                FieldDiff(
+                    field_name="cover_image",
+                    action="no_change",
+                    current_value=cover_image_path,
+                    new_value=cover_image_path,
+                    message="Cover image unchanged",
+                )
+            )
+        elif cover_image_path:
             field_diffs.append(
                 FieldDiff(
                     field_name="cover_image",
@@ -321,12 +387,7 @@ class SyncEngine:
         stash_studio_name = stash_studio.get("name") if stash_studio else None
 
         # Get CE site's Stashapp ID mapping if it exists
-        ce_studio_stashapp_id = None
-        if ce_site_uuid:
-            site_external_ids = self.ce_client.get_site_external_ids(ce_site_uuid)
-            ce_studio_stashapp_id = site_external_ids.get("stashapp")
-            if ce_studio_stashapp_id:
-                ce_studio_stashapp_id = int(ce_studio_stashapp_id)
+        ce_studio_stashapp_id = self._get_site_stashapp_id(ce_site_uuid) if ce_site_uuid else None
 
         if ce_studio_stashapp_id:
             if stash_studio_id != ce_studio_stashapp_id:
@@ -394,6 +455,13 @@ class SyncEngine:
             existing_stashapp_stash_ids=existing_stashapp_stash_ids,
         )
 
+    def _get_site_stashapp_id(self, site_uuid: str) -> int | None:
+        """Get the Stashapp studio ID a CE site is linked to, looking each site up once."""
+        if site_uuid not in self._site_stashapp_ids:
+            stashapp_id = self.ce_client.get_site_external_ids(site_uuid).get("stashapp")
+            self._site_stashapp_ids[site_uuid] = int(stashapp_id) if stashapp_id else None
+        return self._site_stashapp_ids[site_uuid]
+
     def _create_field_diff(
         self,
         field_name: str,
@@ -531,14 +599,70 @@ class SyncEngine:
 
         return tag_diffs
 
+    def _cover_image_unchanged(self, cover_path: Path, stash_data: dict) -> bool:
+        """Check whether the scene's cover in Stashapp is already this cover image.
+
+        Compares the MD5 of the image that would be uploaded with the checksum Stashapp
+        serves the scene's cover with, so the cover is not downloaded.
+        """
+        screenshot_url = (stash_data.get("paths") or {}).get("screenshot")
+        if not screenshot_url or not cover_path.exists():
+            return False
+        try:
+            image_data, _ = self._load_cover_image(cover_path)
+        except OSError:
+            return False
+        checksum = hashlib.md5(image_data, usedforsecurity=False).hexdigest()
+        return self.stash_client.scene_cover_matches(screenshot_url, checksum)
+
+    def _load_cover_image(self, cover_path: Path) -> tuple[bytes, str]:
+        """Read the cover image as it would be uploaded.
+
+        Returns:
+            Tuple of (image_bytes, mime_type)
+        """
+        image_data = cover_path.read_bytes()
+
+        # Detect MIME type
+        mime_type, _ = mimetypes.guess_type(str(cover_path))
+        if not mime_type or not mime_type.startswith("image/"):
+            mime_type = "image/jpeg"  # Default fallback
+
+        # Stashapp fetches served covers itself, so only uploaded covers are downscaled
+        if self.cover_max_size and not self._cover_image_url(cover_path):
+            image_data, mime_type = self._downscale_cover_image(image_data, mime_type)
+
+        return image_data, mime_type
+
+    def _downscale_cover_image(self, image_data: bytes, mime_type: str) -> tuple[bytes, str]:
+        """Re-encode the image as JPEG to fit cover_max_size, if it is larger."""
+        try:
+            from PIL import Image  # noqa: PLC0415
+        except ImportError as e:
+            raise OSError("Pillow is required to downscale cover images (pip install pillow)") from e
+
+        with Image.open(io.BytesIO(image_data)) as image:
+            if max(image.size) <= self.cover_max_size:
+                return image_data, mime_type
+            image.thumbnail((self.cover_max_size, self.cover_max_size))
+            buffer = io.BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG", quality=90)
+        return buffer.getvalue(), "image/jpeg"
+
+    def _cover_image_url(self, cover_path: Path) -> str | None:
+        """URL Stashapp can fetch the cover image from, if metadata_base_path is served."""
+        if not self.metadata_base_url or not self.metadata_base_path or not cover_path.is_relative_to(self.metadata_base_path):
+            return None
+        return f"{self.metadata_base_url}/{quote(cover_path.relative_to(self.metadata_base_path).as_posix())}"
+
     def _process_cover_image(self, cover_path: Path) -> tuple[str | None, list[str]]:
-        """Process cover image file and return base64 encoded data.
+        """Process cover image file and return its URL or base64 encoded data.
 
         Args:
             cover_path: Path to the cover image file
 
         Returns:
-            Tuple of (base64_encoded_image, errors_list)
+            Tuple of (cover_image_url_or_base64, errors_list)
         """
         errors = []
 
@@ -546,16 +670,14 @@ class SyncEngine:
             errors.append(f"Cover image file not found: {cover_path}")
             return None, errors
 
+        cover_image_url = self._cover_image_url(cover_path)
+        if cover_image_url:
+            return cover_image_url, errors
+
         try:
             # Read and encode the image
-            with cover_path.open("rb") as img_file:
-                image_data = img_file.read()
-                base64_image = base64.b64encode(image_data).decode("utf-8")
-
-            # Detect MIME type
-            mime_type, _ = mimetypes.guess_type(str(cover_path))
-            if not mime_type or not mime_type.startswith("image/"):
-                mime_type = "image/jpeg"  # Default fallback
+            image_data, mime_type = self._load_cover_image(cover_path)
+            base64_image = base64.b64encode(image_data).decode("utf-8")
 
             cover_image_base64 = f"data:{mime_type};base64,{base64_image}"
             return cover_image_base64, errors
@@ -713,7 +835,7 @@ class SyncEngine:
 
     def _apply_stash_ids_update(self, plan: SyncPlan, update_data: dict, overwrite: bool) -> None:
         """Apply stash_ids update."""
-        ce_stash_id = {"endpoint": "https://culture.extractor/graphql", "stash_id": plan.ce_uuid}
+        ce_stash_id = {"endpoint": CE_STASH_ID_ENDPOINT, "stash_id": plan.ce_uuid}
 
         if overwrite:
             update_data["stash_ids"] = [ce_stash_id]
@@ -727,3 +849,185 @@ class SyncEngine:
                 )
             ]
             update_data["stash_ids"] = [*existing_stash_ids, ce_stash_id]
+
+    def plan_site_sync(self, site_uuid: str, overwrite: bool = False, page_size: int = 500) -> SiteSyncPlan:
+        """Compute the sync plan for every release of a site that is linked to a Stashapp scene.
+
+        CE data is fetched with one query per entity type for the whole site and Stashapp
+        scenes with one request per page_size scenes, instead of several queries per release.
+
+        Args:
+            site_uuid: Culture Extractor site UUID
+            overwrite: If True, plan to overwrite existing values instead of merging
+            page_size: Number of Stashapp scenes per findScenes request
+
+        Returns:
+            SiteSyncPlan with the changes for each scene
+        """
+        site_df = self.ce_client.get_site_by_uuid(site_uuid)
+        if site_df.shape[0] == 0:
+            raise ValueError(f"Site with UUID '{site_uuid}' not found in Culture Extractor")
+        site_name = site_df["ce_sites_name"][0]
+
+        releases = {release["ce_release_uuid"]: release for release in self.ce_client.get_releases(site_uuid).to_dicts()}
+        links = self.ce_client.get_site_release_external_ids(site_uuid, "stashapp")
+
+        performers_by_release = defaultdict(list)
+        for performer in self.ce_client.get_site_release_performers(site_uuid).to_dicts():
+            performers_by_release[performer.pop("ce_release_uuid")].append(performer)
+
+        tags_by_release = defaultdict(list)
+        for tag in self.ce_client.get_site_release_tags(site_uuid).to_dicts():
+            tags_by_release[tag.pop("ce_release_uuid")].append(tag)
+
+        covers = self.ce_client.get_site_release_covers(site_uuid)
+        cover_by_release = dict(zip(covers["ce_release_uuid"], covers["ce_downloads_saved_filename"], strict=True))
+
+        # Resolve the studio once for all releases of the site
+        self._get_site_stashapp_id(site_uuid)
+
+        scene_ids = list(dict.fromkeys(int(external_id) for external_id in links["external_id"]))
+        scenes = {
+            int(scene["id"]): scene
+            for scene in self.stash_client.find_scenes_by_ids(scene_ids, STASHAPP_SCENE_FRAGMENT, page_size=page_size)
+        }
+
+        changes = []
+        unchanged = []
+        missing_scene_ids = []
+        for ce_uuid, external_id in links.iter_rows():
+            stash_data = scenes.get(int(external_id))
+            if stash_data is None:
+                missing_scene_ids.append(int(external_id))
+                continue
+
+            ce_data = {
+                "release": releases[ce_uuid],
+                "performers": performers_by_release[ce_uuid],
+                "tags": tags_by_release[ce_uuid],
+                "cover_image_path": self._cover_image_path(site_name, ce_uuid, cover_by_release.get(ce_uuid)),
+            }
+            plan = self.compute_diff(ce_data, stash_data)
+            scene_changes = self._compute_scene_changes(plan, overwrite)
+            if scene_changes.fields_updated:
+                changes.append(scene_changes)
+            else:
+                unchanged.append(plan)
+
+        return SiteSyncPlan(
+            site_uuid=site_uuid,
+            site_name=site_name,
+            changes=changes,
+            unchanged=unchanged,
+            unlinked_releases=len(set(releases) - set(links["ce_release_uuid"])),
+            missing_scene_ids=missing_scene_ids,
+        )
+
+    def _compute_scene_changes(self, plan: SyncPlan, overwrite: bool) -> SceneChanges:
+        """Split a scene's sync plan into per-scene fields and fields shared with other scenes.
+
+        Studio, performer and tag changes go to bulkSceneUpdate: performers and tags are added
+        one ID at a time when merging, so every scene missing the same performer shares a request.
+        Only performers, tags and stash IDs the scene does not have yet count as changes.
+        """
+        update = {}
+        fields_updated = []
+        self._apply_basic_field_updates(plan, update, fields_updated)
+
+        bulk = []
+        if "studio_id" in update:
+            bulk.append(("studio_id", None, update.pop("studio_id")))
+
+        for field_name, field, diffs, existing_ids in (
+            ("performers", "performer_ids", plan.performer_diffs, plan.existing_stashapp_performer_ids),
+            ("tags", "tag_ids", plan.tag_diffs, plan.existing_stashapp_tag_ids),
+        ):
+            matched_ids = {diff.stashapp_id for diff in diffs if diff.status == "matched" and diff.stashapp_id}
+            existing = {int(existing_id) for existing_id in existing_ids}
+            if overwrite:
+                if matched_ids and matched_ids != existing:
+                    bulk.append((field, "SET", tuple(sorted(matched_ids))))
+                    fields_updated.append(field_name)
+            elif matched_ids - existing:
+                bulk.extend((field, "ADD", (matched_id,)) for matched_id in sorted(matched_ids - existing))
+                fields_updated.append(field_name)
+
+        ce_stash_id = {"endpoint": CE_STASH_ID_ENDPOINT, "stash_id": plan.ce_uuid}
+        existing_stash_ids = [
+            {"endpoint": sid.get("endpoint"), "stash_id": sid.get("stash_id")} for sid in plan.existing_stashapp_stash_ids
+        ]
+        if (existing_stash_ids != [ce_stash_id]) if overwrite else (ce_stash_id not in existing_stash_ids):
+            self._apply_stash_ids_update(plan, update, overwrite)
+            fields_updated.append("stash_ids")
+
+        cover_diff = next((d for d in plan.field_diffs if d.field_name == "cover_image"), None)
+        cover_path = None
+        if cover_diff and cover_diff.action in ["update", "add"] and cover_diff.new_value:
+            cover_path = Path(cover_diff.new_value)
+            fields_updated.append("cover_image")
+
+        return SceneChanges(plan=plan, fields_updated=fields_updated, update=update, bulk=bulk, cover_path=cover_path)
+
+    def apply_site_sync(self, site_plan: SiteSyncPlan, batch_size: int = 25) -> SiteSyncResult:
+        """Apply a site-wide sync plan.
+
+        Fields shared between scenes are applied with one bulkSceneUpdate per distinct value,
+        the remaining per-scene fields with one scenesUpdate per batch_size scenes. The CE
+        releases are already linked to their scenes, so nothing is written to CE.
+
+        Args:
+            site_plan: SiteSyncPlan to apply
+            batch_size: Number of scenes per scenesUpdate request
+
+        Returns:
+            SiteSyncResult with operation results
+        """
+        errors = []
+        failed_scene_ids = set()
+        bulk_groups = defaultdict(list)
+        for scene_changes in site_plan.changes:
+            for key in scene_changes.bulk:
+                bulk_groups[key].append(scene_changes.plan.stashapp_id)
+
+        bulk_requests = 0
+        for (field, mode, value), scene_ids in bulk_groups.items():
+            fields = {field: value} if mode is None else {field: {"mode": mode, "ids": list(value)}}
+            try:
+                self.stash_client.bulk_update_scenes(scene_ids, fields)
+                bulk_requests += 1
+            except Exception as e:
+                errors.append(f"bulkSceneUpdate {field} for {len(scene_ids)} scene(s) failed: {e}")
+                failed_scene_ids.update(scene_ids)
+
+        per_scene = [scene_changes for scene_changes in site_plan.changes if scene_changes.update or scene_changes.cover_path]
+        scene_update_requests = 0
+        for start in range(0, len(per_scene), batch_size):
+            updates = []
+            for scene_changes in per_scene[start : start + batch_size]:
+                update = {"id": scene_changes.plan.stashapp_id, **scene_changes.update}
+                if scene_changes.cover_path:
+                    cover_image_base64, cover_errors = self._process_cover_image(scene_changes.cover_path)
+                    errors.extend(cover_errors)
+                    if cover_errors:
+                        failed_scene_ids.add(scene_changes.plan.stashapp_id)
+                    if cover_image_base64:
+                        update["cover_image"] = cover_image_base64
+                if len(update) > 1:
+                    updates.append(update)
+            if not updates:
+                continue
+            try:
+                self.stash_client.update_scenes(updates)
+                scene_update_requests += 1
+            except Exception as e:
+                errors.append(f"scenesUpdate for {len(updates)} scene(s) failed: {e}")
+                failed_scene_ids.update(update["id"] for update in updates)
+
+        return SiteSyncResult(
+            success=not errors,
+            scenes_updated=len(site_plan.changes) - len(failed_scene_ids),
+            scenes_failed=len(failed_scene_ids),
+            bulk_requests=bulk_requests,
+            scene_update_requests=scene_update_requests,
+            errors=errors,
+        )
@@ -19,9 +19,8 @@ from cultureextractorscrapy.items import (
     ReleaseItem,
 )
 from cultureextractorscrapy.spiders.database import (
-    get_existing_releases_with_status,
-    get_or_create_performer,
-    get_or_create_tag,
+    EntityCache,
+    get_existing_release_index,
     get_site_item,
 )
 from cultureextractorscrapy.utils import (
@@ -130,7 +129,8 @@ class AngelsLoveSpider(scrapy.Spider):
         spider.site = site_item
 
         # Get existing releases with their download status
-        spider.existing_releases = get_existing_releases_with_status(site_item.id)
+        spider.existing_releases = get_existing_release_index(site_item.id)
+        spider.entity_cache = EntityCache(site_item.id)
         return spider
 
     def parse(self, response):
@@ -259,30 +259,22 @@ class AngelsLoveSpider(scrapy.Spider):
 
     def _create_performer_items(self, performers, performer_urls):
         """Create performer items from names and URLs."""
-        performer_items = []
+        entries = []
         for i, performer_name in enumerate(performers):
             performer_url = performer_urls[i] if i < len(performer_urls) else None
             performer_short_name = performer_url.split("/")[-1] if performer_url else None
             full_url = f"{self.base_url}{performer_url}" if performer_url else None
+            entries.append((performer_short_name, performer_name.strip(), full_url))
 
-            # Create or get performer from database
-            performer = get_or_create_performer(
-                self.site.id, performer_short_name, performer_name.strip(), full_url
-            )
-            performer_items.append(performer)
-        return performer_items
+        # Resolve all performers of the release at once (new ones are inserted in one statement)
+        return self.entity_cache.get_or_create_performers(entries)
 
     def _create_tag_items(self, tags):
         """Create tag items from tag names."""
-        tag_items = []
-        for tag_name in tags:
-            # Tags don't have URLs on this site, use name as short_name
-            tag_short_name = tag_name.lower().replace(" ", "-")
-
-            # Create or get tag from database
-            tag = get_or_create_tag(self.site.id, tag_short_name, tag_name.strip(), None)
-            tag_items.append(tag)
-        return tag_items
+        # Tags don't have URLs on this site, use name as short_name
+        return self.entity_cache.get_or_create_tags(
+            (tag_name.lower().replace(" ", "-"), tag_name.strip(), None) for tag_name in tags
+        )
 
     def parse_video_detail(self, response):
         """Parse a video detail page to extract additional metadata."""
@@ -765,8 +757,7 @@ class AngelsLoveSpider(scrapy.Spider):
             left_image = list_image
 
         # Create or get performer from database
-        performer = get_or_create_performer(
-            self.site.id,
+        performer = self.entity_cache.get_or_create_performer(
             performer_slug,  # Use slug as short_name
             performer_name,
             response.url,
@@ -2,6 +2,8 @@ import json
 import logging
 import os
 import threading
+import uuid
+from array import array
 
 import newnewid
 from dotenv import load_dotenv
@@ -16,7 +18,12 @@ from sqlalchemy import (
     String,
     Table,
     create_engine,
+    literal,
+    select,
+    text,
+    union_all,
 )
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from sqlalchemy.orm.exc import NoResultFound
@@ -280,6 +287,146 @@ def get_or_create_tag(site_uuid, short_name, name, url):
     return site_tag_item
 
 
+class EntityCache:
+    """Per-spider in-memory cache of a site's performers and tags.
+
+    All performers and tags of the site are loaded with a single query when the
+    cache is created. Lookups are then resolved from memory, and misses are written
+    with one ``INSERT ... ON CONFLICT ... RETURNING`` statement per batch, so a scene
+    page with several new performers or tags costs at most one round trip per entity
+    type. Rows inserted concurrently by another crawl are picked up through the
+    conflict clause instead of being duplicated.
+
+    Entities without a short_name can't be keyed and fall back to the uncached
+    get_or_create_performer/get_or_create_tag functions.
+    """
+
+    def __init__(self, site_uuid):
+        self.site_uuid = site_uuid
+        self._lock = threading.Lock()
+        self._performers: dict[str, SitePerformerItem] = {}
+        self._tags: dict[str, SiteTagItem] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        performers = select(
+            literal("performer").label("kind"),
+            Performer.uuid,
+            Performer.short_name,
+            Performer.name,
+            Performer.url,
+        ).where(Performer.site_uuid == self.site_uuid)
+        tags = select(
+            literal("tag").label("kind"),
+            Tag.uuid,
+            Tag.short_name,
+            Tag.name,
+            Tag.url,
+        ).where(Tag.site_uuid == self.site_uuid)
+
+        with get_session() as session:
+            rows = session.execute(union_all(performers, tags)).all()
+
+        for row in rows:
+            if row.short_name is None:
+                continue
+            cache, item_class = (
+                (self._performers, SitePerformerItem)
+                if row.kind == "performer"
+                else (self._tags, SiteTagItem)
+            )
+            cache[row.short_name] = item_class(
+                id=row.uuid,
+                short_name=row.short_name,
+                name=row.name,
+                url=row.url,
+                site_uuid=self.site_uuid,
+            )
+
+        logger.info(
+            "Loaded %d performers and %d tags into entity cache for site %s",
+            len(self._performers),
+            len(self._tags),
+            self.site_uuid,
+        )
+
+    def get_or_create_performer(self, short_name, name, url):
+        return self.get_or_create_performers([(short_name, name, url)])[0]
+
+    def get_or_create_tag(self, short_name, name, url):
+        return self.get_or_create_tags([(short_name, name, url)])[0]
+
+    def get_or_create_performers(self, entries):
+        """Resolve (short_name, name, url) tuples to SitePerformerItems in input order."""
+        return self._get_or_create(
+            entries, self._performers, Performer, SitePerformerItem, get_or_create_performer
+        )
+
+    def get_or_create_tags(self, entries):
+        """Resolve (short_name, name, url) tuples to SiteTagItems in input order."""
+        return self._get_or_create(entries, self._tags, Tag, SiteTagItem, get_or_create_tag)
+
+    def _get_or_create(self, entries, cache, model, item_class, fallback):
+        entries = list(entries)
+        with self._lock:
+            missing = {}
+            keyed = 0
+            for short_name, name, url in entries:
+                if short_name is None:
+                    continue
+                keyed += 1
+                if short_name not in cache:
+                    missing.setdefault(short_name, (name, url))
+
+            self.misses += len(missing)
+            self.hits += keyed - len(missing)
+
+            if missing:
+                self._flush(missing, cache, model, item_class)
+
+            return [
+                cache[short_name]
+                if short_name is not None
+                else fallback(self.site_uuid, short_name, name, url)
+                for short_name, name, url in entries
+            ]
+
+    def _flush(self, missing, cache, model, item_class):
+        """Insert all missing entities in one statement and add them to the cache."""
+        stmt = insert(model).values(
+            [
+                {
+                    "uuid": newnewid.uuid7(),
+                    "site_uuid": self.site_uuid,
+                    "short_name": short_name,
+                    "name": name,
+                    "url": url,
+                }
+                for short_name, (name, url) in missing.items()
+            ]
+        )
+        # A no-op DO UPDATE (rather than DO NOTHING) makes RETURNING include rows that already existed
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.site_uuid, model.short_name],
+            set_={"short_name": stmt.excluded.short_name},
+        ).returning(model.uuid, model.short_name, model.name, model.url)
+
+        with get_session() as session:
+            rows = session.execute(stmt).all()
+            session.commit()
+
+        for row in rows:
+            cache[row.short_name] = item_class(
+                id=row.uuid,
+                short_name=row.short_name,
+                name=row.name,
+                url=row.url,
+                site_uuid=self.site_uuid,
+            )
+
+
 def get_existing_releases_with_status(site_uuid):
     session = get_session()
     releases = (
@@ -314,6 +461,193 @@ def get_existing_releases_with_status(site_uuid):
     return result
 
 
+# Available files and downloads of every release of a site, one row per file. Double-encoded
+# available_files (a JSON string containing the array) are unwrapped, other non-arrays are ignored.
+# The downloads half uses an outer join so releases without files or downloads are still listed.
+_EXISTING_RELEASE_FILES_SQL = text(
+    """
+    SELECT r.short_name, r.uuid, FALSE AS downloaded,
+           f ->> 'file_type' AS file_type, f ->> 'content_type' AS content_type, f ->> 'variant' AS variant
+    FROM releases r
+    CROSS JOIN LATERAL json_array_elements(
+        CASE json_typeof(r.available_files)
+            WHEN 'array' THEN r.available_files
+            WHEN 'string' THEN (r.available_files #>> '{}')::json
+            ELSE '[]'::json
+        END
+    ) AS f
+    WHERE r.site_uuid = :site_uuid
+    UNION ALL
+    SELECT r.short_name, r.uuid, TRUE AS downloaded, d.file_type, d.content_type, d.variant
+    FROM releases r
+    LEFT JOIN downloads d ON d.release_uuid = r.uuid
+    WHERE r.site_uuid = :site_uuid
+    """
+)
+
+
+class ExistingRelease:
+    """Read-only view of one entry of an ExistingReleaseIndex.
+
+    Supports the dict access spiders already use (``["uuid"]``, ``["downloaded_files"]``,
+    ``["available_files"]`` and ``.get()``). The full available_files JSON is only fetched
+    from the database when it is actually accessed.
+    """
+
+    __slots__ = ("_available_files", "_index", "_position")
+
+    def __init__(self, index, position):
+        self._index = index
+        self._position = position
+        self._available_files = None
+
+    @property
+    def uuid(self):
+        return self._index._uuid_at(self._position)
+
+    @property
+    def downloaded_files(self):
+        return self._index._kinds_in(self._index._downloaded[self._position])
+
+    @property
+    def needs_download(self):
+        """Bitmask of available file kinds that have not been downloaded yet (0 = complete)."""
+        return self._index._available[self._position] & ~self._index._downloaded[self._position]
+
+    @property
+    def available_files(self):
+        if self._available_files is None:
+            self._available_files = self._index._load_available_files(self.uuid)
+        return self._available_files
+
+    def __getitem__(self, key):
+        if key not in ("uuid", "downloaded_files", "available_files"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class ExistingReleaseIndex:
+    """Compact short_name -> (uuid, needs_download bitmask) index of a site's releases.
+
+    Replaces the dict built by get_existing_releases_with_status for membership checks
+    during incremental crawls. Each distinct (file_type, content_type, variant) kind seen
+    for the site gets one bit; per release only the raw uuid bytes and two bitmasks
+    (available kinds and downloaded kinds) are kept in flat arrays. The index is built from
+    a single query read through a server-side cursor in chunks, so the full result is never
+    materialized, and the available_files JSON is loaded per release only when a spider asks
+    for it.
+
+    Spiders may also assign plain dicts (``index[short_name] = {...}``) to track releases
+    created during the crawl; those entries are returned as-is.
+    """
+
+    def __init__(self, site_uuid):
+        self.site_uuid = site_uuid
+        self._positions: dict[str, int] = {}
+        self._uuids = bytearray()
+        self._available = array("Q")
+        self._downloaded = array("Q")
+        self._kinds: list[tuple[str, str, str]] = []
+        self._kind_bits: dict[tuple[str, str, str], int] = {}
+        self._added: dict[str, dict] = {}
+
+    @classmethod
+    def build(cls, site_uuid, chunk_size=10_000):
+        index = cls(site_uuid)
+        with get_engine().connect() as connection:
+            result = connection.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(
+                _EXISTING_RELEASE_FILES_SQL, {"site_uuid": site_uuid}
+            )
+            for rows in result.partitions(chunk_size):
+                for row in rows:
+                    index._add_row(row)
+        logger.info(
+            "Indexed %d existing releases with %d file kinds for site %s",
+            len(index._positions),
+            len(index._kinds),
+            site_uuid,
+        )
+        return index
+
+    def _add_row(self, row):
+        position = self._positions.get(row.short_name)
+        if position is None:
+            position = len(self._positions)
+            self._positions[row.short_name] = position
+            self._uuids += row.uuid.bytes
+            self._available.append(0)
+            self._downloaded.append(0)
+
+        if not (row.file_type and row.content_type and row.variant):
+            return
+
+        bit = self._bit_for((row.file_type, row.content_type, row.variant))
+        masks = self._downloaded if row.downloaded else self._available
+        masks[position] |= bit
+
+    def _bit_for(self, kind):
+        bit = self._kind_bits.get(kind)
+        if bit is None:
+            if len(self._kinds) == 64:
+                # More kinds than fit into unsigned 64-bit masks; fall back to Python ints
+                self._available = list(self._available)
+                self._downloaded = list(self._downloaded)
+            bit = 1 << len(self._kinds)
+            self._kinds.append(kind)
+            self._kind_bits[kind] = bit
+        return bit
+
+    def _kinds_in(self, mask):
+        return {kind for i, kind in enumerate(self._kinds) if mask >> i & 1}
+
+    def _uuid_at(self, position):
+        return uuid.UUID(bytes=bytes(self._uuids[position * 16 : position * 16 + 16]))
+
+    def _load_available_files(self, release_uuid):
+        with get_session() as session:
+            available_files = session.query(Release.available_files).filter(Release.uuid == release_uuid).scalar()
+        if isinstance(available_files, str):
+            available_files = json.loads(available_files)
+        return available_files or []
+
+    def get(self, short_name, default=None):
+        if short_name in self._added:
+            return self._added[short_name]
+        position = self._positions.get(short_name)
+        if position is None:
+            return default
+        return ExistingRelease(self, position)
+
+    def __getitem__(self, short_name):
+        release = self.get(short_name)
+        if release is None:
+            raise KeyError(short_name)
+        return release
+
+    def __setitem__(self, short_name, release):
+        self._added[short_name] = release
+
+    def __contains__(self, short_name):
+        return short_name in self._added or short_name in self._positions
+
+    def __len__(self):
+        return len(self._positions) + sum(1 for short_name in self._added if short_name not in self._positions)
+
+    def __iter__(self):
+        yield from self._positions
+        yield from (short_name for short_name in self._added if short_name not in self._positions)
+
+
+def get_existing_release_index(site_uuid):
+    return ExistingReleaseIndex.build(site_uuid)
+
+
 def get_or_create_sub_site(site_uuid: str, short_name: str, name: str) -> SubSiteItem:
     """Get or create a sub site."""
     with get_session() as session:
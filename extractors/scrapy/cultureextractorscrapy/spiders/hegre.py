@@ -16,7 +16,7 @@ from cultureextractorscrapy.items import (
     ReleaseItem,
 )
 from cultureextractorscrapy.spiders.database import (
-    get_existing_releases_with_status,
+    get_existing_release_index,
     get_or_create_performer,
     get_or_create_tag,
     get_site_item,
@@ -55,7 +55,7 @@ class HegreSpider(scrapy.Spider):
         spider.site = site_item
 
         # Get existing releases with their download status
-        spider.existing_releases = get_existing_releases_with_status(site_item.id)
+        spider.existing_releases = get_existing_release_index(site_item.id)
         return spider
 
     def parse(self, response):
@@ -109,16 +109,10 @@ class HegreSpider(scrapy.Spider):
             # Check if we have this release in database
             existing_release = self.existing_releases.get(external_id)
             if existing_release:
-                # Compare available files with downloaded files
-                available_files = existing_release["available_files"]
-                downloaded_files = existing_release["downloaded_files"]
-
-                needed_files = {
-                    (f["file_type"], f["content_type"], f["variant"])
-                    for f in available_files
-                }
-
-                if not needed_files.issubset(downloaded_files):
+                # The index knows which file kinds are missing, so available files are only loaded when needed
+                if existing_release.needs_download:
+                    available_files = existing_release["available_files"]
+                    downloaded_files = existing_release["downloaded_files"]
                     # We have missing files - yield DirectDownloadItems
                     missing_files = [f for f in available_files if
                         (f["file_type"], f["content_type"], f["variant"]) not in downloaded_files]
@@ -345,16 +339,10 @@ class HegreSpider(scrapy.Spider):
             # Check if we have this release in database
             existing_release = self.existing_releases.get(external_id)
             if existing_release:
-                # Compare available files with downloaded files
-                available_files = existing_release["available_files"]
-                downloaded_files = existing_release["downloaded_files"]
-
-                needed_files = {
-                    (f["file_type"], f["content_type"], f["variant"])
-                    for f in available_files
-                }
-
-                if not needed_files.issubset(downloaded_files):
+                # The index knows which file kinds are missing, so available files are only loaded when needed
+                if existing_release.needs_download:
+                    available_files = existing_release["available_files"]
+                    downloaded_files = existing_release["downloaded_files"]
                     # We have missing files - yield DirectDownloadItems
                     missing_files = [f for f in available_files if
                         (f["file_type"], f["content_type"], f["variant"]) not in downloaded_files]
@@ -18,7 +18,7 @@ from cultureextractorscrapy.items import (
     ReleaseItem,
 )
 from cultureextractorscrapy.spiders.database import (
-    get_existing_releases_with_status,
+    get_existing_release_index,
     get_or_create_performer,
     get_or_create_tag,
     get_site_item,
@@ -67,7 +67,7 @@ class LezKissSpider(scrapy.Spider):
         spider.site = site_item
 
         # Get existing releases with their download status
-        spider.existing_releases = get_existing_releases_with_status(site_item.id)
+        spider.existing_releases = get_existing_release_index(site_item.id)
         return spider
 
     async def start(self):
@@ -4,7 +4,7 @@ import scrapy
 
 from cultureextractorscrapy.items import PerformerItem
 from cultureextractorscrapy.spiders.database import (
-    get_or_create_performer,
+    EntityCache,
     get_site_item,
 )
 from cultureextractorscrapy.utils import get_log_filename
@@ -108,6 +108,7 @@ class MetArtSpider(scrapy.Spider):
                 f"Site with short_name '{spider.site_short_name}' not found in the database."
             )
         spider.site = site_item
+        spider.entity_cache = EntityCache(site_item.id)
 
         return spider
 
@@ -141,32 +142,33 @@ class MetArtSpider(scrapy.Spider):
             f"Letter {letter}, Page {page_num}: Found {len(models)} performers (total: {total})"
         )
 
+        models_with_headshot = []
         for model in models:
+            if not model.get("headshotImagePath", ""):
+                short_name = model["path"].split("/")[-1]
+                self.logger.warning(f"No headshot image for performer: {model['name']} ({short_name})")
+                continue
+            models_with_headshot.append(model)
+
+        # Get or create all performers of the page in database at once
+        performers = self.entity_cache.get_or_create_performers(
+            (model["path"].split("/")[-1], model["name"], f"{self.base_url}{model['path']}")
+            for model in models_with_headshot
+        )
+
+        for model, performer in zip(models_with_headshot, performers, strict=True):
             # Extract performer data
-            short_name = model["path"].split("/")[-1]
+            short_name = performer.short_name
             name = model["name"]
             site_uuid = model["siteUUID"]
-            performer_url = f"{self.base_url}{model['path']}"
 
             # Build image URLs
-            headshot_path = model.get("headshotImagePath", "")
+            headshot_path = model["headshotImagePath"]
             headshot_sfw_path = model.get("headshotImagePathSfw", "")
 
-            if not headshot_path:
-                self.logger.warning(f"No headshot image for performer: {name} ({short_name})")
-                continue
-
             nsfw_url = f"{CDN_BASE_URL}/{site_uuid}{headshot_path}"
             sfw_url = f"{CDN_BASE_URL}/{site_uuid}{headshot_sfw_path}" if headshot_sfw_path else None
 
-            # Get or create performer in database
-            performer = get_or_create_performer(
-                self.site.id,
-                short_name,
-                name,
-                performer_url,
-            )
-
             # Build image URLs list
             image_urls = [
                 {"url": nsfw_url, "type": "profile"},  # Main image, named {performer_uuid}.jpg
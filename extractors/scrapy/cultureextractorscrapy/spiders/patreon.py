@@ -22,7 +22,7 @@ from cultureextractorscrapy.items import (
     ReleaseItem,
 )
 from cultureextractorscrapy.spiders.database import (
-    get_existing_releases_with_status,
+    get_existing_release_index,
     get_or_create_sub_site,
     get_site_item,
 )
@@ -81,7 +81,7 @@ class PatreonSpider(scrapy.Spider):
         spider.site = site_item
 
         # Get existing releases with their download status
-        spider.existing_releases = get_existing_releases_with_status(site_item.id)
+        spider.existing_releases = get_existing_release_index(site_item.id)
 
         # Convert cookies from JSON format to Scrapy format
         spider.cookies = spider._convert_cookies_from_json(patreon_cookies_json)
@@ -517,16 +517,10 @@ class PatreonSpider(scrapy.Spider):
             # Check if we already have this release
             existing_release = self.existing_releases.get(external_id)
             if existing_release and not self.force_update:
-                # Compare available files with downloaded files
-                available_files = existing_release["available_files"]
-                downloaded_files = existing_release["downloaded_files"]
-
-                needed_files = {
-                    (f["file_type"], f["content_type"], f["variant"])
-                    for f in available_files
-                }
-
-                if not needed_files.issubset(downloaded_files):
+                # The index knows which file kinds are missing, so available files are only loaded when needed
+                if existing_release.needs_download:
+                    available_files = existing_release["available_files"]
+                    downloaded_files = existing_release["downloaded_files"]
                     # We have missing files - yield DirectDownloadItems
                     missing_files = [
                         f
@@ -18,10 +18,9 @@ from cultureextractorscrapy.items import (
     ReleaseItem,
 )
 from cultureextractorscrapy.spiders.database import (
-    get_existing_releases_with_status,
-    get_or_create_performer,
+    EntityCache,
+    get_existing_release_index,
     get_or_create_sub_site,
-    get_or_create_tag,
     get_site_item,
 )
 from cultureextractorscrapy.utils import (
@@ -130,7 +129,8 @@ class SexyHubSpider(scrapy.Spider):
         spider.site = site_item
 
         # Get existing releases with their download status
-        spider.existing_releases = get_existing_releases_with_status(site_item.id)
+        spider.existing_releases = get_existing_release_index(site_item.id)
+        spider.entity_cache = EntityCache(site_item.id)
         return spider
 
     def _construct_api_url(self, offset=0, per_page=20):
@@ -238,16 +238,10 @@ class SexyHubSpider(scrapy.Spider):
             # Check if we have this release in database
             existing_release = self.existing_releases.get(external_id)
             if existing_release and not self.force_update:
-                # Compare available files with downloaded files
-                available_files = existing_release["available_files"]
-                downloaded_files = existing_release["downloaded_files"]
-
-                needed_files = {
-                    (f["file_type"], f["content_type"], f["variant"])
-                    for f in available_files
-                }
-
-                if not needed_files.issubset(downloaded_files):
+                # The index knows which file kinds are missing, so available files are only loaded when needed
+                if existing_release.needs_download:
+                    available_files = existing_release["available_files"]
+                    downloaded_files = existing_release["downloaded_files"]
                     # We have missing files - yield DirectDownloadItems
                     missing_files = [
                         f
@@ -315,26 +309,14 @@ class SexyHubSpider(scrapy.Spider):
         release_id = str(newnewid.uuid7())
 
         # Process performers
-        performers = []
-        for actor in release_data.get("actors", []):
-            performer = get_or_create_performer(
-                self.site.id,
-                str(actor["id"]),
-                actor["name"],
-                "",
-            )
-            performers.append(performer)
+        performers = self.entity_cache.get_or_create_performers(
+            (str(actor["id"]), actor["name"], "") for actor in release_data.get("actors", [])
+        )
 
         # Process tags
-        tags = []
-        for tag in release_data.get("tags", []):
-            tag_obj = get_or_create_tag(
-                self.site.id,
-                str(tag["id"]),
-                tag["name"],
-                "",
-            )
-            tags.append(tag_obj)
+        tags = self.entity_cache.get_or_create_tags(
+            (str(tag["id"]), tag["name"], "") for tag in release_data.get("tags", [])
+        )
 
         # Extract subsite from collections
         sub_site = None
@@ -1,6 +1,9 @@
 """StashDB spider for replicating scene metadata to Delta Lake."""
 
+import asyncio
 import os
+import time
+from datetime import datetime
 from pathlib import Path
 
 import scrapy
@@ -32,8 +35,13 @@ class StashDBSpider(scrapy.Spider):
         mode: str = "performer",
         performer_id: str | None = None,
         studio_id: str | None = None,
+        ids: str | None = None,
+        ids_file: str | None = None,
         download_images: bool = True,
         data_path: str = "data/stashdb",
+        scene_partition_by: str | None = None,
+        full: bool = False,
+        max_concurrency: int = 4,
         *args,
         **kwargs,
     ):
@@ -41,25 +49,42 @@ class StashDBSpider(scrapy.Spider):
 
         Args:
             mode: Query mode - "performer" or "studio"
-            performer_id: StashDB performer UUID (required for performer mode)
-            studio_id: StashDB studio UUID (required for studio mode)
+            performer_id: StashDB performer UUID (performer mode)
+            studio_id: StashDB studio UUID (studio mode)
+            ids: Comma-separated performer or studio UUIDs to crawl in one run
+            ids_file: File with one performer or studio UUID per line
             download_images: Whether to download preview images
             data_path: Base path for Delta Lake storage
+            scene_partition_by: Partition column when the scenes table is created
+                ("studio_id" or "release_year")
+            full: Fetch all scenes instead of only those updated since the last completed crawl
+            max_concurrency: Maximum concurrent StashDB requests, shared by all entities
         """
         super().__init__(*args, **kwargs)
 
+        if mode not in ("performer", "studio"):
+            raise ValueError(f"Invalid mode: {mode}. Must be 'performer' or 'studio'")
+
         self.mode = mode
-        self.performer_id = performer_id
-        self.studio_id = studio_id
         self.download_images = download_images if isinstance(download_images, bool) else download_images == "True"
         self.data_path = data_path
-
-        if mode == "performer" and not performer_id:
-            raise ValueError("performer_id is required for performer mode")
-        if mode == "studio" and not studio_id:
-            raise ValueError("studio_id is required for studio mode")
-        if mode not in ("performer", "studio"):
-            raise ValueError(f"Invalid mode: {mode}. Must be 'performer' or 'studio'")
+        self.scene_partition_by = scene_partition_by
+        self.full = full if isinstance(full, bool) else full == "True"
+        self.max_concurrency = int(max_concurrency)
+
+        entity_ids = [performer_id if mode == "performer" else studio_id]
+        if ids:
+            entity_ids.extend(ids.split(","))
+        if ids_file:
+            entity_ids.extend(Path(ids_file).read_text().splitlines())
+        # Keep the given order, without blanks and duplicates
+        self.entity_ids = list(dict.fromkeys(entity_id.strip() for entity_id in entity_ids if entity_id and entity_id.strip()))
+        if not self.entity_ids:
+            raise ValueError(f"{mode}_id, ids or ids_file is required for {mode} mode")
+
+        self.new_watermarks = {}
+        self.failed_ids = []
+        self.scene_count = 0
 
     @classmethod
     def from_crawler(cls, crawler, *args, **kwargs):
@@ -71,8 +96,10 @@ class StashDBSpider(scrapy.Spider):
         if not api_key:
             raise ValueError("STASHDB_API_KEY environment variable is required")
 
-        spider.stashdb_client = StashDbClient(endpoint, api_key)
-        spider.lake = StashDbLake(spider.data_path)
+        spider.stashdb_client = StashDbClient(endpoint, api_key, max_workers=spider.max_concurrency)
+        spider.lake = StashDbLake(spider.data_path, scene_partition_by=spider.scene_partition_by)
+        # Upserts are merged in one commit per table instead of one per call
+        spider.lake_writer = spider.lake.buffered()
 
         images_path = Path(spider.data_path) / "images"
         crawler.settings.set("IMAGES_STORE", str(images_path))
@@ -80,45 +107,95 @@ class StashDBSpider(scrapy.Spider):
         return spider
 
     async def start(self):
-        """Query StashDB and process scenes."""
-        if self.mode == "performer":
-            self.logger.info(f"Querying scenes for performer: {self.performer_id}")
-            scenes = self.stashdb_client.query_scenes_by_performer(self.performer_id)
-        else:
-            self.logger.info(f"Querying scenes for studio: {self.studio_id}")
-            scenes = self.stashdb_client.query_scenes_by_studio(self.studio_id)
-
-        self.logger.info(f"Found {len(scenes)} scenes")
-
-        if not scenes:
-            self.logger.warning("No scenes found")
-            return
+        """Query StashDB for every performer or studio and process scenes updated since their last completed crawl.
 
-        self._process_scenes(scenes)
-
-        if self.download_images:
-            for request in self._generate_image_requests(scenes):
-                yield request
+        Entities are fetched on worker threads, at most max_concurrency at a time (the StashDB
+        client also caps requests in flight at max_concurrency), and processed as they finish.
+        """
+        self.started = time.perf_counter()
+        watermarks = {} if self.full else self.lake.get_watermarks(self.mode, self.entity_ids)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(entity_id: str) -> tuple[str, list[dict] | Exception, float]:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    scenes = await asyncio.to_thread(self._query_entity_scenes, entity_id, watermarks.get(entity_id))
+                except Exception as e:
+                    scenes = e
+                return entity_id, scenes, time.perf_counter() - started
+
+        self.logger.info(
+            f"Crawling {len(self.entity_ids)} {self.mode}s ({len(watermarks)} incremental, "
+            f"{len(self.entity_ids) - len(watermarks)} full)"
+        )
+        tasks = [asyncio.ensure_future(fetch(entity_id)) for entity_id in self.entity_ids]
+        for done_count, task in enumerate(asyncio.as_completed(tasks), start=1):
+            entity_id, scenes, elapsed = await task
+            progress = f"[{done_count}/{len(self.entity_ids)}] {self.mode} {entity_id}"
+            if isinstance(scenes, Exception):
+                self.logger.error(f"{progress}: failed to query scenes: {scenes}")
+                self.failed_ids.append(entity_id)
+                continue
+
+            watermark = watermarks.get(entity_id)
+            crawl = f"updated since {watermark.isoformat()}" if watermark else "full"
+            self.logger.info(f"{progress}: {len(scenes)} scenes ({crawl}) in {elapsed:.1f}s")
+            if not scenes:
+                continue
+
+            latest = max(self.stashdb_client.parse_time(scene["updated"]) for scene in scenes)
+            self.new_watermarks[entity_id] = max(latest, watermark) if watermark else latest
+            self.scene_count += len(scenes)
+            self._process_scenes(scenes)
+
+            if self.download_images:
+                for request in self._generate_image_requests(scenes):
+                    yield request
+
+    def _query_entity_scenes(self, entity_id: str, watermark: datetime | None) -> list[dict]:
+        if self.mode == "performer":
+            return self.stashdb_client.query_scenes_by_performer(entity_id, updated_since=watermark)
+        return self.stashdb_client.query_scenes_by_studio(entity_id, updated_since=watermark)
+
+    def closed(self, reason):
+        """Merge the remaining buffered entities into Delta Lake, advance watermarks and log a summary."""
+        flushed = self.lake_writer.flush()
+        for table, count in flushed.items():
+            self.logger.info(f"Stored {count} {table} to Delta Lake")
+
+        # Only a completed crawl may advance watermarks, otherwise missed scenes would be skipped next time
+        if reason == "finished":
+            self.lake.set_watermarks(self.mode, self.new_watermarks)
+
+        elapsed = time.perf_counter() - self.started if hasattr(self, "started") else 0.0
+        succeeded = len(self.entity_ids) - len(self.failed_ids)
+        self.logger.info(
+            f"Summary: {succeeded}/{len(self.entity_ids)} {self.mode}s crawled, {self.scene_count} scenes, "
+            f"{self.stashdb_client.request_count} requests in {elapsed:.1f}s"
+        )
+        if self.failed_ids:
+            self.logger.warning(f"Failed {self.mode}s: {', '.join(self.failed_ids)}")
 
     def _process_scenes(self, scenes: list[dict]) -> None:
-        """Process and store scenes to Delta Lake."""
-        self.lake.upsert_scenes(scenes)
-        self.logger.info(f"Stored {len(scenes)} scenes to Delta Lake")
+        """Buffer scenes and their performers, studios and tags for Delta Lake."""
+        self.lake_writer.upsert_scenes(scenes)
+        self.logger.info(f"Buffered {len(scenes)} scenes")
 
         performers = self._extract_performers(scenes)
         if performers:
-            self.lake.upsert_performers(performers)
-            self.logger.info(f"Stored {len(performers)} performers to Delta Lake")
+            self.lake_writer.upsert_performers(performers)
+            self.logger.info(f"Buffered {len(performers)} performers")
 
         studios = self._extract_studios(scenes)
         if studios:
-            self.lake.upsert_studios(studios)
-            self.logger.info(f"Stored {len(studios)} studios to Delta Lake")
+            self.lake_writer.upsert_studios(studios)
+            self.logger.info(f"Buffered {len(studios)} studios")
 
         tags = self._extract_tags(scenes)
         if tags:
-            self.lake.upsert_tags(tags)
-            self.logger.info(f"Stored {len(tags)} tags to Delta Lake")
+            self.lake_writer.upsert_tags(tags)
+            self.logger.info(f"Buffered {len(tags)} tags")
 
     def _extract_performers(self, scenes: list[dict]) -> list[dict]:
         """Extract unique performers from scenes."""
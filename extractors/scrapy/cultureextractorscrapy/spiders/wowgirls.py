@@ -19,9 +19,8 @@ from cultureextractorscrapy.items import (
     ReleaseItem,
 )
 from cultureextractorscrapy.spiders.database import (
-    get_existing_releases_with_status,
-    get_or_create_performer,
-    get_or_create_tag,
+    EntityCache,
+    get_existing_release_index,
     get_site_item,
 )
 from cultureextractorscrapy.utils import (
@@ -86,7 +85,8 @@ class WowGirlsSpider(scrapy.Spider):
         spider.site = site_item
 
         # Get existing releases with their download status
-        spider.existing_releases = get_existing_releases_with_status(site_item.id)
+        spider.existing_releases = get_existing_release_index(site_item.id)
+        spider.entity_cache = EntityCache(site_item.id)
         return spider
 
     def parse(self, response):
@@ -909,7 +909,7 @@ class WowGirlsSpider(scrapy.Spider):
 
     def _create_performer_items(self, performers, performer_urls):
         """Create performer items from names and URLs."""
-        performer_items = []
+        entries = []
         for i, performer_name in enumerate(performers):
             performer_url = performer_urls[i] if i < len(performer_urls) else None
 
@@ -921,25 +921,17 @@ class WowGirlsSpider(scrapy.Spider):
                     performer_short_name = match.group(1)
 
             full_url = performer_url  # Keep as relative URL like existing data
+            entries.append((performer_short_name, performer_name.strip(), full_url))
 
-            # Create or get performer from database
-            performer = get_or_create_performer(
-                self.site.id, performer_short_name, performer_name.strip(), full_url
-            )
-            performer_items.append(performer)
-        return performer_items
+        # Resolve all performers of the release at once (new ones are inserted in one statement)
+        return self.entity_cache.get_or_create_performers(entries)
 
     def _create_tag_items(self, tags):
         """Create tag items from tag names."""
-        tag_items = []
-        for tag_name in tags:
-            # Tags use the tag name as short_name (matching existing data)
-            tag_short_name = tag_name
-
-            # Create or get tag from database
-            tag = get_or_create_tag(self.site.id, tag_short_name, tag_name.strip(), None)
-            tag_items.append(tag)
-        return tag_items
+        # Tags use the tag name as short_name (matching existing data)
+        return self.entity_cache.get_or_create_tags(
+            (tag_name, tag_name.strip(), None) for tag_name in tags
+        )
 
     def parse_performers_page(self, response):
         """Parse a page of performers/models."""
@@ -1027,8 +1019,7 @@ class WowGirlsSpider(scrapy.Spider):
         profile_image = response.css('img[src*="content-models2"][src*="icon_"]::attr(src)').get()
 
         # Create or get performer from database
-        performer = get_or_create_performer(
-            self.site.id,
+        performer = self.entity_cache.get_or_create_performer(
             performer_short_name,
             performer_name,
             response.url,
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Existing-release lookup benchmark.
+
+Compares spider startup cost of get_existing_releases_with_status (dict of every release with
+its available and downloaded files) against get_existing_release_index (compact streaming index)
+for a given site. Each variant runs in a fresh subprocess so peak RSS is not shared between them.
+
+Usage (from extractors/scrapy):
+    python scripts/benchmark_release_index.py hegre
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from cultureextractorscrapy.spiders.database import (  # noqa: E402
+    get_existing_release_index,
+    get_existing_releases_with_status,
+    get_site_item,
+)
+
+BUILDERS = {
+    "dict": get_existing_releases_with_status,
+    "index": get_existing_release_index,
+}
+
+
+def run_variant(site_short_name: str, variant: str) -> dict:
+    """Build the existing-release structure in this process and report time and memory."""
+    site_item = get_site_item(site_short_name)
+    if site_item is None:
+        raise SystemExit(f"Site with short_name '{site_short_name}' not found in the database.")
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    releases = BUILDERS[variant](site_item.id)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Lookups as the spiders do them: membership check plus downloaded files of every release
+    start = time.perf_counter()
+    for short_name in list(releases):
+        release = releases.get(short_name)
+        _ = release["uuid"], release["downloaded_files"]
+    lookup_elapsed = time.perf_counter() - start
+
+    return {
+        "variant": variant,
+        "releases": len(releases),
+        "build_seconds": round(elapsed, 3),
+        "lookup_seconds": round(lookup_elapsed, 3),
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": round(rss_after / 1024, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark existing-release lookup structures for a site")
+    parser.add_argument("site", help="Site short name, e.g. hegre")
+    parser.add_argument("--variant", choices=BUILDERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.site, args.variant)))
+        return
+
+    results = []
+    for variant in BUILDERS:
+        output = subprocess.run(
+            [sys.executable, __file__, args.site, "--variant", variant],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print(f"{'variant':<8} {'releases':>9} {'build s':>9} {'lookup s':>9} {'peak RSS MB':>12} {'RSS growth MB':>14}")
+    for r in results:
+        print(
+            f"{r['variant']:<8} {r['releases']:>9} {r['build_seconds']:>9} {r['lookup_seconds']:>9} "
+            f"{r['peak_rss_mb']:>12} {r['rss_growth_mb']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
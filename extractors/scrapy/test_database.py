@@ -0,0 +1,194 @@
+import unittest
+import uuid
+from collections import namedtuple
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+
+from cultureextractorscrapy.spiders.database import EntityCache, ExistingReleaseIndex
+
+Row = namedtuple("Row", ["short_name", "uuid", "downloaded", "file_type", "content_type", "variant"])
+
+
+def build_index(rows):
+    index = ExistingReleaseIndex(site_uuid=uuid.uuid4())
+    for row in rows:
+        index._add_row(row)
+    return index
+
+
+class TestExistingReleaseIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.complete_uuid = uuid.uuid4()
+        self.partial_uuid = uuid.uuid4()
+        self.empty_uuid = uuid.uuid4()
+        self.index = build_index([
+            Row("complete", self.complete_uuid, False, "video", "scene", "1080"),
+            Row("complete", self.complete_uuid, False, "image", "cover", "cover"),
+            Row("partial", self.partial_uuid, False, "video", "scene", "1080"),
+            Row("partial", self.partial_uuid, False, "video", "scene", "2160"),
+            Row("empty", self.empty_uuid, True, None, None, None),
+            Row("complete", self.complete_uuid, True, "video", "scene", "1080"),
+            Row("complete", self.complete_uuid, True, "image", "cover", "cover"),
+            Row("partial", self.partial_uuid, True, "video", "scene", "1080"),
+        ])
+
+    def test_membership(self):
+        self.assertIn("complete", self.index)
+        self.assertIn("empty", self.index)
+        self.assertNotIn("missing", self.index)
+        self.assertIsNone(self.index.get("missing"))
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(set(self.index), {"complete", "partial", "empty"})
+
+    def test_uuid_round_trip(self):
+        self.assertEqual(self.index["complete"]["uuid"], self.complete_uuid)
+        self.assertEqual(self.index.get("partial").get("uuid"), self.partial_uuid)
+        self.assertEqual(self.index["empty"].uuid, self.empty_uuid)
+
+    def test_downloaded_files(self):
+        self.assertEqual(
+            self.index["complete"]["downloaded_files"],
+            {("video", "scene", "1080"), ("image", "cover", "cover")},
+        )
+        self.assertEqual(self.index["partial"]["downloaded_files"], {("video", "scene", "1080")})
+        self.assertEqual(self.index["empty"]["downloaded_files"], set())
+
+    def test_needs_download(self):
+        self.assertFalse(self.index["complete"].needs_download)
+        self.assertTrue(self.index["partial"].needs_download)
+        self.assertFalse(self.index["empty"].needs_download)
+
+    def test_assigned_entries(self):
+        added = {"uuid": uuid.uuid4(), "available_files": [], "downloaded_files": set()}
+        self.index["new"] = added
+        self.assertIs(self.index["new"], added)
+        self.assertIn("new", self.index)
+        self.assertEqual(len(self.index), 4)
+
+    def test_more_than_64_file_kinds(self):
+        release_uuid = uuid.uuid4()
+        rows = [Row("many", release_uuid, False, "image", "gallery", str(i)) for i in range(70)]
+        rows.append(Row("many", release_uuid, True, "image", "gallery", "69"))
+        index = build_index(rows)
+        self.assertTrue(index["many"].needs_download)
+        self.assertEqual(index["many"]["downloaded_files"], {("image", "gallery", "69")})
+
+
+class FakeSession:
+    """Runs EntityCache's statements against in-memory performers and tags tables, as PostgreSQL would."""
+
+    def __init__(self):
+        self.tables = {"performers": [], "tags": []}
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add(self, table, site_uuid, short_name, name=None, url=None):
+        row = SimpleNamespace(uuid=uuid.uuid4(), site_uuid=site_uuid, short_name=short_name, name=name, url=url)
+        self.tables[table].append(row)
+        return row
+
+    def execute(self, stmt):
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        self.statements.append(sql)
+        if sql.startswith("INSERT"):
+            rows = self._upsert(stmt.table.name, compiled.params)
+        else:
+            site_uuids = set(compiled.params.values())
+            rows = [
+                SimpleNamespace(kind=kind, uuid=row.uuid, short_name=row.short_name, name=row.name, url=row.url)
+                for kind, table in (("performer", "performers"), ("tag", "tags"))
+                for row in self.tables[table]
+                if row.site_uuid in site_uuids
+            ]
+        return SimpleNamespace(all=lambda: rows)
+
+    def _upsert(self, table, params):
+        """INSERT ... ON CONFLICT (site_uuid, short_name) DO UPDATE ... RETURNING"""
+        returned = []
+        for index in range(len(params) // 5):
+            values = {column: params[f"{column}_m{index}"] for column in ("uuid", "site_uuid", "short_name", "name", "url")}
+            row = next(
+                (
+                    row
+                    for row in self.tables[table]
+                    if (row.site_uuid, row.short_name) == (values["site_uuid"], values["short_name"])
+                ),
+                None,
+            )
+            if row is None:
+                row = SimpleNamespace(**values)
+                self.tables[table].append(row)
+            returned.append(row)
+        return returned
+
+    def commit(self):
+        pass
+
+
+class TestEntityCache(unittest.TestCase):
+
+    def setUp(self):
+        self.site_uuid = uuid.uuid4()
+        self.session = FakeSession()
+        patcher = mock.patch("cultureextractorscrapy.spiders.database.get_session", return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_load_preloads_performers_and_tags_in_one_query(self):
+        performer = self.session.add("performers", self.site_uuid, "jane", "Jane", "https://example.com/jane")
+        tag = self.session.add("tags", self.site_uuid, "outdoor", "Outdoor")
+        self.session.add("tags", self.site_uuid, None, "Unkeyed")
+        self.session.add("performers", uuid.uuid4(), "other-site", "Other")
+
+        cache = EntityCache(self.site_uuid)
+
+        self.assertEqual(len(self.session.statements), 1)
+        self.assertIn("UNION ALL", self.session.statements[0])
+        self.assertEqual(set(cache._performers), {"jane"})
+        self.assertEqual(set(cache._tags), {"outdoor"})
+        self.assertEqual(cache._performers["jane"].id, performer.uuid)
+        self.assertEqual(cache._performers["jane"].url, "https://example.com/jane")
+        self.assertEqual(cache._tags["outdoor"].id, tag.uuid)
+        self.assertEqual(cache._tags["outdoor"].site_uuid, self.site_uuid)
+
+    def test_get_or_create_returns_cached_uuid_on_second_call(self):
+        cache = EntityCache(self.site_uuid)
+
+        first = cache.get_or_create_performer("jane", "Jane", None)
+        second = cache.get_or_create_performer("jane", "Jane", None)
+
+        self.assertEqual(second.id, first.id)
+        self.assertEqual([row.uuid for row in self.session.tables["performers"]], [first.id])
+        # The preload and one insert, the second call is answered from the cache
+        self.assertEqual(len(self.session.statements), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_flush_upserts_and_returns_existing_uuid_on_conflict(self):
+        cache = EntityCache(self.site_uuid)
+        # Inserted by another crawl after the cache was loaded
+        existing = self.session.add("tags", self.site_uuid, "outdoor", "Outdoor")
+
+        tags = cache.get_or_create_tags([("outdoor", "Outdoor", None), ("indoor", "Indoor", None), ("outdoor", "Outdoor", None)])
+
+        insert_sql = self.session.statements[-1]
+        self.assertEqual(len(self.session.statements), 2)
+        self.assertIn("ON CONFLICT (site_uuid, short_name) DO UPDATE", insert_sql)
+        self.assertIn("RETURNING tags.uuid, tags.short_name, tags.name, tags.url", insert_sql)
+        self.assertEqual(tags[0].id, existing.uuid)
+        self.assertEqual(tags[2].id, existing.uuid)
+        self.assertEqual(len(self.session.tables["tags"]), 2)
+        self.assertEqual(cache._tags["indoor"].id, tags[1].id)
+        self.assertEqual(cache._tags["outdoor"].id, existing.uuid)
+
+
+if __name__ == "__main__":
+    unittest.main()
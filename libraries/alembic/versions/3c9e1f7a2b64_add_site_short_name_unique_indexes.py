@@ -0,0 +1,49 @@
+"""add_site_short_name_unique_indexes
+
+Revision ID: 3c9e1f7a2b64
+Revises: b5c8aff455af
+Create Date: 2026-10-18 09:12:31.204118
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c9e1f7a2b64"
+down_revision: str | Sequence[str] | None = "b5c8aff455af"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def _check_no_duplicates(table: str) -> None:
+    """Fail with a readable message instead of a bare unique violation."""
+    duplicates = op.get_bind().execute(
+        sa.text(
+            f"SELECT site_uuid, short_name, COUNT(*) AS count FROM {table} "
+            "WHERE short_name IS NOT NULL "
+            "GROUP BY site_uuid, short_name HAVING COUNT(*) > 1 LIMIT 10"
+        )
+    ).all()
+    if duplicates:
+        examples = ", ".join(f"{row.site_uuid}/{row.short_name} ({row.count})" for row in duplicates)
+        raise RuntimeError(f"Duplicate (site_uuid, short_name) rows in {table} must be merged first: {examples}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The scrapy EntityCache resolves misses with INSERT ... ON CONFLICT (site_uuid, short_name)
+    _check_no_duplicates("performers")
+    _check_no_duplicates("tags")
+    op.create_index(
+        "ix_performers_site_uuid_short_name", "performers", ["site_uuid", "short_name"], unique=True
+    )
+    op.create_index("ix_tags_site_uuid_short_name", "tags", ["site_uuid", "short_name"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_tags_site_uuid_short_name", table_name="tags")
+    op.drop_index("ix_performers_site_uuid_short_name", table_name="performers")
@@ -1,5 +1,8 @@
 import json
+import math
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import polars as pl
@@ -24,10 +27,31 @@ class StashboxClient(ABC):
 
 
 class StashDbClient(StashboxClient):
-    def __init__(self, endpoint, api_key):
+    def __init__(self, endpoint, api_key, batch_size: int = 25, per_page: int = 25, max_workers: int = 4):
+        """
+        Args:
+            endpoint: StashDB GraphQL endpoint
+            api_key: StashDB API key
+            batch_size: Scene ids looked up per request
+            per_page: Page size of paginated queries
+            max_workers: Maximum concurrent requests, shared by all threads using the client
+        """
         self.endpoint = endpoint
         self.api_key = api_key
+        self.batch_size = batch_size
+        self.per_page = per_page
+        self.max_workers = max_workers
         self.scene_matcher = SceneMatcher()
+        # Number of GraphQL requests sent, for measuring crawls
+        self.request_count = 0
+        self._request_count_lock = threading.Lock()
+        # Bounds requests in flight across all threads using this client
+        self._request_slots = threading.BoundedSemaphore(max_workers)
+        # One session keeps connections alive across requests
+        self.session = requests.Session()
+        self.session.headers["Content-Type"] = "application/json"
+        if api_key:
+            self.session.headers["Apikey"] = api_key
 
     def query_performer_image(self, performer_stash_id):
         query = """
@@ -116,21 +140,34 @@ class StashDbClient(StashboxClient):
         logger.error(f"Failed to query studio with Stash ID {performer_stash_id}.")
         return None
 
-    def query_scenes_by_performer(self, performer_stash_id):
+    def query_scenes_by_performer(self, performer_stash_id, updated_since: datetime | None = None):
+        """Query all scenes of a performer, most recently updated first.
+
+        Args:
+            performer_stash_id: StashDB performer UUID
+            updated_since: Only scenes updated at or after this time. Pages are fetched until
+                the first older scene.
+
+        Raises:
+            RuntimeError: If a page cannot be fetched, so partial results are never mistaken for complete ones
+        """
         query = """
-            query QueryScenes($stash_ids: [ID!]!, $page: Int!) {
+            query QueryScenes($stash_ids: [ID!]!, $page: Int!, $per_page: Int!) {
                 queryScenes(
                     input: {
                         performers: {
                             value: $stash_ids,
                             modifier: INCLUDES
                         },
-                        per_page: 25,
-                        page: $page
+                        per_page: $per_page,
+                        page: $page,
+                        sort: UPDATED_AT,
+                        direction: DESC
                     }
                 ) {
                     scenes {
                         id
+                        updated
                         title
                         details
                         release_date
@@ -183,40 +220,38 @@ class StashDbClient(StashboxClient):
                 }
             }
         """
-        scenes = []
-        page = 1
-        total_scenes = None
-        while True:
-            result = self._gql_query(
-                query, {"stash_ids": performer_stash_id, "page": page}
-            )
-            if result:
-                scenes_data = result["data"]["queryScenes"]
-                scenes.extend(scenes_data["scenes"])
-                total_scenes = total_scenes or scenes_data["count"]
-                if len(scenes) >= total_scenes or len(scenes_data["scenes"]) < 25:
-                    break
-                page += 1
-            else:
-                break
-
-        return scenes
-
-    def query_scenes_by_studio(self, studio_stash_id):
+        if updated_since:
+            return self._query_scenes_updated_since(query, {"stash_ids": performer_stash_id}, updated_since)
+        return self._query_pages(query, {"stash_ids": performer_stash_id}, "queryScenes", "scenes", strict=True)
+
+    def query_scenes_by_studio(self, studio_stash_id, updated_since: datetime | None = None):
+        """Query all scenes of a studio, most recently updated first.
+
+        Args:
+            studio_stash_id: StashDB studio UUID
+            updated_since: Only scenes updated at or after this time. Pages are fetched until
+                the first older scene.
+
+        Raises:
+            RuntimeError: If a page cannot be fetched, so partial results are never mistaken for complete ones
+        """
         query = """
-            query QueryScenes($studio_ids: [ID!]!, $page: Int!) {
+            query QueryScenes($studio_ids: [ID!]!, $page: Int!, $per_page: Int!) {
                 queryScenes(
                     input: {
                         studios: {
                             value: $studio_ids,
                             modifier: INCLUDES
                         },
-                        per_page: 25,
-                        page: $page
+                        per_page: $per_page,
+                        page: $page,
+                        sort: UPDATED_AT,
+                        direction: DESC
                     }
                 ) {
                     scenes {
                         id
+                        updated
                         title
                         details
                         release_date
@@ -269,24 +304,9 @@ class StashDbClient(StashboxClient):
                 }
             }
         """
-        scenes = []
-        page = 1
-        total_scenes = None
-        while True:
-            result = self._gql_query(
-                query, {"studio_ids": studio_stash_id, "page": page}
-            )
-            if result:
-                scenes_data = result["data"]["queryScenes"]
-                scenes.extend(scenes_data["scenes"])
-                total_scenes = total_scenes or scenes_data["count"]
-                if len(scenes) >= total_scenes or len(scenes_data["scenes"]) < 25:
-                    break
-                page += 1
-            else:
-                break
-
-        return scenes
+        if updated_since:
+            return self._query_scenes_updated_since(query, {"studio_ids": studio_stash_id}, updated_since)
+        return self._query_pages(query, {"studio_ids": studio_stash_id}, "queryScenes", "scenes", strict=True)
 
     def query_scenes_by_phash(self, scenes: list[dict]) -> pl.DataFrame:
         """Legacy method for querying scenes by phash"""
@@ -361,28 +381,7 @@ class StashDbClient(StashboxClient):
                 }
             }
         """
-        per_page = 25
-        page = 1
-        all_tags = []
-        total_count = None
-
-        while True:
-            result = self._gql_query(query, {"page": page, "per_page": per_page})
-            if result is None or "data" not in result or "queryTags" not in result["data"]:
-                break
-
-            tags_data = result["data"]["queryTags"]
-            all_tags.extend(tags_data["tags"])
-
-            if total_count is None:
-                total_count = tags_data["count"]
-
-            if len(all_tags) >= total_count:
-                break
-
-            page += 1
-
-        return all_tags
+        return self._query_pages(query, {}, "queryTags", "tags")
 
     def submit_scene_draft(self, draft_input: dict) -> dict:
         """
@@ -409,14 +408,13 @@ class StashDbClient(StashboxClient):
         return self._gql_query(query, variables)
 
     def _gql_query(self, query, variables=None):
-        headers = {"Content-Type": "application/json"}
-        if self.api_key:
-            headers["Apikey"] = self.api_key
-        response = requests.post(
-            self.endpoint,
-            json={"query": query, "variables": variables},
-            headers=headers,
-        )
+        with self._request_count_lock:
+            self.request_count += 1
+        with self._request_slots:
+            response = self.session.post(
+                self.endpoint,
+                json={"query": query, "variables": variables},
+            )
         if response.status_code == 200:
             return response.json()
         logger.error(
@@ -424,6 +422,101 @@ class StashDbClient(StashboxClient):
         )
         return None
 
+    def _query_pages(
+        self, query: str, variables: dict, result_key: str, items_key: str, strict: bool = False
+    ) -> list[dict]:
+        """Fetch all pages of a paginated query.
+
+        The first page's count tells how many pages there are; the remaining pages are then
+        fetched concurrently and returned in page order.
+
+        Args:
+            strict: Raise RuntimeError when a page cannot be fetched instead of skipping it
+        """
+
+        def fetch(page: int) -> dict | None:
+            result = self._gql_query(query, {**variables, "page": page, "per_page": self.per_page})
+            if result is None or not result.get("data") or not result["data"].get(result_key):
+                if strict:
+                    raise RuntimeError(f"Failed to fetch page {page} of {result_key}")
+                logger.error(f"Failed to fetch page {page} of {result_key}")
+                return None
+            return result["data"][result_key]
+
+        first_page = fetch(1)
+        if first_page is None:
+            return []
+
+        items = list(first_page[items_key])
+        page_count = math.ceil(first_page["count"] / self.per_page)
+        if page_count > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for page_data in executor.map(fetch, range(2, page_count + 1)):
+                    if page_data:
+                        items.extend(page_data[items_key])
+        return items
+
+    def _query_scenes_updated_since(self, query: str, variables: dict, updated_since: datetime) -> list[dict]:
+        """Fetch pages of a queryScenes query sorted by UPDATED_AT descending until a scene is older than updated_since."""
+        scenes = []
+        page = 1
+        while True:
+            result = self._gql_query(query, {**variables, "page": page, "per_page": self.per_page})
+            if result is None or not result.get("data") or not result["data"].get("queryScenes"):
+                raise RuntimeError(f"Failed to fetch page {page} of queryScenes")
+
+            scenes_data = result["data"]["queryScenes"]
+            for scene in scenes_data["scenes"]:
+                if self.parse_time(scene["updated"]) < updated_since:
+                    return scenes
+                scenes.append(scene)
+            if page * self.per_page >= scenes_data["count"] or len(scenes_data["scenes"]) < self.per_page:
+                return scenes
+            page += 1
+
+    @staticmethod
+    def parse_time(value: str) -> datetime:
+        """Parse a StashDB timestamp (RFC 3339)."""
+        return datetime.fromisoformat(value)
+
+    def _find_scenes_by_id(self, scene_ids: list[str]) -> dict[str, dict | None]:
+        """Look up scenes by id, batch_size ids per request using aliased findScene queries.
+
+        Returns:
+            Scene data by id, None for scenes that were not found. Ids whose batch failed are left out.
+        """
+        fragment = self._get_scene_fragment()
+        batches = [scene_ids[i : i + self.batch_size] for i in range(0, len(scene_ids), self.batch_size)]
+
+        def fetch(batch: list[str]) -> dict[str, dict | None]:
+            parameters = ", ".join(f"$id{i}: ID!" for i in range(len(batch)))
+            fields = "\n".join(f"scene{i}: findScene(id: $id{i}) {{ ...SceneFields }}" for i in range(len(batch)))
+            query = f"""
+                query FindScenes({parameters}) {{
+                    {fields}
+                }}
+
+                fragment SceneFields on Scene {{
+                    {fragment}
+                }}
+            """
+            result = self._gql_query(query, {f"id{i}": scene_id for i, scene_id in enumerate(batch)})
+            if not result or not result.get("data"):
+                logger.error(f"Failed to query {len(batch)} scenes by id")
+                return {}
+            return {
+                scene_id: result["data"][f"scene{i}"]
+                for i, scene_id in enumerate(batch)
+                if f"scene{i}" in result["data"]
+            }
+
+        scenes_by_id = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for batch_scenes in executor.map(fetch, batches):
+                scenes_by_id.update(batch_scenes)
+        # Keep the requested order
+        return {scene_id: scenes_by_id[scene_id] for scene_id in scene_ids if scene_id in scenes_by_id}
+
     def _get_scene_fragment(self):
         """Returns the GraphQL fragment for querying scene data"""
         return """
@@ -684,18 +777,7 @@ class StashDbClient(StashboxClient):
         # Query scenes by ID
         scenes_by_id = {}
         if scene_ids:
-            find_scene_query = f"""
-                query FindScene($id: ID!) {{
-                    findScene(id: $id) {{
-                        {fragment}
-                    }}
-                }}
-            """
-
-            for scene_id in scene_ids:
-                result = self._gql_query(find_scene_query, {"id": scene_id})
-                if result and "data" in result and "findScene" in result["data"]:
-                    scenes_by_id[scene_id] = result["data"]["findScene"]
+            scenes_by_id = self._find_scenes_by_id(scene_ids)
 
         # Query scenes by phash
         scenes_by_phash = {}
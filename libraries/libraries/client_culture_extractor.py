@@ -831,6 +831,33 @@ class ClientCultureExtractor:
             # Return as dictionary with target system name as key
             return {row[0]: row[1] for row in results}
 
+    def get_linked_external_ids(self, entity_type: str, target_system_name: str) -> list[str]:
+        """Get the external IDs of all sites or performers linked to a target system.
+
+        Args:
+            entity_type: "site" or "performer"
+            target_system_name: Name of the target system (e.g., 'stashapp', 'stashdb')
+
+        Returns:
+            Distinct external IDs, sorted
+        """
+        tables = {"site": "site_external_ids", "performer": "performer_external_ids"}
+        if entity_type not in tables:
+            raise ValueError(f"Invalid entity_type: {entity_type}. Must be one of {', '.join(tables)}")
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT DISTINCT ext.external_id
+                FROM {tables[entity_type]} ext
+                JOIN target_systems ts ON ext.target_system_uuid = ts.uuid
+                WHERE ts.name = %s
+                ORDER BY ext.external_id
+            """,
+                (target_system_name,),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
     def set_site_external_id(
         self, site_uuid: str, target_system_name: str, external_id: str
     ) -> None:
@@ -1532,6 +1559,193 @@ class ClientCultureExtractor:
 
             return pl.DataFrame(tags, schema=schema)
 
+    def get_site_release_external_ids(self, site_uuid: str, target_system_name: str) -> pl.DataFrame:
+        """Get the external IDs of all releases of a site for one target system.
+
+        Args:
+            site_uuid: UUID of the site
+            target_system_name: Name of the target system (e.g., 'stashapp', 'stashdb')
+
+        Returns:
+            DataFrame with one row per release and external ID
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT DISTINCT rei.release_uuid, rei.external_id
+                FROM release_external_ids rei
+                JOIN target_systems ts ON rei.target_system_uuid = ts.uuid
+                JOIN releases r ON rei.release_uuid = r.uuid
+                WHERE r.site_uuid = %s AND ts.name = %s
+                ORDER BY rei.release_uuid, rei.external_id
+            """,
+                (site_uuid, target_system_name),
+            )
+            rows = cursor.fetchall()
+
+            return pl.DataFrame(
+                [{"ce_release_uuid": str(row[0]), "external_id": row[1]} for row in rows],
+                schema={"ce_release_uuid": pl.Utf8, "external_id": pl.Utf8},
+            )
+
+    def get_site_release_performers(self, site_uuid: str) -> pl.DataFrame:
+        """Get the performers of all releases of a site in one query.
+
+        Same columns as get_release_performers, plus the release UUID.
+
+        Args:
+            site_uuid: UUID of the site
+
+        Returns:
+            DataFrame with one row per release and performer
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT DISTINCT
+                    resp.releases_uuid,
+                    p.uuid,
+                    p.short_name,
+                    p.name,
+                    p.url,
+                    stashapp.external_id,
+                    stashdb.external_id
+                FROM release_entity_site_performer_entity resp
+                JOIN releases r ON resp.releases_uuid = r.uuid
+                JOIN performers p ON resp.performers_uuid = p.uuid
+                LEFT JOIN (
+                    SELECT pei.performer_uuid, pei.external_id
+                    FROM performer_external_ids pei
+                    JOIN target_systems ts ON pei.target_system_uuid = ts.uuid
+                    WHERE ts.name = 'stashapp'
+                ) stashapp ON stashapp.performer_uuid = p.uuid
+                LEFT JOIN (
+                    SELECT pei.performer_uuid, pei.external_id
+                    FROM performer_external_ids pei
+                    JOIN target_systems ts ON pei.target_system_uuid = ts.uuid
+                    WHERE ts.name = 'stashdb'
+                ) stashdb ON stashdb.performer_uuid = p.uuid
+                WHERE r.site_uuid = %s
+                ORDER BY resp.releases_uuid, p.name
+            """,
+                (site_uuid,),
+            )
+            rows = cursor.fetchall()
+
+            performers = [
+                {
+                    "ce_release_uuid": str(row[0]),
+                    "ce_performers_uuid": str(row[1]),
+                    "ce_performers_short_name": row[2],
+                    "ce_performers_name": row[3],
+                    "ce_performers_url": row[4],
+                    "ce_performers_stashapp_id": row[5],
+                    "ce_performers_stashdb_id": row[6],
+                }
+                for row in rows
+            ]
+
+            schema = {
+                "ce_release_uuid": pl.Utf8,
+                "ce_performers_uuid": pl.Utf8,
+                "ce_performers_short_name": pl.Utf8,
+                "ce_performers_name": pl.Utf8,
+                "ce_performers_url": pl.Utf8,
+                "ce_performers_stashapp_id": pl.Utf8,
+                "ce_performers_stashdb_id": pl.Utf8,
+            }
+
+            return pl.DataFrame(performers, schema=schema)
+
+    def get_site_release_tags(self, site_uuid: str) -> pl.DataFrame:
+        """Get the tags of all releases of a site, with their Stashapp IDs, in one query.
+
+        Args:
+            site_uuid: UUID of the site
+
+        Returns:
+            DataFrame with one row per release and tag
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT DISTINCT
+                    rest.releases_uuid,
+                    t.uuid,
+                    t.short_name,
+                    t.name,
+                    t.url,
+                    stashapp.external_id
+                FROM release_entity_site_tag_entity rest
+                JOIN releases r ON rest.releases_uuid = r.uuid
+                JOIN tags t ON rest.tags_uuid = t.uuid
+                LEFT JOIN (
+                    SELECT tei.tag_uuid, tei.external_id
+                    FROM tag_external_ids tei
+                    JOIN target_systems ts ON tei.target_system_uuid = ts.uuid
+                    WHERE ts.name = 'stashapp'
+                ) stashapp ON stashapp.tag_uuid = t.uuid
+                WHERE r.site_uuid = %s
+                ORDER BY rest.releases_uuid, t.name
+            """,
+                (site_uuid,),
+            )
+            rows = cursor.fetchall()
+
+            tags = [
+                {
+                    "ce_release_uuid": str(row[0]),
+                    "ce_tags_uuid": str(row[1]),
+                    "ce_tags_short_name": row[2],
+                    "ce_tags_name": row[3],
+                    "ce_tags_url": row[4],
+                    "ce_tags_stashapp_id": row[5],
+                }
+                for row in rows
+            ]
+
+            schema = {
+                "ce_release_uuid": pl.Utf8,
+                "ce_tags_uuid": pl.Utf8,
+                "ce_tags_short_name": pl.Utf8,
+                "ce_tags_name": pl.Utf8,
+                "ce_tags_url": pl.Utf8,
+                "ce_tags_stashapp_id": pl.Utf8,
+            }
+
+            return pl.DataFrame(tags, schema=schema)
+
+    def get_site_release_covers(self, site_uuid: str) -> pl.DataFrame:
+        """Get the most recently downloaded cover image of every release of a site.
+
+        Args:
+            site_uuid: UUID of the site
+
+        Returns:
+            DataFrame with the saved filename of one cover per release
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT DISTINCT ON (d.release_uuid)
+                    d.release_uuid,
+                    d.saved_filename
+                FROM downloads d
+                JOIN releases r ON d.release_uuid = r.uuid
+                WHERE r.site_uuid = %s
+                    AND d.file_type = 'image'
+                    AND d.content_type = 'cover'
+                ORDER BY d.release_uuid, d.downloaded_at DESC
+            """,
+                (site_uuid,),
+            )
+            rows = cursor.fetchall()
+
+            return pl.DataFrame(
+                [{"ce_release_uuid": str(row[0]), "ce_downloads_saved_filename": row[1]} for row in rows],
+                schema={"ce_release_uuid": pl.Utf8, "ce_downloads_saved_filename": pl.Utf8},
+            )
+
     def get_performer_by_uuid(self, performer_uuid: str) -> pl.DataFrame:
         """Get a specific performer by its UUID.
 
@@ -1,10 +1,13 @@
 import os
 import random
 import re
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from types import SimpleNamespace
 
 import polars as pl
+import requests
 from dotenv import load_dotenv
 from stashapi import log
 from stashapi.stashapp import StashInterface
@@ -192,6 +195,84 @@ scenes_schema = {
     "stashapp_galleries": pl.List(pl.Struct({"id": pl.Int64, "title": pl.Utf8})),
 }
 
+# Scene fields for callers that do not need performers, studio, files, tags or galleries
+scenes_fragment_minimal = """
+    id
+    code
+    title
+    details
+    date
+    urls
+    created_at
+    updated_at
+    organized
+    interactive
+    play_duration
+    play_count
+    o_counter
+    stash_ids {
+        endpoint
+        stash_id
+        updated_at
+    }
+"""
+
+# Scene files and fingerprints, e.g. for matching by hash
+scenes_fragment_files = """
+    id
+    files {
+        id
+        path
+        basename
+        size
+        duration
+        fingerprints {
+            type
+            value
+        }
+    }
+"""
+
+# Fragment and columns of each scene projection
+scene_projections = {
+    "minimal": (
+        scenes_fragment_minimal,
+        [
+            "stashapp_id",
+            "stashapp_code",
+            "stashapp_title",
+            "stashapp_details",
+            "stashapp_date",
+            "stashapp_urls",
+            "stashapp_created_at",
+            "stashapp_updated_at",
+            "stashapp_organized",
+            "stashapp_interactive",
+            "stashapp_play_duration",
+            "stashapp_play_count",
+            "stashapp_o_counter",
+            "stashapp_stash_ids",
+            "stashapp_stashdb_id",
+            "stashapp_tpdb_id",
+            "stashapp_ce_id",
+        ],
+    ),
+    "files": (
+        scenes_fragment_files,
+        [
+            "stashapp_id",
+            "stashapp_files",
+            "stashapp_primary_file_path",
+            "stashapp_primary_file_basename",
+            "stashapp_primary_file_oshash",
+            "stashapp_primary_file_phash",
+            "stashapp_primary_file_xxhash",
+            "stashapp_primary_file_duration",
+        ],
+    ),
+    "full": (scenes_fragment, list(scenes_schema)),
+}
+
 galleries_fragment = """
 id
 title
@@ -625,32 +706,61 @@ class StashAppClient:
                     result["stash_studios_ce_id"] = stash_id["stash_id"]
         return result
 
-    def find_scenes_by_oshash(self, oshashes: list[str]) -> pl.DataFrame:
-        scenes = []
-        for oshash in oshashes:
-            stash_scene = self.stash.find_scene_by_hash(
-                {"oshash": oshash}, fragment=scenes_fragment
-            )
-            if stash_scene:
-                scene_data = self._map_scene_data(stash_scene)
-                scenes.append(scene_data)
+    def find_scenes_by_oshash(
+        self, oshashes: list[str], batch_size: int = 100, max_workers: int = 1, projection: str = "full"
+    ) -> pl.DataFrame:
+        """Find the scene with a file matching each oshash.
 
-        df_scenes = pl.DataFrame(scenes, schema=scenes_schema)
+        Sends batch_size aliased findSceneByHash queries per request, with up to
+        max_workers requests in flight.
 
-        return df_scenes
+        Args:
+            oshashes: File oshashes to look up
+            batch_size: Number of oshashes per request
+            max_workers: Maximum number of concurrent requests
+            projection: "minimal", "files" or "full", see scene_projections
 
-    def find_scenes_by_studio(self, studio_ids: list[int]) -> pl.DataFrame:
-        scenes = self.stash.find_scenes(
-            {"studios": {"value": studio_ids, "excludes": [], "modifier": "INCLUDES"}},
-            fragment=scenes_fragment,
+        Returns:
+            One row per oshash that matches a scene, in input order
+        """
+        batches = [oshashes[start : start + batch_size] for start in range(0, len(oshashes), batch_size)]
+        fragment = scene_projections[projection][0]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            scenes = [
+                stash_scene
+                for batch in executor.map(lambda batch: self._find_scenes_by_oshash_batch(batch, fragment), batches)
+                for stash_scene in batch
+                if stash_scene
+            ]
+
+        return self._scenes_to_dataframe(scenes, projection)
+
+    def _find_scenes_by_oshash_batch(self, oshashes: list[str], fragment: str) -> list[dict | None]:
+        """Look up a batch of oshashes in one request, returning a scene or None per oshash."""
+        declarations = ", ".join(f"$oshash{i}: String" for i in range(len(oshashes)))
+        selections = "\n".join(
+            f"scene{i}: findSceneByHash(input: {{oshash: $oshash{i}}}) {{ ...StashScene }}" for i in range(len(oshashes))
         )
-        scenes_data = [self._map_scene_data(scene) for scene in scenes]
-        df_scenes = pl.DataFrame(scenes_data, schema=scenes_schema)
+        query = f"""
+        query FindScenesByOshash({declarations}) {{
+            {selections}
+        }}
+        fragment StashScene on Scene {{
+            {fragment}
+        }}
+        """
+        variables = {f"oshash{i}": oshash for i, oshash in enumerate(oshashes)}
+        result = self.stash.call_GQL(query, variables)
+        return [result[f"scene{i}"] for i in range(len(oshashes))]
 
-        return df_scenes
+    def find_scenes_by_studio(self, studio_ids: list[int], projection: str = "full") -> pl.DataFrame:
+        return self.find_scenes(
+            {"studios": {"value": studio_ids, "excludes": [], "modifier": "INCLUDES"}},
+            projection=projection,
+        )
 
-    def find_scenes_by_performers(self, performer_ids: list[int]) -> pl.DataFrame:
-        scenes = self.stash.find_scenes(
+    def find_scenes_by_performers(self, performer_ids: list[int], projection: str = "full") -> pl.DataFrame:
+        return self.find_scenes(
             {
                 "performers": {
                     "value": performer_ids,
@@ -658,45 +768,103 @@ class StashAppClient:
                     "modifier": "INCLUDES",
                 }
             },
-            fragment=scenes_fragment,
+            projection=projection,
         )
-        scenes_data = [self._map_scene_data(scene) for scene in scenes]
-        df_scenes = pl.DataFrame(scenes_data, schema=scenes_schema)
 
-        return df_scenes
+    def find_scenes(self, filter, projection: str = "full") -> pl.DataFrame:
+        chunks = list(self.iter_scenes(filter, projection=projection))
+        return pl.concat(chunks) if chunks else self._scenes_to_dataframe([], projection)
+
+    def iter_scenes(self, filter, projection: str = "full", per_page: int = 1000) -> Iterator[pl.DataFrame]:
+        """Find scenes matching a scene filter, one DataFrame per page.
 
-    def find_scenes(self, filter) -> pl.DataFrame:
-        scenes = self.stash.find_scenes(filter, fragment=scenes_fragment)
-        scenes_data = [self._map_scene_data(scene) for scene in scenes]
-        df_scenes = pl.DataFrame(scenes_data, schema=scenes_schema)
+        Only one page of scenes is held in memory at a time. Pages are sorted by scene ID
+        so that scenes do not move between pages while iterating.
+
+        Args:
+            filter: Stashapp SceneFilterType
+            projection: "minimal", "files" or "full", see scene_projections
+            per_page: Number of scenes per request and DataFrame
+
+        Yields:
+            DataFrames with the projection's columns of scenes_schema
+        """
+        for scenes in self.iter_scene_pages(filter, scene_projections[projection][0], per_page=per_page):
+            yield self._scenes_to_dataframe(scenes, projection)
+
+    def iter_scene_pages(self, filter, fragment: str, per_page: int = 1000) -> Iterator[list[dict]]:
+        """Find scenes matching a scene filter, one page of scene dicts at a time, sorted by scene ID.
+
+        Args:
+            filter: Stashapp SceneFilterType
+            fragment: Scene fields to request
+            per_page: Number of scenes per request
+
+        Yields:
+            Lists of at most per_page scenes
+        """
+        query = f"""
+        query IterScenes($scene_filter: SceneFilterType, $filter: FindFilterType) {{
+            findScenes(scene_filter: $scene_filter, filter: $filter) {{
+                count
+                scenes {{
+                    {fragment}
+                }}
+            }}
+        }}
+        """
+        page = 1
+        while True:
+            result = self.stash.call_GQL(
+                query,
+                {
+                    "scene_filter": filter,
+                    "filter": {"page": page, "per_page": per_page, "sort": "id", "direction": "ASC"},
+                },
+            )["findScenes"]
+            if result["scenes"]:
+                yield result["scenes"]
+            if len(result["scenes"]) < per_page or page * per_page >= result["count"]:
+                return
+            page += 1
+
+    def _scenes_to_dataframe(self, stash_scenes: list[dict], projection: str = "full") -> pl.DataFrame:
+        """Map Stashapp scenes to a DataFrame with the projection's columns of scenes_schema."""
+        columns = scene_projections[projection][1]
+        # Dates arrive as strings and are parsed for the whole column below
+        schema = {
+            column: pl.Utf8 if column in {"stashapp_date", "stashapp_created_at", "stashapp_updated_at"} else scenes_schema[column]
+            for column in columns
+        }
+        rows = []
+        for stash_scene in stash_scenes:
+            scene_data = self._map_scene_data(stash_scene)
+            rows.append({column: scene_data[column] for column in columns})
+
+        df_scenes = pl.DataFrame(rows, schema=schema)
+        if "stashapp_date" in schema:
+            df_scenes = df_scenes.with_columns(
+                pl.col("stashapp_date").str.to_date("%Y-%m-%d"),
+                # Stashapp returns local times with an offset, stored as naive UTC
+                pl.col("stashapp_created_at", "stashapp_updated_at")
+                .str.to_datetime(time_zone="UTC")
+                .dt.replace_time_zone(None)
+                .cast(scenes_schema["stashapp_created_at"]),
+            )
         return df_scenes
 
     def _map_scene_data(self, stash_scene):
+        primary_file = (stash_scene.get("files") or [{}])[0]
         scene_data = {
             "stashapp_id": int(stash_scene.get("id")),
             "stashapp_code": stash_scene.get("code", ""),
             "stashapp_title": stash_scene.get("title", ""),
             "stashapp_details": stash_scene.get("details", ""),
-            "stashapp_date": (
-                datetime.strptime(stash_scene.get("date", ""), "%Y-%m-%d").date()
-                if stash_scene.get("date")
-                else None
-            ),
+            # Dates are parsed for the whole column in _scenes_to_dataframe
+            "stashapp_date": stash_scene.get("date") or None,
             "stashapp_urls": stash_scene.get("urls", []),
-            "stashapp_created_at": (
-                datetime.fromisoformat(
-                    stash_scene.get("created_at").replace("Z", "+00:00")
-                )
-                if stash_scene.get("created_at")
-                else None
-            ),
-            "stashapp_updated_at": (
-                datetime.fromisoformat(
-                    stash_scene.get("updated_at").replace("Z", "+00:00")
-                )
-                if stash_scene.get("updated_at")
-                else None
-            ),
+            "stashapp_created_at": stash_scene.get("created_at") or None,
+            "stashapp_updated_at": stash_scene.get("updated_at") or None,
             "stashapp_performers": [
                 {
                     "stashapp_performers_id": int(p.get("id")),
@@ -756,40 +924,21 @@ class StashAppClient:
                 }
                 for f in stash_scene.get("files", [])
             ],
-            "stashapp_primary_file_path": stash_scene.get("files", [])[0].get(
-                "path", ""
-            ),
-            "stashapp_primary_file_basename": stash_scene.get("files", [])[0].get(
-                "basename", ""
-            ),
+            "stashapp_primary_file_path": primary_file.get("path", ""),
+            "stashapp_primary_file_basename": primary_file.get("basename", ""),
             "stashapp_primary_file_oshash": next(
-                (
-                    fp["value"]
-                    for fp in stash_scene.get("files", [])[0].get("fingerprints", [])
-                    if fp["type"] == "oshash"
-                ),
+                (fp["value"] for fp in primary_file.get("fingerprints", []) if fp["type"] == "oshash"),
                 None,
             ),
             "stashapp_primary_file_phash": next(
-                (
-                    fp["value"]
-                    for fp in stash_scene.get("files", [])[0].get("fingerprints", [])
-                    if fp["type"] == "phash"
-                ),
+                (fp["value"] for fp in primary_file.get("fingerprints", []) if fp["type"] == "phash"),
                 None,
             ),
             "stashapp_primary_file_xxhash": next(
-                (
-                    fp["value"]
-                    for fp in stash_scene.get("files", [])[0].get("fingerprints", [])
-                    if fp["type"] == "xxhash"
-                ),
+                (fp["value"] for fp in primary_file.get("fingerprints", []) if fp["type"] == "xxhash"),
                 None,
             ),
-            "stashapp_primary_file_duration": stash_scene.get("files", [])[0].get(
-                "duration", 0
-            )
-            * 1000,
+            "stashapp_primary_file_duration": primary_file.get("duration", 0) * 1000,
             "stashapp_tags": stash_scene.get("tags", []),
             "stashapp_organized": stash_scene.get("organized", False),
             "stashapp_interactive": stash_scene.get("interactive", False),
@@ -1200,17 +1349,29 @@ class StashAppClient:
         scene_ids: list[int],
         add_tag_names: list[str],
         remove_tag_names: list[str],
+        *,
+        dry_run: bool = False,
+        batch_size: int = 500,
     ):
         """Update tags for multiple scenes by adding and removing specified tags by name.
 
+        The current tags of all scenes are fetched batch_size scenes per request, scenes
+        needing the same change are grouped, and each group is updated with bulkSceneUpdate
+        in ADD and REMOVE mode.
+
         Args:
-            scene_ids: List of scene IDs to update
+            scene_ids: List of scene IDs to update, as ints or strings
             add_tag_names: List of tag names to add
             remove_tag_names: List of tag names to remove
+            dry_run: Print the planned mutations instead of applying them
+            batch_size: Number of scenes per findScenes and bulkSceneUpdate request
 
         Returns:
             Dict[int, bool]: Dictionary mapping scene IDs to success status
         """
+        # stashapi returns IDs as strings
+        scene_ids = [int(scene_id) for scene_id in scene_ids]
+
         # Get all tags at once
         all_tags = self.stash.find_tags(fragment="id name")
 
@@ -1218,47 +1379,52 @@ class StashAppClient:
         tag_lookup = {tag["name"]: tag for tag in all_tags}
 
         # Get all tags that need to be added
-        add_tags = []
+        add_tag_ids = set()
         for tag_name in add_tag_names:
             tag = tag_lookup.get(tag_name)
             if not tag:
                 print(f"Warning: Tag '{tag_name}' not found")
                 return dict.fromkeys(scene_ids, False)
-            add_tags.append(tag)
+            add_tag_ids.add(int(tag["id"]))
 
-        # Create set of tags to remove
-        remove_tag_names_set = set(remove_tag_names)
+        # Tags that do not exist cannot be on a scene, and added tags are kept
+        remove_tag_ids = {int(tag_lookup[name]["id"]) for name in remove_tag_names if name in tag_lookup} - add_tag_ids
 
+        # Group scenes by the tags they need added and removed
+        current_tags = {
+            int(scene["id"]): {int(tag["id"]) for tag in scene["tags"]}
+            for scene in self.find_scenes_by_ids(scene_ids, "id tags { id }", page_size=batch_size)
+        }
         results = {}
-
-        # Process each scene
+        groups = {}
         for scene_id in scene_ids:
-            scene = self.stash.find_scene(scene_id, fragment="id tags { id name }")
-
-            try:
-                # Build new tag list:
-                # 1. Keep existing tags that aren't in remove list
-                # 2. Add new tags
-                new_tag_ids = []
-
-                # Keep existing tags not marked for removal
-                for existing_tag in scene["tags"]:
-                    if existing_tag["name"] not in remove_tag_names_set:
-                        new_tag_ids.append(existing_tag["id"])
-
-                # Add new tags
-                for tag in add_tags:
-                    if tag["id"] not in new_tag_ids:  # Avoid duplicates
-                        new_tag_ids.append(tag["id"])
-
-                # Update the scene
-                self.stash.update_scene({"id": scene_id, "tag_ids": new_tag_ids})
-
-                results[scene_id] = True
-
-            except Exception as e:
-                print(f"Error updating scene {scene_id}: {e!s}")
+            if scene_id not in current_tags:
+                print(f"Error updating scene {scene_id}: scene not found")
                 results[scene_id] = False
+                continue
+            to_add = frozenset(add_tag_ids - current_tags[scene_id])
+            to_remove = frozenset(remove_tag_ids & current_tags[scene_id])
+            results[scene_id] = True
+            if to_add or to_remove:
+                groups.setdefault((to_add, to_remove), []).append(scene_id)
+
+        # One bulkSceneUpdate per mode, group and batch
+        tag_names = {int(tag["id"]): tag["name"] for tag in all_tags}
+        for (to_add, to_remove), group_scene_ids in groups.items():
+            for start in range(0, len(group_scene_ids), batch_size):
+                batch = group_scene_ids[start : start + batch_size]
+                for mode, tag_ids in (("ADD", to_add), ("REMOVE", to_remove)):
+                    if not tag_ids:
+                        continue
+                    if dry_run:
+                        names = ", ".join(sorted(tag_names[tag_id] for tag_id in tag_ids))
+                        print(f"bulkSceneUpdate {mode} [{names}] on {len(batch)} scene(s): {batch}")
+                        continue
+                    try:
+                        self.bulk_scene_update(batch, sorted(tag_ids), mode)
+                    except Exception as e:
+                        print(f"Error updating scenes {batch}: {e!s}")
+                        results.update(dict.fromkeys(batch, False))
 
         return results
 
@@ -1278,3 +1444,81 @@ class StashAppClient:
         }
 
         return self.stash.call_GQL(query, variables)
+
+    def scene_cover_matches(self, screenshot_url: str, checksum: str) -> bool:
+        """Check whether a scene's cover image has this MD5 checksum, without downloading it.
+
+        Stashapp serves images with the MD5 of the image as ETag and answers a matching
+        If-None-Match with 304 Not Modified.
+
+        Args:
+            screenshot_url: The scene's paths.screenshot URL
+            checksum: Hex MD5 of the image to compare with
+
+        Returns:
+            True if the cover matches, False if it differs or could not be checked
+        """
+        try:
+            with self.stash.s.get(screenshot_url, headers={"If-None-Match": f'"{checksum}"'}, stream=True, timeout=30) as response:
+                return response.status_code == 304 or response.headers.get("ETag", "").strip('"') == checksum
+        except requests.RequestException:
+            return False
+
+    def find_scenes_by_ids(self, scene_ids: list[int], fragment: str, page_size: int = 500) -> list[dict]:
+        """Fetch scenes by ID, page_size IDs per request.
+
+        Args:
+            scene_ids: Stashapp scene IDs
+            fragment: GraphQL fields to fetch for each scene
+            page_size: Number of IDs per findScenes request
+
+        Returns:
+            The scenes that exist, in Stashapp's order
+        """
+        query = f"""
+        query FindScenesByIds($ids: [ID!], $filter: FindFilterType) {{
+            findScenes(ids: $ids, filter: $filter) {{
+                scenes {{
+                    {fragment}
+                }}
+            }}
+        }}
+        """
+        scenes = []
+        for start in range(0, len(scene_ids), page_size):
+            page_ids = [str(scene_id) for scene_id in scene_ids[start : start + page_size]]
+            result = self.stash.call_GQL(query, {"ids": page_ids, "filter": {"per_page": -1}})
+            scenes.extend(result["findScenes"]["scenes"])
+        return scenes
+
+    def bulk_update_scenes(self, scene_ids: list[int], fields: dict):
+        """Set the same fields on many scenes with one bulkSceneUpdate.
+
+        Args:
+            scene_ids: Stashapp scene IDs
+            fields: BulkSceneUpdateInput fields, e.g. {"studio_id": 1} or
+                {"performer_ids": {"mode": "ADD", "ids": [1, 2]}}
+        """
+        query = """
+        mutation BulkSceneUpdate($input: BulkSceneUpdateInput!) {
+            bulkSceneUpdate(input: $input) {
+                id
+            }
+        }
+        """
+        return self.stash.call_GQL(query, {"input": {"ids": scene_ids, **fields}})
+
+    def update_scenes(self, updates: list[dict]):
+        """Apply different SceneUpdateInputs to many scenes with one scenesUpdate.
+
+        Args:
+            updates: SceneUpdateInput dicts, each with the scene "id"
+        """
+        query = """
+        mutation ScenesUpdate($input: [SceneUpdateInput!]!) {
+            scenesUpdate(input: $input) {
+                id
+            }
+        }
+        """
+        return self.stash.call_GQL(query, {"input": updates})
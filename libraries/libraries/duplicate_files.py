@@ -0,0 +1,217 @@
+"""Checks for Stashapp scenes with more than one file.
+
+All files of multi-file scenes are loaded once into a DataFrame with one row per file,
+and the duration, phash and codec checks run as Polars expressions over it.
+"""
+
+import polars as pl
+
+from libraries.client_stashapp import StashAppClient
+
+
+MULTIPLE_VERSIONS_TAG = "Scene: Multiple Versions"
+DURATION_MISMATCH_TAG = "Duplicate: Duration Mismatch"
+PHASH_MISMATCH_TAG = "Duplicate: Phash Mismatch"
+CODECS_DIFFER_TAG = "Duplicate: Video or Audio Formats Differ"
+
+# Tag applied to the scenes failing each check, by check column
+CHECK_TAGS = {
+    "duration_mismatch": DURATION_MISMATCH_TAG,
+    "phash_mismatch": PHASH_MISMATCH_TAG,
+    "codecs_differ": CODECS_DIFFER_TAG,
+}
+
+duplicate_files_fragment = """
+id
+title
+date
+studio { name }
+tags { name }
+files {
+    id
+    path
+    size
+    duration
+    width
+    height
+    format
+    video_codec
+    audio_codec
+    fingerprints { type value }
+}
+"""
+
+files_schema = {
+    "scene_id": pl.Int64,
+    "title": pl.Utf8,
+    "date": pl.Utf8,
+    "studio_name": pl.Utf8,
+    "tags": pl.List(pl.Utf8),
+    "file_id": pl.Int64,
+    "file_path": pl.Utf8,
+    "is_primary": pl.Boolean,
+    "size": pl.Int64,
+    "duration": pl.Float64,
+    "width": pl.Int64,
+    "height": pl.Int64,
+    "format": pl.Utf8,
+    "video_codec": pl.Utf8,
+    "audio_codec": pl.Utf8,
+    "oshash": pl.Utf8,
+    "phash": pl.Utf8,
+}
+
+
+def load_duplicate_files(client: StashAppClient, *, exclude_tag_names: list[str] | None = None, per_page: int = 500) -> pl.DataFrame:
+    """Load every file of the scenes with more than one file, one row per file.
+
+    Args:
+        client: Stashapp client
+        exclude_tag_names: Skip scenes with any of these tags, by default MULTIPLE_VERSIONS_TAG
+        per_page: Number of scenes per findScenes request
+
+    Returns:
+        DataFrame with files_schema, the primary file of a scene first
+    """
+    if exclude_tag_names is None:
+        exclude_tag_names = [MULTIPLE_VERSIONS_TAG]
+    tag_ids = {tag["name"]: tag["id"] for tag in client.stash.find_tags(fragment="id name")}
+    scene_filter = {"file_count": {"modifier": "GREATER_THAN", "value": 1}}
+    exclude_tag_ids = [tag_ids[name] for name in exclude_tag_names if name in tag_ids]
+    if exclude_tag_ids:
+        scene_filter["tags"] = {"value": [], "modifier": "INCLUDES", "excludes": exclude_tag_ids}
+
+    pages = [files_to_dataframe(scenes) for scenes in client.iter_scene_pages(scene_filter, duplicate_files_fragment, per_page=per_page)]
+    return pl.concat(pages) if pages else pl.DataFrame(schema=files_schema)
+
+
+def files_to_dataframe(scenes: list[dict]) -> pl.DataFrame:
+    """Flatten Stashapp scenes with duplicate_files_fragment to one row per file."""
+    rows = []
+    for scene in scenes:
+        for index, file in enumerate(scene["files"]):
+            fingerprints = {fingerprint["type"]: fingerprint["value"] for fingerprint in file["fingerprints"]}
+            rows.append(
+                {
+                    "scene_id": int(scene["id"]),
+                    "title": scene["title"],
+                    "date": scene["date"],
+                    "studio_name": scene["studio"]["name"] if scene["studio"] else None,
+                    "tags": [tag["name"] for tag in scene["tags"]],
+                    "file_id": int(file["id"]),
+                    "file_path": file["path"],
+                    "is_primary": index == 0,
+                    "size": file["size"],
+                    "duration": file["duration"],
+                    "width": file["width"],
+                    "height": file["height"],
+                    "format": file["format"],
+                    "video_codec": file["video_codec"],
+                    "audio_codec": file["audio_codec"],
+                    "oshash": fingerprints.get("oshash"),
+                    "phash": fingerprints.get("phash"),
+                }
+            )
+    return pl.DataFrame(rows, schema=files_schema)
+
+
+def phash_to_uint64(phash: pl.Expr) -> pl.Expr:
+    """Parse hex phashes to UInt64, null for missing or invalid phashes."""
+    return phash.str.to_integer(base=16, dtype=pl.UInt64, strict=False)
+
+
+def phash_distances(files: pl.DataFrame) -> pl.DataFrame:
+    """Hamming distance between the phashes of every pair of files of the same scene.
+
+    Returns:
+        DataFrame with scene_id, file_id, other_file_id and phash_distance, one row per pair
+    """
+    hashes = files.select("scene_id", "file_id", phash_to_uint64(pl.col("phash")).alias("phash")).drop_nulls("phash")
+    return (
+        hashes.join(hashes, on="scene_id", suffix="_other")
+        .filter(pl.col("file_id") < pl.col("file_id_other"))
+        .select(
+            "scene_id",
+            "file_id",
+            pl.col("file_id_other").alias("other_file_id"),
+            (pl.col("phash") ^ pl.col("phash_other")).bitwise_count_ones().cast(pl.Int64).alias("phash_distance"),
+        )
+    )
+
+
+def check_duplicate_files(files: pl.DataFrame, *, duration_tolerance: float = 1.0, phash_threshold: int = 8) -> pl.DataFrame:
+    """Run the duration, phash and codec checks for every scene in files.
+
+    Args:
+        files: Files as returned by load_duplicate_files
+        duration_tolerance: Largest difference in seconds between the longest and shortest file
+            of a scene that still counts as the same duration
+        phash_threshold: Largest phash distance between two files of a scene with matching
+            durations that still counts as the same video
+
+    Returns:
+        DataFrame with one row per scene and a boolean column per check in CHECK_TAGS
+    """
+    max_distances = phash_distances(files).group_by("scene_id").agg(pl.col("phash_distance").max().alias("max_phash_distance"))
+    return (
+        files.group_by("scene_id")
+        .agg(
+            pl.col("title").first(),
+            pl.col("tags").first(),
+            pl.len().alias("file_count"),
+            (pl.col("duration").max() - pl.col("duration").min()).alias("duration_delta"),
+            pl.col("video_codec").unique(maintain_order=True).alias("video_codecs"),
+            pl.col("audio_codec").unique(maintain_order=True).alias("audio_codecs"),
+        )
+        .join(max_distances, on="scene_id", how="left")
+        .with_columns(duration_mismatch=pl.col("duration_delta") > duration_tolerance)
+        .with_columns(
+            # Files of different lengths are expected to have different phashes
+            phash_mismatch=~pl.col("duration_mismatch") & (pl.col("max_phash_distance").fill_null(0) > phash_threshold),
+            codecs_differ=(pl.col("video_codecs").list.len() > 1) | (pl.col("audio_codecs").list.len() > 1),
+        )
+        .sort("scene_id")
+    )
+
+
+def apply_duplicate_tags(
+    client: StashAppClient, checks: pl.DataFrame, *, dry_run: bool = False, batch_size: int = 500
+) -> dict[str, tuple[int, int]]:
+    """Tag the scenes failing each check and untag the scenes passing it.
+
+    Only scenes whose tags change are updated, with one bulkSceneUpdate per tag, mode and
+    batch. Scenes still tagged with only one file left are untagged as well.
+
+    Args:
+        client: Stashapp client
+        checks: Checks as returned by check_duplicate_files
+        dry_run: Print the planned mutations instead of applying them
+        batch_size: Number of scenes per bulkSceneUpdate request
+
+    Returns:
+        Number of (tagged, untagged) scenes by tag name
+    """
+    tag_ids = {tag["name"]: int(tag["id"]) for tag in client.stash.find_tags(fragment="id name")}
+    counts = {}
+    for check, tag_name in CHECK_TAGS.items():
+        if tag_name not in tag_ids:
+            print(f"Warning: Tag '{tag_name}' not found")
+            continue
+        has_tag = pl.col("tags").list.contains(tag_name)
+        to_add = checks.filter(pl.col(check) & ~has_tag)["scene_id"].to_list()
+        to_remove = checks.filter(~pl.col(check) & has_tag)["scene_id"].to_list()
+        single_file_filter = {
+            "tags": {"value": [tag_ids[tag_name]], "modifier": "INCLUDES"},
+            "file_count": {"modifier": "EQUALS", "value": 1},
+        }
+        to_remove += [int(scene["id"]) for scenes in client.iter_scene_pages(single_file_filter, "id") for scene in scenes]
+
+        for mode, scene_ids in (("ADD", to_add), ("REMOVE", to_remove)):
+            for start in range(0, len(scene_ids), batch_size):
+                batch = scene_ids[start : start + batch_size]
+                if dry_run:
+                    print(f"bulkSceneUpdate {mode} [{tag_name}] on {len(batch)} scene(s): {batch}")
+                else:
+                    client.bulk_scene_update(batch, [tag_ids[tag_name]], mode)
+        counts[tag_name] = (len(to_add), len(to_remove))
+    return counts
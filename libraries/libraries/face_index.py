@@ -0,0 +1,221 @@
+"""Face embeddings of known performers for local nearest-neighbour identification.
+
+Embeddings (e.g. 512-dimensional InceptionResnetV1 vectors of verified faces) are stored
+L2-normalized in a memory-mapped float32 file, so cosine similarity is a dot product and a
+search is one matrix-vector product over the mapped rows. Which performer and source image
+each row belongs to is kept in SQLite next to it.
+"""
+
+import sqlite3
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from libraries.sqlite_store import SQLiteStore
+
+
+@dataclass
+class FaceMatch:
+    performer_id: str
+    performer_name: str
+    source: str  # Image the indexed face was embedded from
+    similarity: float  # Cosine similarity to the query
+
+
+@dataclass
+class IdentifiedPerformer:
+    performer_id: str
+    performer_name: str
+    similarity: float  # Best cosine similarity of the performer's faces among the neighbours
+    faces: int  # Number of the performer's faces among the neighbours
+
+
+class FaceIndex(SQLiteStore):
+    """Embeddings in <index_dir>/embeddings.f32, their metadata in <index_dir>/faces.db.
+
+    Row n of the embeddings file is the face with row n in SQLite. Additions write the
+    embeddings before committing their rows, so an interrupted addition leaves only unused
+    rows at the end of the file, overwritten by the next one. Additions take SQLite's write
+    lock, so several processes can add to and search the same index.
+    """
+
+    def __init__(self, index_dir: str | Path, dim: int = 512, timeout: float = 30.0):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.embeddings_path = self.index_dir / "embeddings.f32"
+        self.dim = dim
+        self._matrix: np.memmap | None = None
+
+        super().__init__(self.index_dir / "faces.db", timeout)
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS performers (
+                    performer_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS faces (
+                    row INTEGER PRIMARY KEY,
+                    performer_id TEXT NOT NULL REFERENCES performers (performer_id),
+                    source TEXT NOT NULL UNIQUE,
+                    added_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS faces_performer ON faces (performer_id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('dim', ?)", (str(dim),))
+            stored_dim = int(conn.execute("SELECT value FROM settings WHERE key = 'dim'").fetchone()[0])
+        if stored_dim != dim:
+            raise ValueError(f"{self.index_dir} holds {stored_dim}-dimensional embeddings, not {dim}")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COALESCE(MAX(row) + 1, 0) FROM faces").fetchone()[0]
+
+    def _rows(self, count: int) -> np.ndarray:
+        """The first count embeddings, remapping the file when it has grown"""
+        if self._matrix is None or len(self._matrix) < count:
+            capacity = self.embeddings_path.stat().st_size // (self.dim * 4) if self.embeddings_path.exists() else 0
+            self._matrix = np.memmap(self.embeddings_path, dtype=np.float32, mode="r", shape=(capacity, self.dim)) if capacity else None
+        return self._matrix[:count] if count else np.empty((0, self.dim), dtype=np.float32)
+
+    def _write_rows(self, start: int, embeddings: np.ndarray):
+        """Write embeddings from row start, doubling the file when it is too small"""
+        needed = start + len(embeddings)
+        capacity = self.embeddings_path.stat().st_size // (self.dim * 4) if self.embeddings_path.exists() else 0
+        if needed > capacity:
+            self._matrix = None  # Windows cannot resize a mapped file
+            with self.embeddings_path.open("ab") as f:
+                f.truncate(max(needed, capacity * 2, 1024) * self.dim * 4)
+        matrix = np.memmap(self.embeddings_path, dtype=np.float32, mode="r+", offset=start * self.dim * 4, shape=embeddings.shape)
+        matrix[:] = embeddings
+        matrix.flush()
+        del matrix
+
+    def _normalize(self, embeddings: np.ndarray | Sequence[Sequence[float]]) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1, norms)
+
+    def add(self, embeddings: np.ndarray, performer_id: str, performer_name: str, sources: Sequence[str]) -> int:
+        """Add a performer's face embeddings, skipping sources already in the index.
+
+        Args:
+            embeddings: One embedding per source, shape (len(sources), dim)
+            sources: Unique name of each face, usually the path of its image
+
+        Returns:
+            Number of added faces
+        """
+        embeddings = self._normalize(embeddings)
+        if len(embeddings) != len(sources):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(sources)} sources")
+
+        with self._transaction() as conn:
+            seen = self._indexed(conn, sources)
+            new = []
+            for i, source in enumerate(sources):
+                if source not in seen:
+                    seen.add(source)
+                    new.append(i)
+            if not new:
+                return 0
+            start = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM faces").fetchone()[0]
+            self._write_rows(start, embeddings[new])
+            conn.execute(
+                "INSERT INTO performers (performer_id, name) VALUES (?, ?) ON CONFLICT (performer_id) DO UPDATE SET name = excluded.name",
+                (performer_id, performer_name),
+            )
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO faces (row, performer_id, source, added_at) VALUES (?, ?, ?, ?)",
+                [(start + offset, performer_id, sources[i], now) for offset, i in enumerate(new)],
+            )
+        return len(new)
+
+    @staticmethod
+    def _indexed(conn: sqlite3.Connection, sources: Sequence[str]) -> set[str]:
+        indexed = set()
+        for start in range(0, len(sources), 500):
+            batch = list(sources[start : start + 500])
+            rows = conn.execute(f"SELECT source FROM faces WHERE source IN ({', '.join('?' * len(batch))})", batch)
+            indexed.update(row[0] for row in rows)
+        return indexed
+
+    def indexed_sources(self, sources: Sequence[str] | None = None) -> set[str]:
+        """The given sources that are in the index, or all indexed sources"""
+        conn = self._connection()
+        if sources is None:
+            return {row[0] for row in conn.execute("SELECT source FROM faces")}
+        return self._indexed(conn, sources)
+
+    def performers(self) -> dict[str, tuple[str, int]]:
+        """Name and number of faces of each indexed performer"""
+        rows = self._connection().execute(
+            "SELECT p.performer_id, p.name, COUNT(f.row) FROM performers p JOIN faces f USING (performer_id) GROUP BY p.performer_id"
+        )
+        return {performer_id: (name, count) for performer_id, name, count in rows}
+
+    def search(self, queries: np.ndarray | Sequence[Sequence[float]], k: int = 10) -> list[list[FaceMatch]]:
+        """The k most similar indexed faces to each query embedding, most similar first."""
+        queries = self._normalize(queries)
+        matrix = self._rows(len(self))
+        if not len(matrix) or not len(queries):
+            return [[] for _ in queries]
+
+        similarities = queries @ matrix.T
+        k = min(k, len(matrix))
+        nearest = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarities, nearest, axis=1), axis=1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+
+        rows = sorted({int(row) for row in nearest.ravel()})
+        metadata = {}
+        conn = self._connection()
+        for start in range(0, len(rows), 500):
+            batch = rows[start : start + 500]
+            for row, performer_id, name, source in conn.execute(
+                f"""
+                SELECT f.row, f.performer_id, p.name, f.source FROM faces f JOIN performers p USING (performer_id)
+                WHERE f.row IN ({", ".join("?" * len(batch))})
+                """,
+                batch,
+            ):
+                metadata[row] = (performer_id, name, source)
+
+        return [
+            [FaceMatch(*metadata[int(row)], similarity=float(similarities[query, row])) for row in nearest[query]]
+            for query in range(len(queries))
+        ]
+
+    def identify(
+        self, queries: np.ndarray | Sequence[Sequence[float]], *, k: int = 20, top: int = 3, min_similarity: float = 0.0
+    ) -> list[list[IdentifiedPerformer]]:
+        """The performers of each query's k nearest faces, ranked by their best similarity.
+
+        Neighbours below min_similarity are ignored, so a query may identify no performer.
+        """
+        results = []
+        for matches in self.search(queries, k):
+            performers: dict[str, IdentifiedPerformer] = {}
+            for match in matches:
+                if match.similarity < min_similarity:
+                    continue
+                performer = performers.setdefault(
+                    match.performer_id, IdentifiedPerformer(match.performer_id, match.performer_name, match.similarity, 0)
+                )
+                performer.faces += 1
+            results.append(sorted(performers.values(), key=lambda performer: (-performer.similarity, -performer.faces))[:top])
+        return results
+
+    def close(self):
+        """Close this thread's connection and the mapped embeddings"""
+        self._matrix = None
+        super().close()
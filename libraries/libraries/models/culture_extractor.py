@@ -189,6 +189,7 @@ class Performer(Base):
             ondelete="CASCADE",
         ),
         Index("ix_performers_site_uuid", "site_uuid"),
+        Index("ix_performers_site_uuid_short_name", "site_uuid", "short_name", unique=True),
     )
 
     uuid: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True))
@@ -221,6 +222,7 @@ class Tag(Base):
             ondelete="CASCADE",
         ),
         Index("ix_tags_site_uuid", "site_uuid"),
+        Index("ix_tags_site_uuid_short_name", "site_uuid", "short_name", unique=True),
     )
 
     uuid: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True))
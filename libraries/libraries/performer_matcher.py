@@ -32,6 +32,81 @@ class PerformerMatcher:
         self.matches: list[PerformerMatch] = []
         self.all_stashapp_performers = all_stashapp_performers
 
+        # Index of all Stashapp performers, built once
+        self._all_performers_list: list[dict] = []
+        self._exact_index: dict[str, list[int]] = {}  # normalized name/alias -> positions
+        self._trigram_index: dict[str, list[int]] = {}  # trigram -> positions with a name/alias containing it
+        self._prefix_index: dict[str, list[int]] = {}  # first trigram of a name/alias -> positions
+        self._short_positions: list[int] = []  # positions with a name/alias shorter than a trigram
+        self._stashdb_performers: dict[str, tuple[int, str]] = {}  # StashDB UUID -> (Stashapp ID, name)
+        if all_stashapp_performers is not None:
+            self._build_index()
+
+    def _build_index(self) -> None:
+        """Index all Stashapp performers by normalized name/alias, trigram and StashDB UUID"""
+        for position, row in enumerate(self.all_stashapp_performers.iter_rows(named=True)):
+            self._all_performers_list.append({
+                "stashapp_performers_id": row["stashapp_id"],
+                "stashapp_performers_name": row["stashapp_name"],
+                "stashapp_performers_alias_list": row["stashapp_alias_list"],
+                "stashapp_performers_gender": row["stashapp_gender"],
+                "stashapp_performers_stash_ids": row["stashapp_stash_ids"]
+            })
+
+            for stash_id in row["stashapp_stash_ids"]:
+                if stash_id["endpoint"] == "https://stashdb.org/graphql":
+                    # Later rows win, like the previous linear scan
+                    self._stashdb_performers[stash_id["stash_id"]] = (row["stashapp_id"], row["stashapp_name"])
+
+            names = {row["stashapp_name"].lower().strip()}
+            names.update(alias.lower().strip() for alias in row["stashapp_alias_list"])
+            trigrams = set()
+            for name in names:
+                self._exact_index.setdefault(name, []).append(position)
+                if len(name) < 3:
+                    self._short_positions.append(position)
+                    continue
+                self._prefix_index.setdefault(name[:3], []).append(position)
+                trigrams.update(self._trigrams(name))
+            for trigram in trigrams:
+                self._trigram_index.setdefault(trigram, []).append(position)
+
+    @staticmethod
+    def _trigrams(name: str) -> set[str]:
+        return {name[i:i + 3] for i in range(len(name) - 2)}
+
+    def _positions_to_performers(self, positions: set[int]) -> list[dict]:
+        # Keep the original order so ties are resolved like a scan over the full list
+        return [self._all_performers_list[position] for position in sorted(positions)]
+
+    def _exact_candidates(self, ce_performers: list[dict]) -> list[dict]:
+        """All Stashapp performers whose normalized name or alias equals one of the CE performers' names"""
+        positions = set()
+        for ce_perf in ce_performers:
+            positions.update(self._exact_index.get(ce_perf["name"].lower().strip(), ()))
+        return self._positions_to_performers(positions)
+
+    def _candidate_performers(self, ce_name: str) -> list[dict]:
+        """
+        All Stashapp performers with a non-zero match confidence for ce_name.
+
+        A name or alias X can only match if X contains ce_name (then X contains ce_name's rarest
+        trigram), ce_name contains X (then X's first trigram is one of ce_name's trigrams) or X is
+        too short to have trigrams.
+        """
+        name = ce_name.lower().strip()
+        if len(name) < 3:
+            # Very short names are contained in almost anything
+            return self._all_performers_list
+
+        trigrams = self._trigrams(name)
+        rarest = min(trigrams, key=lambda trigram: len(self._trigram_index.get(trigram, ())))
+        positions = set(self._short_positions)
+        positions.update(self._trigram_index.get(rarest, ()))
+        for trigram in trigrams:
+            positions.update(self._prefix_index.get(trigram, ()))
+        return self._positions_to_performers(positions)
+
     def match_performers(self,
                         ce_performers: pl.Series,
                         stashapp_performers: pl.Series,
@@ -95,20 +170,13 @@ class PerformerMatcher:
 
             # Third try: Match remaining with all known Stashapp performers
             if remaining_ce and self.all_stashapp_performers is not None:
-                all_performers_list = [
-                    {
-                        "stashapp_performers_id": row["stashapp_id"],
-                        "stashapp_performers_name": row["stashapp_name"],
-                        "stashapp_performers_alias_list": row["stashapp_alias_list"],
-                        "stashapp_performers_gender": row["stashapp_gender"],
-                        "stashapp_performers_stash_ids": row["stashapp_stash_ids"]
-                    }
-                    for row in self.all_stashapp_performers.iter_rows(named=True)
-                ]
+                # Global matches need a confidence of 0.9, which even with the scene context boost
+                # only exact name or alias matches reach, so only those performers are candidates
+                global_candidates = self._exact_candidates(remaining_ce)
 
                 global_matches = self._match_scene_performers(
                     remaining_ce,
-                    all_performers_list,
+                    global_candidates,
                     "stashapp_all",
                     min_confidence=0.9  # Higher threshold for global matches
                 )
@@ -200,18 +268,8 @@ class PerformerMatcher:
                 if source == "stashdb_scene":
                     stashdb_uuid = perf["id"]
                     stashdb_name = perf["name"]
-                    stashapp_id = -1
-                    stashapp_name = ""
-
                     # Try to find matching Stashapp performer
-                    if self.all_stashapp_performers is not None:
-                        for row in self.all_stashapp_performers.iter_rows(named=True):
-                            for stash_id in row["stashapp_stash_ids"]:
-                                if (stash_id["endpoint"] == "https://stashdb.org/graphql" and
-                                    stash_id["stash_id"] == stashdb_uuid):
-                                    stashapp_id = row["stashapp_id"]
-                                    stashapp_name = row["stashapp_name"]
-                                    break
+                    stashapp_id, stashapp_name = self._stashdb_performers.get(stashdb_uuid, (-1, ""))
                 else:
                     stashapp_id = perf["stashapp_performers_id"]
                     stashapp_name = perf["stashapp_performers_name"]
@@ -330,16 +388,6 @@ class PerformerMatcher:
 
         matches = []
 
-        # Convert all Stashapp performers to list format for matching
-        all_performers_list = [
-            {
-                "stashapp_performers_id": row["stashapp_id"],
-                "stashapp_performers_name": row["stashapp_name"],
-                "stashapp_performers_alias_list": row["stashapp_alias_list"],
-            }
-            for row in self.all_stashapp_performers.iter_rows(named=True)
-        ]
-
         # Try to match each unmatched performer
         for row in unmatched_performers.iter_rows(named=True):
             ce_performer = {
@@ -350,7 +398,7 @@ class PerformerMatcher:
             best_match = None
             best_confidence = 0.5  # Minimum confidence threshold for unmatched performers
 
-            for perf in all_performers_list:
+            for perf in self._candidate_performers(ce_performer["name"]):
                 confidence, reason = self._calculate_match_confidence(
                     ce_performer["name"],
                     perf["stashapp_performers_name"],
@@ -1,69 +1,89 @@
 from dataclasses import dataclass
 
+import numpy as np
+
 
 @dataclass
 class SceneMatcher:
     MAX_DISTANCE: int = 16
     MAX_DURATION_DIFF_SECS: int = 60
+    # Upper bound on input scenes x fingerprints distances held in memory at once
+    CHUNK_ELEMENTS: int = 4_000_000
 
     def _hamming_distance(self, hash1: str, hash2: str) -> int:
         """Calculate the Hamming distance between two hex strings."""
-        bin1 = bin(int(hash1, 16))[2:].zfill(64)
-        bin2 = bin(int(hash2, 16))[2:].zfill(64)
-        return sum(b1 != b2 for b1, b2 in zip(bin1, bin2, strict=False))
+        return (int(hash1, 16) ^ int(hash2, 16)).bit_count()
+
+    @staticmethod
+    def _phash_array(hashes: list[str]) -> np.ndarray:
+        """Convert hex phashes to a uint64 array."""
+        return np.fromiter((int(h, 16) for h in hashes), dtype=np.uint64, count=len(hashes))
 
     def match_scenes(self, input_scenes: list[dict], stashdb_scenes: list[dict]) -> dict[str, dict | None]:
         """
         Match input scenes to StashDB scenes using phash and duration.
+
+        For every input scene the StashDB scene with the closest PHASH fingerprint wins. Ties are
+        broken by a quality score: the weighted share of the scene's PHASH fingerprints that are
+        within MAX_DISTANCE and MAX_DURATION_DIFF_SECS of the input scene. Remaining ties go to
+        the scene listed first.
+
+        All fingerprints are flattened into uint64 arrays once, and distances for a chunk of input
+        scenes are computed at once with XOR + popcount.
         """
+        # Flatten PHASH fingerprints, grouped per StashDB scene
+        scene_indices = []
+        scene_starts = []
+        fp_hashes = []
+        fp_durations = []
+        for scene_index, stashdb_scene in enumerate(stashdb_scenes):
+            phash_fingerprints = [f for f in stashdb_scene["fingerprints"] if f["algorithm"] == "PHASH"]
+            if not phash_fingerprints:
+                continue
+            scene_indices.append(scene_index)
+            scene_starts.append(len(fp_hashes))
+            for fingerprint in phash_fingerprints:
+                fp_hashes.append(fingerprint["hash"])
+                # Fingerprints without a duration never pass the duration check
+                fp_durations.append(fingerprint.get("duration") or np.nan)
+
+        if not scene_indices:
+            return {input_scene["phash"]: None for input_scene in input_scenes}
+
+        fp_phashes = self._phash_array(fp_hashes)
+        fp_durations = np.asarray(fp_durations, dtype=np.float64)
+        starts = np.asarray(scene_starts, dtype=np.intp)
+        fp_counts = np.diff(np.append(starts, len(fp_hashes)))
+        # Quality is sum(weight) / count with weight = (MAX_DISTANCE + 1 - distance) / (MAX_DISTANCE + 1);
+        # the numerator is accumulated as integers so equal scores compare equal
+        quality_denominators = fp_counts * (self.MAX_DISTANCE + 1)
+
+        input_phashes = self._phash_array([input_scene["phash"] for input_scene in input_scenes])
+        input_durations = np.asarray(
+            [input_scene.get("duration") or np.nan for input_scene in input_scenes], dtype=np.float64
+        )
+
         phash_to_scene = {}
+        chunk_size = max(1, self.CHUNK_ELEMENTS // len(fp_hashes))
+        for chunk_start in range(0, len(input_scenes), chunk_size):
+            chunk = slice(chunk_start, chunk_start + chunk_size)
+            distances = np.bitwise_count(input_phashes[chunk, None] ^ fp_phashes[None, :]).astype(np.int64)
+
+            with np.errstate(invalid="ignore"):
+                duration_ok = np.abs(input_durations[chunk, None] - fp_durations[None, :]) <= self.MAX_DURATION_DIFF_SECS
+            qualifying = (distances <= self.MAX_DISTANCE) & duration_ok
+            numerators = np.where(qualifying, self.MAX_DISTANCE + 1 - distances, 0)
+
+            min_distances = np.minimum.reduceat(distances, starts, axis=1)
+            quality = np.add.reduceat(numerators, starts, axis=1) / quality_denominators
+
+            best_distances = min_distances.min(axis=1, keepdims=True)
+            # argmax returns the first scene among the closest ones with the best quality
+            candidates = np.where(min_distances == best_distances, quality, -1.0)
+            best = candidates.argmax(axis=1)
 
-        for input_scene in input_scenes:
-            matching_scene = None
-            min_distance = float("inf")
-            max_quality_score = 0.0  # Higher score = better match
-            input_duration = input_scene.get("duration")
-
-            for stashdb_scene in stashdb_scenes:
-                phash_fingerprints = [f for f in stashdb_scene["fingerprints"]
-                                    if f["algorithm"] == "PHASH"]
-
-                # Calculate quality score for this scene
-                quality_score = 0
-                min_scene_distance = float("inf")
-
-                for fingerprint in phash_fingerprints:
-                    distance = self._hamming_distance(input_scene["phash"], fingerprint["hash"])
-                    min_scene_distance = min(min_scene_distance, distance)
-
-                    # Only consider fingerprints within MAX_DISTANCE
-                    if distance <= self.MAX_DISTANCE:
-                        fingerprint_duration = fingerprint.get("duration")
-                        duration_diff = float("inf")
-
-                        if input_duration and fingerprint_duration:
-                            duration_diff = abs(input_duration - fingerprint_duration)
-
-                        if duration_diff <= self.MAX_DURATION_DIFF_SECS:
-                            # Weight the fingerprint based on how close it matches
-                            # Distance 0 = weight 1.0
-                            # Distance MAX_DISTANCE = weight close to 0
-                            weight = 1.0 - (distance / (self.MAX_DISTANCE + 1))
-                            quality_score += weight
-
-                # Normalize quality score by number of fingerprints
-                if phash_fingerprints:
-                    quality_score = quality_score / len(phash_fingerprints)
-
-                    # Update match if:
-                    # 1. This is the closest phash match yet, or
-                    # 2. Equal min distance but better quality score
-                    if (min_scene_distance < min_distance or
-                        (min_scene_distance == min_distance and quality_score > max_quality_score)):
-                        min_distance = min_scene_distance
-                        max_quality_score = quality_score
-                        matching_scene = stashdb_scene
-
-            phash_to_scene[input_scene["phash"]] = matching_scene
+            for offset, best_index in enumerate(best):
+                input_scene = input_scenes[chunk_start + offset]
+                phash_to_scene[input_scene["phash"]] = stashdb_scenes[scene_indices[best_index]]
 
         return phash_to_scene
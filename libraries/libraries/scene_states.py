@@ -1,8 +1,13 @@
 import json
+import platform
+import sqlite3
 import time
+from collections.abc import Callable
 from enum import Enum
 from pathlib import Path
 
+from libraries.sqlite_store import SQLiteStore
+
 
 class SceneState(Enum):
     PENDING = "1_pending"  # JSON files waiting to be processed
@@ -14,8 +19,186 @@ class SceneState(Enum):
     FAILED = "7_failed"
     NO_FACES_FOUND = "8_no_faces_found"  # Add this line
 
+
+# SQLite's locks and WAL index do not work on these, e.g. H: mounted in WSL2 over 9P
+NETWORK_FILESYSTEMS = {"9p", "drvfs", "cifs", "smb3", "nfs", "nfs4", "fuse.sshfs"}
+
+
+def current_os() -> str:
+    """windows, wsl, linux or darwin"""
+    system = platform.system().lower()
+    if system == "linux" and "microsoft" in platform.release().lower():
+        return "wsl"
+    return system
+
+
+def filesystem_type(path: Path) -> str | None:
+    """Type of the filesystem path is on, from /proc/self/mounts, None where there is none"""
+    mounts = Path("/proc/self/mounts")
+    if not mounts.exists():
+        return None
+    path = path.resolve()
+    best, fs_type = None, None
+    for line in mounts.read_text().splitlines():
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        mount_point = Path(fields[1].replace("\\040", " "))
+        if path.is_relative_to(mount_point) and (best is None or len(mount_point.parts) > len(best.parts)):
+            best, fs_type = mount_point, fields[2]
+    return fs_type
+
+
+class SceneStateStore(SQLiteStore):
+    """Scene states in SQLite, shared by every process working on a dataset.
+
+    Each state change is a single-row upsert. claim_next moves one scene from a state to
+    another in one transaction, so workers sharing a state as their queue never get the
+    same scene.
+
+    WAL and SQLite's file locks only work between processes on one OS with the database on
+    a local disk, so every worker has to run on the OS that created the database: all on
+    Windows, or all in WSL2 with the database on the WSL2 filesystem. The OS is recorded
+    in <db_path>.os, and opening the database from another OS or over 9P, SMB or NFS fails.
+    """
+
+    def __init__(self, db_path: Path, timeout: float = 30.0):
+        self.db_path = Path(db_path)
+        self._check_os()
+        super().__init__(self.db_path, timeout)
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS scene_states (
+                    scene_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    worker TEXT,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scene_states_state ON scene_states (state, updated_at)")
+
+    def _check_os(self):
+        """Refuse a database on a network filesystem or created on another OS"""
+        fs_type = filesystem_type(self.db_path.parent)
+        if fs_type in NETWORK_FILESYSTEMS:
+            raise RuntimeError(
+                f"{self.db_path} is on a {fs_type} filesystem, where SQLite locking does not work. "
+                "Run every worker on the OS the dataset's disk belongs to, or keep the database on a local disk"
+            )
+        os_path = self.db_path.with_name(f"{self.db_path.name}.os")
+        os_name = current_os()
+        if not os_path.exists():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            os_path.write_text(os_name)
+        elif (created_on := os_path.read_text().strip()) != os_name:
+            raise RuntimeError(f"{self.db_path} is used from {created_on}, run every worker of the dataset there (this is {os_name})")
+
+    def get(self, scene_id: str) -> SceneState | None:
+        """Current state of a scene, None if it has none"""
+        row = self._connection().execute("SELECT state FROM scene_states WHERE scene_id = ?", (scene_id,)).fetchone()
+        return SceneState(row[0]) if row else None
+
+    def set(self, scene_id: str, state: SceneState, worker: str | None = None):
+        """Set a scene's state"""
+        self.set_many({scene_id: state}, worker)
+
+    def set_many(self, states: dict[str, SceneState], worker: str | None = None):
+        """Set the states of many scenes in one transaction"""
+        with self._transaction() as conn:
+            self._upsert(conn, states, worker)
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, states: dict[str, SceneState], worker: str | None):
+        now = time.time()
+        conn.executemany(
+            """
+            INSERT INTO scene_states (scene_id, state, worker, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (scene_id) DO UPDATE SET state = excluded.state, worker = excluded.worker, updated_at = excluded.updated_at
+            """,
+            [(scene_id, state.value, worker, now) for scene_id, state in states.items()],
+        )
+
+    def import_once(self, source: Path, read_states: Callable[[Path], dict[str, SceneState]]) -> int | None:
+        """Set the states read from source and rename it to <source>.migrated, in one transaction.
+
+        Processes starting at the same time wait for the first one, and then find source gone.
+
+        Returns:
+            Number of imported scenes, None if source no longer exists
+        """
+        migrated = source.with_name(f"{source.name}.migrated")
+        renamed = False
+        try:
+            with self._transaction() as conn:
+                if not source.exists():
+                    return None
+                states = read_states(source)
+                self._upsert(conn, states, None)
+                source.rename(migrated)
+                renamed = True
+        except BaseException:
+            # Not committed, so the next process migrates again
+            if renamed:
+                migrated.rename(source)
+            raise
+        return len(states)
+
+    def claim_next(self, from_state: SceneState, to_state: SceneState, worker: str) -> str | None:
+        """Move the scene longest in from_state to to_state for worker.
+
+        Returns:
+            The claimed scene ID, None if no scene is in from_state
+        """
+        # The write lock is taken before reading, so two workers cannot pick the same scene
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT scene_id FROM scene_states WHERE state = ? ORDER BY updated_at, scene_id LIMIT 1", (from_state.value,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE scene_states SET state = ?, worker = ?, updated_at = ? WHERE scene_id = ?",
+                    (to_state.value, worker, time.time(), row[0]),
+                )
+        return row[0] if row else None
+
+    def release_claims(self, claimed_state: SceneState, back_to: SceneState, worker: str | None = None) -> int:
+        """Return scenes claimed by a worker that stopped, or by any worker, to back_to.
+
+        Returns:
+            Number of released scenes
+        """
+        query = "UPDATE scene_states SET state = ?, worker = NULL, updated_at = ? WHERE state = ?"
+        params = [back_to.value, time.time(), claimed_state.value]
+        if worker is not None:
+            query += " AND worker = ?"
+            params.append(worker)
+        with self._transaction() as conn:
+            return conn.execute(query, params).rowcount
+
+    def scene_ids(self, state: SceneState) -> list[str]:
+        """IDs of the scenes in a state, longest in it first"""
+        rows = self._connection().execute(
+            "SELECT scene_id FROM scene_states WHERE state = ? ORDER BY updated_at, scene_id", (state.value,)
+        )
+        return [row[0] for row in rows]
+
+    def counts(self) -> dict[SceneState, int]:
+        """Number of scenes per state"""
+        rows = self._connection().execute("SELECT state, COUNT(*) FROM scene_states GROUP BY state")
+        return {SceneState(state): count for state, count in rows}
+
+
 class DatasetStructure:
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, state_db: str | Path | None = None):
+        """Directories of a face dataset and its scene states.
+
+        Args:
+            base_dir: Base directory of the dataset
+            state_db: Scene state database (default: <base_dir>/metadata/scene_states.db). Every
+                worker of the dataset has to run on the OS that created it, see SceneStateStore
+        """
         self.base_dir = Path(base_dir)
 
         # Scene processing states
@@ -25,39 +208,61 @@ class DatasetStructure:
         # Permanent metadata storage
         self.metadata = self.base_dir / "metadata"
         self.scene_data = self.metadata / "scenes"  # Individual scene JSON files
-        self.dataset_info = self.metadata / "dataset.json"  # Global dataset info
+        self.dataset_info = self.metadata / "dataset.json"  # Scene states before scene_states.db
 
         # Create all directories
         for dir in self.scenes.values():
             dir.mkdir(parents=True, exist_ok=True)
         self.scene_data.mkdir(parents=True, exist_ok=True)
 
-        # Load or initialize dataset info
-        self.load_dataset_info()
-
-    def load_dataset_info(self):
-        """Load or initialize dataset info tracking processed scenes"""
+        # Scene states, shared with the other processes working on this dataset
+        self.states = SceneStateStore(Path(state_db) if state_db else self.metadata / "scene_states.db")
         if self.dataset_info.exists():
-            with self.dataset_info.open("r") as f:
-                self.info = json.load(f)
-        else:
-            self.info = {
-                "processed_scenes": {},  # scene_id -> current_state
-                "last_updated": None
-            }
-            self.save_dataset_info()
-
-    def save_dataset_info(self):
-        """Save dataset info"""
-        self.info["last_updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
-        with self.dataset_info.open("w") as f:
-            json.dump(self.info, f, indent=2)
+            self.migrate_dataset_info()
+
+    def migrate_dataset_info(self) -> int | None:
+        """Move scene states from dataset.json and the state directories into the state store.
+
+        States in dataset.json are overridden by the directory a scene is in, except that a
+        failed directory only counts for scenes without another state. Pending and
+        extracting-frames scenes get no state, as the frame extractor redoes them from their
+        pending JSON. dataset.json is renamed to dataset.json.migrated in the same transaction,
+        so only the first of several processes starting at once migrates.
+
+        Returns:
+            Number of migrated scenes, None if another process migrated them
+        """
+        migrated = self.states.import_once(self.dataset_info, self._read_dataset_info)
+        if migrated is not None:
+            print(f"Migrated {migrated} scene states from {self.dataset_info.name} to {self.states.db_path.name}")
+        return migrated
+
+    def _read_dataset_info(self, dataset_info: Path) -> dict[str, SceneState]:
+        with dataset_info.open("r") as f:
+            states = {scene_id: SceneState(state) for scene_id, state in json.load(f)["processed_scenes"].items()}
+
+        skipped = {SceneState.PENDING, SceneState.EXTRACTING_FRAMES, SceneState.FAILED}
+        for state in SceneState:
+            if state in skipped:
+                continue
+            for entry in self.scenes[state.value].iterdir():
+                states[entry.name.removesuffix(".tar")] = state
+        for entry in self.scenes[SceneState.FAILED.value].iterdir():
+            states.setdefault(entry.name, SceneState.FAILED)
+        return states
+
+    def get_scene_state(self, scene_id: str) -> SceneState | None:
+        """Get scene's processing state, None if it has not been processed"""
+        return self.states.get(scene_id)
 
     def is_scene_processed(self, scene_id: str) -> bool:
         """Check if scene has been processed before"""
-        return scene_id in self.info["processed_scenes"]
+        return self.states.get(scene_id) is not None
 
-    def update_scene_state(self, scene_id: str, state: SceneState):
+    def update_scene_state(self, scene_id: str, state: SceneState, worker: str | None = None):
         """Update scene's processing state"""
-        self.info["processed_scenes"][scene_id] = state.value
-        self.save_dataset_info()
+        self.states.set(scene_id, state, worker)
+
+    def claim_next_scene(self, from_state: SceneState, to_state: SceneState, worker: str) -> str | None:
+        """Claim the next scene in from_state for worker by moving it to to_state"""
+        return self.states.claim_next(from_state, to_state, worker)
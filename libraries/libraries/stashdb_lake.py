@@ -1,22 +1,62 @@
 """Delta Lake client for StashDB data storage with time-travel support."""
 
+import bisect
 import json
-from datetime import UTC, datetime
+import time
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
 from pathlib import Path
 
 import polars as pl
-from deltalake import DeltaTable, write_deltalake
+from deltalake import DeltaTable, WriterProperties, write_deltalake
 
 
-class StashDbLake:
-    """Client for reading/writing StashDB data to Delta Lake tables."""
+SCENE_PARTITION_COLUMNS = ("studio_id", "release_year")
+# Small row groups let scans skip most of a file using row group min/max statistics
+ROW_GROUP_SIZE = 8192
+CHANGE_DATA_FEED = "delta.enableChangeDataFeed"
+# Delta Lake's default deleted file retention (7 days)
+DEFAULT_RETENTION_HOURS = 168
+
+
+@dataclass
+class TableMaintenance:
+    """Result of maintaining one Delta table."""
 
-    def __init__(self, base_path: str = "data/stashdb"):
+    table: str
+    files_before: int
+    files_after: int
+    files_vacuumed: int
+    version: int
+
+
+class StashDbLake:
+    """Client for reading/writing StashDB data to Delta Lake tables.
+
+    Reads go through lazy scans so id, studio and date filters are pushed down to the
+    Delta/Parquet reader, which skips files and row groups using their statistics.
+    """
+
+    def __init__(self, base_path: str = "data/stashdb", scene_partition_by: str | None = None):
+        """
+        Args:
+            base_path: Base directory of the Delta tables
+            scene_partition_by: Partition column for a newly created scenes table,
+                "studio_id" or "release_year". Existing tables keep their layout.
+        """
+        if scene_partition_by is not None and scene_partition_by not in SCENE_PARTITION_COLUMNS:
+            raise ValueError(
+                f"Invalid scene_partition_by: {scene_partition_by}. Must be one of {', '.join(SCENE_PARTITION_COLUMNS)}"
+            )
         self.base_path = Path(base_path)
+        self.scene_partition_by = scene_partition_by
+        # Table URI -> (commit timestamps, versions), both sorted by version
+        self._version_index: dict[str, tuple[list[datetime], list[int]]] = {}
         self.scenes_path = self.base_path / "scenes"
         self.performers_path = self.base_path / "performers"
         self.studios_path = self.base_path / "studios"
         self.tags_path = self.base_path / "tags"
+        self.crawl_state_path = self.base_path / "crawl_state"
 
     def _ensure_dirs(self) -> None:
         """Create base directories if they don't exist."""
@@ -26,6 +66,27 @@ class StashDbLake:
         """Check if a Delta table exists at the given path."""
         return (path / "_delta_log").exists()
 
+    def _partition_columns(self, path: Path) -> list[str]:
+        """Partition columns of an existing table."""
+        return DeltaTable(str(path)).metadata().partition_columns
+
+    def _scan(self, path: Path, as_of: datetime | None = None) -> pl.LazyFrame:
+        """Lazily scan a table, optionally at a specific point in time."""
+        version = None
+        if as_of:
+            version = self._get_version_at_timestamp(DeltaTable(str(path)), as_of)
+        return pl.scan_delta(str(path), version=version)
+
+    def _read(self, path: Path, as_of: datetime | None, ids: list[str] | None) -> pl.DataFrame:
+        """Read a table with an optional id filter pushed down to the scan."""
+        if not self._table_exists(path):
+            return pl.DataFrame()
+
+        lf = self._scan(path, as_of)
+        if ids:
+            lf = lf.filter(pl.col("id").is_in(ids))
+        return lf.collect()
+
     # -------------------------------------------------------------------------
     # Scenes
     # -------------------------------------------------------------------------
@@ -64,56 +125,105 @@ class StashDbLake:
             pl.col("parent_studio_id").cast(pl.Utf8),
         ])
 
-        self._write_or_merge(df, self.scenes_path, "id")
+        if self._table_exists(self.scenes_path):
+            partition_by = self._partition_columns(self.scenes_path)
+        else:
+            partition_by = [self.scene_partition_by] if self.scene_partition_by else []
+        if "release_year" in partition_by:
+            df = df.with_columns(pl.col("release_date").dt.year().alias("release_year"))
+
+        self._write_or_merge(df, self.scenes_path, "id", partition_by=partition_by or None)
 
     def get_scenes(
         self,
         as_of: datetime | None = None,
         scene_ids: list[str] | None = None,
+        studio_ids: list[str] | None = None,
+        released_from: date | None = None,
+        released_to: date | None = None,
     ) -> pl.DataFrame:
-        """Query scenes, optionally at a specific point in time."""
+        """Query scenes, optionally at a specific point in time.
+
+        Args:
+            as_of: Read the table as it was at this time
+            scene_ids: Only these scene IDs
+            studio_ids: Only scenes of these studios
+            released_from: Only scenes released on or after this date
+            released_to: Only scenes released on or before this date
+        """
         if not self._table_exists(self.scenes_path):
             return pl.DataFrame()
 
-        if as_of:
-            dt = DeltaTable(str(self.scenes_path))
-            # Find version at the given timestamp
-            version = self._get_version_at_timestamp(dt, as_of)
-            if version is not None:
-                dt.load_as_version(version)
-            df = pl.read_delta(str(self.scenes_path), version=version)
-        else:
-            df = pl.read_delta(str(self.scenes_path))
-
+        lf = self._scan(self.scenes_path, as_of)
         if scene_ids:
-            df = df.filter(pl.col("id").is_in(scene_ids))
-
-        return df
+            lf = lf.filter(pl.col("id").is_in(scene_ids))
+        if studio_ids:
+            lf = lf.filter(pl.col("studio_id").is_in(studio_ids))
+        if released_from or released_to:
+            # Filtering on the partition column as well lets the scan prune whole partitions
+            by_year = "release_year" in self._partition_columns(self.scenes_path)
+            if released_from:
+                lf = lf.filter(pl.col("release_date") >= released_from)
+                if by_year:
+                    lf = lf.filter(pl.col("release_year") >= released_from.year)
+            if released_to:
+                lf = lf.filter(pl.col("release_date") <= released_to)
+                if by_year:
+                    lf = lf.filter(pl.col("release_year") <= released_to.year)
+
+        return lf.collect()
 
     def get_scene_history(self, scene_id: str) -> pl.DataFrame:
-        """Get all versions of a scene over time."""
+        """Get all stored versions of a scene over time, newest first.
+
+        Versions written while the change data feed is enabled are read from the feed, filtered
+        by id. Only versions from before the feed was enabled fall back to reading the table
+        snapshot at each version. Versions whose files were vacuumed by maintain() are left out.
+        """
         if not self._table_exists(self.scenes_path):
             return pl.DataFrame()
 
         dt = DeltaTable(str(self.scenes_path))
         history = dt.history()
+        cdf_start = self._change_data_feed_start(dt, history)
 
         versions = []
-        for entry in history:
-            version = entry["version"]
+        legacy_versions = [entry["version"] for entry in history if cdf_start is None or entry["version"] < cdf_start]
+        for version in sorted(legacy_versions):
             try:
-                df = pl.read_delta(str(self.scenes_path), version=version)
-                scene_df = df.filter(pl.col("id") == scene_id)
-                if len(scene_df) > 0:
-                    scene_df = scene_df.with_columns(pl.lit(version).alias("_version"))
-                    versions.append(scene_df)
+                scene_df = (
+                    pl.scan_delta(str(self.scenes_path), version=version)
+                    .filter(pl.col("id") == scene_id)
+                    .collect()
+                )
             except Exception:
                 continue
+            if len(scene_df) > 0:
+                versions.append(scene_df.with_columns(pl.lit(version).alias("_version")))
+
+        if cdf_start is not None:
+            escaped_id = scene_id.replace("'", "''")
+            predicate = f"id = '{escaped_id}'"
+            try:
+                changes = pl.DataFrame(dt.load_cdf(starting_version=cdf_start, predicate=predicate))
+            except Exception:
+                # maintain() vacuumed the files of the oldest versions
+                changes = self._load_remaining_changes(dt, cdf_start, predicate)
+            if len(changes) > 0:
+                changes = (
+                    changes.filter(pl.col("_change_type").is_in(["insert", "update_postimage"]))
+                    .with_columns(pl.col("_commit_version").cast(pl.Int32).alias("_version"))
+                    .drop(["_change_type", "_commit_version", "_commit_timestamp"])
+                )
+                versions.append(changes)
 
         if not versions:
             return pl.DataFrame()
 
-        return pl.concat(versions).sort("scraped_at", descending=True)
+        # Snapshots repeat unchanged rows; keep each stored row once, at the version it was written
+        scene_history = pl.concat(versions, how="diagonal_relaxed").sort("_version")
+        scene_history = scene_history.unique(subset=["scraped_at"], keep="first", maintain_order=True)
+        return scene_history.sort("scraped_at", descending=True)
 
     # -------------------------------------------------------------------------
     # Performers
@@ -158,21 +268,7 @@ class StashDbLake:
         performer_ids: list[str] | None = None,
     ) -> pl.DataFrame:
         """Query performers, optionally at a specific point in time."""
-        if not self._table_exists(self.performers_path):
-            return pl.DataFrame()
-
-        if as_of:
-            version = self._get_version_at_timestamp(
-                DeltaTable(str(self.performers_path)), as_of
-            )
-            df = pl.read_delta(str(self.performers_path), version=version)
-        else:
-            df = pl.read_delta(str(self.performers_path))
-
-        if performer_ids:
-            df = df.filter(pl.col("id").is_in(performer_ids))
-
-        return df
+        return self._read(self.performers_path, as_of, performer_ids)
 
     # -------------------------------------------------------------------------
     # Studios
@@ -209,21 +305,7 @@ class StashDbLake:
         studio_ids: list[str] | None = None,
     ) -> pl.DataFrame:
         """Query studios, optionally at a specific point in time."""
-        if not self._table_exists(self.studios_path):
-            return pl.DataFrame()
-
-        if as_of:
-            version = self._get_version_at_timestamp(
-                DeltaTable(str(self.studios_path)), as_of
-            )
-            df = pl.read_delta(str(self.studios_path), version=version)
-        else:
-            df = pl.read_delta(str(self.studios_path))
-
-        if studio_ids:
-            df = df.filter(pl.col("id").is_in(studio_ids))
-
-        return df
+        return self._read(self.studios_path, as_of, studio_ids)
 
     # -------------------------------------------------------------------------
     # Tags
@@ -262,30 +344,68 @@ class StashDbLake:
         tag_ids: list[str] | None = None,
     ) -> pl.DataFrame:
         """Query tags, optionally at a specific point in time."""
-        if not self._table_exists(self.tags_path):
-            return pl.DataFrame()
+        return self._read(self.tags_path, as_of, tag_ids)
 
-        if as_of:
-            version = self._get_version_at_timestamp(
-                DeltaTable(str(self.tags_path)), as_of
-            )
-            df = pl.read_delta(str(self.tags_path), version=version)
-        else:
-            df = pl.read_delta(str(self.tags_path))
+    # -------------------------------------------------------------------------
+    # Crawl state
+    # -------------------------------------------------------------------------
 
-        if tag_ids:
-            df = df.filter(pl.col("id").is_in(tag_ids))
+    def get_watermark(self, entity_type: str, entity_id: str) -> datetime | None:
+        """Latest StashDB `updated` time seen by a completed crawl of a performer or studio.
+
+        Args:
+            entity_type: "performer" or "studio"
+            entity_id: StashDB UUID of the performer or studio
+        """
+        return self.get_watermarks(entity_type, [entity_id]).get(entity_id)
+
+    def get_watermarks(self, entity_type: str, entity_ids: list[str]) -> dict[str, datetime]:
+        """Watermarks of several performers or studios; entities never crawled are left out."""
+        state = self._read(self.crawl_state_path, None, [f"{entity_type}:{entity_id}" for entity_id in entity_ids])
+        if state.is_empty():
+            return {}
+        return dict(zip(state["entity_id"].to_list(), state["updated_at"].to_list(), strict=True))
+
+    def set_watermark(self, entity_type: str, entity_id: str, updated_at: datetime) -> None:
+        """Record the latest StashDB `updated` time seen by a completed crawl."""
+        self.set_watermarks(entity_type, {entity_id: updated_at})
+
+    def set_watermarks(self, entity_type: str, watermarks: dict[str, datetime]) -> None:
+        """Record watermarks of several performers or studios in one commit."""
+        if not watermarks:
+            return
 
-        return df
+        self._ensure_dirs()
+        crawled_at = datetime.now(UTC)
+        df = pl.DataFrame({
+            "id": [f"{entity_type}:{entity_id}" for entity_id in watermarks],
+            "entity_type": [entity_type] * len(watermarks),
+            "entity_id": list(watermarks),
+            "updated_at": list(watermarks.values()),
+            "crawled_at": [crawled_at] * len(watermarks),
+        }).with_columns(
+            pl.col("updated_at").dt.convert_time_zone("UTC"),
+            pl.col("crawled_at").dt.convert_time_zone("UTC"),
+        )
+        self._write_or_merge(df, self.crawl_state_path, "id")
 
     # -------------------------------------------------------------------------
     # Helpers
     # -------------------------------------------------------------------------
 
-    def _write_or_merge(self, df: pl.DataFrame, path: Path, merge_key: str) -> None:
+    def _write_or_merge(
+        self, df: pl.DataFrame, path: Path, merge_key: str, partition_by: list[str] | None = None
+    ) -> None:
         """Write new table or merge into existing one."""
         if not self._table_exists(path):
-            write_deltalake(str(path), df.to_arrow(), mode="overwrite")
+            write_deltalake(
+                str(path),
+                df.to_arrow(),
+                mode="overwrite",
+                partition_by=partition_by,
+                configuration={CHANGE_DATA_FEED: "true"},
+                writer_properties=WriterProperties(max_row_group_size=ROW_GROUP_SIZE),
+            )
         else:
             dt = DeltaTable(str(path))
             dt.merge(
@@ -293,17 +413,239 @@ class StashDbLake:
                 predicate=f"target.{merge_key} = source.{merge_key}",
                 source_alias="source",
                 target_alias="target",
+                writer_properties=WriterProperties(max_row_group_size=ROW_GROUP_SIZE),
             ).when_matched_update_all().when_not_matched_insert_all().execute()
 
+    def z_order(self, table: str = "scenes", columns: list[str] | None = None) -> dict:
+        """Rewrite a table Z-ordered on the given columns (default: id).
+
+        Clustering rows by id gives every file and row group a narrow id range, so point
+        lookups can skip almost all of them based on their min/max statistics.
+
+        Returns:
+            Optimize metrics reported by Delta Lake
+        """
+        path = self.base_path / table
+        if not self._table_exists(path):
+            return {}
+        return DeltaTable(str(path)).optimize.z_order(
+            columns or ["id"], writer_properties=WriterProperties(max_row_group_size=ROW_GROUP_SIZE)
+        )
+
+    def enable_change_data_feed(self) -> list[str]:
+        """Enable the change data feed on existing tables that were created without it.
+
+        Changes are only recorded from this point on; earlier versions are still read from
+        table snapshots by get_scene_history.
+
+        Returns:
+            Names of the tables that were migrated
+        """
+        migrated = []
+        for path in (self.scenes_path, self.performers_path, self.studios_path, self.tags_path):
+            if not self._table_exists(path):
+                continue
+            dt = DeltaTable(str(path))
+            if dt.metadata().configuration.get(CHANGE_DATA_FEED) != "true":
+                dt.alter.set_table_properties({CHANGE_DATA_FEED: "true"})
+                migrated.append(path.name)
+        return migrated
+
+    def maintain(
+        self,
+        retention_hours: int | None = DEFAULT_RETENTION_HOURS,
+        z_order: bool = False,
+    ) -> list[TableMaintenance]:
+        """Compact small files, vacuum removed files and write a checkpoint for every table.
+
+        Each merge adds its own small Parquet files and commit, so tables written by many
+        small upserts get slower to scan and merge into over time.
+
+        Args:
+            retention_hours: Delete files that were removed from the table longer ago than
+                this. Versions older than the retention can no longer be read (as_of, scene
+                history). None skips the vacuum.
+            z_order: Z-order the scenes table on id instead of only compacting it
+
+        Returns:
+            File counts per table before and after maintenance
+        """
+        results = []
+        tables = (self.scenes_path, self.performers_path, self.studios_path, self.tags_path, self.crawl_state_path)
+        for path in tables:
+            if not self._table_exists(path):
+                continue
+            dt = DeltaTable(str(path))
+            files_before = len(dt.file_uris())
+
+            if z_order and path == self.scenes_path:
+                self.z_order("scenes")
+            else:
+                dt.optimize.compact(writer_properties=WriterProperties(max_row_group_size=ROW_GROUP_SIZE))
+
+            dt = DeltaTable(str(path))
+            vacuumed = []
+            if retention_hours is not None:
+                vacuumed = dt.vacuum(
+                    retention_hours=retention_hours, dry_run=False, enforce_retention_duration=False
+                )
+            dt.create_checkpoint()
+
+            results.append(TableMaintenance(
+                table=path.name,
+                files_before=files_before,
+                files_after=len(dt.file_uris()),
+                files_vacuumed=len(vacuumed),
+                version=dt.version(),
+            ))
+        return results
+
+    def buffered(self, max_rows: int = 50_000, max_seconds: float = 300.0) -> StashDbLakeWriter:
+        """Writer that collects upserts in memory and merges them in one commit per table."""
+        return StashDbLakeWriter(self, max_rows=max_rows, max_seconds=max_seconds)
+
+    def _change_data_feed_start(self, dt: DeltaTable, history: list[dict]) -> int | None:
+        """First version with change data, or None if the feed is not enabled."""
+        if dt.metadata().configuration.get(CHANGE_DATA_FEED) != "true":
+            return None
+
+        for entry in history:
+            if entry["operation"] == "SET TBLPROPERTIES":
+                properties = json.loads(entry.get("operationParameters", {}).get("properties", "{}"))
+                if properties.get(CHANGE_DATA_FEED) == "true":
+                    return entry["version"]
+        # Enabled when the table was created
+        return min(entry["version"] for entry in history)
+
+    @staticmethod
+    def _load_remaining_changes(dt: DeltaTable, cdf_start: int, predicate: str) -> pl.DataFrame:
+        """Change data from the oldest version whose files were not vacuumed yet.
+
+        Reading from a version reads all later versions too, so the oldest readable starting
+        version is found by bisecting between the feed start and the latest version. Each
+        successful read lowers the upper bound, so the last one read from the oldest.
+        """
+        low, high = cdf_start + 1, dt.version() + 1
+        changes = pl.DataFrame()
+        while low < high:
+            middle = (low + high) // 2
+            try:
+                changes = pl.DataFrame(dt.load_cdf(starting_version=middle, predicate=predicate))
+            except Exception:
+                low = middle + 1
+            else:
+                high = middle
+        return changes
+
+    @staticmethod
+    def _commit_time(entry: dict) -> datetime:
+        """Commit time of a history entry (epoch milliseconds or ISO string, depending on version)."""
+        timestamp = entry["timestamp"]
+        if isinstance(timestamp, str):
+            return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        return datetime.fromtimestamp(timestamp / 1000, tz=UTC)
+
+    def _version_timeline(self, dt: DeltaTable) -> tuple[list[datetime], list[int]]:
+        """Commit timestamps and versions sorted by version, cached and extended incrementally."""
+        key = dt.table_uri
+        latest = dt.version()
+        timestamps, versions = self._version_index.get(key, ([], []))
+        if versions and versions[-1] > latest:
+            # Table was recreated
+            timestamps, versions = [], []
+
+        if not versions or versions[-1] < latest:
+            known = versions[-1] if versions else -1
+            new_entries = [entry for entry in dt.history(limit=latest - known) if entry["version"] > known]
+            for entry in sorted(new_entries, key=lambda e: e["version"]):
+                # Keep timestamps non-decreasing so the list can be bisected
+                commit_time = self._commit_time(entry)
+                timestamps.append(max(commit_time, timestamps[-1]) if timestamps else commit_time)
+                versions.append(entry["version"])
+            self._version_index[key] = (timestamps, versions)
+
+        return timestamps, versions
+
     def _get_version_at_timestamp(
         self, dt: DeltaTable, timestamp: datetime
     ) -> int | None:
         """Find the Delta table version at a specific timestamp."""
-        history = dt.history()
-        for entry in history:
-            entry_time = datetime.fromisoformat(
-                entry["timestamp"].replace("Z", "+00:00")
-            )
-            if entry_time <= timestamp:
-                return entry["version"]
-        return None
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=UTC)
+        timestamps, versions = self._version_timeline(dt)
+        index = bisect.bisect_right(timestamps, timestamp)
+        return versions[index - 1] if index else None
+
+
+class StashDbLakeWriter:
+    """Buffers upserts and merges them into the lake in one commit per table.
+
+    Entities are kept by id (the last one added wins), and the buffers are flushed once they
+    hold max_rows entities in total or the oldest buffered entity is max_seconds old. Use it as
+    a context manager so the remainder is flushed at the end.
+    """
+
+    def __init__(self, lake: StashDbLake, max_rows: int = 50_000, max_seconds: float = 300.0):
+        self.lake = lake
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self._buffers: dict[str, dict[str, dict]] = {"scenes": {}, "performers": {}, "studios": {}, "tags": {}}
+        self._first_buffered_at: float | None = None
+
+    def __enter__(self) -> StashDbLakeWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    @property
+    def buffered_rows(self) -> int:
+        """Number of entities waiting to be merged."""
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    def upsert_scenes(self, scenes: list[dict]) -> None:
+        self._add("scenes", scenes)
+
+    def upsert_performers(self, performers: list[dict]) -> None:
+        self._add("performers", performers)
+
+    def upsert_studios(self, studios: list[dict]) -> None:
+        self._add("studios", studios)
+
+    def upsert_tags(self, tags: list[dict]) -> None:
+        self._add("tags", tags)
+
+    def _add(self, table: str, entities: list[dict]) -> None:
+        if not entities:
+            return
+
+        buffer = self._buffers[table]
+        for entity in entities:
+            # A merge source must not contain the same key twice
+            buffer[entity["id"]] = entity
+        if self._first_buffered_at is None:
+            self._first_buffered_at = time.monotonic()
+
+        if self.buffered_rows >= self.max_rows or time.monotonic() - self._first_buffered_at >= self.max_seconds:
+            self.flush()
+
+    def flush(self) -> dict[str, int]:
+        """Merge all buffered entities.
+
+        Returns:
+            Number of entities merged per table
+        """
+        upserts = {
+            "scenes": self.lake.upsert_scenes,
+            "performers": self.lake.upsert_performers,
+            "studios": self.lake.upsert_studios,
+            "tags": self.lake.upsert_tags,
+        }
+        flushed = {}
+        for table, buffer in self._buffers.items():
+            if buffer:
+                upserts[table](list(buffer.values()))
+                flushed[table] = len(buffer)
+                buffer.clear()
+        self._first_buffered_at = None
+        return flushed
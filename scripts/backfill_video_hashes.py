@@ -4,13 +4,25 @@
 554 videos were downloaded without hashes because the videohashes tool couldn't
 find ffmpeg/ffprobe (it searches in cwd, not PATH). This script recalculates
 the hashes from the original files on disk and updates the database.
+
+Video files are located through a release UUID -> path index built with one walk
+per volume and cached on disk until the volume's mtime changes (--refresh-index
+rebuilds it). Hashes are calculated in parallel, with at most --per-disk videos
+read from the same volume at once, and updates are committed every --batch-size
+videos. Updated downloads no longer match the query, so an interrupted run
+continues where it stopped.
 """
 
 import argparse
 import json
+import os
+import re
 import shutil
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -39,30 +51,75 @@ VIDEOHASHES_PATH = "/Users/thardas/Code/videohashes/dist/videohashes-arm64-macos
 
 VIDEO_EXTENSIONS = ("mp4", "mkv", "avi", "mov", "wmv", "flv", "webm", "m4v", "mpg", "mpeg", "ts")
 
+INDEX_CACHE_PATH = Path.home() / ".cache" / "culture" / "video_file_index.json"
+
+UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+
+
+def index_volume(search_dir: str) -> dict[str, str]:
+    """Map every UUID in a video filename under search_dir to the file's path."""
+    index = {}
+    for root, dirs, files in os.walk(search_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(VIDEO_EXTENSIONS):
+                continue
+            for match in UUID_PATTERN.findall(name):
+                index.setdefault(match.lower(), os.path.join(root, name))  # noqa: PTH118
+    return index
+
 
-def find_video_file(download_uuid: str) -> str | None:
-    """Find video file by download UUID using fd across all volumes."""
-    search_paths = []
-    for d in VIDEO_SEARCH_DIRS:
-        if Path(d).exists():
-            search_paths.extend(["--search-path", d])
+def build_file_index(cache_path: Path, refresh: bool = False) -> dict[str, str]:
+    """Build the UUID -> path index over all volumes, reusing cached volumes whose mtime is unchanged.
+
+    A volume's mtime only changes when its top-level entries change, so videos added
+    deeper in a volume need --refresh-index.
+    """
+    cache = {}
+    if cache_path.exists() and not refresh:
+        cache = json.loads(cache_path.read_text())
+
+    volumes = {}
+    for search_dir in VIDEO_SEARCH_DIRS:
+        if not Path(search_dir).exists():
+            continue
+        mtime = Path(search_dir).stat().st_mtime
+        cached = cache.get(search_dir)
+        if cached and cached["mtime"] == mtime:
+            volumes[search_dir] = cached
+            continue
+        start = time.perf_counter()
+        volumes[search_dir] = {"mtime": mtime, "files": index_volume(search_dir)}
+        print(f"Indexed {search_dir}: {len(volumes[search_dir]['files'])} videos in {time.perf_counter() - start:.1f}s")
 
-    if not search_paths:
-        return None
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(json.dumps(volumes))
 
-    cmd = ["fd", "--ignore-case", str(download_uuid), *search_paths]
-    for ext in VIDEO_EXTENSIONS:
-        cmd.extend(["--extension", ext])
+    # Earlier volumes win, like the first match of a search across all volumes
+    index = {}
+    for volume in volumes.values():
+        for uuid, path in volume["files"].items():
+            index.setdefault(uuid, path)
+    return index
 
-    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-    if result.returncode == 0 and result.stdout.strip():
-        # Return the first match
-        return result.stdout.strip().split("\n")[0]
-    return None
 
+def find_video_file(file_index: dict[str, str], release_uuid: str) -> str | None:
+    """Find the video file of a release in the file index."""
+    file_path = file_index.get(str(release_uuid).lower())
+    return file_path if file_path and Path(file_path).exists() else None
 
-def calculate_hashes(file_path: str, ffmpeg_dir: str) -> dict | None:
-    """Calculate video hashes using videohashes tool."""
+
+def volume_of(file_path: str) -> str:
+    """The search dir a file was found in, to limit concurrent reads per disk."""
+    return next((d for d in VIDEO_SEARCH_DIRS if file_path.startswith(d)), "")
+
+
+def calculate_hashes(file_path: str, ffmpeg_dir: str) -> tuple[dict | None, str | None]:
+    """Calculate video hashes using videohashes tool.
+
+    Returns:
+        Tuple of (hashes, error)
+    """
     try:
         result = subprocess.run(
             [VIDEOHASHES_PATH, "-json", "-md5", file_path],
@@ -73,31 +130,104 @@ def calculate_hashes(file_path: str, ffmpeg_dir: str) -> dict | None:
             check=False,
         )
         if result.returncode == 0:
-            return json.loads(result.stdout)
-        print(f"  ERROR: videohashes failed: {result.stdout}")
-        return None
+            return json.loads(result.stdout), None
+        return None, f"videohashes failed: {result.stdout}"
     except Exception as e:
-        print(f"  ERROR: {e}")
-        return None
+        return None, str(e)
 
 
-def update_metadata_with_hashes(session, download_uuid, file_metadata, hashes):
-    """Update the file_metadata in the database with calculated hashes."""
+def metadata_with_hashes(file_metadata, hashes) -> dict:
+    """The file_metadata with calculated hashes and without the hashing error."""
     new_metadata = dict(file_metadata) if file_metadata else {}
     new_metadata["duration"] = hashes.get("duration")
     new_metadata["phash"] = hashes.get("phash")
     new_metadata["oshash"] = hashes.get("oshash")
     new_metadata["md5"] = hashes.get("md5")
     new_metadata.pop("video_hashes_error", None)
+    return new_metadata
 
-    session.execute(
-        text("UPDATE downloads SET file_metadata = :metadata WHERE uuid = :uuid"),
-        {"metadata": json.dumps(new_metadata), "uuid": download_uuid},
-    )
+
+def write_updates(session, updates: list[dict]) -> None:
+    """Update file_metadata of a batch of downloads in one transaction."""
+    session.execute(text("UPDATE downloads SET file_metadata = :metadata WHERE uuid = :uuid"), updates)
     session.commit()
 
 
-def main(limit: int | None = None, dry_run: bool = False):
+def hash_videos(session, jobs: list[tuple], ffmpeg_dir: str, *, workers: int | None, per_disk: int, batch_size: int):
+    """Hash videos in parallel and write the results in batches.
+
+    Args:
+        session: Database session
+        jobs: (download_uuid, file_metadata, file_path, label) per video
+        ffmpeg_dir: Directory containing ffmpeg, the working directory of videohashes
+        workers: Concurrent videohashes processes (default: CPUs, at most per_disk x disks)
+        per_disk: Concurrent videohashes processes reading from one volume
+        batch_size: Videos per database transaction
+
+    Returns:
+        Tuple of (success_count, error_count)
+    """
+    disks = {volume_of(file_path) for _, _, file_path, _ in jobs}
+    workers = workers or max(1, min(os.cpu_count() or 1, per_disk * len(disks)))
+    disk_slots = {disk: threading.BoundedSemaphore(per_disk) for disk in disks}
+    print(f"Hashing {len(jobs)} videos with {workers} workers, at most {per_disk} per disk")
+
+    def hash_video(file_path: str) -> tuple[dict | None, str | None]:
+        with disk_slots[volume_of(file_path)]:
+            return calculate_hashes(file_path, ffmpeg_dir)
+
+    success_count = 0
+    error_count = 0
+    pending = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(hash_video, file_path): (uuid, metadata, label) for uuid, metadata, file_path, label in jobs}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                download_uuid, file_metadata, label = futures[future]
+                hashes, error = future.result()
+                rate = done / (time.perf_counter() - start) * 3600
+                print(f"\n[{done}/{len(jobs)}, {rate:.0f} videos/hour] {label}")
+                if not hashes:
+                    print(f"  ERROR: {error}")
+                    error_count += 1
+                    continue
+
+                print(f"  phash: {hashes.get('phash')}")
+                print(f"  oshash: {hashes.get('oshash')}")
+                print(f"  md5: {hashes.get('md5')}")
+                pending.append({"metadata": json.dumps(metadata_with_hashes(file_metadata, hashes)), "uuid": download_uuid})
+                success_count += 1
+
+                if len(pending) >= batch_size:
+                    write_updates(session, pending)
+                    print(f"  Updated database ({len(pending)} videos)")
+                    pending = []
+        except KeyboardInterrupt:
+            print("\nInterrupted - saving finished videos, run again to continue")
+            for future in futures:
+                future.cancel()
+        finally:
+            if pending:
+                write_updates(session, pending)
+                print(f"  Updated database ({len(pending)} videos)")
+
+    elapsed = time.perf_counter() - start
+    if elapsed > 0:
+        print(f"\nRate: {(success_count + error_count) / elapsed * 3600:.0f} videos/hour ({elapsed:.0f}s)")
+    return success_count, error_count
+
+
+def main(
+    *,
+    limit: int | None = None,
+    dry_run: bool = False,
+    workers: int | None = None,
+    per_disk: int = 2,
+    batch_size: int = 50,
+    refresh_index: bool = False,
+    index_cache: Path = INDEX_CACHE_PATH,
+):
     ffmpeg_path = shutil.which("ffmpeg")
     if not ffmpeg_path:
         print("ERROR: ffmpeg not found in PATH")
@@ -122,39 +252,30 @@ def main(limit: int | None = None, dry_run: bool = False):
     rows = session.execute(text(query_str)).fetchall()
     print(f"Found {len(rows)} videos missing hashes")
 
-    success_count = 0
-    error_count = 0
-    not_found_count = 0
+    file_index = build_file_index(index_cache, refresh=refresh_index)
 
-    for i, row in enumerate(rows):
-        download_uuid, saved_filename, file_metadata, release_uuid, site_name = row
+    jobs = []
+    not_found_count = 0
+    for download_uuid, saved_filename, file_metadata, release_uuid, site_name in rows:
         display_name = saved_filename[:80] if saved_filename else "unknown"
-        print(f"\n[{i + 1}/{len(rows)}] {site_name}: {display_name}")
-
-        file_path = find_video_file(str(release_uuid))
+        file_path = find_video_file(file_index, release_uuid)
         if not file_path:
-            print("  FILE NOT FOUND on any volume")
+            print(f"{site_name}: {display_name}\n  FILE NOT FOUND on any volume")
             not_found_count += 1
             continue
+        jobs.append((download_uuid, file_metadata, file_path, f"{site_name}: {display_name}"))
 
-        print(f"  Found: {file_path}")
-
-        if dry_run:
-            print("  DRY RUN - skipping hash calculation")
-            continue
-
-        hashes = calculate_hashes(file_path, ffmpeg_dir)
-        if not hashes:
-            error_count += 1
-            continue
+    if not_found_count and not refresh_index:
+        print(f"{not_found_count} videos not in the file index. Use --refresh-index if they were added since it was built.")
 
-        print(f"  phash: {hashes.get('phash')}")
-        print(f"  oshash: {hashes.get('oshash')}")
-        print(f"  md5: {hashes.get('md5')}")
-
-        update_metadata_with_hashes(session, download_uuid, file_metadata, hashes)
-        print("  Updated database")
-        success_count += 1
+    success_count = 0
+    error_count = 0
+    if dry_run:
+        for _, _, file_path, label in jobs:
+            print(f"{label}\n  Found: {file_path}")
+        print("\nDRY RUN - skipping hash calculation")
+    else:
+        success_count, error_count = hash_videos(session, jobs, ffmpeg_dir, workers=workers, per_disk=per_disk, batch_size=batch_size)
 
     print("\n=== SUMMARY ===")
     print(f"Success: {success_count}")
@@ -168,5 +289,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Backfill missing video hashes")
     parser.add_argument("--limit", type=int, help="Limit number of files to process")
     parser.add_argument("--dry-run", action="store_true", help="Find files but don't update database")
+    parser.add_argument("--workers", type=int, help="Concurrent videohashes processes (default: CPUs, at most per-disk x disks)")
+    parser.add_argument("--per-disk", type=int, default=2, help="Concurrent videohashes processes reading from one volume")
+    parser.add_argument("--batch-size", type=int, default=50, help="Videos per database transaction")
+    parser.add_argument("--refresh-index", action="store_true", help="Rebuild the file index even if volumes are unchanged")
+    parser.add_argument("--index-cache", type=Path, default=INDEX_CACHE_PATH, help="File index cache location")
     args = parser.parse_args()
-    main(limit=args.limit, dry_run=args.dry_run)
+    main(
+        limit=args.limit,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        per_disk=args.per_disk,
+        batch_size=args.batch_size,
+        refresh_index=args.refresh_index,
+        index_cache=args.index_cache,
+    )
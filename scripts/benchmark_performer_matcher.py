@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Benchmark PerformerMatcher's indexed global matching against the previous full scans.
+
+Generates a synthetic Stashapp (performers with aliases) and a synthetic site (scenes whose
+performers are missing from the scene's Stashapp/StashDB data, so they go through the global
+"stashapp_all" stage), then runs match_performers and match_unmatched_performers with both the
+indexed matcher and a matcher that scans every Stashapp performer like before. Results must agree.
+
+Usage:
+    python scripts/benchmark_performer_matcher.py --performers 30000 --scenes 5000
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+import polars as pl
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "libraries"))
+
+from libraries.performer_matcher import PerformerMatcher
+
+
+class FullScanPerformerMatcher(PerformerMatcher):
+    """Candidates are every Stashapp performer, rebuilt from the DataFrame on each call like before."""
+
+    def _all_rows(self) -> list[dict]:
+        return [
+            {
+                "stashapp_performers_id": row["stashapp_id"],
+                "stashapp_performers_name": row["stashapp_name"],
+                "stashapp_performers_alias_list": row["stashapp_alias_list"],
+                "stashapp_performers_gender": row["stashapp_gender"],
+                "stashapp_performers_stash_ids": row["stashapp_stash_ids"],
+            }
+            for row in self.all_stashapp_performers.iter_rows(named=True)
+        ]
+
+    def _exact_candidates(self, ce_performers: list[dict]) -> list[dict]:  # noqa: ARG002
+        return self._all_rows()
+
+    def _candidate_performers(self, ce_name: str) -> list[dict]:  # noqa: ARG002
+        return self._all_rows()
+
+
+def random_name(rng: random.Random) -> str:
+    def word():
+        return rng.choice(string.ascii_uppercase) + "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 8)))
+
+    return " ".join(word() for _ in range(rng.randint(1, 3)))
+
+
+def generate(rng: random.Random, performer_count: int, scene_count: int) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+    names = [random_name(rng) for _ in range(performer_count)]
+    aliases = [[random_name(rng) for _ in range(rng.randint(0, 2))] for _ in range(performer_count)]
+    performers = pl.DataFrame({
+        "stashapp_id": list(range(1, performer_count + 1)),
+        "stashapp_name": names,
+        "stashapp_gender": ["FEMALE"] * performer_count,
+        "stashapp_stash_ids": [[{"endpoint": "https://stashdb.org/graphql", "stash_id": f"uuid-{i}"}] for i in range(performer_count)],
+        "stashapp_alias_list": aliases,
+    }).with_columns(pl.col("stashapp_alias_list").cast(pl.List(pl.Utf8)))
+
+    def ce_name():
+        choice = rng.random()
+        index = rng.randrange(performer_count)
+        if choice < 0.4:
+            return names[index]
+        if choice < 0.6 and aliases[index]:
+            return aliases[index][0]
+        if choice < 0.8:
+            return names[index].split(" ")[0]
+        return random_name(rng)
+
+    scenes = pl.DataFrame({
+        "ce_downloads_performers": [
+            [{"uuid": f"ce-{s}-{i}", "name": ce_name()} for i in range(rng.randint(1, 3))] for s in range(scene_count)
+        ],
+        "stashapp_performers": [None] * scene_count,
+        "stashdb_performers": [None] * scene_count,
+    })
+    unmatched = pl.DataFrame({
+        "performer_uuid": [f"unmatched-{i}" for i in range(scene_count // 10)],
+        "performer_name": [ce_name() for _ in range(scene_count // 10)],
+    })
+    return performers, scenes, unmatched
+
+
+def run(matcher: PerformerMatcher, scenes: pl.DataFrame, unmatched: pl.DataFrame) -> tuple[float, float, list, list]:
+    start = time.perf_counter()
+    matches = matcher.match_performers(
+        scenes["ce_downloads_performers"], scenes["stashapp_performers"], scenes["stashdb_performers"]
+    )
+    scene_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    unmatched_matches = matcher.match_unmatched_performers(unmatched)
+    unmatched_elapsed = time.perf_counter() - start
+    return scene_elapsed, unmatched_elapsed, matches, unmatched_matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark global performer matching")
+    parser.add_argument("--performers", type=int, default=30000)
+    parser.add_argument("--scenes", type=int, default=5000)
+    parser.add_argument("--full-scan-scenes", type=int, default=50, help="Scenes to run through the (slow) full scan")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    performers, scenes, unmatched = generate(random.Random(args.seed), args.performers, args.scenes)
+    print(f"{args.performers} Stashapp performers, {args.scenes} scenes, {len(unmatched)} unmatched performers")
+
+    start = time.perf_counter()
+    indexed = PerformerMatcher(performers)
+    print(f"  index build:           {time.perf_counter() - start:8.2f}s")
+    scene_elapsed, unmatched_elapsed, _, _ = run(indexed, scenes, unmatched)
+    print(f"  indexed scenes:        {scene_elapsed:8.2f}s  {args.scenes / scene_elapsed:10.1f} scenes/s")
+    print(f"  indexed unmatched:     {unmatched_elapsed:8.2f}s  {len(unmatched) / unmatched_elapsed:10.1f} performers/s")
+
+    sample_scenes = scenes.head(args.full_scan_scenes)
+    sample_unmatched = unmatched.head(args.full_scan_scenes)
+    full_scene, full_unmatched, full_matches, full_unmatched_matches = run(
+        FullScanPerformerMatcher(performers), sample_scenes, sample_unmatched
+    )
+    print(f"  full scan scenes:      {full_scene:8.2f}s  {len(sample_scenes) / full_scene:10.1f} scenes/s")
+    print(f"  full scan unmatched:   {full_unmatched:8.2f}s  {len(sample_unmatched) / full_unmatched:10.1f} performers/s")
+
+    _, _, sample_matches, sample_unmatched_matches = run(PerformerMatcher(performers), sample_scenes, sample_unmatched)
+    if sample_matches != full_matches or sample_unmatched_matches != full_unmatched_matches:
+        raise SystemExit("Indexed and full scan matchers disagree")
+    print(f"  results identical on the {len(sample_scenes)} scene sample")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Benchmark SceneMatcher.match_scenes against the previous nested-loop implementation.
+
+Generates a synthetic studio (local scenes with phashes and durations, StashDB scenes with a few
+PHASH and OSHASH fingerprints each), runs both matchers and reports scenes/second. Results of
+both implementations are compared to make sure they agree.
+
+Usage:
+    python scripts/benchmark_scene_matcher.py --input-scenes 3000 --stashdb-scenes 3000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "libraries"))
+
+from libraries.scene_matcher import SceneMatcher
+
+
+def legacy_hamming_distance(hash1: str, hash2: str) -> int:
+    bin1 = bin(int(hash1, 16))[2:].zfill(64)
+    bin2 = bin(int(hash2, 16))[2:].zfill(64)
+    return sum(b1 != b2 for b1, b2 in zip(bin1, bin2, strict=False))
+
+
+def legacy_match_scenes(matcher: SceneMatcher, input_scenes: list[dict], stashdb_scenes: list[dict]) -> dict:
+    """The previous SceneMatcher.match_scenes, kept verbatim as the baseline."""
+    phash_to_scene = {}
+    for input_scene in input_scenes:
+        matching_scene = None
+        min_distance = float("inf")
+        max_quality_score = 0.0
+        input_duration = input_scene.get("duration")
+
+        for stashdb_scene in stashdb_scenes:
+            phash_fingerprints = [f for f in stashdb_scene["fingerprints"] if f["algorithm"] == "PHASH"]
+            quality_score = 0
+            min_scene_distance = float("inf")
+
+            for fingerprint in phash_fingerprints:
+                distance = legacy_hamming_distance(input_scene["phash"], fingerprint["hash"])
+                min_scene_distance = min(min_scene_distance, distance)
+                if distance <= matcher.MAX_DISTANCE:
+                    fingerprint_duration = fingerprint.get("duration")
+                    duration_diff = float("inf")
+                    if input_duration and fingerprint_duration:
+                        duration_diff = abs(input_duration - fingerprint_duration)
+                    if duration_diff <= matcher.MAX_DURATION_DIFF_SECS:
+                        quality_score += 1.0 - (distance / (matcher.MAX_DISTANCE + 1))
+
+            if phash_fingerprints:
+                quality_score = quality_score / len(phash_fingerprints)
+                if min_scene_distance < min_distance or (
+                    min_scene_distance == min_distance and quality_score > max_quality_score
+                ):
+                    min_distance = min_scene_distance
+                    max_quality_score = quality_score
+                    matching_scene = stashdb_scene
+
+        phash_to_scene[input_scene["phash"]] = matching_scene
+    return phash_to_scene
+
+
+def flip_bits(rng: random.Random, value: int, max_bits: int) -> str:
+    for _ in range(rng.randint(0, max_bits)):
+        value ^= 1 << rng.randrange(64)
+    return f"{value:016x}"
+
+
+def generate_studio(rng: random.Random, input_count: int, stashdb_count: int) -> tuple[list[dict], list[dict]]:
+    stashdb_scenes = []
+    originals = []
+    for i in range(stashdb_count):
+        phash = rng.getrandbits(64)
+        duration = rng.randint(600, 3600)
+        originals.append((phash, duration))
+        fingerprints = [
+            {"algorithm": "PHASH", "hash": flip_bits(rng, phash, 4), "duration": duration + rng.randint(-2, 2)}
+            for _ in range(rng.randint(1, 4))
+        ]
+        fingerprints.append({"algorithm": "OSHASH", "hash": f"{rng.getrandbits(64):016x}", "duration": duration})
+        stashdb_scenes.append({"id": str(i), "fingerprints": fingerprints})
+
+    input_scenes = []
+    for _ in range(input_count):
+        phash, duration = rng.choice(originals)
+        input_scenes.append({"phash": flip_bits(rng, phash, 6), "duration": duration + rng.randint(-5, 5)})
+    return input_scenes, stashdb_scenes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark phash scene matching")
+    parser.add_argument("--input-scenes", type=int, default=3000)
+    parser.add_argument("--stashdb-scenes", type=int, default=3000)
+    parser.add_argument(
+        "--legacy-sample", type=int, default=100, help="Input scenes to run through the (slow) legacy matcher"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    input_scenes, stashdb_scenes = generate_studio(random.Random(args.seed), args.input_scenes, args.stashdb_scenes)
+    matcher = SceneMatcher()
+    print(f"{args.input_scenes} input scenes x {args.stashdb_scenes} StashDB scenes")
+
+    start = time.perf_counter()
+    result = matcher.match_scenes(input_scenes, stashdb_scenes)
+    elapsed = time.perf_counter() - start
+    print(f"  vectorized: {elapsed:8.2f}s  {len(input_scenes) / elapsed:10.1f} scenes/s")
+
+    sample = input_scenes[: args.legacy_sample]
+    start = time.perf_counter()
+    legacy_result = legacy_match_scenes(matcher, sample, stashdb_scenes)
+    legacy_elapsed = time.perf_counter() - start
+    legacy_rate = len(sample) / legacy_elapsed
+    print(f"  legacy:     {legacy_elapsed:8.2f}s  {legacy_rate:10.1f} scenes/s  ({len(sample)} scene sample)")
+    print(f"  speedup:    {len(input_scenes) / elapsed / legacy_rate:8.1f}x")
+
+    mismatches = [phash for phash, scene in legacy_result.items() if result[phash] is not scene]
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} scenes matched differently, e.g. {mismatches[0]}")
+    print("  results identical on the legacy sample")
+
+
+if __name__ == "__main__":
+    main()
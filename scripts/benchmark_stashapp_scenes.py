@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Benchmark StashAppClient scene queries against a stub Stashapp library.
+
+Compares the previous find_scenes (all scenes in one findScenes request with the full
+fragment, dates parsed per row) with the paged find_scenes/iter_scenes and the minimal
+and files projections. The stub answers with a JSON round trip of only the fields in the
+requested fragment, like Stashapp would. Reports time and peak Python heap (tracemalloc, which
+does not see memory Polars allocates itself).
+
+Usage:
+    python scripts/benchmark_stashapp_scenes.py --scenes 50000
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import polars as pl
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "libraries"))
+
+from libraries.client_stashapp import StashAppClient, scenes_fragment, scenes_schema
+
+
+def make_scene(scene_id: int, rng: random.Random) -> dict:
+    return {
+        "id": str(scene_id),
+        "code": None,
+        "title": f"Scene {rng.getrandbits(32):08x}",
+        "details": "Lorem ipsum " * rng.randint(0, 40),
+        "date": f"20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        "urls": [f"https://example.com/scenes/{scene_id}"],
+        "created_at": "2024-01-02T03:04:05+01:00",
+        "updated_at": "2024-06-02T03:04:05+01:00",
+        "organized": rng.random() < 0.5,
+        "interactive": False,
+        "play_duration": rng.randint(0, 5000),
+        "play_count": rng.randint(0, 10),
+        "o_counter": 0,
+        "performers": [
+            {
+                "id": str(rng.randrange(5000)),
+                "name": f"Performer {i}",
+                "disambiguation": None,
+                "alias_list": [],
+                "gender": "FEMALE",
+                "favorite": False,
+                "stash_ids": [{"endpoint": "https://stashdb.org/graphql", "stash_id": f"{rng.getrandbits(64):016x}", "updated_at": None}],
+                "custom_fields": {},
+            }
+            for i in range(rng.randint(1, 3))
+        ],
+        "studio": {"id": str(rng.randrange(100)), "name": "Studio", "url": None, "tags": [], "parent_studio": None},
+        "files": [
+            {
+                "id": str(scene_id),
+                "path": f"/media/{scene_id}.mp4",
+                "basename": f"{scene_id}.mp4",
+                "size": rng.randint(10**8, 10**10),
+                "duration": rng.uniform(600, 3600),
+                "fingerprints": [
+                    {"type": "oshash", "value": f"{rng.getrandbits(64):016x}"},
+                    {"type": "phash", "value": f"{rng.getrandbits(64):016x}"},
+                ],
+            }
+        ],
+        "tags": [{"id": str(rng.randrange(500)), "name": "Tag"} for _ in range(rng.randint(0, 10))],
+        "stash_ids": [{"endpoint": "https://stashdb.org/graphql", "stash_id": f"{rng.getrandbits(64):016x}", "updated_at": None}],
+        "galleries": [],
+    }
+
+
+class StubStash:
+    """findScenes over an in-memory library, returning only the scene fields named in the query."""
+
+    def __init__(self, library: list[dict]):
+        self.library = library
+
+    def _answer(self, query: str, scenes: list[dict]) -> list[dict]:
+        fields = [key for key in self.library[0] if re.search(rf"\b{key}\b", query)]
+        return json.loads(json.dumps([{key: scene[key] for key in fields} for scene in scenes]))
+
+    def find_scenes(self, f=None, filter=None, fragment=None):  # noqa: ARG002 - stashapi signature
+        # stashapi's find_scenes defaults to per_page -1: every scene in one response
+        return self._answer(fragment, self.library)
+
+    def call_GQL(self, query, variables):  # noqa: N802 - StashInterface method name
+        page, per_page = variables["filter"]["page"], variables["filter"]["per_page"]
+        scenes = self.library[(page - 1) * per_page : page * per_page]
+        return {"findScenes": {"count": len(self.library), "scenes": self._answer(query, scenes)}}
+
+
+def legacy_find_scenes(client: StashAppClient) -> pl.DataFrame:
+    """The previous find_scenes: one request for every scene, dates parsed per row."""
+    rows = []
+    for scene in client.stash.find_scenes({}, fragment=scenes_fragment):
+        row = client._map_scene_data(scene)
+        row["stashapp_date"] = datetime.strptime(row["stashapp_date"], "%Y-%m-%d").date() if row["stashapp_date"] else None  # noqa: DTZ007
+        for column in ("stashapp_created_at", "stashapp_updated_at"):
+            row[column] = datetime.fromisoformat(row[column].replace("Z", "+00:00")) if row[column] else None
+        rows.append(row)
+    return pl.DataFrame(rows, schema=scenes_schema)
+
+
+def measure(func) -> tuple[float, float, int]:
+    start = time.perf_counter()
+    rows = len(func())
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StashAppClient scene queries")
+    parser.add_argument("--scenes", type=int, default=50_000)
+    parser.add_argument("--per-page", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    client = StashAppClient.__new__(StashAppClient)
+    client.stash = StubStash([make_scene(scene_id, rng) for scene_id in range(1, args.scenes + 1)])
+
+    def oshashes_streamed() -> pl.DataFrame:
+        return pl.concat(
+            chunk.select("stashapp_id", "stashapp_primary_file_oshash")
+            for chunk in client.iter_scenes({}, projection="files", per_page=args.per_page)
+        )
+
+    cases = [
+        ("previous find_scenes (full)", lambda: legacy_find_scenes(client)),
+        ("find_scenes full", lambda: client.find_scenes({})),
+        ("find_scenes minimal", lambda: client.find_scenes({}, projection="minimal")),
+        ("find_scenes files", lambda: client.find_scenes({}, projection="files")),
+        ("iter_scenes files -> oshashes", oshashes_streamed),
+    ]
+
+    print(f"{args.scenes} scenes, {args.per_page} per page")
+    print(f"{'':<32} {'time':>9} {'peak memory':>13} {'rows':>8}")
+    for label, func in cases:
+        elapsed, peak_mib, rows = measure(func)
+        print(f"{label:<32} {elapsed:8.2f}s {peak_mib:9.1f} MiB {rows:8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Benchmark StashDbClient id lookups and pagination against a local stub server with latency.
+
+The stub answers findScene (plain or aliased) and queryScenes requests after a fixed delay
+that stands in for the round trip to StashDB. Compares one findScene request per id and
+sequential paging (the previous behaviour) with batched lookups and concurrent paging.
+
+Usage:
+    python scripts/benchmark_stashdb_client.py --scenes 500 --latency-ms 50
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "libraries"))
+
+from libraries.StashDbClient import StashDbClient
+
+
+def make_scene(scene_id: str) -> dict:
+    return {
+        "id": scene_id,
+        "title": f"Title {scene_id}",
+        "code": None,
+        "duration": 1200,
+        "date": "2024-01-01",
+        "urls": [],
+        "images": [],
+        "studio": {"id": "studio-1", "name": "Studio", "urls": [], "images": [], "parent": None},
+        "tags": [],
+        "performers": [],
+        "fingerprints": [],
+    }
+
+
+def make_handler(scenes: dict[str, dict], latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            query, variables = body["query"], body["variables"] or {}
+            time.sleep(latency)
+            if "queryScenes" in query:
+                start = (variables["page"] - 1) * variables["per_page"]
+                page = list(scenes.values())[start : start + variables["per_page"]]
+                data = {"queryScenes": {"count": len(scenes), "scenes": page}}
+            elif "$id:" in query:
+                data = {"findScene": scenes.get(variables["id"])}
+            else:
+                data = {
+                    alias: scenes.get(variables[variable])
+                    for alias, variable in re.findall(r"(\w+): findScene\(id: \$(\w+)\)", query)
+                }
+            payload = json.dumps({"data": data}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class SequentialStashDbClient(StashDbClient):
+    """The previous behaviour: one findScene request per id, one page at a time."""
+
+    def _find_scenes_by_id(self, scene_ids: list[str]) -> dict[str, dict | None]:
+        query = f"query FindScene($id: ID!) {{ findScene(id: $id) {{ {self._get_scene_fragment()} }} }}"
+        scenes_by_id = {}
+        for scene_id in scene_ids:
+            result = self._gql_query(query, {"id": scene_id})
+            if result and "data" in result and "findScene" in result["data"]:
+                scenes_by_id[scene_id] = result["data"]["findScene"]
+        return scenes_by_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StashDbClient batching")
+    parser.add_argument("--scenes", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    scenes = {f"scene-{i}": make_scene(f"scene-{i}") for i in range(args.scenes)}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(scenes, args.latency_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/graphql"
+
+    print(f"{args.scenes} scenes, {args.latency_ms:.0f} ms simulated latency")
+    for label, client in (
+        ("sequential (previous)", SequentialStashDbClient(endpoint, None, max_workers=1)),
+        ("batched + concurrent", StashDbClient(endpoint, None)),
+    ):
+        start = time.perf_counter()
+        df = client.query_scenes(scene_ids=list(scenes))
+        lookup_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        paged = client.query_scenes_by_studio(["studio-1"])
+        paging_elapsed = time.perf_counter() - start
+        if len(df) != args.scenes or len(paged) != args.scenes:
+            raise SystemExit(f"{label}: expected {args.scenes} scenes")
+        print(f"  {label:<22} ids {lookup_elapsed:7.2f}s   paging {paging_elapsed:7.2f}s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
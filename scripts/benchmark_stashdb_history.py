@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Benchmark StashDbLake scene history and time travel as the number of table versions grows.
+
+Creates a scenes table with the change data feed enabled, then simulates daily crawls: every
+crawl merges a batch of random scenes, and every few crawls the tracked scene is among them.
+At a few version counts it measures:
+
+- the previous get_scene_history (read the full table at every version, filter by id)
+- get_scene_history reading the change data feed filtered by id
+- resolving a timestamp to a version (previous linear history scan vs cached binary search)
+
+Usage:
+    python scripts/benchmark_stashdb_history.py --scenes 20000 --versions 200
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+import polars as pl
+from deltalake import DeltaTable
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "libraries"))
+
+from libraries.stashdb_lake import StashDbLake
+
+
+def make_scene(scene_id: str, rng: random.Random) -> dict:
+    return {
+        "id": scene_id,
+        "title": f"Scene {rng.getrandbits(32):08x}",
+        "release_date": "2020-01-01",
+        "duration": rng.randint(600, 3600),
+        "studio": {"id": f"studio-{rng.randrange(100)}"},
+        "performers": [{"performer": {"id": f"performer-{rng.randrange(5000)}"}}],
+        "tags": [{"id": f"tag-{rng.randrange(500)}"}],
+        "fingerprints": [],
+    }
+
+
+def legacy_scene_history(path: Path, scene_id: str) -> pl.DataFrame:
+    """The previous get_scene_history: full table read for every version."""
+    versions = []
+    for entry in DeltaTable(str(path)).history():
+        version = entry["version"]
+        scene_df = pl.read_delta(str(path), version=version).filter(pl.col("id") == scene_id)
+        if len(scene_df) > 0:
+            versions.append(scene_df.with_columns(pl.lit(version).alias("_version")))
+    return pl.concat(versions).sort("scraped_at", descending=True)
+
+
+def legacy_version_at(dt: DeltaTable, timestamp: datetime) -> int | None:
+    """The previous linear history scan."""
+    for entry in dt.history():
+        if datetime.fromtimestamp(entry["timestamp"] / 1000, tz=UTC) <= timestamp:
+            return entry["version"]
+    return None
+
+
+def timed(func, repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StashDbLake scene history")
+    parser.add_argument("--scenes", type=int, default=20_000)
+    parser.add_argument("--versions", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=200, help="Scenes per simulated crawl")
+    parser.add_argument("--track-every", type=int, default=25, help="The tracked scene is re-crawled every N crawls")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    checkpoints = sorted({c for c in (10, 50, 100, 200, 400, args.versions) if c <= args.versions})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lake = StashDbLake(str(Path(tmp) / "stashdb"))
+        scene_ids = [f"scene-{i}" for i in range(args.scenes)]
+        tracked = scene_ids[0]
+        lake.upsert_scenes([make_scene(scene_id, rng) for scene_id in scene_ids])
+
+        print(f"{'versions':>8} {'history (previous)':>20} {'history (CDF)':>15} {'as_of (linear)':>16} {'as_of (bisect)':>16}")
+        for version_count in range(2, args.versions + 1):
+            batch = rng.sample(scene_ids[1:], args.batch_size - 1)
+            if version_count % args.track_every == 0:
+                batch.append(tracked)
+            lake.upsert_scenes([make_scene(scene_id, rng) for scene_id in batch])
+            if version_count not in checkpoints:
+                continue
+
+            legacy_ms = timed(lambda: legacy_scene_history(lake.scenes_path, tracked), repeats=1)
+            history = lake.get_scene_history(tracked)
+            cdf_ms = timed(lambda: lake.get_scene_history(tracked))
+            expected = 1 + version_count // args.track_every
+            if len(history) != expected or len(legacy_scene_history(lake.scenes_path, tracked).unique("scraped_at")) != expected:
+                raise SystemExit(f"Expected {expected} history rows, got {len(history)}")
+
+            dt = DeltaTable(str(lake.scenes_path))
+            middle = datetime.fromtimestamp(dt.history()[version_count // 2]["timestamp"] / 1000, tz=UTC)
+            linear_ms = timed(lambda dt=dt, middle=middle: legacy_version_at(dt, middle))
+            bisect_ms = timed(lambda dt=dt, middle=middle: lake._get_version_at_timestamp(dt, middle))
+            print(f"{version_count:>8} {legacy_ms:>17.1f} ms {cdf_ms:>12.1f} ms {linear_ms:>13.2f} ms {bisect_ms:>13.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
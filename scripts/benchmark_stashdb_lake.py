@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Benchmark StashDbLake point lookups on a synthetic scenes table.
+
+Builds a synthetic scenes table (default 500k scenes, appended in batches like repeated crawls)
+in a temporary directory and measures lookup latency of:
+
+- the previous approach: read the whole table with pl.read_delta, then filter by id
+- get_scenes(scene_ids=...) with the filter pushed down to the scan
+- the same after Z-ordering the table on id
+- studio and release date range queries on an unpartitioned and a release_year partitioned table
+
+Usage:
+    python scripts/benchmark_stashdb_lake.py --scenes 500000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+import polars as pl
+from deltalake import WriterProperties, write_deltalake
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "libraries"))
+
+from libraries.stashdb_lake import ROW_GROUP_SIZE, StashDbLake
+
+
+# Same row group size as StashDbLake writes
+WRITER_PROPERTIES = WriterProperties(max_row_group_size=ROW_GROUP_SIZE)
+
+
+def synthetic_batch(rng: random.Random, count: int, studio_ids: list[str]) -> pl.DataFrame:
+    release_dates = [date(2005, 1, 1) + timedelta(days=rng.randrange(20 * 365)) for _ in range(count)]
+    return pl.DataFrame({
+        "id": [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(count)],
+        "scraped_at": [datetime.now(UTC)] * count,
+        "title": [f"Scene {rng.getrandbits(32):08x}" for _ in range(count)],
+        "release_date": release_dates,
+        "duration": [rng.randint(600, 3600) for _ in range(count)],
+        "studio_id": [rng.choice(studio_ids) for _ in range(count)],
+        "parent_studio_id": [None] * count,
+        "performer_ids": [[str(uuid.UUID(int=rng.getrandbits(128)))] for _ in range(count)],
+        "tag_ids": [[f"tag-{rng.randrange(500)}"] for _ in range(count)],
+        "fingerprints": ["[]"] * count,
+        "json_document": ["{" + "x" * rng.randint(200, 600) + "}" for _ in range(count)],
+    }).with_columns(pl.col("parent_studio_id").cast(pl.Utf8))
+
+
+def build_table(path: Path, scenes: int, batch_size: int, partition_by: list[str] | None, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    studio_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(200)]
+    ids = []
+    for start in range(0, scenes, batch_size):
+        df = synthetic_batch(rng, min(batch_size, scenes - start), studio_ids)
+        if partition_by and "release_year" in partition_by:
+            df = df.with_columns(pl.col("release_date").dt.year().alias("release_year"))
+        write_deltalake(
+            str(path), df.to_arrow(), mode="append", partition_by=partition_by, writer_properties=WRITER_PROPERTIES
+        )
+        ids.extend(df["id"].to_list())
+    return ids
+
+
+def timed(label: str, func, repeats: int) -> None:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    print(f"  {label:<48} median {statistics.median(timings) * 1000:9.1f} ms   max {max(timings) * 1000:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StashDbLake reads")
+    parser.add_argument("--scenes", type=int, default=500_000)
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Scenes per commit")
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        lake = StashDbLake(str(Path(tmp) / "plain"))
+        start = time.perf_counter()
+        ids = build_table(lake.scenes_path, args.scenes, args.batch_size, None, args.seed)
+        print(f"Built {args.scenes} scenes in {time.perf_counter() - start:.1f}s")
+
+        def lookup_ids():
+            return [rng.choice(ids)]
+
+        print("Point lookups by id")
+        timed(
+            "read_delta + filter (previous)",
+            lambda: pl.read_delta(str(lake.scenes_path)).filter(pl.col("id").is_in(lookup_ids())),
+            max(3, args.lookups // 5),
+        )
+        timed("get_scenes(scene_ids) pushdown", lambda: lake.get_scenes(scene_ids=lookup_ids()), args.lookups)
+        start = time.perf_counter()
+        lake.z_order("scenes")
+        print(f"  (Z-order on id took {time.perf_counter() - start:.1f}s)")
+        timed("get_scenes(scene_ids) after Z-order", lambda: lake.get_scenes(scene_ids=lookup_ids()), args.lookups)
+
+        partitioned = StashDbLake(str(Path(tmp) / "partitioned"), scene_partition_by="release_year")
+        build_table(partitioned.scenes_path, args.scenes, args.batch_size, ["release_year"], args.seed)
+
+        studio_id = lake.get_scenes(scene_ids=[ids[0]])["studio_id"][0]
+        print("Range queries")
+        timed("studio (unpartitioned)", lambda: lake.get_scenes(studio_ids=[studio_id]), args.lookups)
+        timed(
+            "one release year (unpartitioned)",
+            lambda: lake.get_scenes(released_from=date(2015, 1, 1), released_to=date(2015, 12, 31)),
+            args.lookups,
+        )
+        timed(
+            "one release year (partitioned by release_year)",
+            lambda: partitioned.get_scenes(released_from=date(2015, 1, 1), released_to=date(2015, 12, 31)),
+            args.lookups,
+        )
+
+
+if __name__ == "__main__":
+    main()
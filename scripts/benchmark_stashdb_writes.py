@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Benchmark StashDbLake per-call upserts against the buffered writer, and table maintenance.
+
+Simulates a crawl that stores scenes one page at a time: with StashDbLake.upsert_scenes every
+page is its own MERGE and commit, with StashDbLakeWriter pages are merged in one commit per
+flush. Afterwards the per-call table is compacted and checkpointed with maintain(), and a full
+scan and a point lookup are timed before and after.
+
+Usage:
+    python scripts/benchmark_stashdb_writes.py --pages 200 --page-size 25
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from deltalake import DeltaTable
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "libraries"))
+
+from libraries.stashdb_lake import StashDbLake
+
+
+def make_scene(scene_id: str, rng: random.Random) -> dict:
+    return {
+        "id": scene_id,
+        "title": f"Scene {rng.getrandbits(32):08x}",
+        "release_date": "2020-01-01",
+        "duration": rng.randint(600, 3600),
+        "studio": {"id": f"studio-{rng.randrange(100)}"},
+        "performers": [{"performer": {"id": f"performer-{rng.randrange(5000)}"}}],
+        "tags": [{"id": f"tag-{rng.randrange(500)}"}],
+        "fingerprints": [],
+    }
+
+
+def timed(func, repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StashDbLake writes")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [
+        [make_scene(f"scene-{page}-{i}", rng) for i in range(args.page_size)] for page in range(args.pages)
+    ]
+    scene_count = args.pages * args.page_size
+
+    with tempfile.TemporaryDirectory() as tmp:
+        per_call = StashDbLake(str(Path(tmp) / "per_call"))
+        start = time.perf_counter()
+        for page in pages:
+            per_call.upsert_scenes(page)
+        per_call_elapsed = time.perf_counter() - start
+
+        buffered = StashDbLake(str(Path(tmp) / "buffered"))
+        start = time.perf_counter()
+        with buffered.buffered() as writer:
+            for page in pages:
+                writer.upsert_scenes(page)
+        buffered_elapsed = time.perf_counter() - start
+
+        print(f"{args.pages} pages x {args.page_size} scenes")
+        for label, lake, elapsed in (("upsert per page", per_call, per_call_elapsed), ("buffered writer", buffered, buffered_elapsed)):
+            dt = DeltaTable(str(lake.scenes_path))
+            print(
+                f"  {label:<16} {elapsed:8.2f}s  {scene_count / elapsed:10.0f} scenes/s"
+                f"  {len(dt.file_uris()):5} files  {dt.version() + 1:5} commits"
+            )
+
+        lookup_id = pages[len(pages) // 2][0]["id"]
+        scan_before = timed(per_call.get_scenes)
+        lookup_before = timed(lambda: per_call.get_scenes(scene_ids=[lookup_id]))
+        start = time.perf_counter()
+        (result,) = per_call.maintain(retention_hours=0)
+        maintain_elapsed = time.perf_counter() - start
+        scan_after = timed(per_call.get_scenes)
+        lookup_after = timed(lambda: per_call.get_scenes(scene_ids=[lookup_id]))
+
+        print(
+            f"maintain() on the per-page table: {maintain_elapsed:.2f}s, files {result.files_before} -> {result.files_after},"
+            f" {result.files_vacuumed} vacuumed"
+        )
+        print(f"  full scan      {scan_before:8.1f} ms -> {scan_after:8.1f} ms")
+        print(f"  point lookup   {lookup_before:8.1f} ms -> {lookup_after:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
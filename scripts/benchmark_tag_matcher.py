@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Benchmark CE-to-Stashapp tag matching against the previous nested-loop comparison.
+
+Generates synthetic tag names (with near-duplicates, separators and case changes), runs
+find_tag_matches and a sample of the previous all-pairs loop, and checks they agree.
+
+Usage:
+    python scripts/benchmark_tag_matcher.py --ce-tags 4000 --stashapp-tags 8000
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from dataclasses import astuple
+from pathlib import Path
+
+import polars as pl
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "cli"))
+
+from culture_cli.modules.ce.utils.tag_matcher import (
+    TagMatch,
+    TagMatchIndex,
+    calculate_similarity,
+    find_tag_matches,
+)
+
+
+def legacy_find_tag_matches(ce_tags: pl.DataFrame, stashapp_tags: pl.DataFrame, threshold: float) -> list[TagMatch]:
+    """The previous find_tag_matches: every CE tag against every Stashapp tag."""
+    matches = []
+    stashapp_tags_list = stashapp_tags.select(["id", "name", "stashdb_id"]).to_dicts()
+    for ce_tag in ce_tags.select(["ce_tags_uuid", "ce_tags_name"]).to_dicts():
+        for stash_tag in stashapp_tags_list:
+            distance, similarity = calculate_similarity(ce_tag["ce_tags_name"], stash_tag["name"])
+            if similarity >= threshold:
+                matches.append(
+                    TagMatch(
+                        ce_uuid=ce_tag["ce_tags_uuid"],
+                        ce_name=ce_tag["ce_tags_name"],
+                        stashapp_id=stash_tag["id"],
+                        stashapp_name=stash_tag["name"],
+                        stashdb_id=stash_tag.get("stashdb_id"),
+                        distance=distance,
+                        similarity=similarity,
+                    )
+                )
+    matches.sort(key=lambda x: (-x.similarity, x.distance))
+    return matches
+
+
+def generate_names(rng: random.Random, base: list[str], count: int) -> list[str]:
+    names = []
+    for _ in range(count):
+        name = list(rng.choice(base))
+        for _ in range(rng.randint(0, 2)):
+            position = rng.randrange(len(name) + 1)
+            name.insert(position, rng.choice(string.ascii_lowercase + " -_"))
+        names.append("".join(name).title() if rng.random() < 0.5 else "".join(name))
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy tag matching")
+    parser.add_argument("--ce-tags", type=int, default=4000)
+    parser.add_argument("--stashapp-tags", type=int, default=8000)
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--legacy-sample", type=int, default=100, help="CE tags to run through the (slow) nested loop")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    base = [
+        " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(rng.randint(1, 3)))
+        for _ in range(args.stashapp_tags)
+    ]
+    stashapp_tags = pl.DataFrame({
+        "id": list(range(args.stashapp_tags)),
+        "name": generate_names(rng, base, args.stashapp_tags),
+        "stashdb_id": [None] * args.stashapp_tags,
+    })
+    ce_tags = pl.DataFrame({
+        "ce_tags_uuid": [str(i) for i in range(args.ce_tags)],
+        "ce_tags_name": generate_names(rng, base, args.ce_tags),
+    })
+    pairs = args.ce_tags * args.stashapp_tags
+    print(f"{args.ce_tags} CE tags x {args.stashapp_tags} Stashapp tags ({pairs:,} pairs), threshold {args.threshold}")
+
+    start = time.perf_counter()
+    matches = find_tag_matches(ce_tags, stashapp_tags, threshold=args.threshold)
+    elapsed = time.perf_counter() - start
+    print(f"  blocked cdist:  {elapsed:8.2f}s  {pairs / elapsed:14,.0f} pairs/s  {len(matches)} matches")
+
+    index = TagMatchIndex(stashapp_tags)
+    names = ce_tags["ce_tags_name"].to_list()
+    start = time.perf_counter()
+    for name in names:
+        index.find_best_match(name, threshold=args.threshold)
+    lookup_elapsed = time.perf_counter() - start
+    print(f"  index lookups:  {lookup_elapsed:8.2f}s  {len(names) / lookup_elapsed:14,.0f} tags/s")
+
+    sample = ce_tags.head(args.legacy_sample)
+    sample_pairs = len(sample) * args.stashapp_tags
+    start = time.perf_counter()
+    legacy_matches = legacy_find_tag_matches(sample, stashapp_tags, args.threshold)
+    legacy_elapsed = time.perf_counter() - start
+    print(f"  nested loops:   {legacy_elapsed:8.2f}s  {sample_pairs / legacy_elapsed:14,.0f} pairs/s  ({len(sample)} CE tag sample)")
+
+    sample_matches = find_tag_matches(sample, stashapp_tags, threshold=args.threshold)
+    if [astuple(m) for m in sample_matches] != [astuple(m) for m in legacy_matches]:
+        raise SystemExit("Blocked and nested-loop matchers disagree")
+    print(f"  results identical on the {len(sample)} CE tag sample")
+
+
+if __name__ == "__main__":
+    main()
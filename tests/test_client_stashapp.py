@@ -0,0 +1,383 @@
+import re
+import threading
+from datetime import UTC, date, datetime
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from libraries.client_stashapp import StashAppClient, scene_projections, scenes_schema
+
+
+def make_scene(scene_id: int, oshash: str) -> dict:
+    # Scenes past the first two vary their dates: offsets, fractional seconds, missing values
+    offset = ["Z", "Z", "Z", "+05:30", "-04:00", ".250+01:00", ".5Z"][scene_id % 7] if scene_id > 2 else "Z"
+    return {
+        "id": str(scene_id),
+        "code": None,
+        "title": f"Scene {scene_id}",
+        "details": "",
+        "date": "" if scene_id % 11 == 3 else None if scene_id % 11 == 4 else f"2024-01-{scene_id % 28 + 1:02d}",
+        "urls": [f"https://example.com/{scene_id}"],
+        "created_at": f"2024-01-02T03:04:05{offset}",
+        "updated_at": None if scene_id % 13 == 5 else "2024-01-03T03:04:05Z",
+        "organized": False,
+        "interactive": False,
+        "play_duration": 0,
+        "play_count": 0,
+        "o_counter": 0,
+        "performers": [
+            {
+                "id": "7",
+                "name": "Performer",
+                "disambiguation": None,
+                "alias_list": [],
+                "gender": "FEMALE",
+                "favorite": False,
+                "stash_ids": [{"endpoint": "https://stashdb.org/graphql", "stash_id": "abc", "updated_at": "2024-01-01T00:00:00Z"}],
+                "custom_fields": {},
+            }
+        ],
+        "studio": {"id": "3", "name": "Studio", "url": None, "tags": [], "parent_studio": None},
+        "files": [
+            {
+                "id": str(scene_id * 10),
+                "path": f"/media/{scene_id}.mp4",
+                "basename": f"{scene_id}.mp4",
+                "size": 1000,
+                "duration": 60.5,
+                "fingerprints": [{"type": "oshash", "value": oshash}, {"type": "phash", "value": "ff"}],
+            }
+        ],
+        "tags": [{"id": "1", "name": "Tag"}],
+        "stash_ids": [],
+        "galleries": [],
+    }
+
+
+SCENES_BY_OSHASH = {f"{i:016x}": make_scene(i, f"{i:016x}") for i in range(1, 251)}
+
+
+TAGS = [{"id": str(i), "name": f"Tag {i}"} for i in range(1, 6)]
+
+
+class StubStash:
+    """Answers findSceneByHash, single or aliased, from SCENES_BY_OSHASH, and tag queries from scene_tags."""
+
+    def __init__(self, scene_tags: dict[int, set[int]] | None = None):
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.scene_tags = scene_tags or {}
+        self.mutations = []
+
+    def find_scene_by_hash(self, hash_input, fragment=None):
+        with self.lock:
+            self.requests += 1
+        return SCENES_BY_OSHASH.get(hash_input["oshash"])
+
+    def find_tags(self, fragment=None):
+        return TAGS
+
+    def call_GQL(self, query, variables):  # noqa: N802 - StashInterface method name
+        with self.lock:
+            self.requests += 1
+        if "IterScenes" in query:
+            library = list(SCENES_BY_OSHASH.values())
+            start = (variables["filter"]["page"] - 1) * variables["filter"]["per_page"]
+            return {"findScenes": {"count": len(library), "scenes": library[start : start + variables["filter"]["per_page"]]}}
+        if "findScenes(ids:" in query:
+            scenes = [
+                {"id": scene_id, "tags": [{"id": str(tag_id)} for tag_id in self.scene_tags[int(scene_id)]]}
+                for scene_id in variables["ids"]
+                if int(scene_id) in self.scene_tags
+            ]
+            return {"findScenes": {"scenes": scenes}}
+        if "bulkSceneUpdate" in query:
+            update = variables["input"]
+            self.mutations.append((update["tag_ids"]["mode"], update["tag_ids"]["ids"], update["ids"]))
+            for scene_id in update["ids"]:
+                if update["tag_ids"]["mode"] == "ADD":
+                    self.scene_tags[scene_id] |= set(update["tag_ids"]["ids"])
+                else:
+                    self.scene_tags[scene_id] -= set(update["tag_ids"]["ids"])
+            return {"bulkSceneUpdate": [{"id": str(scene_id)} for scene_id in update["ids"]]}
+        return {
+            alias: SCENES_BY_OSHASH.get(variables[variable])
+            for alias, variable in re.findall(r"(\w+): findSceneByHash\(input: \{oshash: \$(\w+)\}\)", query)
+        }
+
+
+def legacy_map_scene_data(stash_scene):
+    """StashAppClient._map_scene_data before dates were parsed for whole columns (frozen copy)."""
+    scene_data = {
+        "stashapp_id": int(stash_scene.get("id")),
+        "stashapp_code": stash_scene.get("code", ""),
+        "stashapp_title": stash_scene.get("title", ""),
+        "stashapp_details": stash_scene.get("details", ""),
+        "stashapp_date": (
+            datetime.strptime(stash_scene.get("date", ""), "%Y-%m-%d").date()  # noqa: DTZ007 - as in the original
+            if stash_scene.get("date")
+            else None
+        ),
+        "stashapp_urls": stash_scene.get("urls", []),
+        "stashapp_created_at": (
+            datetime.fromisoformat(
+                stash_scene.get("created_at").replace("Z", "+00:00")
+            )
+            if stash_scene.get("created_at")
+            else None
+        ),
+        "stashapp_updated_at": (
+            datetime.fromisoformat(
+                stash_scene.get("updated_at").replace("Z", "+00:00")
+            )
+            if stash_scene.get("updated_at")
+            else None
+        ),
+        "stashapp_performers": [
+            {
+                "stashapp_performers_id": int(p.get("id")),
+                "stashapp_performers_name": p.get("name"),
+                "stashapp_performers_disambiguation": p.get("disambiguation"),
+                "stashapp_performers_alias_list": p.get("alias_list", []),
+                "stashapp_performers_gender": p.get("gender"),
+                "stashapp_performers_favorite": p.get("favorite", False),
+                "stashapp_performers_stash_ids": [
+                    {
+                        "endpoint": x["endpoint"],
+                        "stash_id": x["stash_id"],
+                        "updated_at": x["updated_at"],
+                    }
+                    for x in p.get("stash_ids", [])
+                ],
+                "stashapp_performers_stashdb_id": next(
+                    (
+                        x["stash_id"]
+                        for x in p.get("stash_ids", [])
+                        if x["endpoint"] == "https://stashdb.org/graphql"
+                    ),
+                    None,
+                ),
+                "stashapp_performers_tpdb_id": next(
+                    (
+                        x["stash_id"]
+                        for x in p.get("stash_ids", [])
+                        if x["endpoint"] == "https://theporndb.net/graphql"
+                    ),
+                    None,
+                ),
+                "stashapp_performers_custom_fields": [
+                    {"key": k, "value": v}
+                    for k, v in p.get("custom_fields", {}).items()
+                ],
+            }
+            for p in stash_scene.get("performers", [])
+        ],
+        "stashapp_studio": stash_scene.get("studio", {}),
+        "stashapp_files": [
+            {
+                "id": int(f.get("id")),
+                "path": f.get("path", ""),
+                "basename": f.get("basename", ""),
+                "size": int(f.get("size", 0)),
+                "duration": int(
+                    f.get("duration", 0) * 1000
+                ),  # Convert seconds to milliseconds
+                "fingerprints": [
+                    {
+                        "type": fp.get("type", ""),
+                        "value": fp.get("value", ""),
+                    }
+                    for fp in f.get("fingerprints", [])
+                ],
+            }
+            for f in stash_scene.get("files", [])
+        ],
+        "stashapp_primary_file_path": stash_scene.get("files", [])[0].get(
+            "path", ""
+        ),
+        "stashapp_primary_file_basename": stash_scene.get("files", [])[0].get(
+            "basename", ""
+        ),
+        "stashapp_primary_file_oshash": next(
+            (
+                fp["value"]
+                for fp in stash_scene.get("files", [])[0].get("fingerprints", [])
+                if fp["type"] == "oshash"
+            ),
+            None,
+        ),
+        "stashapp_primary_file_phash": next(
+            (
+                fp["value"]
+                for fp in stash_scene.get("files", [])[0].get("fingerprints", [])
+                if fp["type"] == "phash"
+            ),
+            None,
+        ),
+        "stashapp_primary_file_xxhash": next(
+            (
+                fp["value"]
+                for fp in stash_scene.get("files", [])[0].get("fingerprints", [])
+                if fp["type"] == "xxhash"
+            ),
+            None,
+        ),
+        "stashapp_primary_file_duration": stash_scene.get("files", [])[0].get(
+            "duration", 0
+        )
+        * 1000,
+        "stashapp_tags": stash_scene.get("tags", []),
+        "stashapp_organized": stash_scene.get("organized", False),
+        "stashapp_interactive": stash_scene.get("interactive", False),
+        "stashapp_play_duration": stash_scene.get("play_duration", 0),
+        "stashapp_play_count": stash_scene.get("play_count", 0),
+        "stashapp_o_counter": stash_scene.get("o_counter", 0),
+        "stashapp_stash_ids": stash_scene.get("stash_ids", []),
+        "stashapp_stashdb_id": next(
+            (
+                x["stash_id"]
+                for x in stash_scene.get("stash_ids", [])
+                if x["endpoint"] == "https://stashdb.org/graphql"
+            ),
+            None,
+        ),
+        "stashapp_tpdb_id": next(
+            (
+                x["stash_id"]
+                for x in stash_scene.get("stash_ids", [])
+                if x["endpoint"] == "https://theporndb.net/graphql"
+            ),
+            None,
+        ),
+        "stashapp_ce_id": next(
+            (
+                x["stash_id"]
+                for x in stash_scene.get("stash_ids", [])
+                if x["endpoint"] == "https://culture.extractor/graphql"
+            ),
+            None,
+        ),
+        "stashapp_galleries": [
+            {
+                "id": int(g.get("id")),
+                "title": g.get("title", ""),
+            }
+            for g in stash_scene.get("galleries", [])
+        ],
+    }
+    return scene_data
+
+
+def make_client(scene_tags: dict[int, set[int]] | None = None) -> StashAppClient:
+    client = StashAppClient.__new__(StashAppClient)
+    client.stash = StubStash(scene_tags)
+    return client
+
+
+def test_find_scenes_by_oshash_matches_per_hash_lookup():
+    oshashes = [*reversed(SCENES_BY_OSHASH), "missing", "0000000000000001"]
+
+    # One findSceneByHash request per oshash and per-row date parsing, as before batching
+    client = make_client()
+    expected = pl.DataFrame(
+        [legacy_map_scene_data(scene) for oshash in oshashes if (scene := client.stash.find_scene_by_hash({"oshash": oshash}))],
+        schema=scenes_schema,
+    )
+    assert len(expected) == 251
+
+    client = make_client()
+    batched = client.find_scenes_by_oshash(oshashes, batch_size=100, max_workers=3)
+
+    assert_frame_equal(batched, expected)
+    assert client.stash.requests == 3
+
+
+def test_scene_dates_parsed_per_column():
+    client = make_client()
+    scenes = [
+        {**SCENES_BY_OSHASH["0000000000000001"], "created_at": "2024-01-02T03:04:05+01:00"},
+        {**SCENES_BY_OSHASH["0000000000000002"], "date": "", "updated_at": None},
+    ]
+
+    df = client._scenes_to_dataframe(scenes)
+
+    assert df.schema == pl.DataFrame(schema=scenes_schema).schema
+    assert df["stashapp_date"].to_list() == [date(2024, 1, 2), None]
+    # Offsets are converted to UTC, like datetime.fromisoformat into a naive Datetime column
+    assert df["stashapp_created_at"].dt.replace_time_zone("UTC").to_list() == [
+        datetime(2024, 1, 2, 2, 4, 5, tzinfo=UTC),
+        datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC),
+    ]
+    assert df["stashapp_updated_at"].dt.replace_time_zone("UTC").to_list() == [datetime(2024, 1, 3, 3, 4, 5, tzinfo=UTC), None]
+
+
+def test_iter_scenes_yields_pages():
+    client = make_client()
+
+    chunks = list(client.iter_scenes({}, projection="files", per_page=100))
+
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert client.stash.requests == 3
+    assert chunks[0].columns == scene_projections["files"][1]
+    assert chunks[0]["stashapp_primary_file_oshash"][0] == "0000000000000001"
+
+
+def test_find_scenes_projections():
+    client = make_client()
+
+    full = client.find_scenes({})
+    minimal = client.find_scenes_by_studio([3], projection="minimal")
+
+    assert full.schema == pl.DataFrame(schema=scenes_schema).schema
+    assert len(full) == len(SCENES_BY_OSHASH)
+    assert_frame_equal(minimal, full.select(scene_projections["minimal"][1]))
+
+
+def test_find_scenes_by_oshash_empty():
+    client = make_client()
+    assert client.find_scenes_by_oshash([]).is_empty()
+    assert client.stash.requests == 0
+
+
+def test_update_tags_for_scenes_groups_scenes_by_change():
+    scene_tags = {scene_id: {1} for scene_id in range(1, 8)}
+    scene_tags[6] = {1, 2, 3}
+    scene_tags[7] = {2}
+    client = make_client(scene_tags)
+
+    results = client.update_tags_for_scenes([*range(1, 8), 99], ["Tag 2"], ["Tag 1", "Tag 4"], batch_size=4)
+
+    assert results == {**dict.fromkeys(range(1, 8), True), 99: False}
+    assert all(tags == {2} for scene_id, tags in scene_tags.items() if scene_id != 6)
+    assert scene_tags[6] == {2, 3}
+    # Scenes 1-5 share one change (in two batches), scene 6 only loses a tag, scene 7 is unchanged
+    assert client.stash.mutations == [
+        ("ADD", [2], [1, 2, 3, 4]),
+        ("REMOVE", [1], [1, 2, 3, 4]),
+        ("ADD", [2], [5]),
+        ("REMOVE", [1], [5]),
+        ("REMOVE", [1], [6]),
+    ]
+
+
+def test_update_tags_for_scenes_dry_run(capsys):
+    scene_tags = {1: {1}, 2: {1}}
+    client = make_client(scene_tags)
+
+    results = client.update_tags_for_scenes([1, 2], ["Tag 3"], [], dry_run=True)
+
+    assert results == {1: True, 2: True}
+    assert client.stash.mutations == []
+    assert scene_tags == {1: {1}, 2: {1}}
+    assert "bulkSceneUpdate ADD [Tag 3] on 2 scene(s): [1, 2]" in capsys.readouterr().out
+
+
+def test_update_tags_for_scenes_accepts_string_ids():
+    scene_tags = {1: {1}, 2: {1}}
+    client = make_client(scene_tags)
+
+    results = client.update_tags_for_scenes(["1", "2"], ["Tag 3"], [])
+
+    assert results == {1: True, 2: True}
+    assert client.stash.mutations == [("ADD", [3], [1, 2])]
+    assert scene_tags == {1: {1, 3}, 2: {1, 3}}
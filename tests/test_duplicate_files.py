@@ -0,0 +1,132 @@
+import random
+
+from libraries.client_stashapp import StashAppClient
+from libraries.duplicate_files import (
+    CODECS_DIFFER_TAG,
+    DURATION_MISMATCH_TAG,
+    PHASH_MISMATCH_TAG,
+    apply_duplicate_tags,
+    check_duplicate_files,
+    files_to_dataframe,
+    phash_distances,
+)
+
+
+def make_file(file_id: int, *, duration: float = 600.0, phash: str | None = "ffff000000000000", video_codec: str = "h264") -> dict:
+    fingerprints = [{"type": "oshash", "value": f"{file_id:016x}"}]
+    if phash is not None:
+        fingerprints.append({"type": "phash", "value": phash})
+    return {
+        "id": str(file_id),
+        "path": f"/media/{file_id}.mp4",
+        "size": 1000,
+        "duration": duration,
+        "width": 1920,
+        "height": 1080,
+        "format": "mp4",
+        "video_codec": video_codec,
+        "audio_codec": "aac",
+        "fingerprints": fingerprints,
+    }
+
+
+def make_scene(scene_id: int, files: list[dict], tags: list[str] | None = None) -> dict:
+    return {
+        "id": str(scene_id),
+        "title": f"Scene {scene_id}",
+        "date": "2024-01-02",
+        "studio": None,
+        "tags": [{"name": name} for name in tags or []],
+        "files": files,
+    }
+
+
+SCENES = [
+    # Identical files
+    make_scene(1, [make_file(10), make_file(11)]),
+    # Durations differ, so the different phash is expected
+    make_scene(2, [make_file(20, duration=600.0), make_file(21, duration=612.4, phash="0000ffff00000000")]),
+    # Same duration, 9 bits apart, unpadded hex as Stashapp stores it
+    make_scene(3, [make_file(30, phash="1ff"), make_file(31, phash="0")], tags=[DURATION_MISMATCH_TAG]),
+    # Duration within tolerance, different video codecs, one file without phash
+    make_scene(4, [make_file(40, duration=600.0), make_file(41, duration=600.8, video_codec="hevc", phash=None)]),
+]
+
+
+def hamming_distance_hex(hash1: str, hash2: str) -> int:
+    return (int(hash1, 16) ^ int(hash2, 16)).bit_count()
+
+
+def test_phash_distances_match_python():
+    rng = random.Random(0)
+    phashes = [f"{rng.getrandbits(64):x}" for _ in range(30)]
+    scenes = [make_scene(i, [make_file(i * 10 + j, phash=phashes[i * 3 + j]) for j in range(3)]) for i in range(10)]
+
+    distances = phash_distances(files_to_dataframe(scenes))
+
+    expected = {
+        (int(a["id"]), int(b["id"])): hamming_distance_hex(a["fingerprints"][1]["value"], b["fingerprints"][1]["value"])
+        for scene in scenes
+        for i, a in enumerate(scene["files"])
+        for b in scene["files"][i + 1 :]
+    }
+    assert {(row["file_id"], row["other_file_id"]): row["phash_distance"] for row in distances.iter_rows(named=True)} == expected
+
+
+def test_check_duplicate_files():
+    checks = check_duplicate_files(files_to_dataframe(SCENES))
+
+    assert checks["scene_id"].to_list() == [1, 2, 3, 4]
+    assert checks["file_count"].to_list() == [2, 2, 2, 2]
+    assert checks["max_phash_distance"].to_list() == [0, 32, 9, None]
+    assert checks["duration_mismatch"].to_list() == [False, True, False, False]
+    assert checks["phash_mismatch"].to_list() == [False, False, True, False]
+    assert checks["codecs_differ"].to_list() == [False, False, False, True]
+
+
+def test_check_duplicate_files_thresholds():
+    checks = check_duplicate_files(files_to_dataframe(SCENES), duration_tolerance=0.5, phash_threshold=9)
+
+    assert checks["duration_mismatch"].to_list() == [False, True, False, True]
+    assert checks["phash_mismatch"].to_list() == [False, False, False, False]
+
+
+class StubStash:
+    """Tags by name, findScenes for tagged single-file scenes and bulkSceneUpdate."""
+
+    def __init__(self):
+        self.mutations = []
+
+    def find_tags(self, fragment=None):
+        return [{"id": "1", "name": DURATION_MISMATCH_TAG}, {"id": "2", "name": PHASH_MISMATCH_TAG}, {"id": "3", "name": CODECS_DIFFER_TAG}]
+
+    def call_GQL(self, query, variables):  # noqa: N802 - StashInterface method name
+        if "bulkSceneUpdate" in query:
+            update = variables["input"]
+            self.mutations.append((update["tag_ids"]["mode"], update["tag_ids"]["ids"], update["ids"]))
+            return {"bulkSceneUpdate": []}
+        # Scene 9 has one file left and is still tagged with the duration mismatch tag
+        tagged = variables["scene_filter"]["tags"]["value"] == [1]
+        scenes = [{"id": "9"}] if tagged else []
+        return {"findScenes": {"count": len(scenes), "scenes": scenes}}
+
+
+def test_apply_duplicate_tags_only_changes_differing_scenes(capsys):
+    client = StashAppClient.__new__(StashAppClient)
+    client.stash = StubStash()
+    checks = check_duplicate_files(files_to_dataframe(SCENES))
+
+    counts = apply_duplicate_tags(client, checks)
+
+    assert counts == {DURATION_MISMATCH_TAG: (1, 2), PHASH_MISMATCH_TAG: (1, 0), CODECS_DIFFER_TAG: (1, 0)}
+    assert client.stash.mutations == [("ADD", [1], [2]), ("REMOVE", [1], [3, 9]), ("ADD", [2], [3]), ("ADD", [3], [4])]
+
+    client.stash.mutations = []
+    apply_duplicate_tags(client, checks, dry_run=True)
+    assert client.stash.mutations == []
+    assert f"bulkSceneUpdate REMOVE [{DURATION_MISMATCH_TAG}] on 2 scene(s): [3, 9]" in capsys.readouterr().out
+
+
+def test_files_to_dataframe_empty():
+    assert files_to_dataframe([]).is_empty()
+    assert check_duplicate_files(files_to_dataframe([])).is_empty()
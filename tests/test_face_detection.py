@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("cv2")
+
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "analysis" / "scripts" / "scripts"))
+
+from face_detection import SCRFDBackend  # noqa: E402
+
+
+STRIDES = [8, 16, 32]
+# The one face: first anchor at row 10, column 20 of stride 8, centered at (160, 80)
+FACE_ANCHOR = (10 * 80 + 20) * 2
+FACE_BOX = (144, 56, 48, 64)
+
+
+def write_model(path: Path, *, batched_input: bool = True, flat_outputs: bool = False, anchors_per_location: int = 2) -> Path:
+    """An SCRFD-shaped model (scores and boxes for strides 8, 16 and 32) returning one face for every frame.
+
+    flat_outputs returns (frames * anchors, values) like models exported without a batch axis.
+    """
+    nodes = [
+        helper.make_node("Shape", ["input.1"], ["shape"]),
+        helper.make_node("Slice", ["shape", "zero", "one"], ["batch"]),
+    ]
+    initializers = [
+        numpy_helper.from_array(np.array([0], dtype=np.int64), "zero"),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), "one"),
+    ]
+    outputs = []
+    for kind, width in (("score", 1), ("bbox", 4)):
+        for stride in STRIDES:
+            anchors = (640 // stride) ** 2 * anchors_per_location
+            value = np.zeros((1, anchors, width), dtype=np.float32)
+            if stride == 8:
+                value[0, FACE_ANCHOR] = 0.9 if kind == "score" else [2, 3, 4, 5]
+            name = f"{kind}_{stride}"
+            initializers += [
+                numpy_helper.from_array(value, f"{name}_value"),
+                numpy_helper.from_array(np.array([anchors, width], dtype=np.int64), f"{name}_dims"),
+            ]
+            nodes += [
+                helper.make_node("Concat", ["batch", f"{name}_dims"], [f"{name}_shape"], axis=0),
+                helper.make_node("Expand", [f"{name}_value", f"{name}_shape"], [f"{name}_batch" if flat_outputs else name]),
+            ]
+            if flat_outputs:
+                initializers.append(numpy_helper.from_array(np.array([-1, width], dtype=np.int64), f"{name}_flat"))
+                nodes.append(helper.make_node("Reshape", [f"{name}_batch", f"{name}_flat"], [name]))
+                outputs.append(helper.make_tensor_value_info(name, TensorProto.FLOAT, ["anchors", width]))
+            else:
+                outputs.append(helper.make_tensor_value_info(name, TensorProto.FLOAT, ["batch", anchors, width]))
+
+    model_input = helper.make_tensor_value_info("input.1", TensorProto.FLOAT, ["batch" if batched_input else 1, 3, 640, 640])
+    graph = helper.make_graph(nodes, "scrfd", [model_input], outputs, initializers)
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)], ir_version=8), path)
+    return path
+
+
+def frames(count: int) -> list[np.ndarray]:
+    return [np.zeros((640, 640, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def test_batched_model(tmp_path):
+    backend = SCRFDBackend(write_model(tmp_path / "model.onnx"), batch_size=8)
+
+    assert backend.batched
+    assert backend.batch_size == 8
+    faces = backend.detect(frames(5))
+    assert [[face.box for face in frame_faces] for frame_faces in faces] == [[FACE_BOX]] * 5
+    assert faces[0][0].confidence == pytest.approx(0.9)
+
+
+def test_dynamic_input_with_flat_outputs_runs_one_frame_at_a_time(tmp_path):
+    backend = SCRFDBackend(write_model(tmp_path / "model.onnx", flat_outputs=True), batch_size=8)
+
+    assert not backend.batched
+    assert backend.batch_size == 1
+    faces = backend.detect(frames(3))
+    assert [[face.box for face in frame_faces] for frame_faces in faces] == [[FACE_BOX]] * 3
+
+
+def test_fixed_batch_model(tmp_path):
+    backend = SCRFDBackend(write_model(tmp_path / "model.onnx", batched_input=False), batch_size=8)
+
+    assert backend.batch_size == 1
+    assert [[face.box for face in frame_faces] for frame_faces in backend.detect(frames(2))] == [[FACE_BOX]] * 2
+
+
+def test_anchor_count_mismatch(tmp_path):
+    # One anchor per location, while models with 6 outputs have two
+    backend = SCRFDBackend(write_model(tmp_path / "model.onnx", anchors_per_location=1))
+
+    with pytest.raises(ValueError, match="expected 12800 anchors"):
+        backend.detect(frames(1))
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from libraries.face_index import FaceIndex
+
+
+DIM = 16
+
+
+def random_embeddings(rng: np.random.Generator, count: int) -> np.ndarray:
+    return rng.normal(size=(count, DIM)).astype(np.float32)
+
+
+def test_search_matches_brute_force_cosine(tmp_path):
+    rng = np.random.default_rng(0)
+    index = FaceIndex(tmp_path, dim=DIM)
+    embeddings = random_embeddings(rng, 300)
+    for performer in range(3):
+        rows = slice(performer * 100, (performer + 1) * 100)
+        sources = [f"p{performer}/{i}.jpg" for i in range(100)]
+        assert index.add(embeddings[rows], f"id-{performer}", f"Performer {performer}", sources) == 100
+
+    queries = random_embeddings(rng, 5)
+    results = index.search(queries, k=7)
+
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similarities = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T
+    for query, matches in enumerate(results):
+        expected = np.argsort(-similarities[query])[:7]
+        assert [match.source for match in matches] == [f"p{row // 100}/{row % 100}.jpg" for row in expected]
+        assert [match.similarity for match in matches] == pytest.approx(similarities[query, expected].tolist(), abs=1e-5)
+
+
+def test_add_is_incremental_and_skips_indexed_sources(tmp_path):
+    rng = np.random.default_rng(1)
+    index = FaceIndex(tmp_path, dim=DIM)
+    first = random_embeddings(rng, 3)
+    assert index.add(first, "a", "Alice", ["a/1.jpg", "a/2.jpg", "a/3.jpg"]) == 3
+    # Grows past the initial 1024 rows of the embeddings file
+    assert index.add(random_embeddings(rng, 1500), "b", "Bea", [f"b/{i}.jpg" for i in range(1500)]) == 1500
+    assert index.add(random_embeddings(rng, 2), "a", "Alice", ["a/3.jpg", "a/4.jpg"]) == 1
+    index.close()
+
+    reopened = FaceIndex(tmp_path, dim=DIM)
+    assert len(reopened) == 1504
+    assert reopened.performers() == {"a": ("Alice", 4), "b": ("Bea", 1500)}
+    assert reopened.indexed_sources(["a/1.jpg", "a/5.jpg"]) == {"a/1.jpg"}
+    assert reopened.search(first[1], k=1)[0][0].source == "a/2.jpg"
+
+
+def test_identify_ranks_performers_of_nearest_faces(tmp_path):
+    index = FaceIndex(tmp_path, dim=2)
+    index.add([[1, 0], [0.9, 0.1], [0.8, 0.2]], "a", "Alice", ["a1", "a2", "a3"])
+    index.add([[0.95, 0.05], [0, 1]], "b", "Bea", ["b1", "b2"])
+
+    [performers] = index.identify([[1, 0]], k=4)
+    assert [(performer.performer_id, performer.faces) for performer in performers] == [("a", 3), ("b", 1)]
+    assert performers[0].similarity == pytest.approx(1.0)
+
+    assert index.identify([[-1, 0]], min_similarity=0.5) == [[]]
+
+
+def test_empty_index_and_dimension_mismatch(tmp_path):
+    index = FaceIndex(tmp_path, dim=DIM)
+    assert index.search(np.ones((2, DIM)), k=3) == [[], []]
+    with pytest.raises(ValueError, match="16-dimensional"):
+        FaceIndex(tmp_path, dim=512)
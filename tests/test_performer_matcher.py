@@ -282,3 +282,44 @@ def test_stashdb_scene_matching_without_stashapp(all_stashapp_performers):
     assert match.stashapp_id == -1, "Should have placeholder Stashapp ID since performer doesn't exist in Stashapp"
     assert match.stashapp_name == "", "Should have empty Stashapp name since performer doesn't exist in Stashapp"
     assert match.confidence >= 0.9, "Should have high confidence for exact name match"
+
+def test_candidate_performers_cover_every_possible_match():
+    """Index candidates must include every performer with a non-zero confidence, in list order"""
+    names = ["Jill Kassidy", "Jill", "Kassidy", "Jo", "Anna Bell Peaks", "Bella", "Annabelle", "Ann", "Mia Malkova"]
+    aliases = [["JK", "Jill K"], [], ["Kass"], [], ["Anna Bell"], ["Bell"], [], [" Anna "], ["Mia M"]]
+    performers = pl.DataFrame({
+        "stashapp_id": list(range(1, len(names) + 1)),
+        "stashapp_name": names,
+        "stashapp_gender": ["FEMALE"] * len(names),
+        "stashapp_stash_ids": [[] for _ in names],
+        "stashapp_alias_list": aliases,
+    }).with_columns(pl.col("stashapp_alias_list").cast(pl.List(pl.Utf8)))
+    matcher = PerformerMatcher(performers)
+
+    for ce_name in ["Jill", "jill kassidy ", "Anna", "Bella Rose", "Kassidy Jill", "Mia", "Nobody", "J"]:
+        candidates = matcher._candidate_performers(ce_name)
+        candidate_ids = [p["stashapp_performers_id"] for p in candidates]
+        assert candidate_ids == sorted(candidate_ids)
+        for perf in matcher._all_performers_list:
+            confidence, _ = matcher._calculate_match_confidence(
+                ce_name, perf["stashapp_performers_name"], perf["stashapp_performers_alias_list"]
+            )
+            if confidence > 0:
+                assert perf["stashapp_performers_id"] in candidate_ids, f"{ce_name} should consider {perf}"
+
+def test_match_unmatched_performers_uses_first_best_candidate():
+    performers = pl.DataFrame({
+        "stashapp_id": [1, 2, 3],
+        "stashapp_name": ["Anna Bell Peaks", "Annabelle", "Anna Bell"],
+        "stashapp_gender": ["FEMALE"] * 3,
+        "stashapp_stash_ids": [[], [], []],
+        "stashapp_alias_list": [["Anna Bell"], [], []],
+    }).with_columns(pl.col("stashapp_alias_list").cast(pl.List(pl.Utf8)))
+    matcher = PerformerMatcher(performers)
+
+    matches = matcher.match_unmatched_performers(pl.DataFrame({
+        "performer_uuid": ["a", "b", "c"],
+        "performer_name": ["Anna Bell", "Annabelle Lee", "Nobody"],
+    }))
+
+    assert [(m.ce_uuid, m.stashapp_id, m.confidence) for m in matches] == [("a", 3, 1.0), ("b", 2, 0.6 + 9 / 13 * 0.1)]
@@ -1,4 +1,5 @@
 import json
+import random
 from pathlib import Path
 
 from libraries.scene_matcher import SceneMatcher
@@ -38,3 +39,55 @@ def test_scene_matcher_sample03():
     result = matcher.match_scenes(input_scenes, stashdb_scenes)
     expected_scene = next(scene for scene in stashdb_scenes if scene["id"] == "69698da1-46de-42e1-84ce-fc560e76fb62")
     assert result["b414ba062f6bdc72"] == expected_scene
+
+def reference_match_scenes(matcher: SceneMatcher, input_scenes, stashdb_scenes):
+    """Straightforward pairwise matching, equivalent to the original nested-loop implementation"""
+    phash_to_scene = {}
+    for input_scene in input_scenes:
+        best_key = None
+        for scene_index, stashdb_scene in enumerate(stashdb_scenes):
+            fingerprints = [f for f in stashdb_scene["fingerprints"] if f["algorithm"] == "PHASH"]
+            if not fingerprints:
+                continue
+            distances = [matcher._hamming_distance(input_scene["phash"], f["hash"]) for f in fingerprints]
+            quality = 0.0
+            for distance, fingerprint in zip(distances, fingerprints, strict=True):
+                if distance > matcher.MAX_DISTANCE or not input_scene.get("duration") or not fingerprint.get("duration"):
+                    continue
+                if abs(input_scene["duration"] - fingerprint["duration"]) <= matcher.MAX_DURATION_DIFF_SECS:
+                    quality += matcher.MAX_DISTANCE + 1 - distance
+            key = (min(distances), -quality / (len(fingerprints) * (matcher.MAX_DISTANCE + 1)), scene_index)
+            if best_key is None or key < best_key:
+                best_key = key
+        phash_to_scene[input_scene["phash"]] = stashdb_scenes[best_key[2]] if best_key else None
+    return phash_to_scene
+
+def test_scene_matcher_matches_pairwise_reference():
+    rng = random.Random(42)
+    base_hashes = [rng.getrandbits(64) for _ in range(20)]
+
+    def near(value: int) -> str:
+        for _ in range(rng.randint(0, 20)):
+            value ^= 1 << rng.randrange(64)
+        return f"{value:016x}"
+
+    stashdb_scenes = []
+    for i in range(60):
+        fingerprints = [
+            {"algorithm": "PHASH", "hash": near(rng.choice(base_hashes)), "duration": rng.choice([None, 0, 1200, 1250, 1500])}
+            for _ in range(rng.randint(0, 4))
+        ]
+        fingerprints.append({"algorithm": "OSHASH", "hash": near(0), "duration": 1200})
+        stashdb_scenes.append({"id": str(i), "fingerprints": fingerprints})
+    input_scenes = [
+        {"phash": near(rng.choice(base_hashes)), "duration": rng.choice([None, 1200, 1300])} for _ in range(200)
+    ]
+
+    # A small chunk size exercises the chunked distance computation
+    matcher = SceneMatcher(CHUNK_ELEMENTS=500)
+    assert matcher.match_scenes(input_scenes, stashdb_scenes) == reference_match_scenes(matcher, input_scenes, stashdb_scenes)
+
+def test_scene_matcher_without_phash_fingerprints():
+    matcher = SceneMatcher()
+    stashdb_scenes = [{"id": "1", "fingerprints": [{"algorithm": "OSHASH", "hash": "abc", "duration": 10}]}]
+    assert matcher.match_scenes([{"phash": "870f040525ef8bfe"}], stashdb_scenes) == {"870f040525ef8bfe": None}
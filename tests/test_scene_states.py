@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from libraries import scene_states
+from libraries.scene_states import DatasetStructure, SceneState, SceneStateStore
+
+
+def test_update_scene_state_is_shared_between_instances(tmp_path):
+    extractor = DatasetStructure(str(tmp_path))
+    detector = DatasetStructure(str(tmp_path))
+
+    extractor.update_scene_state("a", SceneState.FRAMES_EXTRACTED)
+    detector.update_scene_state("b", SceneState.FACES_EXTRACTED)
+    extractor.update_scene_state("b", SceneState.VERIFIED)
+
+    assert detector.get_scene_state("a") == SceneState.FRAMES_EXTRACTED
+    assert detector.get_scene_state("b") == SceneState.VERIFIED
+    assert detector.is_scene_processed("a")
+    assert not detector.is_scene_processed("c")
+    assert detector.states.counts() == {SceneState.FRAMES_EXTRACTED: 1, SceneState.VERIFIED: 1}
+
+
+def test_claim_next_gives_each_scene_to_one_worker(tmp_path):
+    store = SceneStateStore(tmp_path / "states.db")
+    scene_ids = [f"scene-{i:03d}" for i in range(200)]
+    store.set_many(dict.fromkeys(scene_ids, SceneState.FRAMES_EXTRACTED))
+
+    def claim_all(worker: str) -> list[str]:
+        # Separate stores, as in separate processes
+        worker_store = SceneStateStore(tmp_path / "states.db")
+        claimed = []
+        while scene_id := worker_store.claim_next(SceneState.FRAMES_EXTRACTED, SceneState.EXTRACTING_FACES, worker):
+            claimed.append(scene_id)
+        return claimed
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        claims = list(executor.map(claim_all, ["w1", "w2", "w3", "w4"]))
+
+    assert sorted(scene_id for claimed in claims for scene_id in claimed) == scene_ids
+    assert store.scene_ids(SceneState.FRAMES_EXTRACTED) == []
+    assert len(store.scene_ids(SceneState.EXTRACTING_FACES)) == 200
+
+
+def test_release_claims_of_one_worker(tmp_path):
+    store = SceneStateStore(tmp_path / "states.db")
+    store.set_many({"a": SceneState.FRAMES_EXTRACTED, "b": SceneState.FRAMES_EXTRACTED})
+    assert store.claim_next(SceneState.FRAMES_EXTRACTED, SceneState.EXTRACTING_FACES, "w1") == "a"
+    assert store.claim_next(SceneState.FRAMES_EXTRACTED, SceneState.EXTRACTING_FACES, "w2") == "b"
+
+    assert store.release_claims(SceneState.EXTRACTING_FACES, SceneState.FRAMES_EXTRACTED, worker="w1") == 1
+
+    assert store.get("a") == SceneState.FRAMES_EXTRACTED
+    assert store.get("b") == SceneState.EXTRACTING_FACES
+    assert store.claim_next(SceneState.EXTRACTING_FACES, SceneState.FACES_EXTRACTED, "w2") == "b"
+    assert store.claim_next(SceneState.EXTRACTING_FACES, SceneState.FACES_EXTRACTED, "w2") is None
+
+
+def test_migrate_dataset_info(tmp_path):
+    metadata = tmp_path / "metadata"
+    metadata.mkdir()
+    (metadata / "dataset.json").write_text(
+        json.dumps(
+            {
+                "processed_scenes": {
+                    "verified": "6_verified",
+                    "detected": "3_frames_extracted",
+                    "retried": "5_faces_extracted",
+                },
+                "last_updated": "2025-01-01 00:00:00",
+            }
+        )
+    )
+    scenes = tmp_path / "scenes"
+    # The face detector moved "detected" on without its state being saved
+    (scenes / "5_faces_extracted" / "detected").mkdir(parents=True)
+    (scenes / "3_frames_extracted").mkdir(parents=True)
+    (scenes / "3_frames_extracted" / "archived.tar").write_bytes(b"")
+    (scenes / "7_failed" / "retried").mkdir(parents=True)
+    (scenes / "7_failed" / "broken").mkdir(parents=True)
+    (scenes / "1_pending").mkdir(parents=True)
+    (scenes / "1_pending" / "queued.json").write_text("{}")
+
+    dataset = DatasetStructure(str(tmp_path))
+
+    assert {
+        scene_id: dataset.get_scene_state(scene_id) for scene_id in ["verified", "detected", "retried", "archived", "broken", "queued"]
+    } == {
+        "verified": SceneState.VERIFIED,
+        "detected": SceneState.FACES_EXTRACTED,
+        "retried": SceneState.FACES_EXTRACTED,
+        "archived": SceneState.FRAMES_EXTRACTED,
+        "broken": SceneState.FAILED,
+        "queued": None,
+    }
+    assert not (metadata / "dataset.json").exists()
+    assert (metadata / "dataset.json.migrated").exists()
+
+    # Opening the dataset again does not migrate again
+    dataset.update_scene_state("detected", SceneState.VERIFIED)
+    assert DatasetStructure(str(tmp_path)).get_scene_state("detected") == SceneState.VERIFIED
+
+
+def test_migrate_dataset_info_once_when_processes_start_together(tmp_path, monkeypatch):
+    metadata = tmp_path / "metadata"
+    metadata.mkdir()
+    processed = {f"scene-{i}": "6_verified" for i in range(100)}
+    (metadata / "dataset.json").write_text(json.dumps({"processed_scenes": processed}))
+    barrier = threading.Barrier(4)
+
+    def slow_load(f):
+        # Every process reads dataset.json before the first one is done with it
+        time.sleep(0.2)
+        return json.load(f)
+
+    monkeypatch.setattr(scene_states, "json", SimpleNamespace(load=slow_load))
+
+    def open_dataset(_) -> int | None:
+        barrier.wait()
+        return DatasetStructure(str(tmp_path)).states.counts()[SceneState.VERIFIED]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(open_dataset, range(4))) == [100] * 4
+    assert not (metadata / "dataset.json").exists()
+    assert (metadata / "dataset.json.migrated").exists()
+
+
+def test_state_db_location(tmp_path):
+    dataset = DatasetStructure(str(tmp_path / "dataset"), state_db=tmp_path / "local" / "states.db")
+    dataset.update_scene_state("a", SceneState.FRAMES_EXTRACTED)
+
+    assert (tmp_path / "local" / "states.db.os").read_text() == scene_states.current_os()
+    assert not (tmp_path / "dataset" / "metadata" / "scene_states.db").exists()
+
+
+def test_refuses_database_of_another_os(tmp_path):
+    SceneStateStore(tmp_path / "states.db")
+    (tmp_path / "states.db.os").write_text("windows" if scene_states.current_os() != "windows" else "wsl")
+
+    with pytest.raises(RuntimeError, match="run every worker of the dataset there"):
+        SceneStateStore(tmp_path / "states.db")
+
+
+def test_refuses_database_on_network_filesystem(tmp_path, monkeypatch):
+    monkeypatch.setattr(scene_states, "filesystem_type", lambda path: "9p")
+
+    with pytest.raises(RuntimeError, match="9p filesystem"):
+        SceneStateStore(tmp_path / "states.db")
+    assert not (tmp_path / "states.db").exists()
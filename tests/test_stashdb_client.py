@@ -0,0 +1,114 @@
+import json
+import re
+import threading
+from datetime import UTC, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from libraries.StashDbClient import StashDbClient
+
+
+def make_scene(scene_id: str, updated: str = "2024-01-01T00:00:00Z") -> dict:
+    return {
+        "id": scene_id,
+        "updated": updated,
+        "title": f"Title {scene_id}",
+        "code": None,
+        "details": None,
+        "director": None,
+        "duration": 1200,
+        "date": "2024-01-01",
+        "urls": [],
+        "images": [],
+        "studio": {"id": "studio-1", "name": "Studio", "urls": [], "images": [], "parent": None},
+        "tags": [],
+        "performers": [],
+        "fingerprints": [],
+    }
+
+
+# Most recently updated first, like queryScenes sorted by UPDATED_AT descending
+SCENES = {
+    f"scene-{i}": make_scene(f"scene-{i}", (datetime(2024, 3, 1, tzinfo=UTC) - timedelta(days=i)).isoformat())
+    for i in range(60)
+}
+TAGS = [{"id": f"tag-{i}", "name": f"Tag {i}"} for i in range(53)]
+
+
+class StubGraphQLHandler(BaseHTTPRequestHandler):
+    """Answers the queries StashDbClient sends, from SCENES and TAGS."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        query, variables = body["query"], body["variables"] or {}
+        self.server.requests.append(body)
+
+        if "queryScenes" in query or "queryTags" in query:
+            items_key, items = ("tags", TAGS) if "queryTags" in query else ("scenes", list(SCENES.values()))
+            start = (variables["page"] - 1) * variables["per_page"]
+            page_items = items[start : start + variables["per_page"]]
+            data = {"queryTags" if items_key == "tags" else "queryScenes": {"count": len(items), items_key: page_items}}
+        else:
+            data = {
+                alias: SCENES.get(variables[variable])
+                for alias, variable in re.findall(r"(\w+): findScene\(id: \$(\w+)\)", query)
+            }
+
+        payload = json.dumps({"data": data}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGraphQLHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    return StashDbClient(f"http://127.0.0.1:{server.server_address[1]}/graphql", "api-key", batch_size=20, per_page=10)
+
+
+def test_query_scenes_batches_ids(client, server):
+    scene_ids = [f"scene-{i}" for i in reversed(range(45))] + ["missing"]
+    df = client.query_scenes(scene_ids=scene_ids)
+
+    assert len(server.requests) == 3
+    assert df["id"].to_list() == [*scene_ids[:-1], None]
+    assert df["title"][0] == "Title scene-44"
+
+
+def test_paginated_queries_fetch_all_pages(client, server):
+    scenes = client.query_scenes_by_performer(["performer-1"])
+    assert [scene["id"] for scene in scenes] == list(SCENES)
+    assert len(server.requests) == 6
+    assert server.requests[0]["variables"]["stash_ids"] == ["performer-1"]
+
+    assert [tag["id"] for tag in client.query_tags()] == [tag["id"] for tag in TAGS]
+    assert len(client.query_scenes_by_studio(["studio-1"])) == len(SCENES)
+
+
+def test_api_key_header(client):
+    assert client.session.headers["Apikey"] == "api-key"
+
+
+def test_scenes_updated_since_stops_at_older_scene(client, server):
+    scenes = client.query_scenes_by_studio(["studio-1"], updated_since=datetime(2024, 2, 20, tzinfo=UTC))
+    # Scenes updated exactly at the watermark are fetched again
+    assert [scene["id"] for scene in scenes] == [f"scene-{i}" for i in range(11)]
+    # The first older scene is on the second page
+    assert len(server.requests) == 2
+    assert client.request_count == 2
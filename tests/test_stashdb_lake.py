@@ -0,0 +1,199 @@
+from datetime import UTC, date, datetime, timedelta
+
+import polars as pl
+import pytest
+from deltalake import DeltaTable, write_deltalake
+
+from libraries.stashdb_lake import StashDbLake
+
+
+def make_scene(scene_id: str, studio_id: str, release_date: str, title: str = "Scene") -> dict:
+    return {
+        "id": scene_id,
+        "title": title,
+        "release_date": release_date,
+        "duration": 1200,
+        "studio": {"id": studio_id, "parent": None},
+        "performers": [{"performer": {"id": "performer-1"}}],
+        "tags": [{"id": "tag-1"}],
+        "fingerprints": [],
+    }
+
+
+SCENES = [
+    make_scene("scene-1", "studio-a", "2019-05-01"),
+    make_scene("scene-2", "studio-a", "2021-01-15"),
+    make_scene("scene-3", "studio-b", "2021-07-30"),
+    make_scene("scene-4", "studio-b", "2023-03-03"),
+]
+
+
+@pytest.fixture(params=[None, "studio_id", "release_year"])
+def lake(tmp_path, request):
+    lake = StashDbLake(str(tmp_path / "stashdb"), scene_partition_by=request.param)
+    lake.upsert_scenes(SCENES)
+    return lake
+
+def test_get_scenes_filters(lake):
+    assert sorted(lake.get_scenes()["id"].to_list()) == ["scene-1", "scene-2", "scene-3", "scene-4"]
+    assert lake.get_scenes(scene_ids=["scene-3"])["id"].to_list() == ["scene-3"]
+    assert sorted(lake.get_scenes(studio_ids=["studio-a"])["id"].to_list()) == ["scene-1", "scene-2"]
+    assert sorted(
+        lake.get_scenes(released_from=date(2021, 1, 1), released_to=date(2021, 12, 31))["id"].to_list()
+    ) == ["scene-2", "scene-3"]
+    assert lake.get_scenes(scene_ids=["missing"]).is_empty()
+
+def test_upsert_updates_existing_scene(lake):
+    lake.upsert_scenes([make_scene("scene-2", "studio-a", "2021-01-15", title="Renamed")])
+    scenes = lake.get_scenes()
+    assert len(scenes) == 4
+    assert scenes.filter(scenes["id"] == "scene-2")["title"].to_list() == ["Renamed"]
+
+def test_scene_partitioning(lake):
+    expected = [lake.scene_partition_by] if lake.scene_partition_by else []
+    assert DeltaTable(str(lake.scenes_path)).metadata().partition_columns == expected
+
+def test_z_order_keeps_rows(lake):
+    lake.z_order("scenes")
+    assert sorted(lake.get_scenes()["id"].to_list()) == ["scene-1", "scene-2", "scene-3", "scene-4"]
+
+def test_invalid_partition_column(tmp_path):
+    with pytest.raises(ValueError, match="Invalid scene_partition_by"):
+        StashDbLake(str(tmp_path), scene_partition_by="title")
+
+def test_get_entities_by_id(tmp_path):
+    lake = StashDbLake(str(tmp_path / "stashdb"))
+    assert lake.get_performers(performer_ids=["performer-1"]).is_empty()
+    lake.upsert_performers([{"id": "performer-1", "name": "One"}, {"id": "performer-2", "name": "Two"}])
+    assert lake.get_performers(performer_ids=["performer-1"])["name"].to_list() == ["One"]
+    assert len(lake.get_performers()) == 2
+
+def test_new_tables_have_change_data_feed(lake):
+    assert DeltaTable(str(lake.scenes_path)).metadata().configuration["delta.enableChangeDataFeed"] == "true"
+
+def test_scene_history_from_change_data_feed(lake):
+    lake.upsert_scenes([make_scene("scene-2", "studio-a", "2021-01-15", title="Renamed")])
+    lake.upsert_scenes([make_scene("scene-3", "studio-b", "2021-07-30", title="Other")])
+
+    history = lake.get_scene_history("scene-2")
+    assert history["title"].to_list() == ["Renamed", "Scene"]
+    assert history["_version"].to_list() == [1, 0]
+    assert lake.get_scene_history("missing").is_empty()
+
+def test_scene_history_after_migration(tmp_path):
+    lake = StashDbLake(str(tmp_path / "stashdb"))
+    # A table created before the change data feed was enabled by default
+    write_deltalake(str(lake.scenes_path), pl.DataFrame({
+        "id": ["scene-1"], "scraped_at": [datetime(2024, 1, 1, tzinfo=UTC)], "title": ["Original"]
+    }).to_arrow())
+    lake.upsert_scenes([make_scene("scene-1", "studio-a", "2019-05-01", title="Pre-migration")])
+
+    assert lake.enable_change_data_feed() == ["scenes"]
+    assert lake.enable_change_data_feed() == []
+
+    lake.upsert_scenes([make_scene("scene-1", "studio-a", "2019-05-01", title="Post-migration")])
+    history = lake.get_scene_history("scene-1")
+    assert history["title"].to_list() == ["Post-migration", "Pre-migration", "Original"]
+    assert history["_version"].to_list() == [3, 1, 0]
+
+def test_get_version_at_timestamp(lake):
+    lake.upsert_scenes([make_scene("scene-5", "studio-a", "2024-01-01")])
+    dt = DeltaTable(str(lake.scenes_path))
+    commits = {entry["version"]: datetime.fromtimestamp(entry["timestamp"] / 1000, tz=UTC) for entry in dt.history()}
+
+    assert lake._get_version_at_timestamp(dt, commits[0] - timedelta(seconds=1)) is None
+    assert lake._get_version_at_timestamp(dt, commits[0]) == 0
+    assert lake._get_version_at_timestamp(dt, commits[1]) == 1
+    assert lake._get_version_at_timestamp(dt, datetime.now(UTC) + timedelta(days=1)) == 1
+    # Naive timestamps are treated as UTC
+    assert lake._get_version_at_timestamp(dt, commits[0].replace(tzinfo=None)) == 0
+
+    # The cached timeline picks up new versions
+    lake.upsert_scenes([make_scene("scene-6", "studio-a", "2024-01-02")])
+    assert lake._get_version_at_timestamp(DeltaTable(str(lake.scenes_path)), datetime.now(UTC) + timedelta(days=1)) == 2
+    assert sorted(lake.get_scenes(as_of=commits[0])["id"].to_list()) == ["scene-1", "scene-2", "scene-3", "scene-4"]
+
+def test_buffered_writer_merges_in_one_commit(tmp_path):
+    lake = StashDbLake(str(tmp_path / "stashdb"))
+    with lake.buffered(max_rows=100) as writer:
+        for scene in SCENES:
+            writer.upsert_scenes([scene])
+        writer.upsert_scenes([make_scene("scene-2", "studio-a", "2021-01-15", title="Renamed")])
+        writer.upsert_studios([{"id": "studio-a", "name": "A"}])
+        assert writer.buffered_rows == 5
+        assert not lake.scenes_path.exists()
+
+    assert DeltaTable(str(lake.scenes_path)).version() == 0
+    scenes = lake.get_scenes()
+    assert len(scenes) == 4
+    assert scenes.filter(pl.col("id") == "scene-2")["title"].to_list() == ["Renamed"]
+    assert lake.get_studios()["name"].to_list() == ["A"]
+
+def test_buffered_writer_flushes_at_limit(tmp_path):
+    lake = StashDbLake(str(tmp_path / "stashdb"))
+    writer = lake.buffered(max_rows=2)
+    writer.upsert_scenes(SCENES[:1])
+    assert writer.buffered_rows == 1
+    writer.upsert_scenes(SCENES[1:2])
+    assert writer.buffered_rows == 0
+    assert len(lake.get_scenes()) == 2
+
+    writer.max_seconds = 0
+    writer.upsert_scenes(SCENES[2:3])
+    assert writer.buffered_rows == 0
+    assert writer.flush() == {}
+
+def test_maintain_compacts_and_vacuums(tmp_path):
+    lake = StashDbLake(str(tmp_path / "stashdb"))
+    for scene in SCENES:
+        lake.upsert_scenes([scene])
+    lake.upsert_tags([{"id": "tag-1", "name": "Tag"}])
+
+    results = {result.table: result for result in lake.maintain(retention_hours=0)}
+    assert set(results) == {"scenes", "tags"}
+    scenes = results["scenes"]
+    assert scenes.files_before == 4
+    assert scenes.files_after == 1
+    assert scenes.files_vacuumed > 0
+    assert (lake.scenes_path / "_delta_log" / f"{scenes.version:020}.checkpoint.parquet").exists()
+    assert sorted(lake.get_scenes()["id"].to_list()) == ["scene-1", "scene-2", "scene-3", "scene-4"]
+
+def test_maintain_without_vacuum_keeps_history(lake):
+    lake.upsert_scenes([make_scene("scene-2", "studio-a", "2021-01-15", title="Renamed")])
+    results = lake.maintain(retention_hours=None, z_order=True)
+    assert [result.files_vacuumed for result in results] == [0]
+    assert lake.get_scene_history("scene-2")["title"].to_list() == ["Renamed", "Scene"]
+
+def test_scene_history_after_vacuum(tmp_path):
+    lake = StashDbLake(str(tmp_path / "stashdb"))
+    lake.upsert_scenes(SCENES)
+    for title in ["First", "Second", "Third"]:
+        lake.upsert_scenes([make_scene("scene-2", "studio-a", "2021-01-15", title=title)])
+
+    lake.maintain(retention_hours=0)
+    history = lake.get_scene_history("scene-2")
+    # The files written at version 0 were vacuumed
+    assert history["title"].to_list() == ["Third", "Second", "First"]
+    assert history["_version"].to_list() == [3, 2, 1]
+    assert lake.get_scene_history("scene-1").is_empty()
+
+def test_watermarks(tmp_path):
+    lake = StashDbLake(str(tmp_path / "stashdb"))
+    assert lake.get_watermark("studio", "studio-a") is None
+
+    lake.set_watermark("studio", "studio-a", datetime(2024, 1, 1, tzinfo=UTC))
+    lake.set_watermark("performer", "studio-a", datetime(2024, 2, 1, tzinfo=UTC))
+    lake.set_watermark("studio", "studio-a", datetime(2024, 3, 1, tzinfo=UTC))
+    assert lake.get_watermark("studio", "studio-a") == datetime(2024, 3, 1, tzinfo=UTC)
+    assert lake.get_watermark("performer", "studio-a") == datetime(2024, 2, 1, tzinfo=UTC)
+
+def test_batch_watermarks(tmp_path):
+    lake = StashDbLake(str(tmp_path / "stashdb"))
+    lake.set_watermarks("studio", {"studio-a": datetime(2024, 1, 1, tzinfo=UTC), "studio-b": datetime(2024, 2, 1, tzinfo=UTC)})
+    lake.set_watermarks("studio", {})
+
+    assert lake.get_watermarks("studio", ["studio-a", "studio-b", "studio-c"]) == {
+        "studio-a": datetime(2024, 1, 1, tzinfo=UTC),
+        "studio-b": datetime(2024, 2, 1, tzinfo=UTC),
+    }
+    assert DeltaTable(str(lake.crawl_state_path)).version() == 0
@@ -0,0 +1,206 @@
+import base64
+import builtins
+import hashlib
+import io
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from culture_cli.utils.sync_engine import SceneChanges, SiteSyncPlan, SyncEngine
+from libraries.client_stashapp import StashAppClient
+
+
+SCREENSHOT_URL = "http://stash.local/scene/1/screenshot"
+
+
+class StubResponse:
+    def __init__(self, status_code: int, etag: str | None = None):
+        self.status_code = status_code
+        self.headers = {"ETag": f'"{etag}"'} if etag else {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class StubSession:
+    """Serves one cover image the way Stashapp does: MD5 as ETag, 304 on a matching If-None-Match."""
+
+    def __init__(self, checksum: str, honours_if_none_match: bool = True, error: Exception | None = None):
+        self.checksum = checksum
+        self.honours_if_none_match = honours_if_none_match
+        self.error = error
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        self.requests.append((url, headers))
+        if self.error:
+            raise self.error
+        if self.honours_if_none_match and headers.get("If-None-Match") == f'"{self.checksum}"':
+            return StubResponse(304)
+        return StubResponse(200, self.checksum)
+
+
+def make_engine(session: StubSession | None = None, **kwargs) -> SyncEngine:
+    stash_client = StashAppClient.__new__(StashAppClient)
+    stash_client.stash = SimpleNamespace(s=session)
+    return SyncEngine(ce_client=None, stash_client=stash_client, **kwargs)
+
+
+def md5(data: bytes) -> str:
+    return hashlib.md5(data, usedforsecurity=False).hexdigest()
+
+
+@pytest.fixture
+def cover(tmp_path):
+    path = tmp_path / "covers" / "scene 1.jpg"
+    path.parent.mkdir()
+    path.write_bytes(b"cover image")
+    return path
+
+
+@pytest.mark.parametrize("honours_if_none_match", [True, False])
+def test_cover_image_unchanged_on_304_or_matching_etag(cover, honours_if_none_match):
+    session = StubSession(md5(b"cover image"), honours_if_none_match)
+    engine = make_engine(session)
+
+    assert engine._cover_image_unchanged(cover, {"paths": {"screenshot": SCREENSHOT_URL}})
+    assert session.requests == [(SCREENSHOT_URL, {"If-None-Match": f'"{md5(b"cover image")}"'})]
+
+
+def test_cover_image_changed(cover):
+    engine = make_engine(StubSession(md5(b"other image")))
+
+    assert not engine._cover_image_unchanged(cover, {"paths": {"screenshot": SCREENSHOT_URL}})
+
+
+def test_cover_image_changed_without_screenshot_or_file(tmp_path, cover):
+    session = StubSession(md5(b"cover image"))
+    engine = make_engine(session)
+
+    assert not engine._cover_image_unchanged(cover, {"paths": {"screenshot": None}})
+    assert not engine._cover_image_unchanged(tmp_path / "missing.jpg", {"paths": {"screenshot": SCREENSHOT_URL}})
+    assert session.requests == []
+
+
+@pytest.mark.parametrize("error", [requests.Timeout("timed out"), requests.ConnectionError("refused")])
+def test_cover_image_changed_when_request_fails(cover, error):
+    engine = make_engine(StubSession(md5(b"cover image"), error=error))
+
+    assert not engine._cover_image_unchanged(cover, {"paths": {"screenshot": SCREENSHOT_URL}})
+
+
+def test_cover_image_url_when_metadata_base_url_is_set(tmp_path, cover):
+    engine = make_engine(metadata_base_path=tmp_path, metadata_base_url="http://files.local/metadata/")
+
+    assert engine._cover_image_url(cover) == "http://files.local/metadata/covers/scene%201.jpg"
+    assert engine._process_cover_image(cover) == ("http://files.local/metadata/covers/scene%201.jpg", [])
+    assert engine._cover_image_url(tmp_path.parent / "elsewhere.jpg") is None
+
+
+def test_cover_image_base64_without_metadata_base_url(tmp_path, cover):
+    engine = make_engine(metadata_base_path=tmp_path)
+
+    assert engine._cover_image_url(cover) is None
+    image, errors = engine._process_cover_image(cover)
+    assert image == f"data:image/jpeg;base64,{base64.b64encode(b'cover image').decode()}"
+    assert errors == []
+
+
+def test_downscale_cover_image(tmp_path):
+    image_module = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    image_module.new("RGB", (800, 400), "red").save(buffer, format="PNG")
+    large = tmp_path / "large.png"
+    large.write_bytes(buffer.getvalue())
+    engine = make_engine(cover_max_size=200)
+
+    image_data, mime_type = engine._load_cover_image(large)
+    assert mime_type == "image/jpeg"
+    with image_module.open(io.BytesIO(image_data)) as image:
+        assert image.size == (200, 100)
+
+    # Images that already fit are uploaded as they are
+    engine.cover_max_size = 800
+    assert engine._load_cover_image(large) == (buffer.getvalue(), "image/png")
+
+
+def test_served_covers_are_not_downscaled(tmp_path, cover):
+    engine = make_engine(metadata_base_path=tmp_path, metadata_base_url="http://files.local", cover_max_size=200)
+
+    # Read as is, without Pillow, since Stashapp fetches the cover itself
+    assert engine._load_cover_image(cover) == (b"cover image", "image/jpeg")
+
+
+def test_downscale_without_pillow(monkeypatch, cover):
+    real_import = builtins.__import__
+
+    def import_without_pillow(name, *args, **kwargs):
+        if name == "PIL" or name.startswith("PIL."):
+            raise ImportError(f"No module named {name!r}")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", import_without_pillow)
+    engine = make_engine(cover_max_size=200)
+
+    with pytest.raises(OSError, match="Pillow is required"):
+        engine._load_cover_image(cover)
+    image, errors = engine._process_cover_image(cover)
+    assert image is None
+    assert errors == ["Failed to read cover image: Pillow is required to downscale cover images (pip install pillow)"]
+    # Planning treats the cover as changed instead of failing
+    assert not engine._cover_image_unchanged(cover, {"paths": {"screenshot": SCREENSHOT_URL}})
+
+
+class StubSiteStash:
+    """Records bulkSceneUpdate and scenesUpdate requests, failing those that touch failing_ids."""
+
+    def __init__(self, failing_ids: set[int]):
+        self.failing_ids = failing_ids
+        self.requests = []
+
+    def bulk_update_scenes(self, scene_ids, fields):
+        self.requests.append(("bulk", sorted(scene_ids), fields))
+        if self.failing_ids & set(scene_ids):
+            raise requests.ConnectionError("refused")
+
+    def update_scenes(self, updates):
+        self.requests.append(("update", [update["id"] for update in updates]))
+        if self.failing_ids & {update["id"] for update in updates}:
+            raise requests.ConnectionError("refused")
+
+
+def scene_changes(scene_id: int, update: dict | None = None, bulk: list | None = None, cover_path=None) -> SceneChanges:
+    return SceneChanges(
+        plan=SimpleNamespace(stashapp_id=scene_id), fields_updated=[], update=update or {}, bulk=bulk or [], cover_path=cover_path
+    )
+
+
+def test_apply_site_sync_counts_only_applied_scenes(tmp_path):
+    plan = SiteSyncPlan(
+        site_uuid="site",
+        site_name="Site",
+        changes=[
+            scene_changes(1, bulk=[("studio_id", None, 7)]),
+            scene_changes(2, bulk=[("studio_id", None, 8)]),
+            scene_changes(3, update={"title": "Three"}),
+            scene_changes(4, update={"title": "Four"}),
+            scene_changes(5, update={"title": "Five"}, cover_path=tmp_path / "missing.jpg"),
+        ],
+        unchanged=[],
+        unlinked_releases=0,
+        missing_scene_ids=[],
+    )
+    stash = StubSiteStash(failing_ids={2, 4})
+    engine = SyncEngine(ce_client=None, stash_client=stash)
+
+    result = engine.apply_site_sync(plan, batch_size=2)
+
+    assert not result.success
+    # Scene 2's bulk request and the scenesUpdate of 3 and 4 failed, scene 5's cover is missing
+    assert (result.scenes_updated, result.scenes_failed) == (1, 4)
+    assert (result.bulk_requests, result.scene_update_requests) == (1, 1)
+    assert len(result.errors) == 3
@@ -0,0 +1,109 @@
+import random
+import string
+from dataclasses import astuple
+
+import polars as pl
+import pytest
+
+from culture_cli.modules.ce.utils.tag_matcher import (
+    TagMatch,
+    TagMatchIndex,
+    calculate_similarity,
+    find_best_match_for_tag,
+    find_tag_matches,
+)
+
+
+def per_tag_matches(ce_tags: pl.DataFrame, stashapp_tags: pl.DataFrame, threshold: float, max_distance: int | None) -> list[TagMatch]:
+    """Every CE tag compared with every Stashapp tag, as find_tag_matches did before the index."""
+    matches = []
+    for ce_tag in ce_tags.to_dicts():
+        for stash_tag in stashapp_tags.to_dicts():
+            distance, similarity = calculate_similarity(ce_tag["ce_tags_name"], stash_tag["name"])
+            if similarity >= threshold and (max_distance is None or distance <= max_distance):
+                matches.append(TagMatch(
+                    ce_uuid=ce_tag["ce_tags_uuid"],
+                    ce_name=ce_tag["ce_tags_name"],
+                    stashapp_id=stash_tag["id"],
+                    stashapp_name=stash_tag["name"],
+                    stashdb_id=stash_tag["stashdb_id"],
+                    distance=distance,
+                    similarity=similarity,
+                ))
+    matches.sort(key=lambda x: (-x.similarity, x.distance))
+    return matches
+
+
+def per_tag_best_match(ce_tag_name: str, stashapp_tags: pl.DataFrame, threshold: float) -> tuple | None:
+    """(stashapp id, distance, similarity) of the first most similar Stashapp tag."""
+    best = None
+    for stash_tag in stashapp_tags.to_dicts():
+        distance, similarity = calculate_similarity(ce_tag_name, stash_tag["name"])
+        if similarity >= threshold and similarity > 0 and (best is None or similarity > best[2]):
+            best = (stash_tag["id"], distance, similarity)
+    return best
+
+
+def generate_names(rng: random.Random, base: list[str], count: int) -> list[str]:
+    """Names from base with inserted letters and separators, and changed case."""
+    names = []
+    for _ in range(count):
+        name = list(rng.choice(base))
+        for _ in range(rng.randint(0, 2)):
+            name.insert(rng.randrange(len(name) + 1), rng.choice(string.ascii_lowercase + " -_"))
+        names.append("".join(name).title() if rng.random() < 0.5 else "".join(name))
+    return names
+
+
+@pytest.fixture
+def tags():
+    rng = random.Random(0)
+    base = [
+        " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 7))) for _ in range(rng.randint(1, 3)))
+        for _ in range(60)
+    ]
+    stashapp_tags = pl.DataFrame({
+        "id": list(range(200)),
+        "name": [*generate_names(rng, base, 198), "", "Big-Tits"],
+        "stashdb_id": [f"stashdb-{i}" if i % 3 else None for i in range(200)],
+    })
+    ce_tags = pl.DataFrame({
+        "ce_tags_uuid": [f"ce-{i}" for i in range(80)],
+        "ce_tags_name": [*generate_names(rng, base, 78), "", "big tits"],
+    })
+    return ce_tags, stashapp_tags
+
+
+@pytest.mark.parametrize(("threshold", "max_distance"), [(0.85, None), (0.6, None), (0.6, 2), (1.0, None)])
+def test_find_matches_equals_per_tag_matching(tags, threshold, max_distance):
+    ce_tags, stashapp_tags = tags
+
+    matches = find_tag_matches(ce_tags, stashapp_tags, threshold=threshold, max_distance=max_distance)
+
+    expected = per_tag_matches(ce_tags, stashapp_tags, threshold, max_distance)
+    assert expected
+    assert [astuple(match) for match in matches] == pytest.approx([astuple(match) for match in expected])
+
+
+@pytest.mark.parametrize("threshold", [0.85, 0.6])
+def test_find_best_match_equals_per_tag_matching(tags, threshold):
+    ce_tags, stashapp_tags = tags
+    index = TagMatchIndex(stashapp_tags, workers=1)
+
+    for name in ce_tags["ce_tags_name"]:
+        match = index.find_best_match(name, threshold=threshold)
+        expected = per_tag_best_match(name, stashapp_tags, threshold)
+        actual = (match.stashapp_id, match.distance, match.similarity) if match else None
+        assert actual == pytest.approx(expected), name
+
+
+def test_find_best_match_for_tag_reuses_index(tags):
+    _, stashapp_tags = tags
+    index = TagMatchIndex(stashapp_tags)
+
+    match = find_best_match_for_tag("BIG_TITS", index)
+    assert (match.stashapp_id, match.stashapp_name, match.stashdb_id, match.distance, match.similarity) == (
+        199, "Big-Tits", "stashdb-199", 0, 1.0
+    )
+    assert find_best_match_for_tag("BIG_TITS", stashapp_tags) == match
+    assert find_best_match_for_tag("zzzzzzzzzzzzzzzzzzzz", index) is None